@@ -0,0 +1,141 @@
+"""Agendamentos de depósitos, saques e transferências (únicos ou recorrentes) executados em lotes pelo mesmo caminho atômico dos
+movimentos, uma vez por ocorrência (uso: python agendamentos.py --db ... [--continuo] [--listar NUMERO_CONTA])."""
+import argparse
+import calendar
+import datetime
+import sqlite3
+import threading
+import time
+
+from main import DatabaseManager, Dinheiro, MovimentoRecusado, _texto_data, postar_movimento
+
+INTERVALOS = {'diario': (1, 0), 'semanal': (7, 0), 'mensal': (0, 1)} # intervalo: (dias, meses) entre ocorrências
+# Vencidos em ordem de vencimento pelo índice parcial idx_agendamentos_proxima, com o que postar_movimento precisa da conta de origem
+SQL_VENCIDOS = """SELECT a.id, a.conta_id, a.tipo, a.centavos, a.conta_destino_id, a.inicio, a.intervalo, a.repeticoes, a.ocorrencia, a.proxima, c.tipo_conta, c.limite_saques
+                  FROM agendamentos a JOIN contas c ON c.id = a.conta_id WHERE a.proxima <= ? ORDER BY a.proxima LIMIT ?"""
+SQL_EXECUCAO = "INSERT INTO execucoes_agendamento (agendamento_id, ocorrencia, vencimento, estado, motivo, transacao_id) VALUES (?, ?, ?, ?, ?, ?)"
+
+def _instante(valor) -> str:
+    """Data/hora (datetime, date ou texto ISO) no formato de transacoes.timestamp; só a data = meia-noite."""
+    if isinstance(valor, str): valor = datetime.datetime.fromisoformat(valor)
+    elif not isinstance(valor, datetime.datetime): valor = datetime.datetime.combine(valor, datetime.time())
+    return _texto_data(valor.replace(microsecond=0))
+
+def vencimento(inicio: str, intervalo: str | None, repeticoes: int | None, ocorrencia: int) -> str | None:
+    """Vencimento da ocorrência `ocorrencia` (0 = a primeira) ou None se o agendamento já terminou.
+
+    Calculado sempre a partir do início (sem acumular deslocamentos): mensal no dia 31 cai no último dia dos meses mais curtos e volta ao 31."""
+    if (intervalo is None and ocorrencia > 0) or (repeticoes is not None and ocorrencia >= repeticoes): return None
+    if intervalo is None or ocorrencia == 0: return inicio
+    t = datetime.datetime.fromisoformat(inicio); dias, meses = INTERVALOS[intervalo]
+    if meses:
+        total = t.month - 1 + meses * ocorrencia; ano, mes = t.year + total // 12, total % 12 + 1
+        t = t.replace(year=ano, month=mes, day=min(t.day, calendar.monthrange(ano, mes)[1]))
+    else: t += datetime.timedelta(days=dias * ocorrencia)
+    return _texto_data(t)
+
+class Agenda:
+    """Agendamentos gravados no BD e o executor das ocorrências vencidas.
+
+    executar_vencidos() grava até `lote` ocorrências por transação (BEGIN IMMEDIATE), cada uma num SAVEPOINT com
+    postar_movimento, o mesmo núcleo de Conta._atualizar_saldo_e_registrar_transacao: uma recusa (saldo, limite diário)
+    fica registrada como 'recusada' e não desfaz o resto do lote. A ocorrência, o lançamento e o avanço de `proxima`
+    são gravados juntos e a chave (agendamento_id, ocorrencia) de execucoes_agendamento não aceita repetição: um executor
+    reiniciado (ou um segundo executor no mesmo arquivo) nunca posta a mesma ocorrência duas vezes. Depois de uma parada,
+    cada ocorrência perdida é executada, em ordem de vencimento."""
+    def __init__(self, db_manager: DatabaseManager):
+        self.db = db_manager
+
+    def agendar(self, conta_id: int, tipo: str, valor, quando=None, *, conta_destino_id: int | None = None, intervalo: str | None = None, repeticoes: int | None = None, descricao: str | None = None) -> int:
+        """Agenda um movimento a partir de `quando` (padrão: agora) e retorna o ID; intervalo None = uma vez, repeticoes None = sem fim. Levanta ValueError."""
+        valor = Dinheiro.de(valor)
+        if tipo not in ('deposito', 'saque', 'transferencia_enviada'): raise ValueError(f"Tipo de movimento inválido para agendamento: {tipo}.")
+        if valor.centavos <= 0: raise ValueError("O valor agendado deve ser positivo.")
+        if intervalo is not None and intervalo not in INTERVALOS: raise ValueError(f"Intervalo inválido: {intervalo} (use {', '.join(INTERVALOS)}).")
+        if repeticoes is not None and repeticoes < 1: raise ValueError("repeticoes deve ser pelo menos 1.")
+        if (tipo == 'transferencia_enviada') != (conta_destino_id is not None) or conta_destino_id == conta_id: raise ValueError("Transferências (e só elas) precisam de uma conta destino diferente da origem.")
+        inicio = _instante(quando or datetime.datetime.now())
+        def gravar(cursor):
+            for cid in (conta_id, conta_destino_id):
+                if cid is not None and cursor.execute("SELECT 1 FROM contas WHERE id = ?", (cid,)).fetchone() is None: raise ValueError(f"Conta ID {cid} não existe.")
+            return cursor.execute("INSERT INTO agendamentos (conta_id, tipo, centavos, conta_destino_id, inicio, intervalo, repeticoes, proxima, descricao) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                  (conta_id, tipo, valor.centavos, conta_destino_id, inicio, intervalo, repeticoes, inicio, descricao)).lastrowid
+        return self.db.executar_transacao(gravar)
+
+    def cancelar(self, agendamento_id: int) -> bool:
+        """Encerra o agendamento (as ocorrências já executadas continuam registradas); False se não existia ou já tinha terminado."""
+        return self.db.executar_transacao(lambda cursor: cursor.execute("UPDATE agendamentos SET proxima = NULL WHERE id = ? AND proxima IS NOT NULL", (agendamento_id,)).rowcount > 0)
+
+    def listar(self, conta_id: int) -> list[dict]:
+        """Agendamentos de uma conta (como origem ou destino), os ativos primeiro, com o total de execuções e recusas."""
+        q = """SELECT a.id, a.conta_id, a.tipo, a.centavos, a.conta_destino_id, a.inicio, a.intervalo, a.repeticoes, a.ocorrencia, a.proxima, a.descricao,
+                      (SELECT COUNT(*) FROM execucoes_agendamento e WHERE e.agendamento_id = a.id AND e.estado = 'recusada') AS recusadas
+               FROM agendamentos a WHERE a.conta_id = ? OR a.conta_destino_id = ? ORDER BY a.proxima IS NULL, a.proxima, a.id"""
+        return [{**dict(row), 'valor': Dinheiro(row['centavos'])} for row in self.db.fetch_all(q, (conta_id, conta_id))]
+
+    def execucoes(self, agendamento_id: int) -> list[dict]:
+        return [dict(row) for row in self.db.fetch_all("SELECT * FROM execucoes_agendamento WHERE agendamento_id = ? ORDER BY ocorrencia", (agendamento_id,))]
+
+    def proximo_vencimento(self) -> str | None:
+        row = self.db.fetch_one("SELECT MIN(proxima) FROM agendamentos WHERE proxima IS NOT NULL"); return row[0] if row else None
+
+    def _executar_lote(self, cursor, agora: str, lote: int) -> dict:
+        """Numa transação aberta: executa até `lote` ocorrências vencidas até `agora` (todas as atrasadas de um mesmo agendamento, em ordem)."""
+        r = {'executadas': 0, 'recusadas': 0, 'duplicadas': 0, 'contas': set()}; feitas = 0
+        for (agendamento_id, conta_id, tipo, centavos, conta_destino_id, inicio, intervalo, repeticoes, ocorrencia, proxima, tipo_conta, limite_saques) in cursor.execute(SQL_VENCIDOS, (agora, lote)).fetchall():
+            usa_limite = tipo_conta == 'corrente'; opcoes = {'usa_limite': usa_limite, 'limite_saques': limite_saques if usa_limite else None} # Como em Conta._postar
+            valor = self.db.para_bd(Dinheiro(centavos)); r['contas'].update((conta_id, conta_destino_id))
+            while proxima is not None and proxima <= agora and feitas < lote:
+                cursor.execute("SAVEPOINT agendamento")
+                try: postar_movimento(cursor, conta_id, tipo, valor, conta_destino_id, **opcoes); estado, motivo, transacao_id = 'executada', None, cursor.lastrowid # O último INSERT é o lançamento da origem
+                except (MovimentoRecusado, sqlite3.IntegrityError) as e: cursor.execute("ROLLBACK TO agendamento"); estado, motivo, transacao_id = 'recusada', getattr(e, 'motivo', 'integridade'), None
+                try: cursor.execute(SQL_EXECUCAO, (agendamento_id, ocorrencia, proxima, estado, motivo, transacao_id)); r[estado + 's'] += 1
+                except sqlite3.IntegrityError: cursor.execute("ROLLBACK TO agendamento"); r['duplicadas'] += 1 # Ocorrência já registrada: desfaz o lançamento
+                cursor.execute("RELEASE agendamento")
+                ocorrencia += 1; proxima = vencimento(inicio, intervalo, repeticoes, ocorrencia); feitas += 1
+            cursor.execute("UPDATE agendamentos SET ocorrencia = ?, proxima = ? WHERE id = ?", (ocorrencia, proxima, agendamento_id))
+        return r
+
+    def executar_vencidos(self, agora=None, *, lote: int = 1000, max_lotes: int | None = None) -> dict:
+        """Executa as ocorrências vencidas até `agora` (padrão: o início da chamada), uma transação por lote; retorna os totais."""
+        agora = _instante(agora or datetime.datetime.now()); inicio = time.perf_counter(); total = {'executadas': 0, 'recusadas': 0, 'duplicadas': 0, 'lotes': 0}
+        while max_lotes is None or total['lotes'] < max_lotes:
+            r = self.db.executar_transacao(lambda cursor: self._executar_lote(cursor, agora, lote))
+            for cid in r.pop('contas') - {None}: self.db.cache_contas.invalidar(cid) # Saldos em cache ficaram velhos
+            for chave, n in r.items(): total[chave] += n
+            if not any(r.values()): break
+            total['lotes'] += 1
+        total['segundos'] = time.perf_counter() - inicio; return total
+
+    def servir(self, parar: threading.Event | None = None, *, lote: int = 1000, espera_max: float = 60.0, ao_executar=None):
+        """Executa os vencidos e dorme até o próximo vencimento (no máximo espera_max s: agendamentos novos de outras conexões) até `parar`."""
+        parar = parar or threading.Event()
+        while not parar.is_set():
+            r = self.executar_vencidos(lote=lote)
+            if ao_executar is not None and r['lotes']: ao_executar(r)
+            proxima = self.proximo_vencimento()
+            espera = espera_max if proxima is None else (datetime.datetime.fromisoformat(proxima) - datetime.datetime.now()).total_seconds()
+            parar.wait(min(max(espera, 0.05), espera_max))
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--db", default="banco_moderno_v6_ptbr.db", help="arquivo do banco de dados")
+    parser.add_argument("--lote", type=int, default=1000, help="ocorrências por transação")
+    parser.add_argument("--continuo", action="store_true", help="continua rodando e executa cada agendamento no vencimento (Ctrl+C para sair)")
+    parser.add_argument("--listar", metavar="NUMERO_CONTA", help="lista os agendamentos da conta em vez de executar")
+    args = parser.parse_args()
+    with DatabaseManager(args.db, pool=True) as db:
+        agenda = Agenda(db)
+        if args.listar:
+            row = db.fetch_one("SELECT id FROM contas WHERE numero = ?", (args.listar,))
+            if row is None: raise SystemExit(f"conta {args.listar} não existe")
+            for a in agenda.listar(row[0]):
+                print(f"#{a['id']:<6} {a['tipo']:<22} R$ {a['valor']:>12,.2f} {a['intervalo'] or 'única':<8} próxima: {a['proxima'] or 'encerrado':<19} ocorrências: {a['ocorrencia']} ({a['recusadas']} recusada(s)) {a['descricao'] or ''}")
+            return
+        relatar = lambda r: print(f"{r['executadas']:,} executada(s), {r['recusadas']:,} recusada(s), {r['duplicadas']} duplicada(s) em {r['lotes']} lote(s), {r['segundos']:.2f}s")
+        if not args.continuo: relatar(agenda.executar_vencidos(lote=args.lote)); return
+        try: agenda.servir(lote=args.lote, ao_executar=relatar)
+        except KeyboardInterrupt: pass
+
+if __name__ == "__main__":
+    main_cli()
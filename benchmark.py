@@ -0,0 +1,1140 @@
+"""Benchmarks headless do Sistema Bancário (uso: python benchmark.py <nome> [opções])."""
+import argparse
+import asyncio
+import contextlib
+import csv
+import datetime
+import heapq
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from agendamentos import Agenda
+from conciliacao import ConciliadorLedger
+from exportacao import ExportadorExtrato
+from interface import BancoGUI, ExecutorUI
+from main import RESUMOS, SQL_DELTA_SALDO, AlocadorNumerosConta, DatabaseManager, Cliente, Dinheiro, Conta, ContaCorrente, ExtratoRenderizado, FeedAlteracoes, MapaIdentidade, MovimentoRecusado, postar_movimento, reservar_sequencia, sincronizar_sequencia_contas
+from particionamento import BancoParticionado
+from processamento_lote import ProcessadorLote
+from relatorios import RelatoriosAdmin
+
+BENCHMARKS = {} # nome -> função(args)
+
+def benchmark(nome):
+    """Registra uma função de benchmark pelo nome usado na linha de comando."""
+    def registrar(func): BENCHMARKS[nome] = func; return func
+    return registrar
+
+def novo_banco(diretorio, nome="bench.db", **kwargs) -> DatabaseManager:
+    """Cria um BD vazio (sem o ADMIN de exemplo, que abriria um messagebox)."""
+    caminho = os.path.join(diretorio, nome)
+    open(caminho, 'a').close() # Arquivo já existente => initialize_db não cria o ADMIN
+    return DatabaseManager(caminho, **kwargs)
+
+def criar_conta(db: DatabaseManager, numero: str, saldo: float = 0.0, cpf: str | None = None) -> int: # saldo em reais
+    """Insere um cliente e uma conta de teste e retorna o ID da conta."""
+    cpf = cpf or f"{int(numero):011d}"; cpf = f"{cpf[:3]}.{cpf[3:6]}.{cpf[6:9]}-{cpf[9:11]}"
+    cliente_id = db.execute_query("INSERT INTO clientes (nome, cpf, endereco, senha) VALUES (?, ?, ?, ?)", (f"Cliente {numero}", cpf, "Rua Teste", "123"))
+    return db.execute_query("INSERT INTO contas (numero, cliente_id, saldo) VALUES (?, ?, ?)", (numero, cliente_id, db.para_bd(saldo)))
+
+def taxa(ops: int, segundos: float) -> str:
+    """Formata operações por segundo."""
+    return f"{ops / segundos:,.0f} ops/s" if segundos > 0 else "inf ops/s"
+
+def percentil(valores: list[float], p: float) -> float:
+    """Percentil p (0-100) por posição na lista ordenada."""
+    if not valores: return 0.0
+    ordenados = sorted(valores); return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p / 100))]
+
+def popular_ledger(db: DatabaseManager, n_contas: int, n_transacoes: int, seed: int = 42) -> list[int]:
+    """Cria n_contas contas e n_transacoes movimentações espalhadas pelos últimos 365 dias (inserção em massa)."""
+    rnd = random.Random(seed); conn = db._connect()
+    try:
+        conn.executemany("INSERT INTO clientes (nome, cpf, endereco, senha) VALUES (?, ?, ?, ?)", ((f"Cliente {i:06d}", f"{i:03d}.{i:03d}.{i:03d}-{i % 100:02d}"[-14:], "Rua", "123") for i in range(n_contas)))
+        conn.executemany("INSERT INTO contas (numero, cliente_id, saldo) VALUES (?, ?, ?)", ((str(10000 + i), i + 1, 0) for i in range(n_contas)))
+        conta_ids = [r[0] for r in conn.execute("SELECT id FROM contas ORDER BY id")]
+        base = datetime.datetime.now() - datetime.timedelta(days=365); tipos = ('deposito', 'saque', 'transferencia_enviada', 'transferencia_recebida')
+        def linhas():
+            for _ in range(n_transacoes):
+                ts = base + datetime.timedelta(seconds=rnd.randrange(365 * 86400))
+                yield (rnd.choice(conta_ids), rnd.choice(tipos), db.para_bd(round(rnd.uniform(1, 500), 2)), ts.strftime('%Y-%m-%d %H:%M:%S'))
+        conn.executemany("INSERT INTO transacoes (conta_id, tipo, valor, timestamp) VALUES (?, ?, ?, ?)", linhas())
+        conn.commit(); conn.execute("ANALYZE;")
+        return conta_ids
+    finally:
+        db._release(conn)
+
+NOMES = ("Ana", "Bruno", "Carla", "Diego", "Eduarda", "Felipe", "Gabriela", "Heitor", "Isabela", "João", "Larissa", "Marcos", "Natália", "Otávio", "Paula", "Rafael", "Sofia", "Thiago", "Vitória", "Yuri")
+SOBRENOMES = ("Silva", "Santos", "Oliveira", "Souza", "Rodrigues", "Ferreira", "Alves", "Pereira", "Lima", "Gomes", "Costa", "Ribeiro", "Martins", "Carvalho", "Almeida", "Lopes", "Soares", "Fernandes", "Vieira", "Barbosa")
+PESOS_HORA = (1, 1, 1, 1, 1, 2, 4, 8, 12, 14, 14, 13, 15, 14, 13, 12, 12, 11, 10, 8, 6, 4, 2, 1) # Movimento ao longo do dia (pico no horário comercial)
+
+def gerar_banco_sintetico(db: DatabaseManager, n_clientes: int, n_contas: int, n_transacoes: int, *, seed: int = 42, dias: int = 365) -> dict:
+    """Popula um BD vazio com dados sintéticos reprodutíveis (mesma seed => mesmo banco) e retorna um resumo.
+
+    Distribuições: toda conta recebe um cliente (os que sobram vão para clientes sorteados, então alguns têm várias contas);
+    a atividade por conta segue Zipf (poucas contas muito movimentadas, cauda longa de contas paradas); valores são
+    log-normais (depósitos maiores que saques); horários seguem PESOS_HORA; transferências geram o par enviada/recebida.
+    Os saldos saem do próprio ledger (mais um depósito inicial) e os contadores de saques são reconstruídos no fim."""
+    rnd = random.Random(seed); conn = db._connect(); agora = datetime.datetime.now()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        clientes = [(f"{rnd.choice(NOMES)} {rnd.choice(SOBRENOMES)} {rnd.choice(SOBRENOMES)}", f"{i // 1000000 % 1000:03d}.{i // 1000 % 1000:03d}.{i % 1000:03d}-{rnd.randrange(100):02d}", f"Rua {rnd.randrange(1, 2000)}", f"senha{i}") for i in range(1, n_clientes + 1)]
+        conn.executemany("INSERT INTO clientes (nome, cpf, endereco, senha) VALUES (?, ?, ?, ?)", clientes)
+        cliente_ids = [r[0] for r in conn.execute("SELECT id FROM clientes ORDER BY id")]
+        donos = cliente_ids[:n_contas] + rnd.choices(cliente_ids, k=max(0, n_contas - n_clientes))
+        numeros = reservar_sequencia(conn.cursor(), n_contas) if n_contas else range(0)
+        conn.executemany("INSERT INTO contas (numero, cliente_id, saldo, tipo_conta) VALUES (?, ?, 0, ?)", ((str(numero), dono, 'corrente' if rnd.random() < 0.8 else 'poupanca') for numero, dono in zip(numeros, donos)))
+        conta_ids = [r[0] for r in conn.execute("SELECT id FROM contas ORDER BY id")]
+        pesos = [1 / (i + 1) ** 1.1 for i in range(len(conta_ids))]; ativas = conta_ids[:]; rnd.shuffle(ativas) # Posição no ranking de atividade sorteada
+        acumulados = list(itertools.accumulate(pesos)); inicio = agora - datetime.timedelta(days=dias); horas = list(range(24))
+        def instante():
+            dia = inicio + datetime.timedelta(days=rnd.randrange(dias + 1))
+            return dia.replace(hour=rnd.choices(horas, PESOS_HORA)[0], minute=rnd.randrange(60), second=rnd.randrange(60)).strftime('%Y-%m-%d %H:%M:%S')
+        saldos = dict.fromkeys(conta_ids, 0); bd = db.para_bd # Valores e saldos na unidade do BD (centavos: soma exata)
+        def linhas():
+            for conta_id in conta_ids: # Depósito inicial: nenhuma conta começa no vermelho
+                valor = bd(round(min(rnd.lognormvariate(7.0, 0.8), 50000.0), 2)); saldos[conta_id] += valor
+                yield (conta_id, 'deposito', valor, inicio.strftime('%Y-%m-%d %H:%M:%S'), None)
+            gerados = 0
+            while gerados < n_transacoes:
+                conta_id = rnd.choices(ativas, cum_weights=acumulados)[0]; sorteio = rnd.random(); ts = instante()
+                if sorteio < 0.35: valor = bd(round(min(rnd.lognormvariate(5.5, 1.0), 20000.0), 2)); saldos[conta_id] += valor; gerados += 1; yield (conta_id, 'deposito', valor, ts, None)
+                elif sorteio < 0.65 or len(conta_ids) < 2: valor = bd(round(min(rnd.lognormvariate(4.0, 0.9), 5000.0), 2)); saldos[conta_id] -= valor; gerados += 1; yield (conta_id, 'saque', valor, ts, None)
+                else:
+                    destino = rnd.choice(conta_ids)
+                    if destino == conta_id: continue
+                    valor = bd(round(min(rnd.lognormvariate(4.5, 1.0), 10000.0), 2)); saldos[conta_id] -= valor; saldos[destino] += valor; gerados += 2
+                    yield (conta_id, 'transferencia_enviada', valor, ts, destino); yield (destino, 'transferencia_recebida', valor, ts, conta_id)
+        conn.executemany("INSERT INTO transacoes (conta_id, tipo, valor, timestamp, conta_destino_id) VALUES (?, ?, ?, ?, ?)", linhas())
+        conn.executemany("UPDATE contas SET saldo = ? WHERE id = ?", ((round(saldo, 2), conta_id) for conta_id, saldo in saldos.items()))
+        sincronizar_sequencia_contas(conn.cursor()); conn.commit()
+    finally:
+        db._release(conn)
+    db.reconstruir_contadores_saques(); db.execute_query("ANALYZE;")
+    return {'clientes': n_clientes, 'contas': n_contas, 'transacoes': db.fetch_one("SELECT COUNT(*) FROM transacoes")[0], 'conta_ids': conta_ids, 'ativas': ativas, 'cpfs': [c[1] for c in clientes], 'cliente_ids': cliente_ids}
+
+# --- Benchmarks ---
+
+@benchmark("pool")
+def bench_pool(args):
+    """Conexão por consulta vs. conexões persistentes (pool): leituras do extrato + depósitos."""
+    for modo, kwargs in (("conexão por consulta", {}), ("pool (WAL)", {"pool": True})):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = novo_banco(tmp, **kwargs); conta_id = criar_conta(db, "1001", 100.0)
+            inicio = time.perf_counter()
+            for _ in range(args.n): # Mesma sequência de idas ao BD de um "Atualizar Extrato" + depósito
+                db.fetch_one("SELECT * FROM contas WHERE id = ?", (conta_id,))
+                db.fetch_one("SELECT nome, cpf, endereco, senha, role FROM clientes WHERE id = ?", (1,))
+                db.fetch_all("SELECT id, tipo, valor, timestamp, conta_destino_id FROM transacoes WHERE conta_id = ? ORDER BY timestamp ASC LIMIT 50", (conta_id,))
+                db.execute_query("UPDATE contas SET saldo = saldo + 1 WHERE id = ?", (conta_id,))
+            duracao = time.perf_counter() - inicio; db.close()
+            print(f"{modo:>22}: {args.n * 4} operações em {duracao:.3f}s -> {taxa(args.n * 4, duracao)}")
+
+@benchmark("planos")
+def bench_planos(args):
+    """Tempo e plano das consultas quentes num ledger grande (a exigência de índice é verificada em tests/test_planos.py)."""
+    n = args.n if args.n != 2000 else 1_000_000 # Padrão: ledger de 1M linhas
+    with tempfile.TemporaryDirectory() as tmp:
+        db = novo_banco(tmp, pool=True); t0 = time.perf_counter(); conta_ids = popular_ledger(db, 1000, n)
+        print(f"Ledger com {n:,} transações criado em {time.perf_counter() - t0:.1f}s")
+        hoje = datetime.date.today(); conta = conta_ids[len(conta_ids) // 2]
+        consultas = {
+            "historico": (Conta.SQL_HISTORICO, (conta,)),
+            "historico_pagina": (Conta.SQL_HISTORICO_PAGINA_BASE + " AND (timestamp, id) > (?, ?) ORDER BY timestamp ASC, id ASC LIMIT ?", (conta, hoje.isoformat(), 0, 200)),
+            "saques_hoje": (Conta.SQL_SAQUES_HOJE, (conta, hoje.isoformat())),
+            "busca_todas": Conta.sql_busca("", limite=6)[:2],
+            "busca_nome": Conta.sql_busca("cliente 0004", limite=6, apos=("Cliente 000400", 401, "10400"))[:2],
+            "busca_cpf": Conta.sql_busca("004.", limite=6)[:2],
+            "busca_numero": Conta.sql_busca("105", limite=6, apos=("10500",))[:2],
+            "contas_cliente": (BancoGUI.SQL_CONTAS_CLIENTE, (500,)),
+            "conta_por_numero": ("SELECT id FROM contas WHERE numero = ?", ("10500",)),
+            "cliente_por_cpf": ("SELECT id, nome, cpf, endereco, senha, role FROM clientes WHERE cpf = ?", ("000.000.000-00",)),
+            "exportacao_conta": ExportadorExtrato.consulta(conta_id=conta, inicio=hoje - datetime.timedelta(days=30)),
+            "exportacao_cliente": ExportadorExtrato.consulta(cliente_id=500),
+            "exportacao_banco": ExportadorExtrato.consulta(inicio=hoje - datetime.timedelta(days=1)), # Índice inteiro em ordem, sem ordenação temporária
+        }
+        for nome, (sql, params) in consultas.items():
+            plano = [row['detail'] for row in db.fetch_all("EXPLAIN QUERY PLAN " + sql, params)]
+            t0 = time.perf_counter(); db.fetch_all(sql, params); ms = (time.perf_counter() - t0) * 1000
+            print(f"{nome:<18} {ms:8.2f} ms  | {' ; '.join(plano)}")
+        db.close()
+
+def _trabalhador_concorrencia(caminho: str, conta_ids: list[int], n_ops: int, seed: int) -> tuple[float, int]:
+    """Processo escritor: depósitos e transferências aleatórias pelo caminho de postagem real de Conta."""
+    rnd = random.Random(seed); depositado = 0.0; recusados = 0
+    with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo): # Conta imprime cada operação
+        db = DatabaseManager(caminho, pool=True); contas = [ContaCorrente(db, conta_id=cid) for cid in conta_ids]
+        for _ in range(n_ops):
+            origem = rnd.choice(contas)
+            if rnd.random() < 0.5:
+                if origem._atualizar_saldo_e_registrar_transacao('deposito', 1.0): depositado += 1.0
+            else:
+                destino = rnd.choice(contas)
+                if destino is origem: continue
+                if not origem._atualizar_saldo_e_registrar_transacao('transferencia_enviada', float(rnd.randint(1, 300)), destino.id): recusados += 1
+        db.close()
+    return depositado, recusados
+
+@benchmark("concorrencia")
+def bench_concorrencia(args):
+    """Vazão de postagem com 1/4/16 processos escritores (a consistência sob concorrência é verificada em tests/test_concorrencia.py)."""
+    ctx = multiprocessing.get_context("spawn"); n_contas = 20; saldo_inicial = 1000.0
+    for escritores in (1, 4, 16):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = novo_banco(tmp, pool=True)
+            conta_ids = [criar_conta(db, str(1000 + i), saldo_inicial) for i in range(n_contas)]
+            db.execute_query("UPDATE contas SET limite_saques = ?", (10 ** 9,)) # O estresse é de concorrência, não do limite diário
+            inicio = time.perf_counter()
+            with ctx.Pool(escritores) as pool:
+                resultados = pool.starmap(_trabalhador_concorrencia, [(db.db_name, conta_ids, args.n // escritores, seed) for seed in range(escritores)])
+            duracao = time.perf_counter() - inicio
+            recusados = sum(r[1] for r in resultados)
+            postados = db.fetch_one("SELECT COUNT(*) AS n FROM transacoes WHERE tipo IN ('deposito', 'transferencia_enviada')")['n']; db.close()
+            print(f"{escritores:>2} escritor(es): {postados} movimentos ({recusados} recusados por saldo) em {duracao:.2f}s -> {taxa(postados, duracao)}")
+
+@benchmark("group_commit")
+def bench_group_commit(args):
+    """Um commit por operação vs. fila de escritor único (group commit), com 16 threads clientes e synchronous=FULL."""
+    n_threads = 16
+    for modo in ("commit por operação", "fila (group commit)"):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = novo_banco(tmp, pool=True, synchronous="FULL"); conta_ids = [criar_conta(db, str(1000 + i), 50.0) for i in range(32)]
+            fila = db.iniciar_fila_postagem() if "fila" in modo else None
+            latencias: list[float] = []; recusas = [0]; lock = threading.Lock()
+            def cliente(seed):
+                rnd = random.Random(seed); minhas = []; minhas_recusas = 0
+                for _ in range(args.n // n_threads):
+                    conta = rnd.choice(conta_ids); tipo = rnd.choice(('deposito', 'saque')); valor = float(rnd.randint(1, 100))
+                    t0 = time.perf_counter()
+                    try:
+                        if fila: fila.enviar(conta, tipo, valor, usa_limite=False).result()
+                        else: db.executar_transacao(lambda cur: postar_movimento(cur, conta, tipo, db.para_bd(valor)))
+                    except MovimentoRecusado: minhas_recusas += 1 # Saque sem saldo: recusa individual, não derruba o lote
+                    minhas.append(time.perf_counter() - t0)
+                with lock: latencias.extend(minhas); recusas[0] += minhas_recusas
+            threads = [threading.Thread(target=cliente, args=(i,)) for i in range(n_threads)]
+            inicio = time.perf_counter()
+            for t in threads: t.start()
+            for t in threads: t.join()
+            duracao = time.perf_counter() - inicio
+            db.close()
+            print(f"{modo:>20}: {len(latencias)} ops ({recusas[0]} recusadas) {taxa(len(latencias), duracao)} | p50 {percentil(latencias, 50) * 1000:.2f} ms | p99 {percentil(latencias, 99) * 1000:.2f} ms")
+
+@benchmark("extrato")
+def bench_extrato(args):
+    """Memória de pico ao percorrer o histórico: lista completa (historico) vs. geradores paginados (iterar_historico)."""
+    for tamanho in (args.n, args.n * 10):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = novo_banco(tmp, pool=True); conta_id = popular_ledger(db, 1, tamanho)[0]; conta = ContaCorrente(db, conta_id=conta_id)
+            for nome, percorrer in (("historico (lista)", lambda: sum(1 for _ in conta.historico)), ("iterar_historico", lambda: sum(1 for _ in conta.iterar_historico()))):
+                tracemalloc.start(); t0 = time.perf_counter(); total = percorrer(); duracao = time.perf_counter() - t0
+                pico = tracemalloc.get_traced_memory()[1]; tracemalloc.stop()
+                print(f"{tamanho:>9,} movimentos | {nome:<18} {total} linhas em {duracao:.2f}s, pico {pico / 1024 / 1024:.1f} MiB")
+            db.close()
+
+@benchmark("limite")
+def bench_limite(args):
+    """Latência da checagem do limite diário: COUNT(*) no ledger vs. contador materializado, por tamanho do histórico."""
+    sql_count = "SELECT COUNT(*) FROM transacoes WHERE conta_id = ? AND tipo IN ('saque', 'transferencia_enviada') AND timestamp >= ? AND timestamp < ?"
+    sql_count_date = "SELECT COUNT(*) FROM transacoes WHERE conta_id = ? AND tipo IN ('saque', 'transferencia_enviada') AND DATE(timestamp) = ?"
+    for tamanho in (args.n, args.n * 10, args.n * 100):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = novo_banco(tmp, pool=True); conta_id = popular_ledger(db, 1, tamanho)[0]; db.reconstruir_contadores_saques()
+            hoje = datetime.date.today(); amanha = hoje + datetime.timedelta(days=1); repeticoes = 200
+            variantes = (("COUNT(*) com DATE() (antigo)", sql_count_date, (conta_id, hoje.isoformat())), ("COUNT(*) por faixa", sql_count, (conta_id, hoje.isoformat(), amanha.isoformat())),
+                         ("contador saques_diarios", Conta.SQL_SAQUES_HOJE, (conta_id, hoje.isoformat())))
+            for nome, sql, params in variantes:
+                t0 = time.perf_counter()
+                for _ in range(repeticoes): db.fetch_one(sql, params)
+                print(f"{tamanho:>9,} movimentos | {nome:<28} {(time.perf_counter() - t0) / repeticoes * 1e6:8.1f} µs/checagem")
+            db.close()
+
+@benchmark("cache")
+def bench_cache(args):
+    """Troca repetida de conta (como selecionar_conta_pelo_dropdown): sem vs. com mapa de identidade."""
+    for nome, capacidade in (("sem cache", 0), ("mapa de identidade", 1024)):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = novo_banco(tmp, pool=True, capacidade_cache=capacidade); conta_ids = popular_ledger(db, 200, 0); rnd = random.Random(1)
+            t0 = time.perf_counter()
+            for _ in range(args.n):
+                conta = ContaCorrente.obter(db, rnd.choice(conta_ids[:50])) # 50 contas "quentes"
+                _ = (conta.cliente.nome, conta.numero, conta.saldo)
+            duracao = time.perf_counter() - t0; stats = db.estatisticas_cache()['contas']; db.close()
+            print(f"{nome:>18}: {args.n} trocas em {duracao:.3f}s -> {taxa(args.n, duracao)} | contas: {stats['acertos']} acertos / {stats['falhas']} falhas")
+    with tempfile.TemporaryDirectory() as tmp: # Memória por objeto com __slots__
+        db = novo_banco(tmp); tracemalloc.start()
+        objetos = [Cliente(db, cliente_id=i, nome="Nome", cpf="000.000.000-00", endereco="Rua", senha="x") for i in range(10000)]
+        print(f"Cliente com __slots__: {tracemalloc.get_traced_memory()[0] / len(objetos):.0f} bytes/objeto"); tracemalloc.stop(); db.close()
+
+@benchmark("seletor")
+def bench_seletor(args):
+    """Lista completa de contas do admin (antigo dropdown) vs. uma página da busca indexada."""
+    sql_lista_completa = "SELECT co.id, co.numero, cl.nome FROM contas co JOIN clientes cl ON co.cliente_id = cl.id ORDER BY cl.nome, co.numero ASC"
+    n = args.n if args.n != 2000 else 50_000
+    with tempfile.TemporaryDirectory() as tmp:
+        db = novo_banco(tmp, pool=True); popular_ledger(db, n, 0)
+        for nome, executar in (("lista completa", lambda: db.fetch_all(sql_lista_completa)), ("página vazia (6)", lambda: Conta.buscar(db, "", limite=6)),
+                               ("prefixo de nome", lambda: Conta.buscar(db, "cliente 01", limite=6)), ("prefixo de CPF", lambda: Conta.buscar(db, "012.", limite=6)),
+                               ("prefixo de número", lambda: Conta.buscar(db, "123", limite=6))):
+            t0 = time.perf_counter()
+            for _ in range(20): executar()
+            print(f"{n:,} contas | {nome:<18} {(time.perf_counter() - t0) / 20 * 1000:8.2f} ms")
+        db.close()
+
+def _trabalhador_sequencia(caminho: str, indice: int, n_contas: int, tamanho_bloco: int) -> int:
+    """Processo de cadastro em massa: números do alocador em blocos, contas inseridas com executemany."""
+    db = DatabaseManager(caminho, pool=True); alocador = AlocadorNumerosConta(db, tamanho_bloco)
+    cliente_id = db.execute_query("INSERT INTO clientes (nome, cpf, endereco, senha) VALUES (?, ?, ?, ?)", (f"Lote {indice}", f"999.999.{indice:03d}-99", "Rua", "123"))
+    conn = db._connect(); criadas = 0
+    while criadas < n_contas:
+        lote = [(alocador.proximo(), cliente_id) for _ in range(min(1000, n_contas - criadas))]
+        with conn: conn.executemany("INSERT INTO contas (numero, cliente_id) VALUES (?, ?)", lote)
+        criadas += len(lote)
+    db.close(); return criadas
+
+@benchmark("sequencia")
+def bench_sequencia(args):
+    """Vazão do cadastro concorrente de contas por vários processos e lacunas deixadas pelos blocos (duplicatas: tests/test_sequencia.py)."""
+    n = args.n if args.n != 2000 else 100_000; processos = 4; tamanho_bloco = 500
+    ctx = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as tmp:
+        db = novo_banco(tmp, pool=True); inicio_seq = db.fetch_one("SELECT proximo FROM sequencias WHERE nome = 'numero_conta'")['proximo']
+        t0 = time.perf_counter()
+        with ctx.Pool(processos) as pool:
+            criadas = sum(pool.starmap(_trabalhador_sequencia, [(db.db_name, i, n // processos + (i < n % processos), tamanho_bloco) for i in range(processos)]))
+        duracao = time.perf_counter() - t0
+        proximo = db.fetch_one("SELECT proximo FROM sequencias WHERE nome = 'numero_conta'")['proximo']; db.close()
+    print(f"{criadas:,} contas por {processos} processos (blocos de {tamanho_bloco}) em {duracao:.2f}s -> {taxa(criadas, duracao)} | lacunas: {(proximo - inicio_seq) - criadas}")
+
+class LoopEventos:
+    """Loop de eventos mínimo com a interface after/after_cancel do Tk; registra o callback mais longo (tempo de travamento da UI)."""
+    def __init__(self):
+        self._tarefas: list = []; self._ids = itertools.count(); self._cancelados: set = set(); self.maior_bloqueio = 0.0
+
+    def after(self, ms, funcao, *args):
+        ident = next(self._ids); heapq.heappush(self._tarefas, (time.perf_counter() + ms / 1000, ident, funcao, args)); return ident
+
+    def after_cancel(self, ident): self._cancelados.add(ident)
+
+    def executar_ate(self, condicao, timeout: float = 60.0):
+        """Processa callbacks na ordem de vencimento até condicao() ficar verdadeira."""
+        limite = time.perf_counter() + timeout
+        while not condicao():
+            if time.perf_counter() > limite: raise TimeoutError("operação não terminou")
+            if not self._tarefas or self._tarefas[0][0] > time.perf_counter(): time.sleep(0.0005); continue
+            _, ident, funcao, args = heapq.heappop(self._tarefas)
+            if ident in self._cancelados: self._cancelados.discard(ident); continue
+            t0 = time.perf_counter(); funcao(*args); self.maior_bloqueio = max(self.maior_bloqueio, time.perf_counter() - t0)
+
+def _segurar_trava(caminho: str, segundos: float, pronto: threading.Event):
+    """Outra conexão segura a trava de escrita (como outra instância do app no meio de um lote)."""
+    conn = sqlite3.connect(caminho); conn.execute("BEGIN IMMEDIATE"); pronto.set(); time.sleep(segundos); conn.commit(); conn.close()
+
+def _primeira_pagina_extrato(conta: Conta) -> tuple:
+    """1ª página do extrato como a interface a abre sem cache: ExtratoRenderizado novo (desde o último fechamento) via BancoGUI.avancar_extrato."""
+    return BancoGUI.avancar_extrato(ExtratoRenderizado(conta), True, None, 0, BancoGUI.TAMANHO_PAGINA_EXTRATO)
+
+@benchmark("ui")
+def bench_ui(args):
+    """Travamento do loop de eventos por operação: trabalho de BD no próprio callback (antes) vs. ExecutorUI (depois)."""
+    n = args.n if args.n != 2000 else 200_000; trava = 0.3; repeticoes = 5
+    with tempfile.TemporaryDirectory() as tmp, open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+        db = novo_banco(tmp, pool=True); conta_ids = popular_ledger(db, 50, n)
+        db.execute_query("UPDATE contas SET saldo = ?, limite_saques = ?", (db.para_bd(10 ** 9), 10 ** 9))
+        conta = ContaCorrente.obter(db, conta_ids[0]); destino = ContaCorrente.obter(db, conta_ids[1]).numero
+        operacoes = [ # (nome, trabalho, trava o BD antes?)
+            ("deposito (BD travado)", lambda: conta.efetuar_movimento('deposito', 1.0), True),
+            ("saque (BD travado)", lambda: conta.efetuar_movimento('saque', 1.0), True),
+            ("transferencia (BD travado)", lambda: conta.efetuar_movimento('transferencia_enviada', 1.0, ContaCorrente.obter_por_numero(db, destino)), True),
+            ("extrato (1a página)", lambda: _primeira_pagina_extrato(conta), False),
+            ("extrato (lista completa)", lambda: conta.exibir_extrato(), False),
+            ("busca de contas (admin)", lambda: Conta.buscar(db, "cliente 0", limite=BancoGUI.LINHAS_SELETOR), False),
+            ("contas do cliente", lambda: db.fetch_all(BancoGUI.SQL_CONTAS_CLIENTE, (conta.cliente_id,)), False),
+        ]
+        resultados = []
+        for nome, trabalho, travar in operacoes:
+            medidas = {}
+            for modo in ("antes", "depois"):
+                loop = LoopEventos(); executor = ExecutorUI(loop); bloqueios = []
+                for _ in range(repeticoes):
+                    feito = threading.Event(); loop.maior_bloqueio = 0.0
+                    if travar:
+                        pronto = threading.Event(); threading.Thread(target=_segurar_trava, args=(db.db_name, trava, pronto), daemon=True).start(); pronto.wait()
+                    if modo == "antes": loop.after(0, lambda: (trabalho(), feito.set()))
+                    else: loop.after(0, lambda: executor.enviar('op', trabalho, ao_concluir=lambda _r: feito.set(), ao_falhar=lambda e: (print(e), feito.set())))
+                    loop.executar_ate(feito.is_set); bloqueios.append(loop.maior_bloqueio)
+                    if travar: time.sleep(trava) # Garante que a trava já foi liberada antes da próxima rodada
+                executor.fechar(); medidas[modo] = bloqueios
+            resultados.append((nome, medidas))
+        db.close()
+    print(f"Travamento do loop de eventos (maior callback; {n:,} movimentos, trava de {trava * 1000:.0f} ms nos movimentos):")
+    for nome, medidas in resultados:
+        antes, depois = medidas["antes"], medidas["depois"]
+        print(f"{nome:<28} antes: média {sum(antes) / len(antes) * 1000:8.2f} ms, máx {max(antes) * 1000:8.2f} ms | depois: média {sum(depois) / len(depois) * 1000:6.2f} ms, máx {max(depois) * 1000:6.2f} ms")
+
+def _processo_servidor(caminho: str, fila, workers: int):
+    """Processo do servidor HTTP (porta livre escolhida pelo SO e devolvida pela fila)."""
+    from servico import ServicoBancario
+    from servidor import ServidorBancario
+    with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+        db = DatabaseManager(caminho, pool=True); servidor = ServidorBancario(ServicoBancario(db), porta=0, max_workers=workers)
+        async def principal(): fila.put(await servidor.iniciar()); await servidor.servir()
+        asyncio.run(principal())
+
+async def _requisicao(reader, writer, metodo: str, caminho: str, corpo: dict | None = None, token: str | None = None) -> tuple[int, dict]:
+    """Cliente HTTP/1.1 mínimo sobre uma conexão keep-alive."""
+    dados = json.dumps(corpo).encode() if corpo is not None else b""
+    cabecalho = f"{metodo} {caminho} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(dados)}\r\n" + (f"Authorization: Bearer {token}\r\n" if token else "") + "\r\n"
+    writer.write(cabecalho.encode() + dados); await writer.drain()
+    status = int((await reader.readline()).split()[1]); tamanho = 0
+    while (h := await reader.readline()) not in (b"\r\n", b""):
+        nome, _, valor = h.decode().partition(":")
+        if nome.lower() == "content-length": tamanho = int(valor)
+    return status, json.loads(await reader.readexactly(tamanho))
+
+async def _cliente_carga(porta: int, indice: int, n_contas: int, n_req: int, latencias: list, erros: list):
+    """Um usuário: login e depois uma mistura de saldo/depósito/extrato/transferência na própria conta."""
+    rnd = random.Random(indice); reader, writer = await asyncio.open_connection("127.0.0.1", porta)
+    i = indice % n_contas; cpf = f"{i:03d}.{i:03d}.{i:03d}-{i % 100:02d}"[-14:]; numero = str(10000 + i)
+    status, r = await _requisicao(reader, writer, "POST", "/login", {'cpf': cpf, 'senha': "123"})
+    if status != 200: erros.append(f"login {status}: {r}"); writer.close(); return
+    token = r['token']
+    for _ in range(n_req):
+        sorteio = rnd.random()
+        if sorteio < 0.5: pedido = ("GET", f"/contas/{numero}/saldo", None)
+        elif sorteio < 0.75: pedido = ("POST", f"/contas/{numero}/depositos", {'valor': 10.0})
+        elif sorteio < 0.9: pedido = ("GET", f"/contas/{numero}/extrato?limite=50", None)
+        else: pedido = ("POST", f"/contas/{numero}/transferencias", {'destino': str(10000 + rnd.randrange(n_contas)), 'valor': 1.0})
+        t0 = time.perf_counter(); status, r = await _requisicao(reader, writer, *pedido, token=token); latencias.append(time.perf_counter() - t0)
+        if status not in (200, 422): erros.append(f"{pedido[0]} {pedido[1]} -> {status}: {r.get('erro')}") # 422 = recusa de negócio (ex.: transferência para si mesmo)
+    writer.close()
+
+@benchmark("servidor")
+def bench_servidor(args):
+    """Gerador de carga local para a API HTTP: req/s e latências (p50/p95/p99) com 1/4/16/64 clientes simultâneos."""
+    ctx = multiprocessing.get_context("spawn"); n_contas = 64; n_req = args.n * 2; falhou = False
+    with tempfile.TemporaryDirectory() as tmp:
+        db = novo_banco(tmp, pool=True); popular_ledger(db, n_contas, 20_000)
+        db.execute_query("UPDATE contas SET saldo = ?, limite_saques = ?", (db.para_bd(10 ** 6), 10 ** 9)); caminho = db.db_name; db.close()
+        fila = ctx.Queue(); processo = ctx.Process(target=_processo_servidor, args=(caminho, fila, 8), daemon=True); processo.start()
+        try:
+            porta = fila.get(timeout=60)
+            for clientes in (1, 4, 16, 64):
+                latencias: list[float] = []; erros: list[str] = []
+                async def rodada(): await asyncio.gather(*(_cliente_carga(porta, i, n_contas, n_req // clientes, latencias, erros) for i in range(clientes)))
+                t0 = time.perf_counter(); asyncio.run(rodada()); duracao = time.perf_counter() - t0
+                print(f"{clientes:>3} cliente(s): {len(latencias)} req em {duracao:.2f}s -> {len(latencias) / duracao:,.0f} req/s | p50 {percentil(latencias, 50) * 1000:.2f} ms | "
+                      f"p95 {percentil(latencias, 95) * 1000:.2f} ms | p99 {percentil(latencias, 99) * 1000:.2f} ms | erros: {len(erros)}")
+                for erro in erros[:5]: print("   ", erro); falhou = True
+        finally:
+            processo.terminate(); processo.join()
+    if falhou: sys.exit(1)
+
+def gerar_csvs(diretorio: str, n_clientes: int, n_transacoes: int, seed: int = 7) -> dict:
+    """Escreve clientes.csv, contas.csv e transacoes.csv (em fluxo) com algumas linhas inválidas propositais; retorna caminhos e rejeições esperadas."""
+    rnd = random.Random(seed); caminhos = {nome: os.path.join(diretorio, f"{nome}.csv") for nome in ("clientes", "contas", "transacoes")}
+    cpf = lambda i: f"{i // 10**8 % 1000:03d}.{i // 10**5 % 1000:03d}.{i // 100 % 1000:03d}-{i % 100:02d}"
+    with open(caminhos["clientes"], "w", newline="") as f:
+        w = csv.writer(f); w.writerow(["nome", "cpf", "endereco", "senha"])
+        for i in range(1, n_clientes + 1): w.writerow([f"Cliente {i:07d}", cpf(i), "Rua Importada", "123"])
+        w.writerow(["Duplicado", cpf(1), "Rua", "123"]); w.writerow(["Formato", "123.456.789", "Rua", "123"]) # 2 rejeições
+    with open(caminhos["contas"], "w", newline="") as f:
+        w = csv.writer(f); w.writerow(["cpf", "numero"])
+        for i in range(1, n_clientes + 1): w.writerow([cpf(i), ""]) # Números vêm da sequência
+        w.writerow(["999.999.999-99", ""]) # 1 rejeição (cliente inexistente)
+    base = datetime.datetime(2024, 1, 1) # Contas numeradas a partir de 1001 (sequência de um BD novo, sem o ADMIN)
+    with open(caminhos["transacoes"], "w", newline="") as f:
+        w = csv.writer(f); w.writerow(["numero_conta", "tipo", "valor", "timestamp", "numero_conta_destino"])
+        for _ in range(n_transacoes):
+            conta = 1001 + rnd.randrange(n_clientes); tipo = rnd.choice(('deposito', 'deposito', 'saque', 'transferencia_enviada'))
+            destino = str(1001 + rnd.randrange(n_clientes)) if tipo == 'transferencia_enviada' else ""
+            w.writerow([conta, tipo, f"{rnd.uniform(1, 500):.2f}", (base + datetime.timedelta(seconds=rnd.randrange(365 * 86400))).strftime('%Y-%m-%d %H:%M:%S'), destino])
+        w.writerow([1001, "estorno", "1.00", "2024-01-01 00:00:00", ""]) # 1 rejeição (tipo inválido)
+    return {'caminhos': caminhos, 'rejeicoes': {'clientes': 2, 'contas': 1, 'transacoes': 1}}
+
+@benchmark("importacao")
+def bench_importacao(args):
+    """Carga em massa de CSV: linhas/s por etapa, memória de pico em dois tamanhos e comparação com o cadastro um a um."""
+    from importacao import ImportadorCSV
+    n = args.n if args.n != 2000 else 50_000; falhou = False
+    for n_clientes, medir_memoria in ((n, False), (n, True), (n * 4, True)): # Vazão sem tracemalloc (que a reduz bastante); memória em dois tamanhos
+        with tempfile.TemporaryDirectory() as tmp:
+            arquivos = gerar_csvs(tmp, n_clientes, n_clientes * 10); db = novo_banco(tmp, pool=True)
+            if medir_memoria: tracemalloc.start()
+            relatorio = ImportadorCSV(db).importar(**arquivos['caminhos'])
+            if medir_memoria: pico = tracemalloc.get_traced_memory()[1]; tracemalloc.stop()
+            for etapa, rel in relatorio.items():
+                if not medir_memoria: print(f"{n_clientes:>9,} clientes | {etapa:<10} {rel['importadas']:>10,} linhas, {rel['rejeitadas']} rejeitadas, {rel['linhas_por_segundo']:>10,.0f} linhas/s")
+                if rel['rejeitadas'] != arquivos['rejeicoes'][etapa]: print(f"    rejeições esperadas: {arquivos['rejeicoes'][etapa]}, erros: {rel['erros']}"); falhou = True
+            divergentes = db.fetch_one("""SELECT COUNT(*) AS n FROM contas co WHERE ABS(co.saldo - (SELECT COALESCE(SUM(CASE WHEN t.tipo IN ('deposito', 'transferencia_recebida')
+                                          THEN t.valor ELSE -t.valor END), 0) FROM transacoes t WHERE t.conta_id = co.id)) > 1e-6""")['n']
+            indices = {r['name'] for r in db.fetch_all("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'transacoes'")}
+            print(f"{n_clientes:>9,} clientes | " + (f"pico de memória (tracemalloc) {pico / 1024 / 1024:.1f} MiB | " if medir_memoria else "") + f"saldos divergentes do ledger: {divergentes} | índices: {sorted(indices)}")
+            falhou = falhou or divergentes > 0 or 'idx_transacoes_conta_ts_id' not in indices or db.verificar_contadores_saques() != []
+            db.close()
+    with tempfile.TemporaryDirectory() as tmp, open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo): # Caminho antigo: um cliente + uma conta por vez
+        db = novo_banco(tmp); quantos = 1000; t0 = time.perf_counter()
+        for i in range(quantos):
+            if Cliente.find_by_cpf(db, f"{i:03d}.000.000-00"): continue
+            cliente = Cliente(db, nome=f"Cliente {i}", cpf=f"{i:03d}.000.000-00", endereco="Rua", senha="123"); cliente.save()
+            db.execute_query("INSERT INTO contas (numero, cliente_id) VALUES (?, ?)", (db.numeros_conta.proximo(), cliente.id))
+        duracao = time.perf_counter() - t0; db.close()
+    print(f"cadastro um a um (find_by_cpf + save + conta, conexão por consulta): {quantos / duracao:,.0f} clientes/s")
+    if falhou: sys.exit(1)
+
+@benchmark("exportacao")
+def bench_exportacao(args):
+    """Exportação em fluxo num ledger de 10M linhas: banco todo em CSV e JSONL.gz, contas em paralelo e memória de pico constante."""
+    n = args.n if args.n != 2000 else 10_000_000; n_contas = 1000
+    with tempfile.TemporaryDirectory() as tmp:
+        db = novo_banco(tmp, pool=True); t0 = time.perf_counter(); popular_ledger(db, n_contas, n)
+        print(f"Ledger com {n:,} transações criado em {time.perf_counter() - t0:.1f}s")
+        exportador = ExportadorExtrato(db)
+        for nome in ("banco.csv", "banco.jsonl.gz"):
+            r = exportador.exportar(os.path.join(tmp, nome))
+            print(f"{nome:<16} {r['linhas']:>12,} linhas em {r['segundos']:6.2f}s -> {r['linhas'] / r['segundos']:>10,.0f} linhas/s | {r['bytes'] / 1024 / 1024:8.1f} MiB")
+            os.remove(r['arquivo'])
+        numeros = [str(10000 + i) for i in range(32)]
+        for paralelismo in (1, 4):
+            t0 = time.perf_counter(); resultados = exportador.exportar_contas(numeros, os.path.join(tmp, f"contas_{paralelismo}"), paralelismo=paralelismo); duracao = time.perf_counter() - t0
+            linhas = sum(r['linhas'] for r in resultados)
+            print(f"{len(numeros)} contas, {paralelismo} thread(s): {linhas:,} linhas em {duracao:.2f}s -> {linhas / duracao:,.0f} linhas/s")
+        for rotulo, inicio in (("último mês", datetime.date.today() - datetime.timedelta(days=30)), ("banco todo", None)): # tracemalloc reduz a vazão; só a memória importa aqui
+            tracemalloc.start(); r = exportador.exportar(os.path.join(tmp, "memoria.csv"), inicio=inicio); pico = tracemalloc.get_traced_memory()[1]; tracemalloc.stop()
+            print(f"pico de memória ({rotulo}, {r['linhas']:,} linhas): {pico / 1024 / 1024:.2f} MiB"); os.remove(r['arquivo'])
+        db.close()
+
+@benchmark("metricas")
+def bench_metricas(args):
+    """Custo da instrumentação: consultas pontuais, extrato paginado e depósitos com metricas=False vs. metricas=True."""
+    n = args.n if args.n != 2000 else 50_000; resultados = {}
+    for rotulo, ligado in (("sem métricas", False), ("com métricas", True)):
+        with tempfile.TemporaryDirectory() as tmp, open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo): # Conta imprime cada depósito
+            db = novo_banco(tmp, pool=True, capacidade_cache=0, metricas=ligado); conta_ids = popular_ledger(db, 1000, 100_000); rnd = random.Random(3)
+            conta = ContaCorrente.obter(db, conta_ids[0]); tempos = {}
+            if ligado: db.metricas.limpar() # Só a carga medida, sem a criação do ledger
+            for _ in range(3): # Melhor de três: o que interessa é o custo fixo por instrução, não o ruído da máquina
+                t0 = time.perf_counter()
+                for _ in range(n): db.fetch_one("SELECT id, saldo FROM contas WHERE numero = ?", (str(10000 + rnd.randrange(1000)),))
+                t1 = time.perf_counter()
+                for _ in range(n // 50): conta.pagina_historico(limite=200)
+                t2 = time.perf_counter()
+                for _ in range(n // 10): conta.efetuar_movimento('deposito', 1.0)
+                t3 = time.perf_counter()
+                for nome, d, ops in (("consulta pontual", t1 - t0, n), ("página do extrato", t2 - t1, n // 50), ("depósito", t3 - t2, n // 10)): tempos[nome] = min(tempos.get(nome, float('inf')), d / ops * 1e6)
+            resultados[rotulo] = tempos
+            if ligado: snapshot = db.estatisticas_consultas()
+            db.close()
+    for nome in resultados["sem métricas"]:
+        antes, depois = resultados["sem métricas"][nome], resultados["com métricas"][nome]
+        print(f"{nome:<18} {antes:8.1f} us/op -> {depois:8.1f} us/op ({(depois / antes - 1) * 100:+.1f}%)")
+    print(f"{len(snapshot['consultas'])} formas de consulta; mais cara: {snapshot['consultas'][0]['forma'][:90]} ({snapshot['consultas'][0]['chamadas']:,} chamadas, p99 {snapshot['consultas'][0]['p99_ms']:.2f} ms)")
+
+def montar_pagina_extrato_antiga(conta: Conta, apos, vazio: bool, limite: int, com_cabecalho: bool = False, desde_fechamento: bool = False) -> tuple[str, tuple | None, bool]:
+    """Linha de base "antes" do extrato_cache: a página que a interface montava do zero a cada movimento (antigo BancoGUI.montar_pagina_extrato).
+
+    desde_fechamento (primeira página): começa depois do último fechamento da conta, mostrando o saldo fechado no cabeçalho."""
+    cabecalho = conta.cabecalho_extrato() if com_cabecalho else ""; sem_movimento = "\n  Nenhuma movimentação realizada."
+    fechamento = conta.fechamento_anterior() if desde_fechamento and apos is None else None
+    if fechamento is not None:
+        apos = (fechamento['inicio'], 0); mes = f"{fechamento['periodo'][5:]}/{fechamento['periodo'][:4]}"; sem_movimento = "\n  Nenhuma movimentação desde o fechamento."
+        cabecalho += f"\n  Saldo no fechamento de {mes}: R$ {fechamento['saldo']:.2f} (use Histórico Completo para os lançamentos anteriores)"
+    linhas, chave = conta.pagina_historico(apos=apos, limite=limite)
+    texto = cabecalho + "".join(f"\n  {conta.formatar_transacao(t)}" for t in linhas); vazio = vazio and not linhas
+    if chave is None: texto += (sem_movimento if vazio else "") + "\n" + conta.rodape_extrato()
+    return texto, chave, vazio
+
+@benchmark("extrato_cache")
+def bench_extrato_cache(args):
+    """Extrato depois de cada movimento (contas com 100k lançamentos): texto refeito do zero vs. cache de extratos (só o lançamento novo é formatado)."""
+    n = args.n if args.n != 2000 else 100_000; ciclos = 5
+    with tempfile.TemporaryDirectory() as tmp, open(os.devnull, 'w') as nulo:
+        db = novo_banco(tmp, pool=True); t0 = time.perf_counter()
+        conta_ids = popular_ledger(db, 6, 6 * n); db.execute_query("UPDATE contas SET saldo = ?, limite_saques = ?", (db.para_bd(10 ** 9), 10 ** 9))
+        print(f"6 contas com ~{n:,} lançamentos cada geradas em {time.perf_counter() - t0:.1f}s")
+        sem_cache = DatabaseManager(db.db_name, pool=True, capacidade_extratos=0)
+        for nome, banco in (("sem cache (texto refeito)", sem_cache), ("cache de extratos", db)):
+            conta = ContaCorrente.obter(banco, conta_ids[0]); tempos = []
+            with contextlib.redirect_stdout(nulo): primeiro = _cronometrar(conta.exibir_extrato)
+            for _ in range(ciclos):
+                with contextlib.redirect_stdout(nulo): conta.efetuar_movimento('deposito', 1.0)
+                tempos.append(_cronometrar(conta.exibir_extrato))
+            print(f"exibir_extrato | {nome:<26} primeiro {primeiro * 1000:8.1f} ms | após cada depósito: mediana {sorted(tempos)[len(tempos) // 2] * 1000:8.2f} ms")
+        assert ContaCorrente.obter(sem_cache, conta_ids[0]).exibir_extrato() == ContaCorrente.obter(db, conta_ids[0]).exibir_extrato(), "texto do cache difere do refeito"
+        sem_cache.close()
+        # Caixa do extrato na interface: antes cada movimento limpava a caixa e refazia a 1ª página; agora só o trecho novo é anexado
+        conta = ContaCorrente.obter(db, conta_ids[1]); extrato = conta.extrato_renderizado(); geracao, exibidas = None, 0; t0 = time.perf_counter()
+        while True:
+            geracao, _, _, exibidas, rodape = BancoGUI.avancar_extrato(extrato, True, geracao, exibidas, BancoGUI.TAMANHO_PAGINA_EXTRATO)
+            if rodape is not None: break
+        print(f"caixa do extrato: {exibidas:,} linhas carregadas página a página em {time.perf_counter() - t0:.1f}s")
+        antes, depois, anexado = [], [], 0
+        for _ in range(ciclos * 4):
+            with contextlib.redirect_stdout(nulo): conta.efetuar_movimento('deposito', 1.0)
+            antes.append(_cronometrar(lambda: montar_pagina_extrato_antiga(conta, None, True, BancoGUI.TAMANHO_PAGINA_EXTRATO, True, True)))
+            t0 = time.perf_counter(); geracao, redesenhar, texto, exibidas, rodape = BancoGUI.avancar_extrato(extrato, False, geracao, exibidas, BancoGUI.TAMANHO_PAGINA_EXTRATO); depois.append(time.perf_counter() - t0)
+            assert not redesenhar; anexado += len(texto) + len(rodape)
+        mediana = lambda v: sorted(v)[len(v) // 2] * 1000
+        print(f"após cada depósito | antes: 1ª página refeita {mediana(antes):6.2f} ms e a rolagem volta ao topo | depois: trecho novo {mediana(depois):6.2f} ms, {anexado / len(depois):.0f} caracteres anexados")
+        # LRU entre contas: 6 contas num cache de 4 extratos completos
+        db.cache_extratos = MapaIdentidade(4); tracemalloc.start()
+        for i in range(24): ContaCorrente.obter(db, conta_ids[i % 6 if i < 12 else i % 3]).exibir_extrato() # Rodízio de 6 (despeja), depois 3 (cabe)
+        pico = tracemalloc.get_traced_memory()[1]; tracemalloc.stop(); stats = db.estatisticas_cache()['extratos']
+        print(f"LRU (capacidade 4, 24 extratos completos): {stats['acertos']} acertos, {stats['falhas']} falhas, {stats['despejos']} despejos, pico {pico / 1024 / 1024:.0f} MiB (~{pico / 1024 / 1024 / 5:.0f} MiB por extrato de {n:,} linhas)")
+        db.close()
+
+def _medir_import(diretorio: str, codigo: str) -> dict:
+    """Roda `codigo` num interpretador novo com -X importtime (cwd = diretorio): tempo total e tempo acumulado por módulo (ms)."""
+    ambiente = {k: v for k, v in os.environ.items() if k != "PYTHONDONTWRITEBYTECODE"} # Morno só existe se o .pyc puder ser gravado
+    t0 = time.perf_counter(); r = subprocess.run([sys.executable, "-X", "importtime", "-c", codigo], cwd=diretorio, env=ambiente, capture_output=True, text=True, check=True)
+    total = (time.perf_counter() - t0) * 1000; modulos = {}
+    for linha in r.stderr.splitlines():
+        partes = linha.split("|")
+        if len(partes) == 3 and partes[1].strip().isdigit(): modulos[partes[2].strip()] = int(partes[1]) / 1000
+    return {'total_ms': total, 'modulos': modulos}
+
+@benchmark("inicializacao")
+def bench_inicializacao(args):
+    """Tempo de partida: imports (frio = sem .pyc dos módulos do app, morno = com .pyc; via -X importtime) e abertura do BD com o esquema em dia."""
+    repeticoes = 5; raiz = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory() as tmp, open(os.devnull, 'w') as nulo:
+        for nome in os.listdir(raiz): # Cópia dos módulos: o primeiro import compila (frio), os seguintes usam __pycache__ (morno)
+            if nome.endswith(".py"): shutil.copy(os.path.join(raiz, nome), tmp)
+        caminho = os.path.join(tmp, "bench.db")
+        with contextlib.redirect_stdout(nulo): DatabaseManager(caminho).close()
+        cenarios = [("import main (CLI, servidor)", "import main"), ("import main + abrir o BD", f"import main; main.DatabaseManager({caminho!r}, pool=True).close()"),
+                    ("import interface (janela)", "import interface")]
+        print(f"{'cenário':<30} {'':>5} {'total':>9} {'main':>9} {'interface':>10} {'customtkinter':>14}  Tk carregado?")
+        for rotulo, codigo in cenarios:
+            shutil.rmtree(os.path.join(tmp, "__pycache__"), ignore_errors=True)
+            frio = _medir_import(tmp, codigo); mornos = sorted((_medir_import(tmp, codigo) for _ in range(repeticoes)), key=lambda m: m['total_ms'])
+            for modo, m in (("frio", frio), ("morno", mornos[len(mornos) // 2])):
+                ms = lambda nome: f"{m['modulos'][nome]:>7.1f}ms" if nome in m['modulos'] else f"{'-':>9}"
+                print(f"{rotulo:<30} {modo:>5} {m['total_ms']:>7.1f}ms {ms('main'):>9} {ms('interface'):>10} {ms('customtkinter'):>14}  {'sim' if 'tkinter' in m['modulos'] else 'não'}")
+        for pool in (False, True): # Abertura em processo, esquema já em dia: consultas e conexões por DatabaseManager()
+            tempos = []
+            for _ in range(args.n // 40 or 1):
+                t0 = time.perf_counter(); db = DatabaseManager(caminho, pool=pool); tempos.append(time.perf_counter() - t0)
+                m = db.estatisticas_consultas(); db.close()
+            consultas = sum(f['chamadas'] for f in m['consultas'])
+            print(f"DatabaseManager(pool={pool!s:<5}) esquema em dia: mediana {sorted(tempos)[len(tempos) // 2] * 1000:6.2f} ms | {consultas} consulta(s), {m['conexoes']['chamadas']} conexão(ões)")
+        if not os.environ.get("DISPLAY") and sys.platform.startswith("linux"): print("primeira pintura da tela de login: sem DISPLAY, não medida"); return
+        codigo = (f"import time; t0 = time.perf_counter(); import main; from concurrent.futures import ThreadPoolExecutor; f = ThreadPoolExecutor(1).submit(main.DatabaseManager, {caminho!r}, pool=True)\n"
+                  "from interface import LoginWindow; w = LoginWindow(f); w.update(); print((time.perf_counter() - t0) * 1000); w.destroy(); f.result().close()")
+        pintura = sorted(float(subprocess.run([sys.executable, "-c", codigo], cwd=tmp, capture_output=True, text=True, check=True).stdout.split()[-1]) for _ in range(repeticoes))
+        print(f"primeira pintura da tela de login (BD abrindo em paralelo): mediana {pintura[len(pintura) // 2]:.1f} ms")
+
+@benchmark("fechamento")
+def bench_fechamento(args):
+    """Fechamentos mensais e arquivamento (banco sintético de 1M lançamentos em 1 ano): verificação de saldos, extrato e tamanho do banco antes/depois."""
+    n = args.n if args.n != 2000 else 1_000_000
+    with tempfile.TemporaryDirectory() as tmp, open(os.devnull, 'w') as nulo:
+        db = novo_banco(tmp, pool=True); t0 = time.perf_counter()
+        with contextlib.redirect_stdout(nulo): dados = gerar_banco_sintetico(db, 5_000, 7_500, n, seed=args.seed)
+        print(f"Banco com {dados['transacoes']:,} transações gerado em {time.perf_counter() - t0:.1f}s")
+        conta = ContaCorrente.obter(db, dados['ativas'][0]); tamanho = lambda caminho: os.path.getsize(caminho) / 1024 / 1024 if os.path.exists(caminho) else 0.0
+        def medir(rotulo, funcao, repeticoes=1):
+            t0 = time.perf_counter()
+            for _ in range(repeticoes): r = funcao()
+            print(f"{rotulo:<44} {(time.perf_counter() - t0) / repeticoes * 1000:>10.1f} ms"); return r
+        completo = medir("verificar_saldos (ledger inteiro)", db.verificar_saldos)
+        medir("extrato completo da conta mais ativa", conta.exibir_extrato, 3)
+        r = medir("fechar_periodos", db.fechar_periodos); print(f"  {len(r['periodos'])} períodos, {r['fechamentos']:,} fechamentos")
+        assert medir("verificar_saldos (desde o fechamento)", db.verificar_saldos) == completo == []
+        medir("1ª página do extrato (desde o fechamento)", lambda: _primeira_pagina_extrato(conta), 20)
+        historico = list(conta.iterar_historico()); db.execute_query("PRAGMA wal_checkpoint(TRUNCATE)"); antes = tamanho(db.db_name)
+        r = db.arquivar_periodos(compactar=True)
+        print(f"arquivar_periodos: {r['removidas']:,} lançamentos movidos em {r['segundos']:.1f}s; banco principal {antes:.1f} MiB -> {tamanho(db.db_name):.1f} MiB (arquivo {tamanho(db.arquivo):.1f} MiB)")
+        assert medir("verificar_saldos (após arquivar)", db.verificar_saldos) == []
+        medir("extrato completo (principal + arquivo)", conta.exibir_extrato, 3)
+        medir("1ª página do extrato (após arquivar)", lambda: _primeira_pagina_extrato(conta), 20)
+        assert list(conta.iterar_historico()) == historico, "histórico mudou com o arquivamento"
+        print(f"histórico da conta mais ativa idêntico após arquivar ({len(historico):,} lançamentos)")
+        db.close()
+
+@benchmark("conciliacao")
+def bench_conciliacao(args):
+    """Conciliação de um ledger de 10M linhas: motor NumPy vs. Python puro, 1 e 4 processos, memória de pico e divergências plantadas."""
+    n = args.n if args.n != 2000 else 10_000_000
+    with tempfile.TemporaryDirectory() as tmp:
+        db = novo_banco(tmp, pool=True); t0 = time.perf_counter()
+        with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo): dados = gerar_banco_sintetico(db, 5_000, 7_500, min(n, 1_000_000), seed=args.seed)
+        conn = db._connect()
+        while (total := conn.execute("SELECT MAX(id) FROM transacoes").fetchone()[0]) < n: # Replica o ledger (pares de transferência inclusos) até n linhas
+            conn.execute("INSERT INTO transacoes (conta_id, tipo, valor, timestamp, conta_destino_id) SELECT conta_id, tipo, valor, timestamp, conta_destino_id FROM transacoes WHERE id <= ?", (n - total,)); conn.commit()
+        conn.execute("UPDATE contas SET saldo = (SELECT COALESCE(SUM(CASE WHEN tipo IN ('deposito', 'transferencia_recebida') THEN valor ELSE -valor END), 0) FROM transacoes t WHERE t.conta_id = contas.id)"); conn.commit()
+        db._release(conn); conta_ids = dados['ativas']
+        db.execute_query("UPDATE contas SET saldo = saldo + ? WHERE id = ?", (db.para_bd(0.01), conta_ids[0])); db.execute_query("UPDATE contas SET saldo = saldo - ? WHERE id = ?", (db.para_bd(10), conta_ids[-1])) # Divergências plantadas
+        db.execute_query("DELETE FROM transacoes WHERE id = (SELECT MAX(id) FROM transacoes WHERE tipo = 'transferencia_recebida')")
+        print(f"Ledger com {total:,} linhas criado em {time.perf_counter() - t0:.1f}s (2 saldos e 1 transferência alterados)")
+        for motor, processos in (("python", 1), ("numpy", 1), ("numpy", 4)):
+            r = ConciliadorLedger(db, motor=motor, processos=processos).conciliar()
+            print(f"{motor:<6} {processos} processo(s): {r['transacoes'] / r['segundos']:>12,.0f} linhas/s ({r['segundos']:6.2f}s) | {len(r['divergencias_saldo'])} saldo(s), {len(r['transferencias_sem_par'])} par(es) divergentes")
+        tracemalloc.start(); ConciliadorLedger(db, motor="numpy").conciliar(); pico = tracemalloc.get_traced_memory()[1]; tracemalloc.stop()
+        print(f"pico de memória (numpy, 1 processo): {pico / 1024 / 1024:.1f} MiB")
+        db.close()
+
+@benchmark("centavos")
+def bench_centavos(args):
+    """Valores em REAL (reais) vs. INTEGER (centavos): consultas de agregação e tamanho do banco, e a conversão online com escritores ativos."""
+    n = args.n if args.n != 2000 else 1_000_000
+    consultas = { # Agregações típicas de relatório/conciliação (mesmo SQL nos dois modos)
+        "saldo total (SUM contas)": "SELECT SUM(saldo) FROM contas",
+        "líquido por conta (GROUP BY)": f"SELECT conta_id, SUM({SQL_DELTA_SALDO}) FROM transacoes GROUP BY conta_id",
+        "volume por mês e tipo": "SELECT substr(timestamp, 1, 7), tipo, COUNT(*), SUM(valor), MAX(valor) FROM transacoes GROUP BY 1, 2",
+    }
+    with tempfile.TemporaryDirectory() as tmp, open(os.devnull, 'w') as nulo:
+        db = novo_banco(tmp, pool=True, centavos=False); t0 = time.perf_counter()
+        with contextlib.redirect_stdout(nulo): dados = gerar_banco_sintetico(db, 5_000, 7_500, n, seed=args.seed)
+        print(f"Banco em reais com {dados['transacoes']:,} transações gerado em {time.perf_counter() - t0:.1f}s")
+        def medir_modo(rotulo):
+            db.execute_query("VACUUM"); db.execute_query("PRAGMA wal_checkpoint(TRUNCATE)") # Tamanho comparável: sem páginas livres nem WAL
+            tempos = {"verificar_saldos": min(_cronometrar(db.verificar_saldos) for _ in range(3))}
+            for nome, q in consultas.items(): tempos[nome] = min(_cronometrar(lambda: db.fetch_all(q)) for _ in range(3))
+            return {'tamanho_mib': os.path.getsize(db.db_name) / 1024 / 1024, **tempos}
+        antes = medir_modo("reais")
+        # Conversão online com 2 threads de escrita postando depósitos/saques (conexões próprias, como outras instâncias)
+        parar = threading.Event(); latencias: list[float] = []; erros: list[str] = []; lock = threading.Lock()
+        def escritor(seed):
+            outro = DatabaseManager(db.db_name, pool=True); rnd = random.Random(seed); minhas = []
+            contas = [ContaCorrente(outro, conta_id=cid) for cid in dados['ativas'][:200]]
+            while not parar.is_set():
+                t = time.perf_counter()
+                try: rnd.choice(contas).efetuar_movimento(rnd.choice(('deposito', 'saque')), rnd.choice((0.01, 0.1, 1.99, 10.5)))
+                except MovimentoRecusado: pass
+                except Exception as e: erros.append(repr(e))
+                minhas.append(time.perf_counter() - t)
+            outro.close()
+            with lock: latencias.extend(minhas)
+        threads = [threading.Thread(target=escritor, args=(i,)) for i in range(2)]
+        with contextlib.redirect_stdout(nulo): # Conta imprime cada operação (redirecionado só aqui: redirect_stdout vale para todas as threads)
+            for t in threads: t.start()
+            time.sleep(0.5); r = db.converter_para_centavos(); time.sleep(0.5); parar.set()
+            for t in threads: t.join()
+        print(f"conversão online: {r['transacoes']:,} lançamentos copiados, {r['contas']:,} contas em {r['segundos']:.1f}s | {len(latencias):,} movimentos concorrentes, "
+              f"p50 {percentil(latencias, 50) * 1000:.2f} ms, p99 {percentil(latencias, 99) * 1000:.2f} ms, máx {max(latencias, default=0) * 1000:.0f} ms | erros: {len(erros)}")
+        divergencias = db.verificar_saldos(); print(f"saldos divergentes do ledger depois da conversão: {len(divergencias)}")
+        depois = medir_modo("centavos"); db.close()
+        print(f"{'':<32} {'REAL (reais)':>14} {'INTEGER (centavos)':>20}")
+        for chave in antes:
+            if chave == 'tamanho_mib': print(f"{'tamanho do banco':<32} {antes[chave]:>10.1f} MiB {depois[chave]:>16.1f} MiB ({(depois[chave] / antes[chave] - 1) * 100:+.1f}%)")
+            else: print(f"{chave:<32} {antes[chave] * 1000:>11.1f} ms {depois[chave] * 1000:>17.1f} ms ({(depois[chave] / antes[chave] - 1) * 100:+.1f}%)")
+        if erros or divergencias: print("   ", erros[:3], divergencias[:3]); sys.exit(1)
+
+@benchmark("relatorios")
+def bench_relatorios(args):
+    """Relatórios do admin sobre um ledger de 10M linhas: construção dos resumos, atualização incremental, consultas (resumo vs. ledger) e verificação."""
+    n = args.n if args.n != 2000 else 10_000_000
+    with tempfile.TemporaryDirectory() as tmp:
+        db = novo_banco(tmp, pool=True); t0 = time.perf_counter()
+        with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo): gerar_banco_sintetico(db, 5_000, 7_500, min(n, 1_000_000), seed=args.seed)
+        conn = db._connect()
+        while (total := conn.execute("SELECT MAX(id) FROM transacoes").fetchone()[0]) < n: # Replica o ledger (mesmos dias e pares) até n linhas
+            conn.execute("INSERT INTO transacoes (conta_id, tipo, valor, timestamp, conta_destino_id) SELECT conta_id, tipo, valor, timestamp, conta_destino_id FROM transacoes WHERE id <= ?", (n - total,)); conn.commit()
+        db._release(conn); print(f"Ledger com {total:,} linhas criado em {time.perf_counter() - t0:.1f}s")
+        r = db.reconstruir_resumos(); tamanhos = {tabela: db.fetch_one(f"SELECT COUNT(*) FROM {tabela}")[0] for tabela in RESUMOS}
+        print(f"reconstruir_resumos: {r['ids']:,} lançamentos em {r['segundos']:.1f}s ({r['ids'] / r['segundos']:,.0f}/s) | " + ", ".join(f"{tabela} {linhas:,}" for tabela, linhas in tamanhos.items()))
+        relatorios = RelatoriosAdmin(db); desde = RelatoriosAdmin._desde(30); mes = RelatoriosAdmin._mes_atual()
+        cliente_id = db.fetch_one("SELECT cliente_id FROM resumo_mensal_cliente WHERE mes = ? ORDER BY movimentos DESC LIMIT 1", (mes,))[0] # O mais movimentado
+        consultas = { # Relatório: (a partir dos resumos, o mesmo direto do ledger)
+            "depósitos por dia (30 dias)": (lambda: relatorios.depositos_por_dia(30), lambda: db.fetch_all("SELECT substr(timestamp, 1, 10) AS dia, SUM(valor), COUNT(*) FROM transacoes WHERE tipo = 'deposito' AND timestamp >= ? GROUP BY dia ORDER BY dia DESC", (desde,))),
+            "fluxo líquido por cliente (mês)": (lambda: relatorios.fluxo_clientes(mes), lambda: db.fetch_all(f"SELECT c.cliente_id, SUM({SQL_DELTA_SALDO}) AS liquido FROM transacoes t JOIN contas c ON c.id = t.conta_id WHERE t.timestamp >= ? GROUP BY c.cliente_id ORDER BY liquido DESC LIMIT 10", (mes + "-01",))),
+            "fluxo diário de um cliente (30 dias)": (lambda: relatorios.fluxo_diario_cliente(cliente_id, 30), lambda: db.fetch_all(f"SELECT substr(t.timestamp, 1, 10) AS dia, SUM({SQL_DELTA_SALDO}), COUNT(*) FROM transacoes t JOIN contas c ON c.id = t.conta_id WHERE c.cliente_id = ? AND t.timestamp >= ? GROUP BY dia ORDER BY dia DESC", (cliente_id, desde))),
+            "transferências entre clientes (mês)": (lambda: relatorios.transferencias_entre_clientes(mes), lambda: db.fetch_all("""SELECT c.cliente_id, cd.cliente_id, COUNT(*), SUM(t.valor) AS total FROM transacoes t JOIN contas c ON c.id = t.conta_id JOIN contas cd ON cd.id = t.conta_destino_id
+                                                                                                                                  WHERE t.tipo = 'transferencia_enviada' AND t.timestamp >= ? GROUP BY 1, 2 ORDER BY total DESC LIMIT 10""", (mes + "-01",))),
+            "maiores saldos": (relatorios.maiores_saldos, lambda: db.fetch_all(f"SELECT conta_id, SUM({SQL_DELTA_SALDO}) AS saldo FROM transacoes GROUP BY conta_id ORDER BY saldo DESC LIMIT 10")),
+        }
+        print(f"{'relatório':<38} {'resumos p50':>12} {'p99':>9} {'ledger':>11} {'ganho':>9}")
+        for nome, (resumo, ledger) in consultas.items():
+            tempos = [_cronometrar(resumo) for _ in range(50)]; bruto = _cronometrar(ledger)
+            print(f"{nome:<38} {percentil(tempos, 50) * 1000:>9.2f} ms {percentil(tempos, 99) * 1000:>6.2f} ms {bruto * 1000:>8.0f} ms {bruto / percentil(tempos, 50):>8,.0f}x")
+        for novos in (100, 10_000, 100_000): # Lançamentos novos (hoje) desde a última atualização: o custo acompanha eles, não o ledger
+            db.execute_query("INSERT INTO transacoes (conta_id, tipo, valor, timestamp, conta_destino_id) SELECT conta_id, tipo, valor, CURRENT_TIMESTAMP, conta_destino_id FROM transacoes WHERE id <= ?", (novos,))
+            r = db.atualizar_resumos(); print(f"atualizar_resumos com {novos:>7,} lançamentos novos: {r['segundos'] * 1000:>9.1f} ms")
+        t = _cronometrar(lambda: relatorios.painel(cliente_id=cliente_id)); print(f"painel completo (atualização + 6 consultas): {t * 1000:.1f} ms")
+        r = db.verificar_resumos(); print(f"verificar_resumos: {r['ultimo_id']:,} lançamentos em {r['segundos']:.1f}s | divergências: {r['divergencias']}")
+        db.close()
+        if any(r['divergencias'].values()): sys.exit(1)
+
+def _agendar_em_massa(db: DatabaseManager, conta_ids: list[int], n: int, inicio: datetime.datetime, *, intervalo: str | None = None, janela: int = 3600, seed: int = 42):
+    """Insere n agendamentos (60% depósitos, 30% transferências, 10% saques de R$ 1 a 100) com início espalhado por `janela` segundos a partir de `inicio`."""
+    rnd = random.Random(seed); conn = db._connect()
+    def linhas():
+        for _ in range(n):
+            origem = rnd.choice(conta_ids); sorteio = rnd.random(); ts = (inicio + datetime.timedelta(seconds=rnd.randrange(janela))).strftime('%Y-%m-%d %H:%M:%S')
+            tipo, destino = ('deposito', None) if sorteio < 0.6 else ('saque', None) if sorteio < 0.7 else ('transferencia_enviada', rnd.choice([c for c in rnd.sample(conta_ids, 2) if c != origem]))
+            yield (origem, tipo, rnd.randint(100, 10_000), destino, ts, intervalo, ts)
+    try:
+        conn.executemany("INSERT INTO agendamentos (conta_id, tipo, centavos, conta_destino_id, inicio, intervalo, proxima) VALUES (?, ?, ?, ?, ?, ?, ?)", linhas())
+        conn.execute("UPDATE contas SET saldo = ?, limite_saques = ?", (db.para_bd(10_000.0), 10 ** 9)); conn.commit() # Saldo de sobra e sem limite diário: o teste é de vazão
+    finally:
+        db._release(conn)
+
+def _conferir_agendamentos(db: DatabaseManager, saldo_inicial: float) -> tuple[bool, str]:
+    """Cada ocorrência executada tem exatamente os seus lançamentos (1, ou 2 numa transferência) e os saldos batem com elas."""
+    executadas, lancamentos, liquido = db.fetch_one("""SELECT COUNT(*), SUM(CASE a.tipo WHEN 'transferencia_enviada' THEN 2 ELSE 1 END), SUM(CASE a.tipo WHEN 'deposito' THEN a.centavos WHEN 'saque' THEN -a.centavos ELSE 0 END)
+                                                       FROM execucoes_agendamento e JOIN agendamentos a ON a.id = e.agendamento_id WHERE e.estado = 'executada'""")
+    ledger = db.fetch_one("SELECT COUNT(*) FROM transacoes")[0]; saldos = db.de_bd(db.fetch_one("SELECT SUM(saldo) FROM contas")[0])
+    n_contas = db.fetch_one("SELECT COUNT(*) FROM contas")[0]; esperado = Dinheiro.de(saldo_inicial) * n_contas + Dinheiro(liquido or 0)
+    ok = ledger == (lancamentos or 0) and saldos == esperado
+    return ok, f"{executadas:,} ocorrência(s) executada(s), {ledger:,} lançamento(s) (esperados {lancamentos or 0:,}), saldos R$ {saldos:,.2f} (esperado {esperado:,.2f}) {'OK' if ok else 'FALHA'}"
+
+def _executar_e_cair(caminho: str, apos: int):
+    """Processo executor que morre (os._exit, sem limpeza) no meio de um lote, depois de `apos` lançamentos."""
+    import agendamentos
+    postar = agendamentos.postar_movimento; feitos = itertools.count(1)
+    def postar_e_cair(*a, **k):
+        if next(feitos) > apos: os._exit(3) # A transação do lote em andamento é desfeita pelo SQLite
+        return postar(*a, **k)
+    agendamentos.postar_movimento = postar_e_cair
+    with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo): agendamentos.Agenda(DatabaseManager(caminho, pool=True)).executar_vencidos(lote=1000)
+
+@benchmark("agendamentos")
+def bench_agendamentos(args):
+    """Execução de 1M pagamentos agendados vencidos: vazão por tamanho de lote, queda do executor no meio de um lote e recuperação após uma parada de 30 dias."""
+    n = args.n if args.n != 2000 else 1_000_000; n_contas = 10_000; saldo_inicial = 10_000.0; falhou = False; agora = datetime.datetime.now().replace(microsecond=0)
+    with tempfile.TemporaryDirectory() as tmp:
+        t0 = time.perf_counter()
+        with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo): db = novo_banco(tmp, pool=True); conta_ids = popular_ledger(db, n_contas, 0)
+        _agendar_em_massa(db, conta_ids, n, agora - datetime.timedelta(hours=1), seed=args.seed)
+        print(f"{n:,} agendamentos únicos vencidos na última hora, {n_contas:,} contas, criados em {time.perf_counter() - t0:.1f}s")
+        agenda = Agenda(db); feitas = 0
+        for lote in (1, 100, 1_000, 10_000): # Mesmo volume por rodada (limitado nos lotes pequenos)
+            ocorrencias = min(20_000 if lote == 1 else 100_000, n - feitas)
+            r = agenda.executar_vencidos(agora, lote=lote, max_lotes=max(1, ocorrencias // lote)); feitas += r['executadas'] + r['recusadas']
+            print(f"lote {lote:>6,}: {r['executadas'] + r['recusadas']:>9,} ocorrência(s) em {r['lotes']:>6,} transação(ões), {r['segundos']:.2f}s -> {taxa(r['executadas'] + r['recusadas'], r['segundos'])}")
+        r = agenda.executar_vencidos(agora, lote=10_000); feitas += r['executadas'] + r['recusadas']
+        print(f"restante com lote 10.000: {r['executadas'] + r['recusadas']:,} ocorrência(s) em {r['segundos']:.1f}s -> {taxa(r['executadas'] + r['recusadas'], r['segundos'])}; "
+              f"pendentes: {db.fetch_one('SELECT COUNT(*) FROM agendamentos WHERE proxima IS NOT NULL')[0]}")
+        ok, texto = _conferir_agendamentos(db, saldo_inicial); print(f"conferência: {texto}"); falhou = falhou or not ok or feitas != n
+        db.close()
+    # Queda no meio de um lote: o lote aberto é desfeito e, ao reiniciar, cada ocorrência é postada uma vez só
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo): db = novo_banco(tmp, pool=True); conta_ids = popular_ledger(db, 1_000, 0)
+        _agendar_em_massa(db, conta_ids, 50_000, agora - datetime.timedelta(hours=1), seed=args.seed)
+        processo = multiprocessing.get_context("spawn").Process(target=_executar_e_cair, args=(db.db_name, 12_345)); processo.start(); processo.join()
+        antes = db.fetch_one("SELECT COUNT(*) FROM execucoes_agendamento")[0]; r = Agenda(db).executar_vencidos(agora, lote=1_000)
+        ok, texto = _conferir_agendamentos(db, saldo_inicial); ok = ok and processo.exitcode == 3 and antes + r['executadas'] + r['recusadas'] == 50_000 and not r['duplicadas']
+        print(f"queda após 12.345 lançamentos: {antes:,} ocorrência(s) gravadas antes; reinício executou {r['executadas'] + r['recusadas']:,} -> {texto}"); falhou = falhou or not ok
+        db.close()
+    # Parada de 30 dias: 10k agendamentos diários acumulam 300k ocorrências atrasadas
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo): db = novo_banco(tmp, pool=True); conta_ids = popular_ledger(db, 1_000, 0)
+        _agendar_em_massa(db, conta_ids, 10_000, agora - datetime.timedelta(days=30), intervalo='diario', janela=86_400, seed=args.seed)
+        r = Agenda(db).executar_vencidos(agora, lote=10_000); ocorrencias = r['executadas'] + r['recusadas']
+        atrasadas = db.fetch_one("SELECT COUNT(*) FROM agendamentos WHERE proxima <= ?", (agora.strftime('%Y-%m-%d %H:%M:%S'),))[0]
+        ok, texto = _conferir_agendamentos(db, saldo_inicial); ok = ok and not atrasadas
+        print(f"recuperação após 30 dias parado: {ocorrencias:,} ocorrência(s) de 10.000 agendamentos diários em {r['segundos']:.1f}s -> {taxa(ocorrencias, r['segundos'])}; ainda atrasados: {atrasadas} | {texto}"); falhou = falhou or not ok
+        db.close()
+    if falhou: sys.exit(1)
+
+def gerar_movimentos(caminho: str, numeros: list[str], n: int, seed: int = 42):
+    """CSV de movimentos: 50% depósitos, 25% saques, 25% transferências (R$ 1 a 800, parte recusada por saldo/limite) e ~1% de linhas inválidas."""
+    rnd = random.Random(seed)
+    with open(caminho, 'w', newline='', encoding='utf-8') as arquivo:
+        escritor = csv.writer(arquivo); escritor.writerow(('numero_conta', 'tipo', 'valor', 'numero_conta_destino'))
+        for _ in range(n):
+            origem = rnd.choice(numeros); sorteio = rnd.random(); valor = f"{rnd.uniform(1, 800):.2f}".replace(".", ",")
+            if sorteio < 0.005: escritor.writerow(("99999999", 'deposito', valor, "")); continue # Conta inexistente
+            if sorteio < 0.01: escritor.writerow((origem, 'saque', "abc", "")); continue # Valor inválido
+            tipo = 'deposito' if sorteio < 0.5 else 'saque' if sorteio < 0.75 else 'transferencia_enviada'
+            escritor.writerow((origem, tipo, valor, rnd.choice(numeros) if tipo == 'transferencia_enviada' else ""))
+
+def aplicar_em_sequencia(db: DatabaseManager, caminho: str) -> dict:
+    """Caminho de referência: cada linha por ContaCorrente.obter_por_numero + efetuar_movimento (o que a interface faz), uma transação por movimento."""
+    recusas = {}
+    with open(caminho, newline='', encoding='utf-8') as arquivo, open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+        leitor = csv.DictReader(arquivo)
+        for r in leitor:
+            try:
+                conta = ContaCorrente.obter_por_numero(db, r['numero_conta'])
+                if conta is None: raise MovimentoRecusado('conta_inexistente', "Conta não existe.")
+                destino = ContaCorrente.obter_por_numero(db, r['numero_conta_destino']) if r['numero_conta_destino'] else None
+                if r['numero_conta_destino'] and destino is None: raise MovimentoRecusado('conta_destino_inexistente', "Conta destino não encontrada.")
+                conta.efetuar_movimento(r['tipo'], r['valor'], destino)
+            except MovimentoRecusado as e: recusas[leitor.line_num] = e.motivo
+    return recusas
+
+def _estado_final(db: DatabaseManager) -> tuple:
+    """Saldos, ledger (sem ids/horário) e contadores de saques: o que precisa ser igual entre o caminho sequencial e o lote."""
+    return (db.fetch_all("SELECT id, saldo FROM contas ORDER BY id"), db.fetch_all("SELECT conta_id, tipo, valor, conta_destino_id FROM transacoes ORDER BY id"),
+            db.fetch_all("SELECT conta_id, dia, total FROM saques_diarios ORDER BY conta_id, dia"))
+
+def _copiar_banco(db: DatabaseManager, destino: str) -> DatabaseManager:
+    """Cópia consistente do BD (API de backup do SQLite) aberta num DatabaseManager próprio."""
+    conn = db._connect(); copia = sqlite3.connect(destino)
+    try: conn.backup(copia)
+    finally: copia.close(); db._release(conn)
+    with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo): return DatabaseManager(destino, pool=True)
+
+@benchmark("lote")
+def bench_lote(args):
+    """Arquivo de movimentos (200k linhas, 10k contas): caminho sequencial da interface vs. ProcessadorLote com 1/2/4 processos, com conferência de equivalência."""
+    n = args.n if args.n != 2000 else 200_000; n_contas = 10_000; n_sequencial = min(n, 20_000); falhou = False
+    print(f"{os.cpu_count()} núcleo(s); {n_contas:,} contas (corrente, saldo R$ 1.000, limite R$ 500, 20 saques/dia)")
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo): base = novo_banco(tmp, "base.db", pool=True); popular_ledger(base, n_contas, 0)
+        base.execute_query("UPDATE contas SET saldo = ?, limite_saques = 20", (base.para_bd(1000.0),))
+        numeros = [row[0] for row in base.fetch_all("SELECT numero FROM contas")]
+        pequeno = os.path.join(tmp, "pequeno.csv"); gerar_movimentos(pequeno, numeros[:500], n_sequencial, seed=args.seed) # Poucas contas: muitas recusas por limite e saldo
+        grande = os.path.join(tmp, "movimentos.csv"); gerar_movimentos(grande, numeros, n, seed=args.seed)
+        # Equivalência: mesmo arquivo pelo caminho sequencial e pelo lote (1 e 4 partições) dá o mesmo BD e as mesmas recusas
+        db = _copiar_banco(base, os.path.join(tmp, "sequencial.db")); t0 = time.perf_counter(); recusas = aplicar_em_sequencia(db, pequeno); t_seq = time.perf_counter() - t0
+        referencia = _estado_final(db); db.close()
+        print(f"sequencial (interface): {n_sequencial:,} linhas em {t_seq:.2f}s -> {taxa(n_sequencial, t_seq)} ({len(recusas):,} recusadas)")
+        for processos in (1, 4):
+            db = _copiar_banco(base, os.path.join(tmp, f"equivalencia{processos}.db")); saida = os.path.join(tmp, "recusados.csv")
+            rel = ProcessadorLote(db, processos=processos, tamanho_bloco=5_000).processar(pequeno, saida)
+            with open(saida, newline='', encoding='utf-8') as arquivo: recusas_lote = {int(r['linha']): r['motivo'] for r in csv.DictReader(arquivo)}
+            ok = _estado_final(db) == referencia and recusas_lote == recusas; db.close(); falhou = falhou or not ok
+            print(f"lote {processos} processo(s), blocos de 5.000: {taxa(rel['lidas'], rel['segundos'])}, {rel['rodadas']} rodada(s) em {rel['blocos']} bloco(s); "
+                  f"saldos, ledger, contadores e recusas iguais ao sequencial: {'OK' if ok else 'FALHA'}")
+        print(f"{n:,} linhas:")
+        for processos in (1, 2, 4):
+            db = _copiar_banco(base, os.path.join(tmp, f"lote{processos}.db"))
+            rel = ProcessadorLote(db, processos=processos).processar(grande, os.path.join(tmp, "recusados.csv")); db.close()
+            print(f"  lote {processos} processo(s): {rel['segundos']:.2f}s -> {taxa(rel['lidas'], rel['segundos'])} ({rel['lidas'] / rel['segundos'] / (n_sequencial / t_seq):,.0f}x o sequencial) | "
+                  f"{rel['recusadas']:,} recusadas {dict(sorted(rel['motivos'].items()))}, {rel['rodadas']} rodada(s) em {rel['blocos']} bloco(s)")
+        base.close()
+    if falhou: sys.exit(1)
+
+def _banco_particionado(diretorio: str, fragmentos: int, contas_por_fragmento: int, saldo_inicial: float) -> tuple[str, list[int]]:
+    """Cria um BancoParticionado vazio (sem ADMIN) com contas distribuídas em rodízio, todas com saldo_inicial (em reais) depositado."""
+    caminho = os.path.join(diretorio, "fragmentado.db")
+    for k in range(fragmentos): open(BancoParticionado.caminho_fragmento(caminho, k), 'a').close() # Arquivos já existentes => sem ADMIN de exemplo
+    with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo), BancoParticionado(caminho, fragmentos) as banco:
+        contas = [banco.abrir_conta(banco.cadastrar_cliente(f"Cliente {i}", f"{i:03d}.{i:03d}.{i:03d}-00"[-14:], "Rua", "123")) for i in range(1, fragmentos * contas_por_fragmento + 1)]
+        for conta in contas: conta.efetuar_movimento('deposito', saldo_inicial)
+        for db in banco.fragmentos: db.execute_query("UPDATE contas SET limite_saques = ?", (10 ** 9,)) # O teste é de vazão, não do limite diário
+        return caminho, [conta.id for conta in contas]
+
+def _trabalhador_fragmentos(caminho: str, fragmentos: int, conta_ids: list[int], n_ops: int, fracao_entre: float, seed: int, barreira, resultados):
+    """Processo escritor: metade depósitos, metade transferências (fracao_entre delas para conta de outro fragmento), por Conta.efetuar_movimento.
+
+    Todos começam juntos (barreira, depois de abrir o banco) e devolvem (depositado, recusados, entre fragmentos, início, fim) na fila."""
+    rnd = random.Random(seed); depositado = 0.0; recusados = entre = 0
+    with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo), BancoParticionado(caminho, fragmentos, recuperar=False) as banco:
+        contas = [banco.conta(cid) for cid in conta_ids]; por_fragmento: dict[int, list] = {}
+        for conta in contas: por_fragmento.setdefault(conta.db.fragmento, []).append(conta)
+        barreira.wait(); inicio = time.monotonic()
+        for _ in range(n_ops):
+            origem = rnd.choice(contas)
+            if rnd.random() < 0.5: origem.efetuar_movimento('deposito', 1.0); depositado += 1.0; continue
+            outro = fragmentos > 1 and rnd.random() < fracao_entre
+            destino = rnd.choice(contas if outro else por_fragmento[origem.db.fragmento])
+            if destino is origem or (outro and destino.db is origem.db): continue
+            try: origem.efetuar_movimento('transferencia_enviada', float(rnd.randint(1, 300)), destino); entre += destino.db is not origem.db
+            except MovimentoRecusado: recusados += 1
+        resultados.put((depositado, recusados, entre, inicio, time.monotonic()))
+
+def _transferir_e_cair(caminho: str, origem_id: int, destino_id: int, passo: str):
+    """Processo que morre (os._exit, sem limpeza) no passo indicado do protocolo de duas fases."""
+    import particionamento
+    setattr(particionamento, passo, lambda *a, **k: os._exit(3)) # O passo não roda: a transação aberta nele é desfeita pelo SQLite
+    with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+        banco = BancoParticionado(caminho, 2, recuperar=False); banco.conta(origem_id).efetuar_movimento('transferencia_enviada', 25.0, banco.conta(destino_id))
+
+@benchmark("fragmentos")
+def bench_fragmentos(args):
+    """Vazão de escrita com 1/2/4/8 fragmentos (8 processos escritores, 10% das transferências entre fragmentos) e queda no meio da transferência entre fragmentos."""
+    ctx = multiprocessing.get_context("spawn"); escritores = 8; contas_total = 64; saldo_inicial = 1000.0; falhou = False
+    print(f"{os.cpu_count()} núcleo(s); {escritores} processos escritores, {args.n:,} movimentos por rodada, synchronous=FULL")
+    for fragmentos in (1, 2, 4, 8):
+        with tempfile.TemporaryDirectory() as tmp:
+            caminho, conta_ids = _banco_particionado(tmp, fragmentos, contas_total // fragmentos, saldo_inicial)
+            barreira = ctx.Barrier(escritores); fila = ctx.Queue()
+            processos = [ctx.Process(target=_trabalhador_fragmentos, args=(caminho, fragmentos, conta_ids, args.n // escritores, 0.1, seed, barreira, fila)) for seed in range(escritores)]
+            for p in processos: p.start()
+            resultados = [fila.get() for _ in processos]
+            for p in processos: p.join()
+            duracao = max(r[4] for r in resultados) - min(r[3] for r in resultados); depositado = sum(r[0] for r in resultados); recusados = sum(r[1] for r in resultados); entre = sum(r[2] for r in resultados)
+            with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo), BancoParticionado(caminho, fragmentos, recuperar=False) as banco:
+                postados = sum(db.fetch_one("SELECT COUNT(*) FROM transacoes WHERE tipo IN ('deposito', 'transferencia_enviada')")[0] for db in banco.fragmentos) - len(conta_ids)
+                v = banco.verificar(); contadores = sum(len(db.verificar_contadores_saques()) for db in banco.fragmentos)
+            esperado = saldo_inicial * len(conta_ids) + depositado
+            ok = v['saldos'] == esperado and not v['em_transito'] and not v['divergencias_saldo'] and not contadores
+            print(f"{fragmentos} fragmento(s): {postados:,} movimentos ({entre:,} transferências entre fragmentos, {recusados} recusados) em {duracao:.2f}s -> {taxa(postados, duracao)} | "
+                  f"total R$ {v['saldos']:.2f} (esperado {esperado:.2f}) {'OK' if ok else 'FALHA'}")
+            falhou = falhou or not ok
+    # Queda do processo em cada passo: a recuperação conclui ou aborta, e o dinheiro total nunca muda
+    for passo, descricao in (("_debitar_origem", "destino preparado, antes do débito"), ("_concluir_destino", "débito confirmado, antes do crédito"), ("_concluir_origem", "creditado, antes de concluir a origem")):
+        with tempfile.TemporaryDirectory() as tmp:
+            caminho, (origem_id, destino_id) = _banco_particionado(tmp, 2, 1, saldo_inicial)
+            processo = ctx.Process(target=_transferir_e_cair, args=(caminho, origem_id, destino_id, passo)); processo.start(); processo.join()
+            with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo), BancoParticionado(caminho, 2, recuperar=False) as banco:
+                antes = banco.verificar(); r = banco.recuperar_transferencias(idade_minima=0); depois = banco.verificar()
+                saldos = (banco.conta(origem_id).saldo, banco.conta(destino_id).saldo)
+            ok = (processo.exitcode == 3 and antes['saldos'] + antes['em_transito'] == depois['saldos'] == 2 * saldo_inicial and not depois['em_transito']
+                  and not depois['divergencias_saldo'] and saldos in ((saldo_inicial, saldo_inicial), (saldo_inicial - 25, saldo_inicial + 25)))
+            print(f"queda ({descricao}): em trânsito R$ {antes['em_transito']:.2f}; recuperação: {r['concluidas']} concluída(s), {r['abortadas']} abortada(s) -> "
+                  f"saldos R$ {saldos[0]:.2f} / {saldos[1]:.2f}, total R$ {depois['saldos']:.2f} {'OK' if ok else 'FALHA'}")
+            falhou = falhou or not ok
+    if falhou: sys.exit(1)
+
+@benchmark("alteracoes")
+def bench_alteracoes(args):
+    """Leituras de BD por minuto de uma janela aberta (ociosa e com outra conexão postando): recarga completa a cada 1s vs. feed de alterações; e o custo dos gatilhos na postagem."""
+    n = args.n if args.n != 2000 else 200_000; n_contas = 1_000; ticks = 60; carga = 100 # Um minuto de verificações a cada 1s (sem esperar de verdade); 100 movimentos/s
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+            db = novo_banco(tmp, pool=True); conta_ids = popular_ledger(db, n_contas, n); escritor = DatabaseManager(db.db_name, pool=True, metricas=False) # "Outro processo"
+        db.execute_query("UPDATE contas SET saldo = ?, limite_saques = ?", (db.para_bd(10 ** 9), 10 ** 9))
+        exibida = conta_ids[0]; cliente_id = db.fetch_one("SELECT cliente_id FROM contas WHERE id = ?", (exibida,))[0]; outras = conta_ids[1:]; rng = random.Random(args.seed)
+        def postar(k: int, na_exibida: bool): # Uma transação por movimento, como a interface de outra instância
+            for cid in ([exibida] if na_exibida else []) + rng.choices(outras, k=k - na_exibida): escritor.executar_transacao(lambda cursor, cid=cid: postar_movimento(cursor, cid, 'deposito', escritor.para_bd(1.0)))
+        def recarga_completa(): # O que a janela precisava fazer para ver mudanças de fora: 'Atualizar Extrato' + lista de contas
+            db.cache_contas.invalidar(exibida); extrato = ContaCorrente.obter(db, exibida).extrato_renderizado(); extrato.limpar()
+            BancoGUI.avancar_extrato(extrato, False, None, 0, BancoGUI.TAMANHO_PAGINA_EXTRATO); db.fetch_all(BancoGUI.SQL_CONTAS_CLIENTE, (cliente_id,))
+        feed = FeedAlteracoes(db); janela = {}
+        def pelo_feed(): # Mesmas leituras que BancoGUI._aplicar_alteracoes faz (fora do Tk)
+            r = feed.novas()
+            if r is None: return
+            if r['recarregar'] or cliente_id in r['criadas'].values(): db.fetch_all(BancoGUI.SQL_CONTAS_CLIENTE, (cliente_id,))
+            if r['recarregar'] or exibida in r['saldos']: # Extrato no fim do histórico: só os lançamentos novos, e o rodapé relê o saldo
+                janela['geracao'], _, _, janela['exibidas'], _ = BancoGUI.avancar_extrato(janela['extrato'], False, janela['geracao'], janela['exibidas'], BancoGUI.TAMANHO_PAGINA_EXTRATO)
+        def medir(funcao, k: int, na_exibida: bool) -> dict:
+            db.metricas.limpar(); segundos = 0.0
+            for _ in range(ticks):
+                if k: postar(k, na_exibida)
+                inicio = time.perf_counter(); funcao(); segundos += time.perf_counter() - inicio
+            consultas = db.estatisticas_consultas()['consultas']
+            return {'leituras': sum(c['chamadas'] for c in consultas), 'linhas': sum(c['linhas'] for c in consultas), 'ms': segundos * 1000}
+        print(f"{n:,} lançamentos em {n_contas:,} contas; janela exibindo uma conta (extrato inteiro carregado), verificação a cada 1s; números por minuto:")
+        for descricao, k, na_exibida in (("ociosa", 0, False), (f"{carga} movimentos/s em outras contas", carga, False), (f"{carga} movimentos/s, 1/s na conta exibida", carga, True)):
+            antes = medir(recarga_completa, k, na_exibida)
+            extrato = ContaCorrente.obter(db, exibida).extrato_renderizado(); extrato.limpar()
+            while not extrato.fim: extrato.carregar_pagina(BancoGUI.TAMANHO_PAGINA_EXTRATO)
+            janela['extrato'] = extrato; janela['geracao'], _, _, janela['exibidas'], _ = extrato.trecho(); feed.novas() # Parte do estado atual
+            depois = medir(pelo_feed, k, na_exibida)
+            print(f"  {descricao:<40} recarga completa: {antes['leituras']:>6,} leituras, {antes['linhas']:>7,} linhas, {antes['ms']:>7.1f} ms | "
+                  f"feed: {depois['leituras']:>5,} leituras, {depois['linhas']:>5,} linhas, {depois['ms']:>6.1f} ms")
+        # Custo dos gatilhos (uma linha em alteracoes por UPDATE de saldo) na vazão de postagem
+        n_ops = 5_000; conta = escritor.cache_contas.obter(exibida) or ContaCorrente.obter(escritor, exibida); destino = ContaCorrente.obter(escritor, outras[0])
+        gatilho = escritor.fetch_one("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = 'alteracoes_saldo'")[0]; vazoes = {"sem gatilhos": 0.0, "com gatilhos": 0.0} # Começa sem: o gatilho existe
+        for _ in range(3): # Rodadas alternadas (melhor de 3): o disco e o checkpoint do WAL pesam mais que a diferença
+            for rotulo in vazoes:
+                escritor.execute_query(gatilho if rotulo == "com gatilhos" else "DROP TRIGGER alteracoes_saldo")
+                with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+                    t0 = time.perf_counter()
+                    for i in range(n_ops): conta.efetuar_movimento('transferencia_enviada' if i % 2 else 'deposito', 1.0, destino if i % 2 else None)
+                    vazoes[rotulo] = max(vazoes[rotulo], n_ops / (time.perf_counter() - t0))
+        print(f"postagem ({n_ops:,} depósitos/transferências alternados, um commit cada, melhor de 3): com gatilhos {vazoes['com gatilhos']:,.0f} ops/s, "
+              f"sem {vazoes['sem gatilhos']:,.0f} ops/s ({vazoes['com gatilhos'] / vazoes['sem gatilhos'] - 1:+.1%})")
+        feed.fechar(); escritor.close(); db.close()
+
+def _cronometrar(funcao) -> float:
+    t0 = time.perf_counter(); funcao(); return time.perf_counter() - t0
+
+# Escalas da suíte: nome -> (clientes, contas, transações)
+ESCALAS = {'pequena': (1_000, 1_500, 50_000), 'media': (10_000, 15_000, 500_000), 'grande': (50_000, 75_000, 2_000_000)}
+FORMATO_RESULTADOS = 1 # Versão do JSON da suíte (mudar ao renomear métricas)
+
+def medir_operacoes(operacao, argumentos) -> dict:
+    """Executa operacao(*args) para cada item e resume: ops/s, p50/p95/p99 em microssegundos e recusas (MovimentoRecusado)."""
+    latencias = []; recusas = 0; inicio = time.perf_counter()
+    for args in argumentos:
+        t0 = time.perf_counter()
+        try: operacao(*args)
+        except MovimentoRecusado: recusas += 1
+        latencias.append(time.perf_counter() - t0)
+    duracao = time.perf_counter() - inicio
+    return {'ops': len(latencias), 'ops_s': len(latencias) / duracao if duracao else 0.0, 'p50_us': percentil(latencias, 50) * 1e6,
+            'p95_us': percentil(latencias, 95) * 1e6, 'p99_us': percentil(latencias, 99) * 1e6, 'recusas': recusas}
+
+def metadados_execucao(args) -> dict:
+    """Identifica a execução para comparar entre commits: commit (e se a árvore tinha alterações), versões e parâmetros."""
+    raiz = os.path.dirname(os.path.abspath(__file__)); commit = None; alterado = None
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=raiz, capture_output=True, text=True, check=True).stdout.strip()
+        alterado = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=raiz, capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError): pass # Fora de um repositório git
+    return {'formato': FORMATO_RESULTADOS, 'commit': commit, 'alterado': alterado, 'data': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(), 'sqlite': sqlite3.sqlite_version, 'plataforma': platform.platform(), 'seed': args.seed, 'n': args.n}
+
+def comparar_resultados(base: dict, atual: dict, tolerancia: float) -> list[str]:
+    """Regressões de atual contra base: ops/s abaixo de (1 - tolerancia) ou p99 acima de (1 + tolerancia), por escala e métrica."""
+    regressoes = []
+    for escala, dados in atual['escalas'].items():
+        for metrica, r in dados['resultados'].items():
+            antes = base.get('escalas', {}).get(escala, {}).get('resultados', {}).get(metrica)
+            if not antes: continue
+            if antes['ops_s'] and r['ops_s'] < antes['ops_s'] * (1 - tolerancia): regressoes.append(f"{escala}/{metrica}: {antes['ops_s']:,.0f} -> {r['ops_s']:,.0f} ops/s")
+            if antes['p99_us'] and r['p99_us'] > antes['p99_us'] * (1 + tolerancia): regressoes.append(f"{escala}/{metrica}: p99 {antes['p99_us']:,.0f} -> {r['p99_us']:,.0f} us")
+    return regressoes
+
+@benchmark("suite")
+def bench_suite(args):
+    """Suíte reprodutível: para cada escala, gera o banco sintético (seed) e mede postagem, transferência, extrato, limite diário, login e listagem de contas.
+
+    --json grava os resultados (com commit e versões) para comparar entre commits; --comparar base.json aponta regressões
+    acima de --tolerancia e sai com código 1 se houver alguma."""
+    resultado = {**metadados_execucao(args), 'escalas': {}}
+    for escala in args.escalas.split(","):
+        n_clientes, n_contas, n_transacoes = ESCALAS[escala]
+        with tempfile.TemporaryDirectory() as tmp:
+            db = novo_banco(tmp, pool=True); t0 = time.perf_counter()
+            dados = gerar_banco_sintetico(db, n_clientes, n_contas, n_transacoes, seed=args.seed); geracao = time.perf_counter() - t0
+            if db.metricas is not None: db.metricas.limpar() # consultas_mais_caras: só a carga medida
+            rnd = random.Random(args.seed + 1); n = args.n; ativas = dados['ativas']; pesos = list(itertools.accumulate(1 / (i + 1) ** 1.1 for i in range(len(ativas))))
+            sortear = lambda k: rnd.choices(ativas, cum_weights=pesos, k=k) # Mesma distribuição de atividade do gerador
+            ids_postagem = sortear(n); ids_extrato = sortear(max(1, n // 10)); ids_limite = sortear(n); mediana = ativas[len(ativas) // 2]
+            contas = {conta_id: ContaCorrente.obter(db, conta_id) for conta_id in {*ids_postagem, *ids_extrato, *ids_limite, *ativas[:50], mediana}} # Carregadas antes de medir
+            db.execute_query(f"UPDATE contas SET limite_saques = 1000000000 WHERE id IN ({','.join('?' * 50)})", ativas[:50]) # Transferências em série sem bater no limite diário
+            for conta_id in ativas[:50]: contas[conta_id].limite_saques = 1_000_000_000
+            resultados = {}
+            with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo): # Conta imprime cada operação
+                resultados['postagem'] = medir_operacoes(lambda c, v: c.efetuar_movimento('deposito', v), [(contas[i], round(rnd.lognormvariate(5.5, 1.0), 2)) for i in ids_postagem])
+                pares = [(contas[o], contas[d]) for o, d in zip(rnd.choices(ativas[:50], k=n), rnd.choices(ativas[:50], k=n)) if o != d]
+                resultados['transferencia'] = medir_operacoes(lambda o, d, v: o.efetuar_movimento('transferencia_enviada', v, d), [(o, d, round(rnd.uniform(1, 50), 2)) for o, d in pares])
+                resultados['extrato_pagina'] = medir_operacoes(_primeira_pagina_extrato, [(contas[i],) for i in ids_extrato])
+                resultados['extrato_completo_mediana'] = medir_operacoes(lambda c: c.exibir_extrato(), [(contas[mediana],)] * max(1, n // 100))
+                resultados['extrato_completo_maior'] = medir_operacoes(lambda c: c.exibir_extrato(), [(contas[ativas[0]],)] * max(1, n // 500))
+                resultados['limite_diario'] = medir_operacoes(lambda c: c._get_numero_saques_hoje(), [(contas[i],) for i in ids_limite])
+                def login(cpf, senha):
+                    db.cache_clientes.limpar() # Cada login é de um cliente "frio", como um processo recém-aberto
+                    cliente = Cliente.find_by_cpf(db, cpf); assert cliente is not None and cliente.check_password(senha)
+                indices = [rnd.randrange(len(dados['cpfs'])) for _ in range(n)]
+                resultados['login'] = medir_operacoes(login, [(dados['cpfs'][i], f"senha{i + 1}") for i in indices])
+                resultados['contas_usuario'] = medir_operacoes(lambda cliente_id: db.fetch_all(BancoGUI.SQL_CONTAS_CLIENTE, (cliente_id,)), [(rnd.choice(dados['cliente_ids']),) for _ in range(n)])
+                resultados['busca_admin'] = medir_operacoes(lambda termo: Conta.buscar(db, termo, limite=BancoGUI.LINHAS_SELETOR), [(rnd.choice(("", rnd.choice(NOMES)[:2], str(10000 + rnd.randrange(n_contas))[:3])),) for _ in range(n)])
+            consultas = db.estatisticas_consultas().get('consultas', [])
+            resultado['escalas'][escala] = {'dados': {'clientes': n_clientes, 'contas': n_contas, 'transacoes': dados['transacoes'], 'geracao_s': geracao}, 'resultados': resultados,
+                                            'consultas_mais_caras': [{k: c[k] for k in ('forma', 'chamadas', 'total_ms', 'p99_ms')} for c in consultas[:5]]}
+            db.close()
+        print(f"\n[{escala}] {n_clientes:,} clientes, {n_contas:,} contas, {dados['transacoes']:,} transações (geradas em {geracao:.1f}s)")
+        for metrica, r in resultados.items(): print(f"  {metrica:<26} {r['ops_s']:>10,.0f} ops/s | p50 {r['p50_us']:>10,.0f} us | p99 {r['p99_us']:>10,.0f} us" + (f" | recusas {r['recusas']}" if r['recusas'] else ""))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as arquivo: json.dump(resultado, arquivo, ensure_ascii=False, indent=2)
+        print(f"\nResultados gravados em {args.json}")
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as arquivo: base = json.load(arquivo)
+        regressoes = comparar_resultados(base, resultado, args.tolerancia)
+        print(f"\nComparação com {args.comparar} (commit {base.get('commit')}, tolerância {args.tolerancia:.0%}): {len(regressoes)} regressão(ões)")
+        for linha in regressoes: print(f"  {linha}")
+        if regressoes: sys.exit(1)
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("nome", choices=sorted(BENCHMARKS), help="benchmark a executar")
+    parser.add_argument("-n", type=int, default=2000, help="número de iterações/operações")
+    parser.add_argument("--seed", type=int, default=42, help="semente do gerador de dados sintéticos (suite)")
+    parser.add_argument("--escalas", default="pequena,media", help=f"escalas da suite, separadas por vírgula ({', '.join(ESCALAS)})")
+    parser.add_argument("--json", help="grava os resultados da suite neste arquivo JSON")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior da suite: aponta regressões")
+    parser.add_argument("--tolerancia", type=float, default=0.15, help="variação tolerada na comparação (0.15 = 15%%)")
+    args = parser.parse_args()
+    BENCHMARKS[args.nome](args)
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,168 @@
+"""Conciliação do ledger: confere contas.saldo contra fechamento + lançamentos e o pareamento das transferências (uso: python conciliacao.py --db ...)."""
+import argparse
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from main import DatabaseManager, Dinheiro, sql_em_centavos
+
+try: import numpy as np
+except ImportError: np = None # Opcional: sem NumPy só o motor 'python' está disponível
+
+# Colunas já reduzidas a inteiros pelo SQLite: conta, tipo (0 depósito, 1 saque, 2 enviada, 3 recebida), centavos, conta destino, depois do último fechamento (0/1).
+# {valor}/{saldo}: a coluna em centavos (BD em centavos) ou convertida dos reais (_em_centavos)
+SQL_LEDGER = """SELECT conta_id, CASE tipo WHEN 'deposito' THEN 0 WHEN 'saque' THEN 1 WHEN 'transferencia_enviada' THEN 2 ELSE 3 END,
+                       {valor}, COALESCE(conta_destino_id, 0), timestamp >= ? FROM transacoes WHERE id > ? AND id <= ?"""
+# Mesmas colunas para o motor NumPy, uma faixa de ids por linha: group_concat entrega cada coluna como texto que np.fromstring
+# converte em C (sem criar uma tupla Python por lançamento, que é o custo dominante de ler o ledger). Tipo + 4 * depois do fechamento.
+SQL_LEDGER_COLUNAS = """SELECT group_concat(conta_id), group_concat(CASE tipo WHEN 'deposito' THEN 0 WHEN 'saque' THEN 1 WHEN 'transferencia_enviada' THEN 2 ELSE 3 END + 4 * (timestamp >= ?)),
+                               group_concat({valor}), group_concat(COALESCE(conta_destino_id, 0)) FROM transacoes WHERE id > ? AND id <= ?"""
+SQL_CONTAS = """SELECT c.id, c.numero, {saldo},
+                       COALESCE((SELECT {saldo_fechamento} FROM fechamentos f WHERE f.conta_id = c.id ORDER BY f.periodo DESC LIMIT 1), 0) FROM contas c"""
+MAX_DIVERGENCIAS = 1000 # Relatório limitado (a contagem é total)
+
+def _em_centavos(expr: str, centavos: bool) -> str:
+    return expr if centavos else sql_em_centavos(expr)
+
+def _lotes_ledger(caminho: str, inicio_id: int, fim_id: int, limite: str, tamanho_lote: int, centavos: bool):
+    """Lê uma faixa de ids do ledger em lotes de tuplas (conexão própria, somente leitura: roda também em outro processo)."""
+    conn = sqlite3.connect(f"file:{caminho}?mode=ro", uri=True)
+    try:
+        cursor = conn.execute(SQL_LEDGER.format(valor=_em_centavos('valor', centavos)), (limite, inicio_id, fim_id))
+        while lote := cursor.fetchmany(tamanho_lote): yield lote
+    finally:
+        conn.close()
+
+def _colunas_ledger(caminho: str, inicio_id: int, fim_id: int, limite: str, tamanho_lote: int, centavos: bool):
+    """(NumPy) Lê a faixa em janelas de `tamanho_lote` ids e gera (conta, tipo, depois_do_fechamento, centavos, destino) como arrays."""
+    conn = sqlite3.connect(f"file:{caminho}?mode=ro", uri=True); q = SQL_LEDGER_COLUNAS.format(valor=_em_centavos('valor', centavos))
+    try:
+        for a in range(inicio_id, fim_id, tamanho_lote):
+            colunas = conn.execute(q, (limite, a, min(a + tamanho_lote, fim_id))).fetchone()
+            if colunas[0] is None: continue # Janela sem lançamentos (ids apagados)
+            conta, codigo, centavos, destino = (np.fromstring(coluna, dtype=np.int64, sep=',') for coluna in colunas)
+            yield conta, codigo & 3, codigo >> 2, centavos, destino
+    finally:
+        conn.close()
+
+def _agregar_python(lotes) -> tuple[dict, dict, int]:
+    """Saldo líquido em centavos por conta e transferências em aberto por par (origem, destino): {par: [quantidade, centavos]}."""
+    saldos: dict[int, int] = {}; pares: dict[tuple[int, int], list[int]] = {}; linhas = 0
+    for lote in lotes:
+        linhas += len(lote)
+        for conta, tipo, centavos, destino, apos in lote:
+            if apos: saldos[conta] = saldos.get(conta, 0) + (centavos if tipo == 0 or tipo == 3 else -centavos)
+            if tipo < 2: continue
+            par, sinal = ((conta, destino), 1) if tipo == 2 else ((destino, conta), -1) # Enviada soma, recebida desconta
+            aberto = pares.get(par)
+            if aberto is None: pares[par] = [sinal, sinal * centavos]
+            else:
+                aberto[0] += sinal; aberto[1] += sinal * centavos
+                if not aberto[0] and not aberto[1]: del pares[par] # Par fechado: a memória fica com as transferências em aberto
+    return saldos, pares, linhas
+
+def _pares(origem, destino):
+    """(NumPy) Chave do par como array estruturado (origem, destino): sem empacotar em 64 bits, vale para qualquer ID (fragmentos começam em 10**12)."""
+    pares = np.empty(len(origem), dtype=[('origem', np.int64), ('destino', np.int64)]); pares['origem'] = origem; pares['destino'] = destino; return pares
+
+def _reduzir(chaves, *colunas):
+    """(NumPy) Soma cada coluna por chave e descarta as chaves zeradas em todas; as chaves viram índices densos (unique), então o bincount não depende do tamanho dos IDs."""
+    chaves, inverso = np.unique(chaves, return_inverse=True); inverso = inverso.reshape(-1)
+    somas = [np.bincount(inverso, weights=coluna, minlength=len(chaves)) for coluna in colunas]
+    abertas = np.logical_or.reduce([soma != 0 for soma in somas]) if len(chaves) else np.zeros(0, dtype=bool)
+    return (chaves[abertas], *(soma[abertas] for soma in somas))
+
+def _agregar_numpy(lotes) -> tuple[dict, dict, int]:
+    """Mesmo resultado de _agregar_python, com group-by vetorizado (unique + bincount) por lote de colunas."""
+    contas = np.zeros(0, dtype=np.int64); saldos = quantidades = centavos_pares = np.zeros(0); pares = _pares(contas, contas); linhas = 0
+    for conta, tipo, apos, centavos, destino in lotes:
+        linhas += len(conta)
+        contas, saldos = _reduzir(np.concatenate((contas, conta)), np.concatenate((saldos, np.where((tipo == 0) | (tipo == 3), centavos, -centavos) * apos))) # float64: exato até 2**53 centavos
+        enviada = tipo == 2; recebida = tipo == 3 # Enviada soma no par (origem, destino), recebida desconta
+        pares, quantidades, centavos_pares = _reduzir(np.concatenate((pares, _pares(conta[enviada], destino[enviada]), _pares(destino[recebida], conta[recebida]))),
+                                                      np.concatenate((quantidades, np.ones(enviada.sum()), -np.ones(recebida.sum()))),
+                                                      np.concatenate((centavos_pares, centavos[enviada], -centavos[recebida])))
+    return (dict(zip(contas.tolist(), saldos.astype(np.int64).tolist())),
+            {par: [int(q), int(c)] for par, q, c in zip(pares.tolist(), quantidades.tolist(), centavos_pares.tolist())}, linhas)
+
+def _agregar_faixa(caminho: str, inicio_id: int, fim_id: int, limite: str, motor: str, tamanho_lote: int, centavos: bool) -> tuple[dict, dict, int]:
+    if motor == 'numpy': return _agregar_numpy(_colunas_ledger(caminho, inicio_id, fim_id, limite, tamanho_lote, centavos))
+    return _agregar_python(_lotes_ledger(caminho, inicio_id, fim_id, limite, tamanho_lote, centavos))
+
+class ConciliadorLedger:
+    """Recalcula cada saldo a partir do ledger e confere que toda transferencia_enviada tem a transferencia_recebida correspondente.
+
+    O ledger é lido em lotes de inteiros (valores em centavos: gravados assim ou arredondados pelo SQLite), então a soma é exata e a memória
+    fica limitada ao lote + uma entrada por conta + os pares de transferência ainda em aberto. motor='numpy' lê cada lote
+    em colunas e agrega com unique/bincount (IDs viram índices densos: servem os de qualquer fragmento); 'python' lê tuplas e agrega com dicts (referência e fallback sem NumPy). Com processos > 1
+    o ledger é dividido em faixas de id lidas em paralelo. Como nem tudo é lido no mesmo snapshot, as divergências são
+    reconferidas numa única consulta no fim (movimentos durante a leitura não viram falso positivo)."""
+    def __init__(self, db_manager: DatabaseManager, *, motor: str = 'auto', tamanho_lote: int = 200_000, processos: int = 1):
+        if motor == 'auto': motor = 'numpy' if np is not None else 'python'
+        if motor not in ('numpy', 'python'): raise ValueError(f"motor desconhecido: {motor}")
+        if motor == 'numpy' and np is None: raise ValueError("motor 'numpy' requer o pacote numpy (pip install numpy)")
+        self.db = db_manager; self.motor = motor; self.tamanho_lote = tamanho_lote; self.processos = max(1, processos)
+
+    def conciliar(self) -> dict:
+        """Relatório: {'motor', 'transacoes', 'contas', 'divergencias_saldo', 'transferencias_sem_par', 'segundos'} (listas limitadas a MAX_DIVERGENCIAS)."""
+        inicio = time.perf_counter(); limite = self.db.limite_fechamento() or '' # Antes do limite o saldo vem do fechamento
+        minimo, maximo = self.db.fetch_one("SELECT COALESCE(MIN(id), 1) - 1, COALESCE(MAX(id), 0) FROM transacoes")
+        passo = -(-(maximo - minimo) // self.processos) or 1
+        centavos = self.db.em_centavos
+        faixas = [(self.db.db_name, a, min(a + passo, maximo), limite, self.motor, self.tamanho_lote, centavos) for a in range(minimo, maximo, passo)] or [(self.db.db_name, 0, 0, limite, self.motor, self.tamanho_lote, centavos)]
+        if len(faixas) == 1: parciais = [_agregar_faixa(*faixas[0])]
+        else:
+            with ProcessPoolExecutor(max_workers=len(faixas)) as pool: parciais = list(pool.map(_agregar_faixa, *zip(*faixas)))
+        saldos, pares, linhas = parciais[0]
+        for outros_saldos, outros_pares, outras_linhas in parciais[1:]: # Junta as faixas (uma transferência pode ter ficado dividida entre duas)
+            linhas += outras_linhas
+            for conta, centavos in outros_saldos.items(): saldos[conta] = saldos.get(conta, 0) + centavos
+            for par, (quantidade, centavos) in outros_pares.items():
+                aberto = pares.setdefault(par, [0, 0]); aberto[0] += quantidade; aberto[1] += centavos
+                if not aberto[0] and not aberto[1]: del pares[par]
+        contas = self.db.fetch_all(SQL_CONTAS.format(saldo=self.db.sql_centavos('c.saldo'), saldo_fechamento=self.db.sql_centavos('f.saldo')))
+        suspeitas = [row['id'] for row in contas if row[2] != row[3] + saldos.get(row['id'], 0)]
+        return {'motor': self.motor, 'transacoes': linhas, 'contas': len(contas), 'divergencias_saldo': self._reconferir_saldos(suspeitas, limite),
+                'transferencias_sem_par': self._reconferir_pares(list(pares)), 'segundos': time.perf_counter() - inicio}
+
+    def _reconferir_saldos(self, conta_ids: list[int], limite: str) -> list[tuple[int, str, Dinheiro, Dinheiro]]:
+        """(conta_id, numero, saldo, esperado) das contas que continuam divergentes numa leitura única."""
+        divergencias = []; centavos = self.db.sql_centavos
+        for i in range(0, min(len(conta_ids), MAX_DIVERGENCIAS), 500):
+            fatia = conta_ids[i:i + 500]
+            q = f"""SELECT c.id, c.numero, {centavos('c.saldo')} AS saldo, COALESCE((SELECT {centavos('f.saldo')} FROM fechamentos f WHERE f.conta_id = c.id ORDER BY f.periodo DESC LIMIT 1), 0)
+                           + COALESCE((SELECT SUM(CASE WHEN tipo IN ('deposito', 'transferencia_recebida') THEN 1 ELSE -1 END * {centavos('valor')})
+                                       FROM transacoes t WHERE t.conta_id = c.id AND t.timestamp >= ?), 0) AS esperado
+                    FROM contas c WHERE c.id IN ({', '.join('?' * len(fatia))})"""
+            divergencias += [(row['id'], row['numero'], Dinheiro(row['saldo']), Dinheiro(row['esperado'])) for row in self.db.fetch_all(q, (limite, *fatia)) if row['saldo'] != row['esperado']]
+        return divergencias
+
+    def _reconferir_pares(self, pares: list[tuple[int, int]]) -> list[dict]:
+        """Pares (origem, destino) cujas enviadas e recebidas não batem em quantidade ou valor, relidos do BD."""
+        resultado = []; valor = self.db.sql_centavos('valor')
+        for origem, destino in pares[:MAX_DIVERGENCIAS]:
+            row = self.db.fetch_one(f"""SELECT SUM(tipo = 'transferencia_enviada') AS n_env, SUM(CASE WHEN tipo = 'transferencia_enviada' THEN {valor} ELSE 0 END) AS v_env,
+                                               SUM(tipo = 'transferencia_recebida') AS n_rec, SUM(CASE WHEN tipo = 'transferencia_recebida' THEN {valor} ELSE 0 END) AS v_rec
+                                       FROM transacoes WHERE (conta_id = ? AND conta_destino_id = ? AND tipo = 'transferencia_enviada')
+                                                          OR (conta_id = ? AND conta_destino_id = ? AND tipo = 'transferencia_recebida')""", (origem, destino, destino, origem))
+            if row is None or (row['n_env'] == row['n_rec'] and row['v_env'] == row['v_rec']): continue
+            resultado.append({'origem': origem, 'destino': destino, 'enviadas': row['n_env'] or 0, 'valor_enviado': Dinheiro(row['v_env'] or 0), 'recebidas': row['n_rec'] or 0, 'valor_recebido': Dinheiro(row['v_rec'] or 0)})
+        return resultado
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--db", default="banco_moderno_v6_ptbr.db", help="arquivo do banco de dados")
+    parser.add_argument("--motor", choices=("auto", "numpy", "python"), default="auto", help="agregação vetorizada (NumPy) ou em Python puro")
+    parser.add_argument("--processos", type=int, default=1, help="faixas do ledger lidas em paralelo")
+    parser.add_argument("--lote", type=int, default=200_000, help="linhas (ids) por lote (limita a memória)")
+    args = parser.parse_args()
+    with DatabaseManager(args.db, pool=True) as db:
+        r = ConciliadorLedger(db, motor=args.motor, tamanho_lote=args.lote, processos=args.processos).conciliar()
+    print(f"{r['transacoes']:,} lançamentos e {r['contas']:,} contas conciliados em {r['segundos']:.2f}s (motor {r['motor']})")
+    for conta_id, numero, saldo, esperado in r['divergencias_saldo']: print(f"Conta {numero} (id {conta_id}): saldo {saldo:.2f}, ledger {esperado:.2f} (diferença {saldo - esperado:+.2f})")
+    for p in r['transferencias_sem_par']: print(f"Transferências {p['origem']} -> {p['destino']}: {p['enviadas']} enviada(s) R$ {p['valor_enviado']:.2f}, {p['recebidas']} recebida(s) R$ {p['valor_recebido']:.2f}")
+    print(f"{len(r['divergencias_saldo'])} saldo(s) divergente(s), {len(r['transferencias_sem_par'])} par(es) de transferência sem correspondência.")
+    raise SystemExit(1 if r['divergencias_saldo'] or r['transferencias_sem_par'] else 0)
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,97 @@
+"""Exportação de extratos em CSV/JSONL (opcionalmente gzip) direto do cursor, em lotes e com memória constante (uso: python exportacao.py --db ... saida.csv)."""
+import argparse
+import csv
+import gzip
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from main import DatabaseManager, _texto_data
+
+COLUNAS = ('numero_conta', 'tipo', 'valor', 'timestamp', 'numero_conta_destino', 'id') # Mesmo formato aceito por importacao.py (que ignora 'id')
+SQL_EXPORTACAO = """SELECT co.numero AS numero_conta, t.tipo AS tipo, {valor} AS valor, t.timestamp AS timestamp, cd.numero AS numero_conta_destino, t.id AS id{chave}
+                     FROM {ledger} t JOIN main.contas co ON co.id = t.conta_id LEFT JOIN main.contas cd ON cd.id = t.conta_destino_id"""
+# Com períodos arquivados: arquivo e principal intercalados por merge (cada lado segue o próprio índice, sem ordenação temporária).
+# Os aliases explícitos são obrigatórios para o ORDER BY do UNION ALL; o NOT EXISTS ignora linhas ainda nos dois bancos (arquivamento interrompido).
+SQL_EXPORTACAO_ARQUIVO = "SELECT " + ", ".join(COLUNAS) + " FROM ({arquivo} AND NOT EXISTS (SELECT 1 FROM main.transacoes m WHERE m.id = t.id) UNION ALL {principal} ORDER BY conta_id, timestamp, id)"
+
+class ExportadorExtrato:
+    """Escreve lançamentos de uma conta, de um cliente ou do banco todo, ordenados por (conta, timestamp, id).
+
+    As linhas vêm do cursor em lotes de `tamanho_lote` (DatabaseManager.iterar_lotes) e vão direto para o arquivo, então
+    a memória não depende do tamanho do extrato. A ordem segue o índice idx_transacoes_conta_ts_id (sem ordenação temporária);
+    períodos arquivados entram pelo índice equivalente do banco de arquivo, intercalados com o principal."""
+    def __init__(self, db_manager: DatabaseManager, *, tamanho_lote: int = 5000, nivel_gzip: int = 6):
+        self.db = db_manager; self.tamanho_lote = tamanho_lote; self.nivel_gzip = nivel_gzip # 6: quase a compressão do 9, bem mais rápido
+
+    @staticmethod
+    def consulta(*, conta_id: int | None = None, cliente_id: int | None = None, inicio=None, fim=None, centavos: bool = False, arquivo: bool = False) -> tuple[str, list]:
+        """SQL e parâmetros da exportação ('inicio' inclusivo, 'fim' exclusivo; sem conta/cliente = banco todo; valor sempre em reais).
+
+        arquivo=True inclui o ledger do banco de arquivo (anexado como 'arquivo', ver DatabaseManager.iterar_lotes)."""
+        filtro = " WHERE 1"; params: list = []
+        if conta_id is not None: filtro += " AND t.conta_id = ?"; params.append(conta_id)
+        if cliente_id is not None: filtro += " AND t.conta_id IN (SELECT id FROM main.contas WHERE cliente_id = ?)"; params.append(cliente_id)
+        if inicio is not None: filtro += " AND t.timestamp >= ?"; params.append(_texto_data(inicio))
+        if fim is not None: filtro += " AND t.timestamp < ?"; params.append(_texto_data(fim))
+        valor = "t.valor / 100.0" if centavos else "t.valor"
+        if not arquivo: return SQL_EXPORTACAO.format(valor=valor, chave="", ledger="transacoes") + filtro + " ORDER BY t.conta_id, t.timestamp, t.id", params
+        braco = lambda ledger: SQL_EXPORTACAO.format(valor=valor, chave=", t.conta_id AS conta_id", ledger=ledger) + filtro
+        return SQL_EXPORTACAO_ARQUIVO.format(arquivo=braco("arquivo.transacoes"), principal=braco("main.transacoes")), params * 2
+
+    def exportar(self, destino: str, *, formato: str | None = None, numero_conta: str | None = None, cpf: str | None = None, inicio=None, fim=None, comprimir: bool | None = None) -> dict:
+        """Exporta para `destino`; formato e gzip são deduzidos da extensão (.csv/.jsonl[.gz]) se não informados."""
+        base = destino[:-3] if destino.endswith('.gz') else destino
+        comprimir = destino.endswith('.gz') if comprimir is None else comprimir
+        formato = formato or ('jsonl' if base.endswith(('.jsonl', '.json')) else 'csv')
+        if formato not in ('csv', 'jsonl'): raise ValueError(f"formato desconhecido: {formato}")
+        filtros = {'inicio': inicio, 'fim': fim}
+        if numero_conta is not None:
+            row = self.db.fetch_one("SELECT id FROM contas WHERE numero = ?", (numero_conta,))
+            if row is None: raise ValueError(f"conta {numero_conta} não existe")
+            filtros['conta_id'] = row['id']
+        if cpf is not None:
+            row = self.db.fetch_one("SELECT id FROM clientes WHERE cpf = ?", (cpf,))
+            if row is None: raise ValueError(f"cliente com CPF {cpf} não existe")
+            filtros['cliente_id'] = row['id']
+        arquivado = self.db.limite_arquivo() # Lançamentos antes dele só existem no banco de arquivo
+        arquivo = arquivado is not None and os.path.exists(self.db.arquivo) and (inicio is None or _texto_data(inicio) < arquivado)
+        q, params = self.consulta(**filtros, centavos=self.db.em_centavos, arquivo=arquivo); inicio_t = time.perf_counter(); linhas = 0
+        abrir = (lambda caminho: gzip.open(caminho, 'wt', compresslevel=self.nivel_gzip, encoding='utf-8', newline='')) if comprimir else (lambda caminho: open(caminho, 'w', encoding='utf-8', newline=''))
+        with abrir(destino) as arquivo:
+            lotes = self.db.iterar_lotes(q, params, tamanho_lote=self.tamanho_lote, tuplas=True, arquivo=arquivo)
+            if formato == 'csv':
+                escritor = csv.writer(arquivo); escritor.writerow(COLUNAS)
+                for lote in lotes: escritor.writerows(lote); linhas += len(lote)
+            else:
+                codificar = json.JSONEncoder(ensure_ascii=False).encode # Reaproveitado: json.dumps recria o encoder a cada chamada com opções
+                for lote in lotes: arquivo.write("".join(codificar(dict(zip(COLUNAS, linha))) + "\n" for linha in lote)); linhas += len(lote)
+        return {'arquivo': destino, 'linhas': linhas, 'bytes': os.path.getsize(destino), 'segundos': time.perf_counter() - inicio_t}
+
+    def exportar_contas(self, numeros, diretorio: str, *, formato: str = 'csv', comprimir: bool = False, inicio=None, fim=None, paralelismo: int = 4) -> list[dict]:
+        """Um arquivo por conta (<diretorio>/extrato_<numero>.<formato>[.gz]), exportados em paralelo (uma conexão por thread)."""
+        os.makedirs(diretorio, exist_ok=True); sufixo = f".{formato}" + (".gz" if comprimir else "")
+        def exportar_uma(numero):
+            return self.exportar(os.path.join(diretorio, f"extrato_{numero}{sufixo}"), formato=formato, numero_conta=str(numero), inicio=inicio, fim=fim, comprimir=comprimir)
+        with ThreadPoolExecutor(max_workers=paralelismo, thread_name_prefix="banco-export") as pool: return list(pool.map(exportar_uma, numeros))
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("destino", help="arquivo (.csv/.jsonl, + .gz para comprimir) ou diretório com --contas")
+    parser.add_argument("--db", default="banco_moderno_v6_ptbr.db", help="arquivo do banco de dados")
+    escopo = parser.add_mutually_exclusive_group()
+    escopo.add_argument("--conta", help="número da conta"); escopo.add_argument("--cpf", help="todas as contas do cliente")
+    escopo.add_argument("--contas", nargs="+", help="várias contas, um arquivo por conta no diretório destino (em paralelo)")
+    parser.add_argument("--inicio", help="data/hora inicial (inclusiva), ex.: 2024-01-01"); parser.add_argument("--fim", help="data/hora final (exclusiva)")
+    parser.add_argument("--formato", choices=("csv", "jsonl")); parser.add_argument("--gzip", action="store_true")
+    parser.add_argument("--paralelismo", type=int, default=4)
+    args = parser.parse_args()
+    with DatabaseManager(args.db, pool=True) as db:
+        exportador = ExportadorExtrato(db)
+        if args.contas: resultados = exportador.exportar_contas(args.contas, args.destino, formato=args.formato or 'csv', comprimir=args.gzip, inicio=args.inicio, fim=args.fim, paralelismo=args.paralelismo)
+        else: resultados = [exportador.exportar(args.destino, formato=args.formato, numero_conta=args.conta, cpf=args.cpf, inicio=args.inicio, fim=args.fim, comprimir=args.gzip or None)]
+    for r in resultados: print(f"{r['arquivo']}: {r['linhas']:,} linhas, {r['bytes'] / 1024 / 1024:.1f} MiB em {r['segundos']:.2f}s")
+
+if __name__ == "__main__":
+    main_cli()
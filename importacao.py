@@ -0,0 +1,177 @@
+"""Importação em massa de CSV (clientes, contas e histórico de transacoes) em lotes, com memória limitada (uso: python importacao.py --db ... --clientes ...)."""
+import argparse
+import csv
+import datetime
+import itertools
+import time
+
+from main import SQL_SALDO_ESPERADO, DatabaseManager, Dinheiro, cpf_formatado_valido, inicio_mes_seguinte, reservar_sequencia, sincronizar_sequencia_contas
+
+TIPOS_TRANSACAO = ('deposito', 'saque', 'transferencia_enviada', 'transferencia_recebida')
+MAX_ERROS_RELATORIO = 100 # Só as primeiras rejeições são guardadas (a contagem é total)
+MAX_PARAMETROS_IN = 900 # Abaixo do limite antigo de 999 variáveis do SQLite
+
+def _lotes(iteravel, tamanho: int):
+    """Fatia um iterável em listas de até `tamanho` itens sem materializar o resto."""
+    iterador = iter(iteravel)
+    while lote := list(itertools.islice(iterador, tamanho)): yield lote
+
+def _mapear(cursor, sql_base: str, chaves) -> dict:
+    """Executa `sql_base` (com um IN (...) no fim) em fatias e retorna {coluna 0: coluna 1}."""
+    chaves = list(chaves); resultado = {}
+    for i in range(0, len(chaves), MAX_PARAMETROS_IN):
+        fatia = chaves[i:i + MAX_PARAMETROS_IN]
+        resultado.update(cursor.execute(f"{sql_base} ({', '.join('?' * len(fatia))})", fatia).fetchall())
+    return resultado
+
+def _texto_timestamp(valor: str) -> str:
+    """Normaliza 'AAAA-MM-DD HH:MM:SS' / ISO 8601 / só a data para o formato gravado em transacoes.timestamp."""
+    valor = valor.strip()
+    ts = datetime.datetime.fromisoformat(valor) if len(valor) > 10 else datetime.datetime.strptime(valor, '%Y-%m-%d')
+    return ts.strftime('%Y-%m-%d %H:%M:%S')
+
+class ImportadorCSV:
+    """Lê CSVs em lotes e grava com executemany, uma transação por arquivo.
+
+    Formatos (cabeçalho obrigatório, colunas extras são ignoradas):
+      clientes:   nome, cpf, endereco, senha[, role]
+      contas:     cpf[, numero, agencia, tipo_conta, limite, limite_saques]  (numero vazio = próximo da sequência)
+      transacoes: numero_conta, tipo, valor, timestamp[, numero_conta_destino]  (uma linha = um lançamento do ledger)
+    A memória fica limitada ao tamanho do lote: a unicidade é conferida contra o BD (que já contém os lotes anteriores)."""
+    def __init__(self, db_manager: DatabaseManager, *, tamanho_lote: int = 10_000, adiar_indices: bool = True):
+        self.db = db_manager; self.tamanho_lote = tamanho_lote; self.adiar_indices = adiar_indices
+
+    def importar(self, *, clientes: str | None = None, contas: str | None = None, transacoes: str | None = None) -> dict:
+        """Importa os arquivos informados, nesta ordem, e retorna o relatório de cada um."""
+        relatorio = {}
+        if clientes: relatorio['clientes'] = self._executar(self._importar_clientes, clientes)
+        if contas: relatorio['contas'] = self._executar(self._importar_contas, contas); self.db.numeros_conta.descartar()
+        if transacoes: relatorio['transacoes'] = self._executar(self._importar_transacoes, transacoes)
+        self.db.cache_contas.limpar() # Saldos recalculados por fora dos objetos em cache
+        return relatorio
+
+    def _executar(self, etapa, caminho: str) -> dict:
+        """Roda uma etapa numa única transação (o arquivo é reaberto se a transação precisar ser repetida)."""
+        def transacao(cursor):
+            rel = {'arquivo': caminho, 'lidas': 0, 'importadas': 0, 'rejeitadas': 0, 'erros': []}
+            with open(caminho, newline='', encoding='utf-8-sig') as arquivo:
+                leitor = csv.DictReader(arquivo); etapa(cursor, leitor, rel)
+            return rel
+        inicio = time.perf_counter(); rel = self.db.executar_transacao(transacao)
+        rel['segundos'] = time.perf_counter() - inicio; rel['linhas_por_segundo'] = rel['lidas'] / rel['segundos'] if rel['segundos'] > 0 else 0.0
+        return rel
+
+    def _linhas(self, leitor: csv.DictReader, rel: dict):
+        """Gera (número da linha, dict) contando as lidas."""
+        for linha in leitor: rel['lidas'] += 1; yield leitor.line_num, linha
+
+    @staticmethod
+    def _rejeitar(rel: dict, num_linha: int, motivo: str):
+        rel['rejeitadas'] += 1
+        if len(rel['erros']) < MAX_ERROS_RELATORIO: rel['erros'].append((num_linha, motivo))
+
+    # --- Etapas ---
+
+    def _importar_clientes(self, cursor, leitor, rel):
+        for lote in _lotes(self._linhas(leitor, rel), self.tamanho_lote):
+            validos = []; cpfs_lote = set()
+            for num, r in lote:
+                nome, cpf, senha = (r.get('nome') or '').strip(), (r.get('cpf') or '').strip(), r.get('senha') or ''
+                role = (r.get('role') or 'user').strip()
+                if not nome or not senha: self._rejeitar(rel, num, "nome e senha obrigatórios"); continue
+                if not cpf_formatado_valido(cpf): self._rejeitar(rel, num, f"CPF com formato inválido: {cpf!r}"); continue
+                if role not in ('user', 'admin'): self._rejeitar(rel, num, f"role inválido: {role!r}"); continue
+                if cpf in cpfs_lote: self._rejeitar(rel, num, f"CPF repetido no arquivo: {cpf}"); continue
+                cpfs_lote.add(cpf); validos.append((num, (nome, cpf, (r.get('endereco') or '').strip(), senha, role)))
+            existentes = _mapear(cursor, "SELECT cpf, id FROM clientes WHERE cpf IN", cpfs_lote) # Inclui os lotes anteriores desta importação
+            linhas = []
+            for num, valores in validos:
+                if valores[1] in existentes: self._rejeitar(rel, num, f"CPF já cadastrado: {valores[1]}")
+                else: linhas.append(valores)
+            cursor.executemany("INSERT INTO clientes (nome, cpf, endereco, senha, role) VALUES (?, ?, ?, ?, ?)", linhas); rel['importadas'] += len(linhas)
+
+    def _importar_contas(self, cursor, leitor, rel):
+        for lote in _lotes(self._linhas(leitor, rel), self.tamanho_lote):
+            cpfs = {(r.get('cpf') or '').strip() for _, r in lote}
+            numeros = {(r.get('numero') or '').strip() for _, r in lote} - {''}
+            cliente_por_cpf = _mapear(cursor, "SELECT cpf, id FROM clientes WHERE cpf IN", cpfs)
+            numeros_usados = set(_mapear(cursor, "SELECT numero, id FROM contas WHERE numero IN", numeros))
+            validos = []; sem_numero = 0
+            for num, r in lote:
+                cpf = (r.get('cpf') or '').strip(); numero = (r.get('numero') or '').strip() or None
+                cliente_id = cliente_por_cpf.get(cpf)
+                if cliente_id is None: self._rejeitar(rel, num, f"cliente com CPF {cpf!r} não existe"); continue
+                if numero is not None:
+                    if not numero.isdigit(): self._rejeitar(rel, num, f"número de conta inválido: {numero!r}"); continue
+                    if numero in numeros_usados: self._rejeitar(rel, num, f"número de conta já existe: {numero}"); continue
+                    numeros_usados.add(numero)
+                else: sem_numero += 1
+                try:
+                    limite = self.db.para_bd(Dinheiro.parse(r['limite']) if r.get('limite') else 500) # "1.234,56" ou "1234.56", na unidade do BD
+                    limite_saques = int(r['limite_saques']) if r.get('limite_saques') else 3
+                except ValueError as e: self._rejeitar(rel, num, f"limite inválido: {e}"); continue
+                validos.append([numero, (r.get('agencia') or '0001').strip(), limite, limite_saques, (r.get('tipo_conta') or 'corrente').strip(), cliente_id])
+            if sem_numero: # Um único bloco da sequência para todas as contas sem número do lote
+                livres = iter(reservar_sequencia(cursor, sem_numero))
+                for valores in validos:
+                    if valores[0] is None: valores[0] = str(next(livres))
+            cursor.executemany("INSERT INTO contas (numero, agencia, limite, limite_saques, tipo_conta, cliente_id) VALUES (?, ?, ?, ?, ?, ?)", validos)
+            rel['importadas'] += len(validos)
+        sincronizar_sequencia_contas(cursor) # Números explícitos podem ter passado da sequência
+
+    def _importar_transacoes(self, cursor, leitor, rel):
+        indices = []
+        if self.adiar_indices: # Recriar o índice no fim (uma ordenação) custa menos que mantê-lo linha a linha
+            indices = cursor.execute("SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = 'transacoes' AND sql IS NOT NULL").fetchall()
+            for nome, _ in indices: cursor.execute(f'DROP INDEX "{nome}"')
+        fechado = cursor.execute("SELECT MAX(periodo) FROM periodos_fechados").fetchone()[0]
+        limite = inicio_mes_seguinte(fechado) if fechado else '' # Lançamentos antes disso mudariam fechamentos já gravados
+        cursor.execute("CREATE TEMP TABLE IF NOT EXISTS importacao_contas (conta_id INTEGER PRIMARY KEY)"); cursor.execute("DELETE FROM temp.importacao_contas")
+        for lote in _lotes(self._linhas(leitor, rel), self.tamanho_lote):
+            numeros = set()
+            for _, r in lote: numeros.add((r.get('numero_conta') or '').strip()); numeros.add((r.get('numero_conta_destino') or '').strip())
+            conta_por_numero = _mapear(cursor, "SELECT numero, id FROM contas WHERE numero IN", numeros - {''})
+            linhas = []
+            for num, r in lote:
+                conta_id = conta_por_numero.get((r.get('numero_conta') or '').strip()); tipo = (r.get('tipo') or '').strip()
+                destino = (r.get('numero_conta_destino') or '').strip(); destino_id = conta_por_numero.get(destino) if destino else None
+                if conta_id is None: self._rejeitar(rel, num, f"conta {r.get('numero_conta')!r} não existe"); continue
+                if tipo not in TIPOS_TRANSACAO: self._rejeitar(rel, num, f"tipo inválido: {tipo!r}"); continue
+                if destino and destino_id is None: self._rejeitar(rel, num, f"conta destino {destino!r} não existe"); continue
+                try: valor = Dinheiro.parse(r['valor']); timestamp = _texto_timestamp(r.get('timestamp') or '')
+                except (KeyError, ValueError) as e: self._rejeitar(rel, num, f"valor/timestamp inválido: {e}"); continue
+                if valor <= 0: self._rejeitar(rel, num, "valor deve ser positivo"); continue
+                if timestamp < limite: self._rejeitar(rel, num, f"período já fechado: {timestamp[:7]}"); continue
+                linhas.append((conta_id, tipo, self.db.para_bd(valor), timestamp, destino_id))
+            cursor.executemany("INSERT INTO transacoes (conta_id, tipo, valor, timestamp, conta_destino_id) VALUES (?, ?, ?, ?, ?)", linhas)
+            cursor.executemany("INSERT OR IGNORE INTO temp.importacao_contas (conta_id) VALUES (?)", {(linha[0],) for linha in linhas})
+            rel['importadas'] += len(linhas)
+        for _, sql in indices: cursor.execute(sql)
+        # Saldo = último fechamento + ledger posterior e contadores de saques recalculados só para as contas que receberam lançamentos
+        cursor.execute(f"UPDATE contas SET saldo = {SQL_SALDO_ESPERADO} WHERE id IN (SELECT conta_id FROM temp.importacao_contas)", (limite,))
+        cursor.execute("DELETE FROM saques_diarios WHERE conta_id IN (SELECT conta_id FROM temp.importacao_contas)")
+        cursor.execute("""INSERT INTO saques_diarios (conta_id, dia, total)
+                          SELECT conta_id, DATE(timestamp, 'localtime') AS dia, COUNT(*) FROM transacoes
+                          WHERE tipo IN ('saque', 'transferencia_enviada') AND conta_id IN (SELECT conta_id FROM temp.importacao_contas) GROUP BY conta_id, dia""")
+        rel['contas_recalculadas'] = cursor.execute("SELECT COUNT(*) FROM temp.importacao_contas").fetchone()[0]
+        cursor.execute("DROP TABLE temp.importacao_contas")
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--db", default="banco_moderno_v6_ptbr.db", help="arquivo do banco de dados")
+    parser.add_argument("--clientes"); parser.add_argument("--contas"); parser.add_argument("--transacoes")
+    parser.add_argument("--lote", type=int, default=10_000, help="linhas por lote (limita a memória)")
+    parser.add_argument("--sem-adiar-indices", action="store_true", help="mantém os índices de transacoes durante a carga")
+    args = parser.parse_args()
+    if not (args.clientes or args.contas or args.transacoes): parser.error("informe ao menos um de --clientes, --contas, --transacoes")
+    with DatabaseManager(args.db, pool=True) as db:
+        relatorio = ImportadorCSV(db, tamanho_lote=args.lote, adiar_indices=not args.sem_adiar_indices).importar(clientes=args.clientes, contas=args.contas, transacoes=args.transacoes)
+    falhou = False
+    for etapa, rel in relatorio.items():
+        print(f"{etapa}: {rel['importadas']:,} importadas, {rel['rejeitadas']:,} rejeitadas de {rel['lidas']:,} em {rel['segundos']:.2f}s ({rel['linhas_por_segundo']:,.0f} linhas/s)")
+        for num_linha, motivo in rel['erros'][:10]: print(f"    linha {num_linha}: {motivo}")
+        falhou = falhou or rel['rejeitadas'] > 0
+    raise SystemExit(1 if falhou else 0)
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,663 @@
+"""Interface gráfica (customtkinter): tela de login e janela principal. Importada só quando uma janela é aberta, então o uso sem interface (CLI, servidor, importação/exportação) não carrega o Tk."""
+import tkinter as tk
+from tkinter import messagebox
+import customtkinter
+import datetime
+import logging
+import queue
+import sqlite3
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from main import Cliente, Conta, ContaCorrente, DatabaseManager, Dinheiro, ExtratoRenderizado, FeedAlteracoes, MovimentoRecusado, cpf_formatado_valido
+from relatorios import RelatoriosAdmin
+
+log = logging.getLogger(__name__) # Configurado por quem inicia a aplicação (main.py)
+
+def _erro_no_callback(janela, tipo, erro, rastro):
+    """report_callback_exception das janelas: exceção num callback do Tk vai para o log e aparece ao usuário (ex.: BD inacessível)."""
+    log.error("Erro na interface: %s", erro, exc_info=(tipo, erro, rastro))
+    if isinstance(erro, sqlite3.Error): messagebox.showerror("Erro Crítico de BD", f"Não foi possível acessar o banco de dados:\n{erro}", parent=janela)
+    else: messagebox.showerror("Erro", f"Falha inesperada: {erro}", parent=janela)
+
+# --- PARTE 2: Tela de Login ---
+
+class LoginWindow(customtkinter.CTk):
+    """Janela de login inicial da aplicação."""
+    report_callback_exception = _erro_no_callback
+    def __init__(self, db_manager: DatabaseManager | Future):
+        """db_manager pode ser um Future (BD abrindo numa thread): a janela aparece logo e o login é liberado quando o BD fica pronto."""
+        super().__init__(); self.db = None if isinstance(db_manager, Future) else db_manager; self.title("Login - Banco Moderno"); self.geometry("400x350"); self.resizable(False, False); self.grid_columnconfigure(0, weight=1)
+        self.lbl_title = customtkinter.CTkLabel(self, text="Acesso ao Sistema", font=customtkinter.CTkFont(size=20, weight="bold")); self.lbl_title.grid(row=0, column=0, padx=20, pady=(30, 15))
+        self.lbl_cpf = customtkinter.CTkLabel(self, text="CPF (xxx.xxx.xxx-xx):"); self.lbl_cpf.grid(row=1, column=0, padx=50, pady=(10, 0), sticky="w")
+        self.entry_cpf = customtkinter.CTkEntry(self, width=300); self.entry_cpf.grid(row=2, column=0, padx=50, pady=(0, 10), sticky="ew")
+        self.lbl_senha = customtkinter.CTkLabel(self, text="Senha:"); self.lbl_senha.grid(row=3, column=0, padx=50, pady=(10, 0), sticky="w")
+        self.entry_senha = customtkinter.CTkEntry(self, width=300, show="*"); self.entry_senha.grid(row=4, column=0, padx=50, pady=(0, 15), sticky="ew")
+        self.btn_login = customtkinter.CTkButton(self, text="Login", command=self.attempt_login, width=300); self.btn_login.grid(row=5, column=0, padx=50, pady=10)
+        self.lbl_error = customtkinter.CTkLabel(self, text="", text_color="red"); self.lbl_error.grid(row=6, column=0, padx=50, pady=(5, 10))
+        self.entry_cpf.focus(); self.entry_senha.bind("<Return>", self.attempt_login); self.btn_login.bind("<Return>", self.attempt_login)
+        if self.db is None: self.btn_login.configure(text="Abrindo banco de dados...", state="disabled"); self._aguardar_db(db_manager)
+
+    def _aguardar_db(self, futuro: Future):
+        """Consulta o Future do BD pelo loop do Tk; pronto, libera o login e mostra os avisos da inicialização (ex.: ADMIN criado)."""
+        if not futuro.done(): self.after(20, self._aguardar_db, futuro); return
+        try: self.db = futuro.result()
+        except Exception as e:
+            log.error("Erro ao abrir o BD: %s", e, exc_info=e); self.btn_login.configure(text="Login"); self.show_error(f"Erro ao abrir o BD: {e}")
+            messagebox.showerror("Erro Crítico de BD", f"Não foi possível conectar ao banco de dados:\n{e}", parent=self); return
+        self.btn_login.configure(text="Login", state="normal")
+        for titulo, texto in self.db.avisos: messagebox.showinfo(titulo, texto, parent=self)
+
+    def attempt_login(self, event=None):
+        """Tenta autenticar o usuário."""
+        if self.db is None: return # BD ainda abrindo (Enter antes do botão ser liberado)
+        cpf = self.entry_cpf.get().strip(); senha = self.entry_senha.get()
+        if not cpf or not senha: self.show_error("CPF e Senha obrigatórios."); return
+        cliente_logando = Cliente.find_by_cpf(self.db, cpf) # Usa método corrigido
+        if cliente_logando and cliente_logando.check_password(senha):
+            log.info("Login OK: %s", cliente_logando); self.destroy(); main_app = BancoGUI(self.db, cliente_logando, cliente_logando.role); main_app.mainloop()
+        else: self.show_error("CPF ou Senha inválidos."); self.entry_senha.delete(0, tk.END)
+
+    def show_error(self, message):
+        """Exibe mensagem de erro no login."""
+        self.lbl_error.configure(text=message)
+
+# --- PARTE 3: Interface Gráfica Principal (Traduzida e com Transferência) ---
+
+class ExecutorUI:
+    """Roda trabalho de BD em threads e entrega os resultados no loop do Tk (via after); envios por chave substituem os anteriores."""
+    def __init__(self, widget, *, max_workers: int = 2, intervalo_ms: int = 15, ao_erro=None):
+        self.widget = widget; self.intervalo_ms = intervalo_ms # widget: qualquer objeto com after/after_cancel (o Tk não é thread-safe)
+        self.ao_erro = ao_erro # ao_erro(chave, erro), no loop do Tk: falhas sem ao_falhar e exceções nos callbacks (sempre registradas no log)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="banco-ui")
+        self._resultados: queue.SimpleQueue = queue.SimpleQueue() # Preenchida pelas threads, esvaziada só no loop do Tk
+        self._ativos: dict = {} # chave -> (geração, Future) do envio mais recente ainda não entregue
+        self._geracao = 0; self._poll = None; self._fechado = False
+
+    def enviar(self, chave, funcao, *args, ao_concluir=None, ao_falhar=None) -> Future | None:
+        """Executa funcao(*args) numa thread; ao_concluir(resultado) ou ao_falhar(erro) rodam depois no loop do Tk.
+
+        Um novo envio com a mesma chave torna o anterior obsoleto: se ainda estiver na fila nem chega a rodar, e se já
+        estiver rodando a resposta é descartada (ex.: página do extrato de uma conta que deixou de estar selecionada)."""
+        if self._fechado: return None
+        self.cancelar(chave); self._geracao += 1; geracao = self._geracao
+        futuro = self._pool.submit(funcao, *args); self._ativos[chave] = (geracao, futuro)
+        futuro.add_done_callback(lambda f: self._resultados.put((chave, geracao, f, ao_concluir, ao_falhar)))
+        if self._poll is None: self._poll = self.widget.after(self.intervalo_ms, self._entregar)
+        return futuro
+
+    def cancelar(self, chave):
+        """Descarta o envio pendente da chave (cancela se ainda não começou)."""
+        ativo = self._ativos.pop(chave, None)
+        if ativo is not None: ativo[1].cancel()
+
+    def ocupado(self, chave) -> bool:
+        """True enquanto houver envio da chave aguardando entrega."""
+        return chave in self._ativos
+
+    def _entregar(self):
+        """(Loop do Tk) Repassa os resultados prontos aos callbacks e volta a verificar enquanto houver trabalho em voo."""
+        self._poll = None
+        while True:
+            try: chave, geracao, futuro, ao_concluir, ao_falhar = self._resultados.get_nowait()
+            except queue.Empty: break
+            if futuro.cancelled() or self._ativos.get(chave, (None,))[0] != geracao: continue # Obsoleto
+            del self._ativos[chave]; erro = futuro.exception()
+            try:
+                if erro is None:
+                    if ao_concluir is not None: ao_concluir(futuro.result())
+                elif ao_falhar is not None: ao_falhar(erro)
+                else: self._falha(chave, erro, "Erro em segundo plano")
+            except Exception as e: self._falha(chave, e, "Erro no callback")
+        if self._ativos and not self._fechado: self._poll = self.widget.after(self.intervalo_ms, self._entregar)
+
+    def _falha(self, chave, erro: BaseException, contexto: str):
+        log.error("%s (%s): %s", contexto, chave, erro, exc_info=erro)
+        if self.ao_erro is None: return
+        try: self.ao_erro(chave, erro)
+        except Exception: log.exception("Erro ao avisar a falha de %s", chave) # Não interrompe a entrega dos demais resultados
+
+    def fechar(self):
+        """Cancela o que está na fila e espera a operação em curso (as conexões do BD são fechadas depois)."""
+        self._fechado = True; self._ativos.clear()
+        if self._poll is not None:
+            try: self.widget.after_cancel(self._poll)
+            except Exception: pass
+            self._poll = None
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+class BancoGUI(customtkinter.CTk):
+    """Interface gráfica principal, adaptada para login, papel e transferência."""
+    report_callback_exception = _erro_no_callback
+    LINHAS_SELETOR = 6 # Linhas visíveis (widgets reaproveitados) no seletor de contas do admin
+    TAMANHO_PAGINA_EXTRATO = 200 # Linhas do histórico carregadas por vez no extrato
+    INTERVALO_ALTERACOES_MS = 1000 # Verificação do feed de alterações (sem gravação nova: um PRAGMA data_version)
+    SQL_CONTAS_CLIENTE = "SELECT co.id, co.numero, cl.nome FROM contas co JOIN clientes cl ON co.cliente_id = cl.id WHERE co.cliente_id = ? ORDER BY co.numero ASC"
+    def __init__(self, db_manager: DatabaseManager, logged_in_cliente: Cliente, user_role: str):
+        super().__init__(); self.db = db_manager; self.logged_in_cliente = logged_in_cliente; self.user_role = user_role
+        self.conta_selecionada: Conta | None = None; self.map_display_to_conta_id: dict[str, int] = {}
+        self._extrato: ExtratoRenderizado | None = None; self._extrato_geracao = None; self._extrato_exibidas = 0; self._extrato_completo = False; self._extrato_poll = None # Extrato na caixa (geração e linhas já exibidas)
+        self.executor = ExecutorUI(self, ao_erro=self._mostrar_erro_segundo_plano); self._textos_ocupados: dict = {} # Trabalho de BD fora do loop do Tk; widget -> texto original
+        self.feed = FeedAlteracoes(self.db); self._alteracoes_after = None; self._alteracoes_pendente = False # Mudanças feitas por outras janelas/processos (e pelas operações desta)
+
+        # Config Janela e Aparência
+        customtkinter.set_appearance_mode("System"); customtkinter.set_default_color_theme("blue")
+        self.title(f"Banco App - [{user_role.upper()}] {logged_in_cliente.nome}") # Título com nome e papel
+        self.geometry("800x850")
+
+        # Layout Principal
+        self.grid_columnconfigure(0, weight=1); self.grid_rowconfigure(3, weight=1); self.grid_rowconfigure(4, weight=0)
+
+        # --- Frame Superior ---
+        top_frame = customtkinter.CTkFrame(self, fg_color="transparent"); top_frame.grid(row=0, column=0, padx=20, pady=(10, 5), sticky="ew"); top_frame.grid_columnconfigure(1, weight=1)
+        self.title_label = customtkinter.CTkLabel(top_frame, text="Bem-vindo(a)!", font=customtkinter.CTkFont(size=20, weight="bold")); self.title_label.grid(row=0, column=0, padx=10, pady=5, sticky="w")
+        self.account_options = ["Carregando..."]; self.selected_account_var = customtkinter.StringVar(value=self.account_options[0])
+        if self.user_role == 'admin': self._criar_seletor_admin(top_frame) # Busca paginada (pode haver dezenas de milhares de contas)
+        else: self.account_dropdown = customtkinter.CTkOptionMenu(top_frame, variable=self.selected_account_var, command=self.selecionar_conta_pelo_dropdown, width=250, state="disabled"); self.account_dropdown.grid(row=0, column=1, padx=10, pady=5, sticky="ew")
+        self.theme_switch = customtkinter.CTkSwitch(top_frame, text="Modo Escuro", command=self.toggle_theme); self.theme_switch.grid(row=0, column=2, padx=10, pady=5, sticky="e")
+        if customtkinter.get_appearance_mode() == "Dark": self.theme_switch.select()
+
+        # --- Frame Botões Gerenciamento ---
+        self.mgmt_button_frame = customtkinter.CTkFrame(self, fg_color="transparent"); self.mgmt_button_frame.grid(row=1, column=0, padx=20, pady=5, sticky="ew"); self.mgmt_button_frame.grid_columnconfigure((0, 1, 2, 3), weight=1)
+        self.btn_encerrar_conta = customtkinter.CTkButton(self.mgmt_button_frame, text="Encerrar Conta Sel.", command=self.encerrar_conta_selecionada, fg_color="#E57373", hover_color="#EF5350"); self.btn_encerrar_conta.grid(row=0, column=0, padx=5, pady=5, sticky="ew")
+        if self.user_role == 'admin': # Botões exclusivos do Admin
+            self.btn_add_conta = customtkinter.CTkButton(self.mgmt_button_frame, text="Add Conta p/ Cliente", command=self.adicionar_nova_conta_para_cliente); self.btn_add_conta.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
+            self.btn_cadastrar_cliente = customtkinter.CTkButton(self.mgmt_button_frame, text="Cadastrar Cliente", command=self.abrir_janela_cadastro); self.btn_cadastrar_cliente.grid(row=0, column=2, padx=5, pady=5, sticky="ew")
+            self.btn_excluir_cliente = customtkinter.CTkButton(self.mgmt_button_frame, text="Excluir Cliente Sel.", command=self.excluir_cliente_selecionado, fg_color="#D32F2F", hover_color="#B71C1C"); self.btn_excluir_cliente.grid(row=0, column=3, padx=5, pady=5, sticky="ew")
+            if self.db.metricas is not None: self.btn_estatisticas = customtkinter.CTkButton(self.mgmt_button_frame, text="Estatísticas BD", command=self.abrir_painel_estatisticas, fg_color="grey", hover_color="#555555"); self.btn_estatisticas.grid(row=1, column=0, columnspan=2, padx=5, pady=(0, 5), sticky="ew")
+            self.btn_relatorios = customtkinter.CTkButton(self.mgmt_button_frame, text="Relatórios", command=self.abrir_painel_relatorios, fg_color="grey", hover_color="#555555"); self.btn_relatorios.grid(row=1, column=2 if self.db.metricas is not None else 0, columnspan=2 if self.db.metricas is not None else 4, padx=5, pady=(0, 5), sticky="ew")
+        else: self.mgmt_button_frame.grid_columnconfigure(0, weight=4) # Botão de encerrar ocupa mais espaço
+
+        # --- Frame Principal Conteúdo ---
+        main_content_frame = customtkinter.CTkFrame(self, corner_radius=10); main_content_frame.grid(row=2, column=0, padx=20, pady=(0, 10), sticky="nsew"); main_content_frame.grid_columnconfigure(0, weight=1); main_content_frame.grid_rowconfigure(3, weight=1)
+        # Seção Informações
+        info_frame = customtkinter.CTkFrame(main_content_frame); info_frame.grid(row=0, column=0, padx=15, pady=15, sticky="ew"); info_frame.grid_columnconfigure(1, weight=1)
+        self.lbl_cliente = customtkinter.CTkLabel(info_frame, text="Cliente: -", anchor="w"); self.lbl_cliente.grid(row=0, column=0, columnspan=2, padx=10, pady=(10, 5), sticky="ew")
+        self.lbl_conta = customtkinter.CTkLabel(info_frame, text="Conta: -", anchor="w"); self.lbl_conta.grid(row=1, column=0, columnspan=2, padx=10, pady=5, sticky="ew")
+        self.lbl_saldo_texto = customtkinter.CTkLabel(info_frame, text="Saldo Atual:", font=customtkinter.CTkFont(size=14, weight="bold"), anchor="w"); self.lbl_saldo_texto.grid(row=2, column=0, padx=10, pady=(10, 10), sticky="w")
+        self.lbl_saldo_valor = customtkinter.CTkLabel(info_frame, text="R$ -", font=customtkinter.CTkFont(size=16, weight="bold"), anchor="e"); self.lbl_saldo_valor.grid(row=2, column=1, padx=10, pady=(10, 10), sticky="e")
+        # Seção Operações (Depósito/Saque)
+        self.actions_frame = customtkinter.CTkFrame(main_content_frame); self.actions_frame.grid(row=1, column=0, padx=15, pady=5, sticky="ew"); self.actions_frame.grid_columnconfigure((1, 2, 3), weight=1)
+        valor_label = customtkinter.CTkLabel(self.actions_frame, text="Valor Op:"); valor_label.grid(row=0, column=0, padx=(10, 0), pady=5, sticky="w")
+        self.entry_valor = customtkinter.CTkEntry(self.actions_frame, placeholder_text="0.00", width=140); self.entry_valor.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
+        self.btn_depositar = customtkinter.CTkButton(self.actions_frame, text="Depositar", command=self.realizar_deposito); self.btn_depositar.grid(row=0, column=2, padx=5, pady=5, sticky="ew")
+        self.btn_sacar = customtkinter.CTkButton(self.actions_frame, text="Sacar", command=self.realizar_saque, fg_color="#E53935", hover_color="#C62828"); self.btn_sacar.grid(row=0, column=3, padx=5, pady=5, sticky="ew")
+        # Seção Transferência
+        self.transfer_frame = customtkinter.CTkFrame(main_content_frame); self.transfer_frame.grid(row=2, column=0, padx=15, pady=5, sticky="ew"); self.transfer_frame.grid_columnconfigure(1, weight=1); self.transfer_frame.grid_columnconfigure(3, weight=1); self.transfer_frame.grid_columnconfigure(4, weight=1)
+        lbl_conta_dest = customtkinter.CTkLabel(self.transfer_frame, text="Conta Destino:"); lbl_conta_dest.grid(row=0, column=0, padx=(10,0), pady=5, sticky="w")
+        self.entry_conta_destino = customtkinter.CTkEntry(self.transfer_frame, placeholder_text="Número", width=100); self.entry_conta_destino.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
+        lbl_valor_transf = customtkinter.CTkLabel(self.transfer_frame, text="Valor Transf:"); lbl_valor_transf.grid(row=0, column=2, padx=(10,0), pady=5, sticky="w")
+        self.entry_valor_transferencia = customtkinter.CTkEntry(self.transfer_frame, placeholder_text="0.00", width=100); self.entry_valor_transferencia.grid(row=0, column=3, padx=5, pady=5, sticky="ew")
+        self.btn_transferir = customtkinter.CTkButton(self.transfer_frame, text="Transferir", command=self.realizar_transferencia, fg_color="#0B5ED7", hover_color="#0A58CA"); self.btn_transferir.grid(row=0, column=4, padx=(5,10), pady=5, sticky="ew")
+        # Seção Extrato
+        self.extrato_frame = customtkinter.CTkFrame(main_content_frame); self.extrato_frame.grid(row=3, column=0, padx=15, pady=10, sticky="nsew"); self.extrato_frame.grid_rowconfigure(0, weight=1); self.extrato_frame.grid_columnconfigure(0, weight=1)
+        self.txt_extrato = customtkinter.CTkTextbox(self.extrato_frame, wrap=tk.WORD, font=("Courier New", 11), corner_radius=8, border_width=1); self.txt_extrato.grid(row=0, column=0, padx=10, pady=(10, 5), sticky="nsew"); self.txt_extrato.configure(state="disabled")
+        self.btn_atualizar_extrato = customtkinter.CTkButton(main_content_frame, text="Atualizar Extrato", command=lambda: self.mostrar_extrato(self._extrato_completo, recarregar=True), fg_color="grey", hover_color="#555555"); self.btn_atualizar_extrato.grid(row=4, column=0, padx=15, pady=(5, 0), sticky="ew")
+        self.btn_historico_completo = customtkinter.CTkButton(main_content_frame, text="Histórico Completo", command=lambda: self.mostrar_extrato(completo=True), fg_color="grey", hover_color="#555555"); self.btn_historico_completo.grid(row=5, column=0, padx=15, pady=(5, 10), sticky="ew")
+
+        # --- Rodapé ---
+        footer_label = customtkinter.CTkLabel(self, text="Artur Kuzma Marques fez isso :)", font=customtkinter.CTkFont(size=10), text_color="gray"); footer_label.grid(row=4, column=0, padx=20, pady=(5, 10), sticky="s")
+
+        # --- Inicialização da Interface ---
+        self.after(100, self.carregar_e_atualizar_contas_iniciais) # Carrega dados após janela aparecer
+        self._alteracoes_after = self.after(self.INTERVALO_ALTERACOES_MS, self._verificar_alteracoes)
+
+    # --- Funções de Gerenciamento e Callbacks (comentários traduzidos) ---
+
+    def carregar_e_atualizar_contas_iniciais(self):
+        """Carrega contas do BD (filtradas por papel) e atualiza dropdown."""
+        log.debug("Carregando contas iniciais do BD..."); self.atualizar_dropdown_contas(self._selecionar_conta_inicial)
+
+    def _selecionar_conta_inicial(self):
+        if self.user_role == 'admin': return # O seletor já escolheu a primeira conta da página
+        if self.account_options and "Nenhuma conta" not in self.account_options[0] and "Você não possui contas" not in self.account_options[0]:
+            self.selected_account_var.set(self.account_options[0]); self.selecionar_conta_pelo_dropdown(self.account_options[0])
+        else: self.atualizar_info_display()
+
+    def atualizar_dropdown_contas(self, ao_concluir=None):
+        """Busca contas no BD em segundo plano (filtrando por user se não for admin) e atualiza; ao_concluir() roda depois."""
+        log.debug("Atualizando dropdown (papel: %s)...", self.user_role)
+        if self.user_role=='admin': # Recarrega só a página visível do seletor
+            def selecionar_primeira(linhas):
+                if (self.conta_selecionada is None or not self.conta_selecionada.id) and linhas: self.conta_selecionada = ContaCorrente.obter(self.db, linhas[0]['id'])
+                self._seletor_destacar(); self.atualizar_info_display()
+                if ao_concluir: ao_concluir()
+            self._seletor_carregar_pagina(selecionar_primeira); return
+        if self.user_role=='user' and self.logged_in_cliente and self.logged_in_cliente.id:
+            self.account_dropdown.configure(state="disabled"); self.selected_account_var.set("Carregando...")
+            self.executor.enviar('contas', self.db.fetch_all, self.SQL_CONTAS_CLIENTE, (self.logged_in_cliente.id,), ao_concluir=lambda contas_db: self._aplicar_contas_usuario(contas_db, ao_concluir))
+        else: log.error("Papel/login inválido: %s", self.user_role); self._aplicar_contas_usuario([], ao_concluir)
+
+    def _aplicar_contas_usuario(self, contas_db, ao_concluir=None):
+        """(Loop do Tk) Preenche o dropdown com as contas carregadas e mantém/escolhe a seleção."""
+        self.map_display_to_conta_id.clear(); self.account_options = []
+        if not contas_db:
+            if self.user_role=='user': self.account_options=["Você não possui contas"]
+            else: self.account_options=["Nenhuma conta cadastrada"]
+            self.conta_selecionada=None; self.selected_account_var.set(self.account_options[0]); self.account_dropdown.configure(values=self.account_options, state="disabled")
+        else:
+            for r in contas_db: self.account_options.append(f"{r['nome']} (Conta {r['numero']})"); self.map_display_to_conta_id[self.account_options[-1]]=r['id']
+            self.account_dropdown.configure(values=self.account_options, state="normal")
+            c_id_ant=self.conta_selecionada.id if self.conta_selecionada else None; sel_enc=False
+            if c_id_ant is not None:
+                for disp, c_id in self.map_display_to_conta_id.items():
+                    if c_id == c_id_ant: self.selected_account_var.set(disp); sel_enc=True; break
+            if not sel_enc:
+                prim_op=self.account_options[0]; self.selected_account_var.set(prim_op)
+                c_id_prim=self.map_display_to_conta_id.get(prim_op)
+                if c_id_prim: self.conta_selecionada = ContaCorrente.obter(self.db, c_id_prim)
+                else: self.conta_selecionada = None
+        self.atualizar_info_display() # Atualiza UI com base na nova lista/seleção
+        if ao_concluir: ao_concluir()
+
+    def selecionar_conta_pelo_dropdown(self, selection_string: str):
+        """Callback quando uma conta é selecionada no dropdown."""
+        log.debug("Dropdown selecionado: %s", selection_string)
+        if "Nenhuma conta" in selection_string or "Você não possui contas" in selection_string: self.conta_selecionada = None; self.atualizar_info_display(); return
+        conta_id = self.map_display_to_conta_id.get(selection_string)
+        if conta_id: self.selecionar_conta_por_id(conta_id)
+        else: messagebox.showerror("Erro Interno", f"ID não encontrado: {selection_string}"); self.conta_selecionada = None; self.atualizar_info_display()
+
+    def selecionar_conta_por_id(self, conta_id: int):
+        """Seleciona a conta pelo ID (dropdown do usuário ou seletor do admin), verificando a permissão."""
+        temp_conta = ContaCorrente.obter(self.db, conta_id)
+        if not temp_conta: messagebox.showerror("Erro", f"Falha ao carregar conta ID {conta_id}."); self.conta_selecionada = None
+        elif self.user_role=='admin' or (temp_conta.cliente and temp_conta.cliente.id == self.logged_in_cliente.id): self.conta_selecionada = temp_conta # Seleção válida
+        else: messagebox.showerror("Acesso Negado", "Permissão negada."); self.conta_selecionada = None # Impede seleção de conta de outro user
+        if self.user_role == 'admin': self._seletor_destacar()
+        else:
+            for disp, c_id in self.map_display_to_conta_id.items():
+                if self.conta_selecionada and c_id == self.conta_selecionada.id: self.selected_account_var.set(disp); break
+        self.atualizar_info_display() # Atualiza UI com a nova seleção
+
+    # --- Seletor de contas do admin (busca por prefixo, paginada) ---
+
+    def _criar_seletor_admin(self, parent):
+        """Cria a busca + lista com LINHAS_SELETOR botões reaproveitados entre páginas/buscas."""
+        self.entry_busca_conta = customtkinter.CTkEntry(parent, placeholder_text="Buscar: nome, CPF ou nº da conta", width=250); self.entry_busca_conta.grid(row=0, column=1, padx=10, pady=5, sticky="ew")
+        self.entry_busca_conta.bind("<KeyRelease>", self._seletor_agendar_busca)
+        self.seletor_frame = customtkinter.CTkFrame(parent); self.seletor_frame.grid(row=1, column=0, columnspan=3, padx=10, pady=(0, 5), sticky="ew"); self.seletor_frame.grid_columnconfigure(1, weight=1)
+        self.seletor_botoes = []
+        for i in range(self.LINHAS_SELETOR):
+            botao = customtkinter.CTkButton(self.seletor_frame, text="", anchor="w", height=24, fg_color="transparent", text_color=("gray10", "gray90"), state="disabled", command=lambda i=i: self._seletor_clicar(i))
+            botao.grid(row=i, column=0, columnspan=3, padx=5, pady=1, sticky="ew"); self.seletor_botoes.append(botao)
+        self.btn_seletor_anterior = customtkinter.CTkButton(self.seletor_frame, text="◀", width=40, command=self._seletor_pagina_anterior); self.btn_seletor_anterior.grid(row=self.LINHAS_SELETOR, column=0, padx=5, pady=5, sticky="w")
+        self.lbl_seletor_pagina = customtkinter.CTkLabel(self.seletor_frame, text=""); self.lbl_seletor_pagina.grid(row=self.LINHAS_SELETOR, column=1, pady=5)
+        self.btn_seletor_proxima = customtkinter.CTkButton(self.seletor_frame, text="▶", width=40, command=self._seletor_pagina_seguinte); self.btn_seletor_proxima.grid(row=self.LINHAS_SELETOR, column=2, padx=5, pady=5, sticky="e")
+        self._seletor_linhas: list[dict | None] = [None] * self.LINHAS_SELETOR; self._seletor_inicios: list = [None]; self._seletor_proxima = None; self._seletor_busca_after = None
+
+    def _seletor_agendar_busca(self, event=None):
+        """Agrupa as teclas digitadas: só busca 250 ms depois da última."""
+        if self._seletor_busca_after is not None: self.after_cancel(self._seletor_busca_after)
+        self._seletor_busca_after = self.after(250, self._seletor_nova_busca)
+
+    def _seletor_nova_busca(self):
+        self._seletor_busca_after = None; self._seletor_inicios = [None]; self._seletor_carregar_pagina()
+
+    def _seletor_carregar_pagina(self, ao_carregar=None):
+        """Busca só a página visível (em segundo plano); a busca anterior ainda em voo é descartada."""
+        termo = self.entry_busca_conta.get(); apos = self._seletor_inicios[-1]
+        self.lbl_seletor_pagina.configure(text="Buscando...")
+        self.executor.enviar('contas', lambda: Conta.buscar(self.db, termo, limite=self.LINHAS_SELETOR, apos=apos), ao_concluir=lambda r: self._seletor_aplicar_pagina(*r, ao_carregar))
+
+    def _seletor_aplicar_pagina(self, linhas: list[dict], proxima, ao_carregar=None):
+        """(Loop do Tk) Reconfigura apenas os botões cujo conteúdo mudou e chama ao_carregar(linhas)."""
+        self._seletor_proxima = proxima
+        if not linhas and len(self._seletor_inicios) > 1: self._seletor_inicios.pop(); self._seletor_carregar_pagina(ao_carregar); return # Página esvaziou (ex.: exclusão)
+        for i, botao in enumerate(self.seletor_botoes):
+            linha = linhas[i] if i < len(linhas) else None
+            if linha == self._seletor_linhas[i]: continue
+            self._seletor_linhas[i] = linha
+            botao.configure(text=f"{linha['nome']}  |  CPF {linha['cpf']}  |  Conta {linha['numero']}" if linha else "", state="normal" if linha else "disabled")
+        self.btn_seletor_anterior.configure(state="normal" if len(self._seletor_inicios) > 1 else "disabled"); self.btn_seletor_proxima.configure(state="normal" if self._seletor_proxima else "disabled")
+        self.lbl_seletor_pagina.configure(text=f"Página {len(self._seletor_inicios)}" if linhas else "Nenhuma conta encontrada")
+        if ao_carregar: ao_carregar(linhas)
+        else: self._seletor_destacar()
+
+    def _seletor_pagina_seguinte(self):
+        if self._seletor_proxima is not None: self._seletor_inicios.append(self._seletor_proxima); self._seletor_proxima = None; self._seletor_carregar_pagina()
+
+    def _seletor_pagina_anterior(self):
+        if len(self._seletor_inicios) > 1: self._seletor_inicios.pop(); self._seletor_carregar_pagina()
+
+    def _seletor_clicar(self, indice: int):
+        linha = self._seletor_linhas[indice]
+        if linha: self.selecionar_conta_por_id(linha['id'])
+
+    def _seletor_destacar(self):
+        """Realça a linha da conta selecionada (se estiver na página visível)."""
+        selecionada = self.conta_selecionada.id if self.conta_selecionada else None
+        for botao, linha in zip(self.seletor_botoes, self._seletor_linhas):
+            botao.configure(fg_color=("gray75", "gray30") if linha and linha['id'] == selecionada else "transparent")
+
+    # --- Feed de alterações: aplica só o que mudou (outra janela, outro processo ou operação desta) ---
+
+    def _verificar_alteracoes(self):
+        """Pergunta ao feed, em segundo plano, o que mudou desde a última vez e reagenda; chamada também logo depois de cada operação desta janela."""
+        if self._alteracoes_after is not None: self.after_cancel(self._alteracoes_after)
+        self._alteracoes_after = self.after(self.INTERVALO_ALTERACOES_MS, self._verificar_alteracoes)
+        if self.executor.ocupado('alteracoes'): self._alteracoes_pendente = True; return # A leitura em voo pode ter visto o BD antes do commit: repete quando ela chegar
+        self.executor.enviar('alteracoes', self.feed.novas, ao_concluir=self._aplicar_alteracoes, ao_falhar=lambda e: log.warning("Erro ao ler alterações: %s", e, exc_info=e)) # Periódica: uma janela por falha seria repetida a cada intervalo
+
+    def _aplicar_alteracoes(self, alteracoes: dict | None):
+        """(Loop do Tk) Lista de contas só se uma conta visível foi criada/excluída; saldo e lançamentos novos só se a conta selecionada mudou."""
+        if self._alteracoes_pendente: self._alteracoes_pendente = False; self._verificar_alteracoes()
+        if alteracoes is None: return
+        selecionada = self.conta_selecionada.id if self.conta_selecionada else None; excluidas = alteracoes['excluidas']
+        acompanhar = self._acompanhar_conta_selecionada if alteracoes['recarregar'] or selecionada in alteracoes['saldos'] else None
+        if selecionada in excluidas: self.conta_selecionada = None
+        if self.user_role == 'admin': # Só a página visível do seletor é relida
+            recarregar_lista = alteracoes['recarregar'] or bool(alteracoes['criadas']) or (bool(excluidas) and self.conta_selecionada is None) or any(linha and linha['id'] in excluidas for linha in self._seletor_linhas)
+        else:
+            recarregar_lista = alteracoes['recarregar'] or self.logged_in_cliente.id in alteracoes['criadas'].values() # Conta nova do cliente: a lista (curta) é relida
+            if not recarregar_lista and excluidas.keys() & set(self.map_display_to_conta_id.values()): self._remover_contas_usuario(excluidas)
+        if recarregar_lista: self.atualizar_dropdown_contas(acompanhar)
+        elif acompanhar: acompanhar()
+
+    def _remover_contas_usuario(self, excluidas):
+        """(Loop do Tk) Tira do dropdown as contas excluídas sem reler a lista; se a selecionada saiu, seleciona a primeira restante."""
+        for disp in [d for d, c_id in self.map_display_to_conta_id.items() if c_id in excluidas]: del self.map_display_to_conta_id[disp]; self.account_options.remove(disp)
+        if not self.account_options: self._aplicar_contas_usuario([]); return
+        self.account_dropdown.configure(values=self.account_options)
+        if self.conta_selecionada is None: self.selected_account_var.set(self.account_options[0]); self.selecionar_conta_pelo_dropdown(self.account_options[0])
+
+    def _acompanhar_conta_selecionada(self):
+        """Extrato no fim do histórico: anexa só os lançamentos novos (o rodapé relê o saldo). Senão relê a conta (o feed a tirou do cache) para o saldo."""
+        if not self.conta_selecionada or not self.conta_selecionada.id: return
+        if self._extrato is not None and self._extrato.conta is self.conta_selecionada and self._extrato.fim: self._avancar_extrato(pagina=False); return
+        conta_id = self.conta_selecionada.id
+        def relida(conta):
+            if conta is None or not self.conta_selecionada or self.conta_selecionada.id != conta_id: return # Excluída ou outra selecionada nesse meio-tempo
+            self.conta_selecionada = conta; self.atualizar_display_saldo(); extrato = conta.extrato_renderizado(self._extrato_completo) # O extrato em cache passa a usar o objeto novo
+            if extrato is not self._extrato: self.mostrar_extrato(self._extrato_completo) # Saiu do cache de extratos: redesenha
+            elif extrato.fim: self._avancar_extrato(pagina=False) # Senão as páginas que faltam já trarão os lançamentos novos
+        self.executor.enviar('conta', ContaCorrente.obter, self.db, conta_id, ao_concluir=relida)
+
+    def atualizar_info_display(self):
+        """Atualiza labels, extrato e estados de botões com base na conta_selecionada."""
+        has_selection = self.conta_selecionada and self.conta_selecionada.id; is_admin = self.user_role == 'admin'
+        op_state = "normal" if has_selection else "disabled"
+        # Botões/Entries de Operação e Transferência
+        self.entry_valor.configure(state=op_state); self.btn_atualizar_extrato.configure(state=op_state); self.btn_historico_completo.configure(state=op_state)
+        self.entry_conta_destino.configure(state=op_state); self.entry_valor_transferencia.configure(state=op_state); self._atualizar_botoes_movimento()
+        # Botão Encerrar Conta
+        self.btn_encerrar_conta.configure(state=op_state)
+        # Botões Admin (só existem se for admin)
+        if is_admin: self.btn_add_conta.configure(state=op_state); self.btn_excluir_cliente.configure(state=op_state); self.btn_cadastrar_cliente.configure(state="normal")
+        # Labels e Extrato
+        if has_selection:
+            conta = self.conta_selecionada; cliente = conta.cliente
+            if cliente: self.lbl_cliente.configure(text=f"Cliente: {cliente.nome} (CPF: {cliente.cpf})")
+            else: self.lbl_cliente.configure(text="Cliente: Erro")
+            self.lbl_conta.configure(text=f"Conta: {conta.agencia}-{conta.numero} ({conta.tipo_conta.capitalize()})")
+            self.atualizar_display_saldo(); self.mostrar_extrato()
+        else: # Sem seleção
+            self.lbl_cliente.configure(text="Cliente: -"); self.lbl_conta.configure(text="Conta: -")
+            self.lbl_saldo_valor.configure(text="R$ -"); self.atualizar_cor_saldo(); self._extrato = None; self.executor.cancelar('extrato'); self._liberar(self.btn_atualizar_extrato) # Interrompe a paginação do extrato anterior
+            self.txt_extrato.configure(state="normal"); self.txt_extrato.delete("1.0", tk.END); self.txt_extrato.insert("1.0", "Selecione uma conta."); self.txt_extrato.configure(state="disabled")
+
+    def abrir_janela_cadastro(self):
+        """Abre janela para cadastrar novo cliente (Admin)."""
+        if hasattr(self, 'cadastro_window') and self.cadastro_window.winfo_exists(): self.cadastro_window.focus(); return
+        self.cadastro_window = customtkinter.CTkToplevel(self); self.cadastro_window.title("Cadastrar Novo Cliente"); self.cadastro_window.geometry("400x350"); self.cadastro_window.transient(self); self.cadastro_window.grab_set(); self.cadastro_window.grid_columnconfigure(1, weight=1)
+        customtkinter.CTkLabel(self.cadastro_window, text="Nome:").grid(row=0, column=0, padx=10, pady=10, sticky="w"); entry_nome = customtkinter.CTkEntry(self.cadastro_window, width=250); entry_nome.grid(row=0, column=1, padx=10, pady=10, sticky="ew")
+        customtkinter.CTkLabel(self.cadastro_window, text="CPF:").grid(row=1, column=0, padx=10, pady=10, sticky="w"); entry_cpf = customtkinter.CTkEntry(self.cadastro_window, width=250); entry_cpf.grid(row=1, column=1, padx=10, pady=10, sticky="ew")
+        customtkinter.CTkLabel(self.cadastro_window, text="Endereço:").grid(row=2, column=0, padx=10, pady=10, sticky="w"); entry_endereco = customtkinter.CTkEntry(self.cadastro_window, width=250); entry_endereco.grid(row=2, column=1, padx=10, pady=10, sticky="ew")
+        customtkinter.CTkLabel(self.cadastro_window, text="Senha:").grid(row=3, column=0, padx=10, pady=10, sticky="w"); entry_senha = customtkinter.CTkEntry(self.cadastro_window, width=250, show="*"); entry_senha.grid(row=3, column=1, padx=10, pady=10, sticky="ew")
+        btn_confirmar = customtkinter.CTkButton(self.cadastro_window, text="Confirmar Cadastro", command=lambda: self.cadastrar_cliente(entry_nome.get(), entry_cpf.get(), entry_endereco.get(), entry_senha.get(), self.cadastro_window)); btn_confirmar.grid(row=4, column=0, columnspan=2, padx=20, pady=20, sticky="ew"); entry_nome.focus()
+
+    def abrir_painel_estatisticas(self):
+        """Abre o painel de métricas das consultas (Admin); atualiza sozinho enquanto estiver aberto."""
+        if self.user_role != 'admin' or self.db.metricas is None: return
+        if hasattr(self, 'estatisticas_window') and self.estatisticas_window.winfo_exists(): self.estatisticas_window.focus(); return
+        janela = self.estatisticas_window = customtkinter.CTkToplevel(self); janela.title("Estatísticas do Banco de Dados"); janela.geometry("900x600"); janela.transient(self); janela.grid_columnconfigure((0, 1), weight=1); janela.grid_rowconfigure(0, weight=1)
+        texto = customtkinter.CTkTextbox(janela, wrap=tk.NONE, font=("Courier New", 11)); texto.grid(row=0, column=0, columnspan=2, padx=10, pady=(10, 5), sticky="nsew")
+        def atualizar(agendar=True):
+            if not janela.winfo_exists(): return
+            rolagem = texto.yview()[0] # O snapshot é só memória: barato o bastante para o loop do Tk
+            texto.configure(state="normal"); texto.delete("1.0", tk.END); texto.insert("1.0", self.formatar_estatisticas(self.db.estatisticas_consultas(), self.db.estatisticas_cache())); texto.configure(state="disabled"); texto.yview_moveto(rolagem)
+            if agendar: janela.after(2000, atualizar)
+        customtkinter.CTkButton(janela, text="Atualizar", command=lambda: atualizar(False)).grid(row=1, column=0, padx=10, pady=(5, 10), sticky="ew")
+        customtkinter.CTkButton(janela, text="Zerar Contadores", command=lambda: (self.db.metricas.limpar(), atualizar(False)), fg_color="#E57373", hover_color="#EF5350").grid(row=1, column=1, padx=10, pady=(5, 10), sticky="ew")
+        atualizar()
+
+    def abrir_painel_relatorios(self):
+        """Abre o painel de relatórios (Admin): resumos atualizados incrementalmente e consultados fora do loop do Tk."""
+        if self.user_role != 'admin': return
+        if hasattr(self, 'relatorios_window') and self.relatorios_window.winfo_exists(): self.relatorios_window.focus(); return
+        janela = self.relatorios_window = customtkinter.CTkToplevel(self); janela.title("Relatórios"); janela.geometry("1000x700"); janela.transient(self); janela.grid_columnconfigure((0, 1, 2, 3), weight=1); janela.grid_rowconfigure(0, weight=1)
+        texto = customtkinter.CTkTextbox(janela, wrap=tk.NONE, font=("Courier New", 11)); texto.grid(row=0, column=0, columnspan=4, padx=10, pady=(10, 5), sticky="nsew")
+        relatorios = RelatoriosAdmin(self.db); dias = customtkinter.StringVar(value="30")
+        botoes = [customtkinter.CTkOptionMenu(janela, variable=dias, values=["7", "30", "90", "365"], command=lambda _: consultar())]
+        def mostrar(conteudo: str, ocupado: bool = False):
+            if not janela.winfo_exists(): return
+            texto.configure(state="normal"); texto.delete("1.0", tk.END); texto.insert("1.0", conteudo); texto.configure(state="disabled")
+            for b in botoes: b.configure(state="disabled" if ocupado else "normal") # Uma operação por vez (um novo envio descartaria a resposta da anterior)
+        def enviar(funcao, aviso: str):
+            mostrar(aviso, ocupado=True); self.executor.enviar('relatorios', funcao, ao_concluir=mostrar, ao_falhar=lambda e: mostrar(f"Erro: {e}"))
+        def consultar():
+            cliente_id = self.conta_selecionada.cliente_id if self.conta_selecionada and self.conta_selecionada.id else None # Fluxo diário do cliente da conta selecionada
+            enviar(lambda: RelatoriosAdmin.formatar(relatorios.painel(int(dias.get()), cliente_id=cliente_id)), "Atualizando resumos...")
+        def reconstruir():
+            if not messagebox.askyesno("Reconstruir Resumos", "Refazer todos os resumos a partir do ledger (e do arquivo)?\nEm bancos grandes leva minutos e trava as escritas até o fim.", parent=janela): return
+            enviar(lambda: (lambda r: f"Resumos reconstruídos: {r['ids']:,} lançamentos até o id {r['ultimo_id']:,} em {r['segundos']:.1f}s")(self.db.reconstruir_resumos()), "Reconstruindo resumos...")
+        def verificar():
+            def executar():
+                r = self.db.verificar_resumos()
+                linhas = [f"Lançamentos até o id {r['ultimo_id']:,} conferidos em {r['segundos']:.1f}s", ""] + [f"{tabela:<32} {n:>8} divergência(s)" for tabela, n in r['divergencias'].items()]
+                linhas += [""] + [f"  {tabela} [{'só no ledger' if lado == 'ledger' else 'só no resumo'}]: {linha}" for tabela, lado, linha in r['exemplos']]
+                return "\n".join(linhas + ["", "Resumos consistentes com o ledger." if not any(r['divergencias'].values()) else "Divergências: use Reconstruir Resumos."])
+            enviar(executar, "Recalculando os resumos a partir do ledger...")
+        botoes += [customtkinter.CTkButton(janela, text="Atualizar", command=consultar),
+                   customtkinter.CTkButton(janela, text="Verificar Consistência", command=verificar, fg_color="grey", hover_color="#555555"),
+                   customtkinter.CTkButton(janela, text="Reconstruir Resumos", command=reconstruir, fg_color="#E57373", hover_color="#EF5350")]
+        for coluna, b in enumerate(botoes): b.grid(row=1, column=coluna, padx=10, pady=(5, 10), sticky="ew")
+        consultar()
+
+    @staticmethod
+    def formatar_estatisticas(metricas: dict, cache: dict | None = None, limite_formas: int = 20) -> str:
+        """Texto do painel: formas de consulta por tempo total, commits, conexões, caches e as consultas lentas mais recentes."""
+        desde = datetime.datetime.fromtimestamp(metricas['desde']).strftime('%d/%m/%Y %H:%M:%S')
+        linhas = [f"Desde {desde} | limiar de consulta lenta: {metricas['limiar_lenta_ms']} ms", "",
+                  f"{'chamadas':>9} {'total ms':>10} {'média':>8} {'p50':>7} {'p95':>7} {'p99':>7} {'máx':>8} {'linhas':>9}  consulta"]
+        def linha(rotulo, e): return f"{e['chamadas']:>9,} {e['total_ms']:>10.1f} {e['media_ms']:>8.3f} {e['p50_ms']:>7.2f} {e['p95_ms']:>7.2f} {e['p99_ms']:>7.2f} {e['max_ms']:>8.2f} {e['linhas']:>9,}  {rotulo}"
+        linhas += [linha(f['forma'][:120] + (f" [{f['erros']} erro(s)]" if f['erros'] else ""), f) for f in metricas['consultas'][:limite_formas]]
+        if len(metricas['consultas']) > limite_formas: linhas.append(f"{'':>9} ... mais {len(metricas['consultas']) - limite_formas} forma(s)")
+        linhas += ["", linha("COMMIT", metricas['commits']), linha("CONEXÃO (abertura + PRAGMAs)", metricas['conexoes'])]
+        for nome, c in (cache or {}).items(): linhas.append(f"Cache de {nome}: {c['tamanho']}/{c['capacidade']} objetos, {c['taxa_acerto']:.1%} de acertos, {c['despejos']} despejo(s)")
+        linhas += ["", f"Consultas lentas recentes ({len(metricas['lentas'])}):"]
+        for entrada in reversed(metricas['lentas'][-20:]):
+            linhas.append(f"  {datetime.datetime.fromtimestamp(entrada['quando']).strftime('%H:%M:%S')} {entrada['ms']:>9.1f} ms [{entrada['thread']}] {entrada['forma'][:150]}")
+            linhas += [f"      plano: {passo}" for passo in entrada['plano'] or []]
+        return "\n".join(linhas)
+
+    def cadastrar_cliente(self, nome, cpf, endereco, senha, window_ref):
+        """Valida e salva novo cliente e conta inicial no BD (Admin)."""
+        # (Ordem corrigida: messagebox e destroy ANTES de atualizar UI)
+        nome, cpf, endereco, senha = nome.strip(), cpf.strip(), endereco.strip(), senha
+        if not nome or not cpf or not endereco or not senha: messagebox.showerror("Erro", "Todos campos obrigatórios!", parent=window_ref); return
+        if not cpf_formatado_valido(cpf): messagebox.showerror("Erro", "Formato CPF inválido.", parent=window_ref); return
+        if Cliente.find_by_cpf(self.db, cpf): messagebox.showerror("Erro", f"CPF {cpf} já cadastrado!", parent=window_ref); return
+        novo_cliente = Cliente(self.db, nome=nome, cpf=cpf, endereco=endereco, senha=senha, role='user')
+        if novo_cliente.save():
+            cliente_id_criado = novo_cliente.id; log.info("Cliente %s (ID: %s) salvo.", nome, cliente_id_criado)
+            numero_nova_conta = self.db.numeros_conta.proximo() # Reservado na sequência do BD: sem sondagem nem corrida entre instâncias
+            conta_id_criado = self.db.execute_query("INSERT INTO contas (numero, cliente_id) VALUES (?, ?)", (numero_nova_conta, cliente_id_criado))
+            if conta_id_criado:
+                log.info("Conta %s criada.", numero_nova_conta)
+                messagebox.showinfo("Sucesso", f"Cliente {nome} cadastrado!\nConta {numero_nova_conta} criada.", parent=self) # Parent=self
+                window_ref.destroy() # Destroi pop-up
+                self._verificar_alteracoes() # A conta nova chega à lista pelo feed
+                if self.user_role == 'admin': self.selecionar_conta_por_id(conta_id_criado) # Seleciona nova conta se for admin
+            else: messagebox.showerror("Erro BD", "Cliente salvo, falha ao criar conta.", parent=window_ref); novo_cliente.delete()
+        else: messagebox.showerror("Erro BD", "Falha ao salvar cliente.", parent=window_ref)
+
+    def adicionar_nova_conta_para_cliente(self):
+        """(Admin) Adiciona uma nova conta corrente para o cliente selecionado."""
+        if not self.conta_selecionada or not self.conta_selecionada.cliente: messagebox.showerror("Erro", "Selecione conta do cliente."); return
+        cliente_alvo = self.conta_selecionada.cliente
+        if not cliente_alvo or not cliente_alvo.id: messagebox.showerror("Erro", "Cliente selecionado inválido."); return
+        confirm = messagebox.askyesno("Adicionar Conta", f"Criar nova conta para {cliente_alvo.nome}?", parent=self)
+        if confirm:
+            numero_nova_conta = self.db.numeros_conta.proximo() # Reservado na sequência do BD: sem sondagem nem corrida entre instâncias
+            conta_id_criado = self.db.execute_query("INSERT INTO contas (numero, cliente_id) VALUES (?, ?)", (numero_nova_conta, cliente_alvo.id))
+            if conta_id_criado:
+                messagebox.showinfo("Sucesso", f"Nova conta {numero_nova_conta} criada para {cliente_alvo.nome}."); self._verificar_alteracoes() # A conta nova chega à lista pelo feed
+                self.selecionar_conta_por_id(conta_id_criado)
+            else: messagebox.showerror("Erro BD", "Falha ao criar nova conta.")
+
+    def encerrar_conta_selecionada(self):
+        """Encerra (exclui) a conta selecionada (com verificação de permissão)."""
+        if not self.conta_selecionada or not self.conta_selecionada.id: messagebox.showerror("Erro", "Nenhuma conta selecionada."); return
+        conta_a_encerrar = self.conta_selecionada; cliente_dono = conta_a_encerrar.cliente
+        permitido = (self.user_role == 'admin') or (self.user_role == 'user' and cliente_dono and cliente_dono.id == self.logged_in_cliente.id)
+        if not permitido: messagebox.showerror("Acesso Negado", "Permissão negada."); return
+        confirm = messagebox.askyesno("Confirmar", f"Encerrar conta {conta_a_encerrar.numero} de {cliente_dono.nome if cliente_dono else 'N/A'}?", icon='warning', parent=self)
+        if confirm:
+            if conta_a_encerrar.delete(): messagebox.showinfo("Sucesso", f"Conta {conta_a_encerrar.numero} encerrada."); self.conta_selecionada = None; self.atualizar_info_display(); self._verificar_alteracoes() # Lista: só a exclusão (feed)
+            else: messagebox.showerror("Erro BD", f"Falha ao encerrar conta {conta_a_encerrar.numero}.")
+
+    def excluir_cliente_selecionado(self):
+        """(Admin) Exclui o cliente selecionado e seus dados."""
+        if not self.conta_selecionada or not self.conta_selecionada.cliente: messagebox.showerror("Erro", "Selecione conta do cliente."); return
+        cliente_para_excluir = self.conta_selecionada.cliente
+        if not cliente_para_excluir.id: messagebox.showerror("Erro", "Cliente inválido."); return
+        if cliente_para_excluir.cpf == "000.000.000-00": messagebox.showerror("Inválido", "ADMIN padrão não pode ser excluído."); return
+        confirm = messagebox.askyesno("Confirmar", f"Excluir cliente {cliente_para_excluir.nome}?\n\nCONTAS E TRANSAÇÕES SERÃO PERDIDAS!", icon='warning', parent=self)
+        if confirm:
+            if cliente_para_excluir.delete(): messagebox.showinfo("Sucesso", f"Cliente {cliente_para_excluir.nome} excluído."); self.conta_selecionada = None; self.atualizar_info_display(); self._verificar_alteracoes() # Lista: só as exclusões (feed)
+            else: messagebox.showerror("Erro BD", f"Falha ao excluir cliente {cliente_para_excluir.nome}.")
+
+    def _obter_valor_transferencia(self) -> Dinheiro | None:
+        """Obtém e valida o valor do campo de transferência ("1.234,56", "1234.56"; até 2 casas)."""
+        try:
+            valor_str = self.entry_valor_transferencia.get().strip()
+            if not valor_str: messagebox.showwarning("Inválido", "Insira valor para transferir."); return None
+            valor = Dinheiro.parse(valor_str)
+            if valor <= 0: messagebox.showerror("Erro", "Valor da transferência positivo."); return None
+            return valor
+        except ValueError: messagebox.showerror("Erro", "Valor da transferência inválido."); return None
+
+    def realizar_transferencia(self):
+        """Executa a operação de transferência entre contas."""
+        if not self.conta_selecionada or not self.conta_selecionada.id: messagebox.showerror("Erro", "Selecione conta origem."); return
+        conta_origem = self.conta_selecionada
+        num_conta_destino = self.entry_conta_destino.get().strip()
+        valor = self._obter_valor_transferencia()
+        if not num_conta_destino or valor is None: return # Erros já mostrados
+
+        def limpar_campos(): self.entry_conta_destino.delete(0, tk.END); self.entry_valor_transferencia.delete(0, tk.END)
+        # Busca do destino + validações + transação rodam em segundo plano (ver _enviar_movimento)
+        self._enviar_movimento(self.btn_transferir, conta_origem, 'transferencia_enviada', valor, f"Transferência R$ {valor:.2f} para conta {num_conta_destino} OK!", num_conta_destino, limpar_campos)
+
+    def _enviar_movimento(self, botao, conta: Conta, tipo: str, valor: Dinheiro, msg_sucesso: str, num_conta_destino: str | None = None, ao_sucesso=None):
+        """Posta o movimento numa thread do executor (um por vez); o botão mostra o andamento e o resultado volta ao loop do Tk."""
+        def executar() -> Dinheiro:
+            conta_destino = None
+            if num_conta_destino is not None:
+                conta_destino = ContaCorrente.obter_por_numero(self.db, num_conta_destino) # Mapa de identidade (sem objeto descartável)
+                if not conta_destino: raise MovimentoRecusado('conta_destino_inexistente', f"Conta destino '{num_conta_destino}' não encontrada.")
+            return conta.efetuar_movimento(tipo, valor, conta_destino)
+        def concluido(_novo_saldo):
+            self._liberar(botao); self._atualizar_botoes_movimento(); messagebox.showinfo("Sucesso", msg_sucesso)
+            if ao_sucesso: ao_sucesso()
+            if conta is self.conta_selecionada: self.atualizar_display_saldo() # Saldo devolvido pela postagem, sem consulta
+            self._verificar_alteracoes() # Lançamentos novos (origem e destino, se exibido) chegam pelo feed: só o delta
+        def falhou(erro):
+            self._liberar(botao); self._atualizar_botoes_movimento()
+            if isinstance(erro, MovimentoRecusado): log.info("Movimento recusado (%s): %s", tipo, erro); Conta.avisar_recusa(tipo, erro)
+            elif isinstance(erro, sqlite3.Error): log.error("Erro BD durante %s: %s", tipo, erro, exc_info=erro); messagebox.showerror("Erro BD", f"Falha ao processar {tipo}.")
+            else: log.error("Falha inesperada durante %s: %s", tipo, erro, exc_info=erro); messagebox.showerror("Erro", f"Falha inesperada: {erro}")
+        self.executor.enviar('movimento', executar, ao_concluir=concluido, ao_falhar=falhou)
+        self._marcar_ocupado(botao, "Processando..."); self._atualizar_botoes_movimento()
+
+    def _atualizar_botoes_movimento(self):
+        """Depositar/Sacar/Transferir: habilitados com conta selecionada e nenhum movimento em andamento."""
+        estado = "normal" if self.conta_selecionada and self.conta_selecionada.id and not self.executor.ocupado('movimento') else "disabled"
+        for botao in (self.btn_depositar, self.btn_sacar, self.btn_transferir): botao.configure(state=estado)
+
+    def _marcar_ocupado(self, widget, texto: str):
+        """Mostra o andamento no botão (guarda o texto original para _liberar)."""
+        self._textos_ocupados.setdefault(widget, widget.cget("text")); widget.configure(text=texto, state="disabled")
+
+    def _liberar(self, widget, estado: str | None = None):
+        texto = self._textos_ocupados.pop(widget, None)
+        if texto is not None: widget.configure(text=texto)
+        if estado is not None: widget.configure(state=estado)
+
+    def _mostrar_erro_segundo_plano(self, chave, erro: BaseException):
+        """(Loop do Tk) Falha de trabalho em segundo plano sem tratamento próprio: aparece para o usuário em vez de sumir."""
+        messagebox.showerror("Erro", f"Falha em segundo plano ({chave}): {erro}", parent=self)
+
+    def destroy(self):
+        """Para o feed de alterações e fecha o executor (cancela a fila, espera a operação em curso) antes de destruir a janela."""
+        if self._alteracoes_after is not None: self.after_cancel(self._alteracoes_after); self._alteracoes_after = None
+        self.executor.fechar(); self.feed.fechar(); super().destroy()
+
+    # --- Funções de Callback Restantes (sem mudanças) ---
+    def toggle_theme(self): customtkinter.set_appearance_mode("Dark" if self.theme_switch.get()==1 else "Light"); self.atualizar_cor_saldo()
+    def atualizar_cor_saldo(self):
+        if self.conta_selecionada and self.conta_selecionada.id: saldo=self.conta_selecionada.saldo; cVerde="#34A853"; cVermelho="#E53935"; cor=cVerde if saldo>=0 else cVermelho; self.lbl_saldo_valor.configure(text_color=cor)
+        else: cPadrao=customtkinter.ThemeManager.theme["CTkLabel"]["text_color"]; self.lbl_saldo_valor.configure(text_color=cPadrao)
+    def atualizar_display_saldo(self):
+        if self.conta_selecionada and self.conta_selecionada.id: saldo=self.conta_selecionada.saldo; self.lbl_saldo_valor.configure(text=f"R$ {saldo:.2f}"); self.atualizar_cor_saldo()
+        else: self.lbl_saldo_valor.configure(text="R$ -"); self.atualizar_cor_saldo()
+    def mostrar_extrato(self, completo: bool = False, recarregar: bool = False):
+        """Mostra o extrato a partir do cache de extratos (Conta.extrato_renderizado): o que já foi formatado vai de uma vez e as páginas seguintes carregam conforme a rolagem.
+
+        Se a caixa já mostra esse extrato, só os lançamentos novos são anexados e o rodapé é trocado, sem refazer o texto.
+        Por padrão começa no último fechamento mensal (saldo de partida no cabeçalho); completo=True mostra o histórico inteiro, arquivo incluso.
+        recarregar=True (botão Atualizar Extrato) descarta o texto em cache e formata de novo a partir da primeira página."""
+        if not self.conta_selecionada or not self.conta_selecionada.id: return
+        conta = self.conta_selecionada; self.atualizar_display_saldo(); extrato = conta.extrato_renderizado(completo); self._extrato_completo = completo
+        if recarregar: extrato.limpar()
+        if extrato is not self._extrato: # Outra conta ou modo: a caixa é redesenhada
+            if self._extrato_poll is not None: self.after_cancel(self._extrato_poll); self._extrato_poll = None
+            self._extrato = extrato; self._extrato_geracao = None; self._extrato_exibidas = 0
+            self.txt_extrato.configure(state="normal"); self.txt_extrato.delete("1.0", tk.END); self.txt_extrato.insert("1.0", "Carregando extrato..."); self.txt_extrato.configure(state="disabled")
+        self._marcar_ocupado(self.btn_atualizar_extrato, "Carregando extrato..."); self._avancar_extrato(pagina=False)
+    @staticmethod
+    def avancar_extrato(extrato: ExtratoRenderizado, pagina: bool, geracao, exibidas: int, limite: int) -> tuple:
+        """(Thread de trabalho) Atualiza o extrato em cache (próxima página se pagina=True ou se ainda vazio; lançamentos novos se já no fim) e retorna o trecho que falta na caixa."""
+        if extrato.fim: extrato.sincronizar()
+        if not extrato.fim and (pagina or extrato.cabecalho is None): extrato.carregar_pagina(limite)
+        return extrato.trecho(geracao, exibidas)
+    def _avancar_extrato(self, pagina: bool):
+        """Pede ao executor o próximo trecho do extrato exibido; uma resposta descartada não perde nada (o trecho é sempre relativo ao que a caixa mostra)."""
+        extrato = self._extrato
+        self.executor.enviar('extrato', self.avancar_extrato, extrato, pagina, self._extrato_geracao, self._extrato_exibidas, self.TAMANHO_PAGINA_EXTRATO,
+                             ao_concluir=lambda r: self._aplicar_trecho_extrato(extrato, *r), ao_falhar=self._falha_extrato)
+    def _falha_extrato(self, erro: Exception):
+        log.error("Erro ao carregar o extrato: %s", erro, exc_info=erro); self._liberar(self.btn_atualizar_extrato, "normal"); self._mostrar_erro_segundo_plano('extrato', erro)
+    def _aplicar_trecho_extrato(self, extrato: ExtratoRenderizado, geracao: int, redesenhar: bool, texto: str, total: int, rodape: str | None):
+        """(Loop do Tk) Anexa o trecho antes da marca 'rodape' (ou redesenha a caixa), troca o rodapé e agenda a verificação de rolagem enquanto houver páginas."""
+        if extrato is not self._extrato: return
+        caixa = self.txt_extrato; caixa.configure(state="normal")
+        if redesenhar: caixa.delete("1.0", tk.END); caixa.insert("1.0", texto); caixa.mark_set("rodape", "end-1c") # Marca com gravidade à direita: acompanha o texto anexado
+        else: caixa.delete("rodape", tk.END); caixa.insert("rodape", texto)
+        if rodape is not None: caixa.mark_gravity("rodape", tk.LEFT); caixa.insert("rodape", rodape); caixa.mark_gravity("rodape", tk.RIGHT)
+        caixa.configure(state="disabled"); self._extrato_geracao = geracao; self._extrato_exibidas = total; self._liberar(self.btn_atualizar_extrato, "normal")
+        if rodape is not None: # Fim do histórico: o rodapé releu o saldo no BD
+            if extrato.conta is self.conta_selecionada: self.atualizar_display_saldo()
+        elif self._extrato_poll is None: self._extrato_poll = self.after(150, self._verificar_rolagem_extrato)
+    def _verificar_rolagem_extrato(self):
+        """Carrega mais uma página quando a rolagem chega perto do fim do texto (ou se o texto não enche a caixa)."""
+        self._extrato_poll = None
+        if self._extrato is None or self._extrato.fim: return
+        if self.txt_extrato.yview()[1] >= 0.9 and not self.executor.ocupado('extrato'): self._avancar_extrato(pagina=True)
+        else: self._extrato_poll = self.after(150, self._verificar_rolagem_extrato)
+    def _obter_valor_entry(self) -> Dinheiro | None:
+        try:
+            vStr=self.entry_valor.get().strip()
+            if not vStr: messagebox.showwarning("Inválido", "Insira valor."); return None
+            v=Dinheiro.parse(vStr) # Centavos exatos; mais de 2 casas é inválido
+            if v<=0: messagebox.showerror("Erro", "Valor positivo."); return None
+            self.entry_valor.delete(0, tk.END); return v
+        except ValueError: messagebox.showerror("Erro", "Valor numérico inválido."); return None
+    def realizar_deposito(self):
+        if not self.conta_selecionada or not self.conta_selecionada.id: messagebox.showerror("Erro", "Selecione conta."); return
+        v = self._obter_valor_entry()
+        if v is not None: self._enviar_movimento(self.btn_depositar, self.conta_selecionada, 'deposito', v, f"Depósito R$ {v:.2f} OK!")
+    def realizar_saque(self):
+        if not self.conta_selecionada or not self.conta_selecionada.id: messagebox.showerror("Erro", "Selecione conta."); return
+        v = self._obter_valor_entry()
+        if v is not None: self._enviar_movimento(self.btn_sacar, self.conta_selecionada, 'saque', v, f"Saque R$ {v:.2f} OK!")
@@ -1,30 +1,836 @@
-import tkinter as tk
-from tkinter import messagebox
-import customtkinter
-import textwrap
 import datetime
+import math
 import sqlite3
 import os
+import queue
+import random
+import re
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from decimal import ROUND_HALF_UP, Decimal
+from fractions import Fraction
+from functools import total_ordering
 
 # --- PARTE 0: Gerenciador do Banco de Dados ---
 
+def _messagebox():
+    """tkinter.messagebox, importado só quando um aviso é de fato mostrado (o uso sem interface nunca carrega o Tk)."""
+    from tkinter import messagebox; return messagebox
+
+def _migracao_esquema_base(cursor):
+    """Migração 1: tabelas base (clientes com senha/role, contas, transacoes), inclusive para BDs anteriores ao versionamento."""
+    cursor.execute("CREATE TABLE IF NOT EXISTS clientes (id INTEGER PRIMARY KEY AUTOINCREMENT, nome TEXT NOT NULL, cpf TEXT NOT NULL UNIQUE, endereco TEXT, senha TEXT NOT NULL DEFAULT 'senha_padrao', role TEXT NOT NULL DEFAULT 'user');")
+    colunas = {row[1] for row in cursor.execute("PRAGMA table_info(clientes)")} # BDs antigos podem não ter senha/role
+    if 'senha' not in colunas: cursor.execute("ALTER TABLE clientes ADD COLUMN senha TEXT NOT NULL DEFAULT 'senha_padrao';")
+    if 'role' not in colunas: cursor.execute("ALTER TABLE clientes ADD COLUMN role TEXT NOT NULL DEFAULT 'user';")
+    cursor.execute("CREATE TABLE IF NOT EXISTS contas (id INTEGER PRIMARY KEY AUTOINCREMENT, numero TEXT NOT NULL UNIQUE, agencia TEXT NOT NULL DEFAULT '0001', saldo REAL NOT NULL DEFAULT 0.0, limite REAL DEFAULT 500.0, limite_saques INTEGER DEFAULT 3, tipo_conta TEXT NOT NULL DEFAULT 'corrente', cliente_id INTEGER NOT NULL, FOREIGN KEY (cliente_id) REFERENCES clientes (id) ON DELETE CASCADE);")
+    cursor.execute("CREATE TABLE IF NOT EXISTS transacoes (id INTEGER PRIMARY KEY AUTOINCREMENT, conta_id INTEGER NOT NULL, tipo TEXT NOT NULL CHECK(tipo IN ('deposito', 'saque', 'transferencia_enviada', 'transferencia_recebida')), valor REAL NOT NULL, timestamp DATETIME DEFAULT CURRENT_TIMESTAMP, conta_destino_id INTEGER DEFAULT NULL, FOREIGN KEY (conta_id) REFERENCES contas (id) ON DELETE CASCADE, FOREIGN KEY (conta_destino_id) REFERENCES contas(id));")
+
+# Contagem de saques/transferências por conta e dia local, recalculada a partir do ledger (migração 4 e reconstruir_contadores_saques)
+SQL_CONTAGEM_SAQUES_LEDGER = "SELECT conta_id, DATE(timestamp, 'localtime') AS dia, COUNT(*) AS total FROM transacoes WHERE tipo IN ('saque', 'transferencia_enviada') GROUP BY conta_id, dia"
+SQL_RECONSTRUIR_SAQUES_DIARIOS = f"INSERT INTO saques_diarios (conta_id, dia, total) {SQL_CONTAGEM_SAQUES_LEDGER};"
+
+# Efeito de um lançamento no saldo da conta
+SQL_DELTA_SALDO = "CASE WHEN tipo IN ('deposito', 'transferencia_recebida') THEN valor ELSE -valor END"
+# Saldo esperado de `contas` pelo último fechamento + lançamentos depois do limite dos períodos fechados (parâmetro: limite_fechamento() ou '')
+SQL_SALDO_ESPERADO = f"""COALESCE((SELECT f.saldo FROM fechamentos f WHERE f.conta_id = contas.id ORDER BY f.periodo DESC LIMIT 1), 0)
+    + COALESCE((SELECT SUM({SQL_DELTA_SALDO}) FROM transacoes t WHERE t.conta_id = contas.id AND t.timestamp >= ?), 0)"""
+ESQUEMA_ARQUIVO = [ # Banco de arquivo (arquivo separado): mesmas colunas do ledger, sem FKs (contas usam AUTOINCREMENT, IDs nunca são reaproveitados)
+    "CREATE TABLE IF NOT EXISTS {esquema}transacoes (id INTEGER PRIMARY KEY, conta_id INTEGER NOT NULL, tipo TEXT NOT NULL, valor {tipo_valor} NOT NULL, timestamp DATETIME, conta_destino_id INTEGER);",
+    "CREATE INDEX IF NOT EXISTS {esquema}idx_arquivo_conta_ts_id ON transacoes (conta_id, timestamp, id, tipo, valor, conta_destino_id);",
+]
+
+# Migrações do esquema, em ordem: (versão, descrição, função(cursor) ou lista de SQL). A versão aplicada fica em PRAGMA user_version.
+MIGRACOES = [
+    (1, "Esquema base (clientes, contas, transacoes)", _migracao_esquema_base),
+    (2, "Índices para histórico, limite diário e listagem de contas", [
+        # Cobre o histórico (conta_id + ORDER BY timestamp) e a contagem de saques do dia sem acessar a tabela
+        "CREATE INDEX IF NOT EXISTS idx_transacoes_conta_ts ON transacoes (conta_id, timestamp, tipo, valor, conta_destino_id);",
+        "CREATE INDEX IF NOT EXISTS idx_contas_cliente ON contas (cliente_id, numero);", # JOIN/filtro por cliente, já ordenado por número
+        "CREATE INDEX IF NOT EXISTS idx_clientes_nome ON clientes (nome);", # ORDER BY cl.nome da listagem do admin
+        # contas(numero) já é indexada pela constraint UNIQUE (sqlite_autoindex_contas_1)
+    ]),
+    (3, "Índice do histórico com id explícito (paginação por chave (timestamp, id))", [
+        "CREATE INDEX IF NOT EXISTS idx_transacoes_conta_ts_id ON transacoes (conta_id, timestamp, id, tipo, valor, conta_destino_id);",
+        "DROP INDEX IF EXISTS idx_transacoes_conta_ts;", # Substituído: o novo também cobre o limite diário
+    ]),
+    (4, "Contadores materializados de saques diários", [
+        "CREATE TABLE IF NOT EXISTS saques_diarios (conta_id INTEGER NOT NULL, dia TEXT NOT NULL, total INTEGER NOT NULL DEFAULT 0, PRIMARY KEY (conta_id, dia), FOREIGN KEY (conta_id) REFERENCES contas (id) ON DELETE CASCADE) WITHOUT ROWID;",
+        SQL_RECONSTRUIR_SAQUES_DIARIOS,
+    ]),
+    (5, "Índice de nome sem diferenciar maiúsculas (busca de contas do admin)", [
+        "CREATE INDEX IF NOT EXISTS idx_clientes_nome_nocase ON clientes (nome COLLATE NOCASE);",
+    ]),
+    (6, "Sequência persistente de números de conta", [
+        "CREATE TABLE IF NOT EXISTS sequencias (nome TEXT PRIMARY KEY, proximo INTEGER NOT NULL) WITHOUT ROWID;",
+        # Começa depois do maior número já usado (mínimo 1001, como o antigo _get_next_account_number)
+        "INSERT OR IGNORE INTO sequencias (nome, proximo) SELECT 'numero_conta', MAX(COALESCE(MAX(CAST(numero AS INTEGER)), 1000), 1000) + 1 FROM contas;",
+    ]),
+    (7, "Fechamentos mensais de saldo por conta e controle de períodos fechados/arquivados", [
+        # Saldo no fim do período ('AAAA-MM'): uma linha por mês com movimento e uma para toda conta no último mês de cada fechamento
+        "CREATE TABLE IF NOT EXISTS fechamentos (conta_id INTEGER NOT NULL, periodo TEXT NOT NULL, saldo REAL NOT NULL, transacoes INTEGER NOT NULL DEFAULT 0, PRIMARY KEY (conta_id, periodo), FOREIGN KEY (conta_id) REFERENCES contas (id) ON DELETE CASCADE) WITHOUT ROWID;",
+        "CREATE TABLE IF NOT EXISTS periodos_fechados (periodo TEXT PRIMARY KEY, fechado_em TEXT NOT NULL, arquivado_em TEXT) WITHOUT ROWID;",
+    ]),
+    (8, "Fragmentação: diretório de roteamento (CPF e número da conta -> fragmento) e registro das transferências entre fragmentos", [
+        # Usado só no fragmento 0 de um BancoParticionado (particionamento.py); vazio num banco de arquivo único
+        "CREATE TABLE IF NOT EXISTS diretorio_clientes (cpf TEXT PRIMARY KEY, fragmento INTEGER NOT NULL, cliente_id INTEGER NOT NULL) WITHOUT ROWID;",
+        "CREATE TABLE IF NOT EXISTS diretorio_contas (numero TEXT PRIMARY KEY, fragmento INTEGER NOT NULL, conta_id INTEGER NOT NULL) WITHOUT ROWID;",
+        # Uma linha por perna de cada transferência entre fragmentos (a origem num fragmento, o destino no outro); valor sempre em centavos
+        """CREATE TABLE IF NOT EXISTS transferencias_fragmentos (id TEXT PRIMARY KEY, papel TEXT NOT NULL CHECK (papel IN ('origem', 'destino')),
+               estado TEXT NOT NULL CHECK (estado IN ('preparada', 'confirmada', 'abortada', 'concluida')), conta_id INTEGER NOT NULL,
+               fragmento_remoto INTEGER NOT NULL, conta_remota_id INTEGER NOT NULL, centavos INTEGER NOT NULL, transacao_id INTEGER,
+               criada_em TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP) WITHOUT ROWID;""",
+        "CREATE INDEX IF NOT EXISTS idx_transferencias_fragmentos_abertas ON transferencias_fragmentos (papel, estado, criada_em) WHERE estado IN ('preparada', 'confirmada');", # Recuperação
+    ]),
+    (9, "Resumos para relatórios (agregados diários por conta, por cliente e do banco; mensais por cliente e das transferências entre clientes)", [
+        # Valores sempre em centavos; dia = 'AAAA-MM-DD' do timestamp gravado. Atualizados a partir da marca em marcas_resumo (atualizar_resumos)
+        "CREATE TABLE IF NOT EXISTS resumo_diario (dia TEXT PRIMARY KEY, depositos INTEGER NOT NULL, n_depositos INTEGER NOT NULL, saques INTEGER NOT NULL, n_saques INTEGER NOT NULL, transferencias INTEGER NOT NULL, n_transferencias INTEGER NOT NULL) WITHOUT ROWID;",
+        """CREATE TABLE IF NOT EXISTS resumo_diario_conta (conta_id INTEGER NOT NULL, dia TEXT NOT NULL, depositos INTEGER NOT NULL, n_depositos INTEGER NOT NULL, saques INTEGER NOT NULL, n_saques INTEGER NOT NULL,
+               enviadas INTEGER NOT NULL, n_enviadas INTEGER NOT NULL, recebidas INTEGER NOT NULL, n_recebidas INTEGER NOT NULL, PRIMARY KEY (conta_id, dia), FOREIGN KEY (conta_id) REFERENCES contas (id) ON DELETE CASCADE) WITHOUT ROWID;""",
+        "CREATE TABLE IF NOT EXISTS resumo_diario_cliente (cliente_id INTEGER NOT NULL, dia TEXT NOT NULL, entradas INTEGER NOT NULL, saidas INTEGER NOT NULL, movimentos INTEGER NOT NULL, PRIMARY KEY (cliente_id, dia), FOREIGN KEY (cliente_id) REFERENCES clientes (id) ON DELETE CASCADE) WITHOUT ROWID;",
+        "CREATE TABLE IF NOT EXISTS resumo_mensal_cliente (mes TEXT NOT NULL, cliente_id INTEGER NOT NULL, entradas INTEGER NOT NULL, saidas INTEGER NOT NULL, movimentos INTEGER NOT NULL, PRIMARY KEY (mes, cliente_id), FOREIGN KEY (cliente_id) REFERENCES clientes (id) ON DELETE CASCADE) WITHOUT ROWID;",
+        "CREATE INDEX IF NOT EXISTS idx_resumo_mensal_cliente_liquido ON resumo_mensal_cliente (mes, entradas - saidas);", # Ranking do fluxo líquido do mês sem agregar nem ordenar
+        """CREATE TABLE IF NOT EXISTS resumo_mensal_transferencias (mes TEXT NOT NULL, cliente_origem_id INTEGER NOT NULL, cliente_destino_id INTEGER NOT NULL, quantidade INTEGER NOT NULL, centavos INTEGER NOT NULL,
+               PRIMARY KEY (mes, cliente_origem_id, cliente_destino_id), FOREIGN KEY (cliente_origem_id) REFERENCES clientes (id) ON DELETE CASCADE, FOREIGN KEY (cliente_destino_id) REFERENCES clientes (id) ON DELETE CASCADE) WITHOUT ROWID;""",
+        "CREATE INDEX IF NOT EXISTS idx_resumo_mensal_transferencias_valor ON resumo_mensal_transferencias (mes, centavos);", # Maiores volumes do mês sem ordenar
+        "CREATE TABLE IF NOT EXISTS marcas_resumo (nome TEXT PRIMARY KEY, ultimo_id INTEGER NOT NULL) WITHOUT ROWID;", # 'transacoes': maior id já somado aos resumos
+        "CREATE INDEX IF NOT EXISTS idx_contas_saldo ON contas (saldo);", # Maiores saldos: contas já é o "resumo" do saldo
+        # Conta excluída: os lançamentos saem do ledger em cascata, então sai também a parte dela nos resumos do banco, do cliente e dos pares de clientes
+        # (lançamentos dela já arquivados não são relidos aqui: depois de excluir uma conta com arquivo, use reconstruir_resumos)
+        """CREATE TRIGGER IF NOT EXISTS resumos_conta_excluida BEFORE DELETE ON contas BEGIN
+               UPDATE resumo_diario SET depositos = resumo_diario.depositos - c.depositos, n_depositos = resumo_diario.n_depositos - c.n_depositos, saques = resumo_diario.saques - c.saques, n_saques = resumo_diario.n_saques - c.n_saques,
+                      transferencias = resumo_diario.transferencias - c.enviadas, n_transferencias = resumo_diario.n_transferencias - c.n_enviadas FROM resumo_diario_conta c WHERE c.conta_id = OLD.id AND resumo_diario.dia = c.dia;
+               UPDATE resumo_diario_cliente SET entradas = resumo_diario_cliente.entradas - c.depositos - c.recebidas, saidas = resumo_diario_cliente.saidas - c.saques - c.enviadas, movimentos = resumo_diario_cliente.movimentos - c.n_depositos - c.n_saques - c.n_enviadas - c.n_recebidas
+                      FROM resumo_diario_conta c WHERE c.conta_id = OLD.id AND resumo_diario_cliente.cliente_id = OLD.cliente_id AND resumo_diario_cliente.dia = c.dia;
+               UPDATE resumo_mensal_cliente SET entradas = resumo_mensal_cliente.entradas - c.entradas, saidas = resumo_mensal_cliente.saidas - c.saidas, movimentos = resumo_mensal_cliente.movimentos - c.movimentos
+                      FROM (SELECT substr(dia, 1, 7) AS mes, SUM(depositos + recebidas) AS entradas, SUM(saques + enviadas) AS saidas, SUM(n_depositos + n_saques + n_enviadas + n_recebidas) AS movimentos
+                            FROM resumo_diario_conta WHERE conta_id = OLD.id GROUP BY 1) c WHERE resumo_mensal_cliente.mes = c.mes AND resumo_mensal_cliente.cliente_id = OLD.cliente_id;
+               UPDATE resumo_mensal_transferencias SET quantidade = resumo_mensal_transferencias.quantidade - p.quantidade, centavos = resumo_mensal_transferencias.centavos - p.centavos
+                      FROM (SELECT substr(t.timestamp, 1, 7) AS mes, cd.cliente_id AS destino, COUNT(*) AS quantidade, SUM(CASE WHEN typeof(t.valor) = 'integer' THEN t.valor ELSE CAST(ROUND(t.valor * 100) AS INTEGER) END) AS centavos
+                            FROM transacoes t JOIN contas cd ON cd.id = t.conta_destino_id WHERE t.conta_id = OLD.id AND t.tipo = 'transferencia_enviada' AND t.id <= (SELECT ultimo_id FROM marcas_resumo WHERE nome = 'transacoes') GROUP BY 1, 2) p
+                      WHERE resumo_mensal_transferencias.mes = p.mes AND resumo_mensal_transferencias.cliente_origem_id = OLD.cliente_id AND resumo_mensal_transferencias.cliente_destino_id = p.destino;
+               DELETE FROM resumo_diario WHERE n_depositos + n_saques + n_transferencias = 0 AND dia IN (SELECT dia FROM resumo_diario_conta WHERE conta_id = OLD.id);
+               DELETE FROM resumo_diario_cliente WHERE cliente_id = OLD.cliente_id AND movimentos = 0;
+               DELETE FROM resumo_mensal_cliente WHERE cliente_id = OLD.cliente_id AND movimentos = 0;
+               DELETE FROM resumo_mensal_transferencias WHERE cliente_origem_id = OLD.cliente_id AND quantidade = 0;
+           END;""",
+    ]),
+    (10, "Agendamentos de movimentos (únicos e recorrentes) e registro das execuções por ocorrência", [
+        # Valor sempre em centavos; proxima = vencimento da ocorrência `ocorrencia` (NULL: encerrado ou cancelado). Datas no formato de transacoes.timestamp
+        """CREATE TABLE IF NOT EXISTS agendamentos (id INTEGER PRIMARY KEY AUTOINCREMENT, conta_id INTEGER NOT NULL, tipo TEXT NOT NULL CHECK (tipo IN ('deposito', 'saque', 'transferencia_enviada')),
+               centavos INTEGER NOT NULL CHECK (centavos > 0), conta_destino_id INTEGER, inicio TEXT NOT NULL, intervalo TEXT CHECK (intervalo IN ('diario', 'semanal', 'mensal')), repeticoes INTEGER,
+               ocorrencia INTEGER NOT NULL DEFAULT 0, proxima TEXT, descricao TEXT, criado_em TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+               FOREIGN KEY (conta_id) REFERENCES contas (id) ON DELETE CASCADE, FOREIGN KEY (conta_destino_id) REFERENCES contas (id) ON DELETE CASCADE);""",
+        "CREATE INDEX IF NOT EXISTS idx_agendamentos_proxima ON agendamentos (proxima) WHERE proxima IS NOT NULL;", # Vencidos em ordem, só os ativos
+        "CREATE INDEX IF NOT EXISTS idx_agendamentos_conta ON agendamentos (conta_id);", # Listagem por conta e cascata da exclusão
+        "CREATE INDEX IF NOT EXISTS idx_agendamentos_destino ON agendamentos (conta_destino_id) WHERE conta_destino_id IS NOT NULL;",
+        # Uma linha por ocorrência executada ou recusada: a chave primária impede postar a mesma ocorrência duas vezes
+        """CREATE TABLE IF NOT EXISTS execucoes_agendamento (agendamento_id INTEGER NOT NULL, ocorrencia INTEGER NOT NULL, vencimento TEXT NOT NULL, estado TEXT NOT NULL CHECK (estado IN ('executada', 'recusada')),
+               motivo TEXT, transacao_id INTEGER, executada_em TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP, PRIMARY KEY (agendamento_id, ocorrencia),
+               FOREIGN KEY (agendamento_id) REFERENCES agendamentos (id) ON DELETE CASCADE) WITHOUT ROWID;""",
+    ]),
+    (11, "Feed de alterações (outbox): saldo mudou, conta criada ou excluída, gravado pelos gatilhos na mesma transação", [
+        # Só cresce (seq AUTOINCREMENT nunca volta); quem exibe dados lê seq > último visto (FeedAlteracoes). Sem FK: a linha da conta excluída fica
+        "CREATE TABLE IF NOT EXISTS alteracoes (seq INTEGER PRIMARY KEY AUTOINCREMENT, tipo TEXT NOT NULL CHECK (tipo IN ('saldo', 'conta_criada', 'conta_excluida')), conta_id INTEGER NOT NULL, cliente_id INTEGER);",
+        # Gatilhos em contas cobrem todo escritor (postar_movimento, fila, lote, importação, agendamentos, fragmentos): uma linha por conta por UPDATE, não por lançamento
+        "CREATE TRIGGER IF NOT EXISTS alteracoes_saldo AFTER UPDATE OF saldo ON contas BEGIN INSERT INTO alteracoes (tipo, conta_id, cliente_id) VALUES ('saldo', NEW.id, NEW.cliente_id); END;",
+        "CREATE TRIGGER IF NOT EXISTS alteracoes_conta_criada AFTER INSERT ON contas BEGIN INSERT INTO alteracoes (tipo, conta_id, cliente_id) VALUES ('conta_criada', NEW.id, NEW.cliente_id); END;",
+        "CREATE TRIGGER IF NOT EXISTS alteracoes_conta_excluida AFTER DELETE ON contas BEGIN INSERT INTO alteracoes (tipo, conta_id, cliente_id) VALUES ('conta_excluida', OLD.id, OLD.cliente_id); END;", # Também na cascata de clientes
+        # Retenção: a cada 1000 alterações apaga as mais antigas que as últimas 100 mil (faixa da chave primária); leitor mais atrasado que isso recarrega tudo
+        "CREATE TRIGGER IF NOT EXISTS alteracoes_poda AFTER INSERT ON alteracoes WHEN NEW.seq % 1000 = 0 BEGIN DELETE FROM alteracoes WHERE seq <= NEW.seq - 100000; END;",
+    ]),
+]
+ESQUEMA_VERSAO = MIGRACOES[-1][0]
+BLOCO_IDS_FRAGMENTO = 10 ** 12 # Faixa de IDs (clientes, contas, transações) de cada fragmento: o fragmento de um ID é id // BLOCO_IDS_FRAGMENTO
+# Estado do esquema numa consulta só (initialize_db): user_version, nº de objetos, valores em centavos?, schema_version
+SQL_SONDA_ESQUEMA = """SELECT (SELECT user_version FROM pragma_user_version), (SELECT COUNT(*) FROM sqlite_master),
+                              (SELECT upper(type) = 'INTEGER' FROM pragma_table_info('transacoes') WHERE name = 'valor'), (SELECT schema_version FROM pragma_schema_version)"""
+
+# Modo centavos (converter_para_centavos): as mesmas tabelas com os valores monetários em INTEGER (centavos) em vez de REAL (reais)
+TABELAS_CENTAVOS = {
+    'contas': "CREATE TABLE IF NOT EXISTS {nome} (id INTEGER PRIMARY KEY AUTOINCREMENT, numero TEXT NOT NULL UNIQUE, agencia TEXT NOT NULL DEFAULT '0001', saldo INTEGER NOT NULL DEFAULT 0, limite INTEGER DEFAULT 50000, limite_saques INTEGER DEFAULT 3, tipo_conta TEXT NOT NULL DEFAULT 'corrente', cliente_id INTEGER NOT NULL, FOREIGN KEY (cliente_id) REFERENCES clientes (id) ON DELETE CASCADE);",
+    'transacoes': "CREATE TABLE IF NOT EXISTS {nome} (id INTEGER PRIMARY KEY AUTOINCREMENT, conta_id INTEGER NOT NULL, tipo TEXT NOT NULL CHECK(tipo IN ('deposito', 'saque', 'transferencia_enviada', 'transferencia_recebida')), valor INTEGER NOT NULL, timestamp DATETIME DEFAULT CURRENT_TIMESTAMP, conta_destino_id INTEGER DEFAULT NULL, FOREIGN KEY (conta_id) REFERENCES contas (id) ON DELETE CASCADE, FOREIGN KEY (conta_destino_id) REFERENCES contas(id));",
+    'fechamentos': "CREATE TABLE IF NOT EXISTS {nome} (conta_id INTEGER NOT NULL, periodo TEXT NOT NULL, saldo INTEGER NOT NULL, transacoes INTEGER NOT NULL DEFAULT 0, PRIMARY KEY (conta_id, periodo), FOREIGN KEY (conta_id) REFERENCES contas (id) ON DELETE CASCADE) WITHOUT ROWID;",
+}
+COLUNAS_MONETARIAS = {'contas': ('saldo', 'limite'), 'transacoes': ('valor',), 'fechamentos': ('saldo',)} # As demais colunas são copiadas como estão
+# Conversão online do ledger: cópia em centavos + gatilhos que espelham as escritas concorrentes (caem junto com a tabela antiga na troca)
+SQL_LINHA_CENTAVOS = "(id, conta_id, tipo, valor, timestamp, conta_destino_id) VALUES (NEW.id, NEW.conta_id, NEW.tipo, CAST(ROUND(NEW.valor * 100) AS INTEGER), NEW.timestamp, NEW.conta_destino_id)"
+COPIA_CENTAVOS = [
+    TABELAS_CENTAVOS['transacoes'].format(nome="transacoes_centavos"),
+    "CREATE INDEX IF NOT EXISTS idx_transacoes_centavos_conta_ts_id ON transacoes_centavos (conta_id, timestamp, id, tipo, valor, conta_destino_id);", # Mantido linha a linha: a troca não reconstrói índice
+    f"CREATE TRIGGER IF NOT EXISTS transacoes_centavos_ai AFTER INSERT ON transacoes BEGIN INSERT OR REPLACE INTO transacoes_centavos {SQL_LINHA_CENTAVOS}; END;",
+    f"CREATE TRIGGER IF NOT EXISTS transacoes_centavos_au AFTER UPDATE ON transacoes BEGIN DELETE FROM transacoes_centavos WHERE id = OLD.id; INSERT OR REPLACE INTO transacoes_centavos {SQL_LINHA_CENTAVOS}; END;",
+    "CREATE TRIGGER IF NOT EXISTS transacoes_centavos_ad AFTER DELETE ON transacoes BEGIN DELETE FROM transacoes_centavos WHERE id = OLD.id; END;",
+]
+
+# --- Valores monetários ---
+
+@total_ordering
+class Dinheiro:
+    """Valor em reais guardado como inteiro de centavos (tratado como imutável): soma e compara sem erro de arredondamento de float.
+
+    Dinheiro(1050) é R$ 10,50; Dinheiro.de(10.5) e Dinheiro.parse("10,50") também. Formata como Decimal (f"{d:.2f}")."""
+    __slots__ = ('centavos',)
+    _RE_TEXTO = re.compile(r"([+-]?)(\d*)(?:\.(\d{0,2}))?")
+
+    def __init__(self, centavos: int = 0):
+        if isinstance(centavos, bool) or not isinstance(centavos, int): raise TypeError(f"centavos deve ser int, não {type(centavos).__name__}")
+        self.centavos = centavos
+
+    @classmethod
+    def de(cls, valor) -> 'Dinheiro':
+        """Converte Dinheiro, texto (ver parse) ou número em reais (int, float arredondado ao centavo, Decimal)."""
+        if isinstance(valor, Dinheiro): return valor
+        if isinstance(valor, str): return cls.parse(valor)
+        if isinstance(valor, bool): raise TypeError("valor monetário não pode ser bool")
+        if isinstance(valor, int): return cls(valor * 100)
+        if isinstance(valor, float):
+            if not math.isfinite(valor): raise ValueError(f"valor monetário inválido: {valor}")
+            return cls(round(valor * 100)) # Mesmo arredondamento do CAST(ROUND(valor * 100) AS INTEGER) da conversão do BD
+        if isinstance(valor, Decimal):
+            if not valor.is_finite(): raise ValueError(f"valor monetário inválido: {valor}")
+            return cls(int((valor * 100).to_integral_value(ROUND_HALF_UP)))
+        raise TypeError(f"valor monetário não suportado: {type(valor).__name__}")
+
+    @classmethod
+    def parse(cls, texto: str) -> 'Dinheiro':
+        """Lê "1.234,56", "1234.56", "10,5" ou "R$ 10" (no máximo 2 casas decimais); levanta ValueError se inválido."""
+        limpo = texto.strip().removeprefix("R$").replace(" ", "")
+        if "," in limpo: limpo = limpo.replace(".", "").replace(",", ".") # Vírgula decimal: pontos são separadores de milhar
+        elif limpo.count(".") > 1: limpo = limpo.replace(".", "") # "1.234.567": só milhar
+        achou = cls._RE_TEXTO.fullmatch(limpo)
+        if not achou or not (achou[2] or achou[3]): raise ValueError(f"valor monetário inválido: {texto!r}")
+        centavos = int(achou[2] or 0) * 100 + int((achou[3] or "").ljust(2, "0"))
+        return cls(-centavos if achou[1] == "-" else centavos)
+
+    def reais(self) -> Decimal: return Decimal(self.centavos).scaleb(-2)
+
+    def _outro(self, outro) -> 'Dinheiro | None':
+        try: return Dinheiro.de(outro) if isinstance(outro, (Dinheiro, int, float, Decimal)) else None
+        except (TypeError, ValueError): return None
+
+    def __add__(self, outro):
+        outro = self._outro(outro)
+        return NotImplemented if outro is None else Dinheiro(self.centavos + outro.centavos)
+    __radd__ = __add__ # sum() começa em 0
+
+    def __sub__(self, outro):
+        outro = self._outro(outro)
+        return NotImplemented if outro is None else Dinheiro(self.centavos - outro.centavos)
+
+    def __rsub__(self, outro):
+        outro = self._outro(outro)
+        return NotImplemented if outro is None else Dinheiro(outro.centavos - self.centavos)
+
+    def __mul__(self, fator):
+        return Dinheiro(self.centavos * fator) if isinstance(fator, int) and not isinstance(fator, bool) else NotImplemented
+    __rmul__ = __mul__
+
+    def __neg__(self): return Dinheiro(-self.centavos)
+    def __abs__(self): return Dinheiro(abs(self.centavos))
+    def __bool__(self): return self.centavos != 0
+    def __float__(self): return self.centavos / 100
+
+    @staticmethod
+    def _numero(outro) -> bool: return isinstance(outro, (int, float, Decimal)) and not isinstance(outro, bool)
+
+    def __eq__(self, outro): # Outros números comparam pelo valor exato (fração centavos/100), como Decimal: Dinheiro(30) == Decimal("0.3"), mas != 0.3 (float binário)
+        if isinstance(outro, Dinheiro): return self.centavos == outro.centavos
+        return Fraction(self.centavos, 100) == outro if self._numero(outro) else NotImplemented
+
+    def __lt__(self, outro):
+        if isinstance(outro, Dinheiro): return self.centavos < outro.centavos
+        return Fraction(self.centavos, 100) < outro if self._numero(outro) else NotImplemented
+
+    def __hash__(self): return hash(Fraction(self.centavos, 100)) # Igual ao de int/float/Decimal de mesmo valor (que comparam iguais)
+    def __format__(self, spec: str) -> str: return format(self.reais(), spec)
+    def __str__(self) -> str: return str(self.reais())
+    def __repr__(self) -> str: return f"Dinheiro('{self.reais()}')"
+
+class AlocadorNumerosConta:
+    """Entrega números de conta reservados na tabela sequencias, um bloco por vez (thread-safe)."""
+    def __init__(self, db: 'DatabaseManager', tamanho_bloco: int = 1):
+        self.db = db; self.tamanho_bloco = tamanho_bloco; self._lock = threading.Lock()
+        self._bloco = iter(()) # Números já reservados no BD e ainda não entregues
+
+    def proximo(self) -> str:
+        """Próximo número livre; reserva um novo bloco quando o atual se esgota."""
+        with self._lock:
+            numero = next(self._bloco, None)
+            if numero is None:
+                self._bloco = iter(self.db.reservar_numeros_conta(self.tamanho_bloco)); numero = next(self._bloco)
+            return str(numero)
+
+    def descartar(self):
+        """Abandona o restante do bloco (os números pulados nunca são reutilizados)."""
+        with self._lock: self._bloco = iter(())
+
+class MapaIdentidade:
+    """Cache LRU limitado de objetos do modelo por ID, com uma chave secundária opcional (CPF ou número da conta)."""
+    def __init__(self, capacidade: int = 1024):
+        self.capacidade = capacidade; self._lock = threading.RLock()
+        self._por_id: OrderedDict = OrderedDict(); self._id_por_chave: dict = {}; self._chave_por_id: dict = {}
+        self.acertos = 0; self.falhas = 0; self.despejos = 0
+
+    def obter(self, obj_id):
+        """Retorna o objeto em cache (marcando-o como recente) ou None."""
+        with self._lock:
+            obj = self._por_id.get(obj_id)
+            if obj is None: self.falhas += 1; return None
+            self._por_id.move_to_end(obj_id); self.acertos += 1; return obj
+
+    def obter_por_chave(self, chave):
+        """Busca pela chave secundária (CPF/número)."""
+        with self._lock:
+            obj_id = self._id_por_chave.get(chave)
+            if obj_id is None: self.falhas += 1; return None
+            return self.obter(obj_id)
+
+    def contem(self, obj_id, obj) -> bool:
+        """True se obj é o objeto em cache para obj_id; não conta acerto/falha nem mexe na ordem LRU."""
+        with self._lock: return self._por_id.get(obj_id) is obj
+
+    def guardar(self, obj_id, obj, chave=None):
+        """Insere/atualiza o objeto e despeja o menos usado se passar da capacidade."""
+        if self.capacidade <= 0 or obj_id is None: return
+        with self._lock:
+            chave_antiga = self._chave_por_id.pop(obj_id, None)
+            if chave_antiga is not None: self._id_por_chave.pop(chave_antiga, None)
+            self._por_id[obj_id] = obj; self._por_id.move_to_end(obj_id)
+            if chave is not None: self._id_por_chave[chave] = obj_id; self._chave_por_id[obj_id] = chave
+            while len(self._por_id) > self.capacidade:
+                antigo_id, _ = self._por_id.popitem(last=False); self.despejos += 1
+                chave_antiga = self._chave_por_id.pop(antigo_id, None)
+                if chave_antiga is not None: self._id_por_chave.pop(chave_antiga, None)
+
+    def invalidar(self, obj_id):
+        """Remove um objeto do cache (após exclusão ou alteração feita fora dele)."""
+        with self._lock:
+            self._por_id.pop(obj_id, None); chave = self._chave_por_id.pop(obj_id, None)
+            if chave is not None: self._id_por_chave.pop(chave, None)
+
+    def invalidar_onde(self, condicao):
+        """Remove todos os objetos em cache que satisfazem condicao(obj)."""
+        with self._lock:
+            for obj_id in [i for i, obj in self._por_id.items() if condicao(obj)]: self.invalidar(obj_id)
+
+    def limpar(self):
+        with self._lock: self._por_id.clear(); self._id_por_chave.clear(); self._chave_por_id.clear()
+
+    def estatisticas(self) -> dict:
+        """Contadores de acertos/falhas/despejos e ocupação."""
+        with self._lock:
+            total = self.acertos + self.falhas
+            return {'tamanho': len(self._por_id), 'capacidade': self.capacidade, 'acertos': self.acertos, 'falhas': self.falhas,
+                    'despejos': self.despejos, 'taxa_acerto': self.acertos / total if total else 0.0}
+
+# --- Instrumentação das consultas (tempo por instrução, por forma de consulta, commits e conexões) ---
+
+LIMITES_HISTOGRAMA_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000) # Baldes fixos; o último conta tudo acima de 1 s
+_RE_LISTA_PARAMETROS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)") # IN (?, ?, ...) de tamanho variável vira uma forma só
+_RE_LITERAIS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+class EstatisticaTempo:
+    """Chamadas, erros, linhas, soma, máximo e histograma (LIMITES_HISTOGRAMA_MS) de uma série de durações em ms."""
+    __slots__ = ('chamadas', 'erros', 'linhas', 'total', 'maximo', 'baldes')
+    def __init__(self):
+        self.chamadas = 0; self.erros = 0; self.linhas = 0; self.total = 0.0; self.maximo = 0.0; self.baldes = [0] * (len(LIMITES_HISTOGRAMA_MS) + 1)
+
+    def registrar(self, ms: float, linhas: int = 0, erro: bool = False):
+        self.chamadas += 1; self.linhas += linhas; self.total += ms; self.baldes[bisect_left(LIMITES_HISTOGRAMA_MS, ms)] += 1
+        if ms > self.maximo: self.maximo = ms
+        if erro: self.erros += 1
+
+    def somar(self, outra: 'EstatisticaTempo'):
+        """Acumula outra série (formas iguais vindas de strings SQL diferentes)."""
+        self.chamadas += outra.chamadas; self.erros += outra.erros; self.linhas += outra.linhas; self.total += outra.total; self.maximo = max(self.maximo, outra.maximo)
+        self.baldes = [a + b for a, b in zip(self.baldes, outra.baldes)]
+
+    def percentil(self, p: float) -> float:
+        """Limite superior (ms) do balde que contém o percentil p (0-100); acima do último limite, o máximo observado."""
+        if not self.chamadas: return 0.0
+        alvo = self.chamadas * p / 100.0; acumulado = 0
+        for i, n in enumerate(self.baldes):
+            acumulado += n
+            if acumulado >= alvo: return min(LIMITES_HISTOGRAMA_MS[i], self.maximo) if i < len(LIMITES_HISTOGRAMA_MS) else self.maximo
+        return self.maximo
+
+    def como_dict(self) -> dict:
+        return {'chamadas': self.chamadas, 'erros': self.erros, 'linhas': self.linhas, 'total_ms': self.total, 'media_ms': self.total / self.chamadas if self.chamadas else 0.0,
+                'max_ms': self.maximo, 'p50_ms': self.percentil(50), 'p95_ms': self.percentil(95), 'p99_ms': self.percentil(99),
+                'histograma': dict(zip([f"<={l}ms" for l in LIMITES_HISTOGRAMA_MS] + [f">{LIMITES_HISTOGRAMA_MS[-1]}ms"], self.baldes))}
+
+def forma_consulta(sql: str) -> str:
+    """SQL normalizado para agrupar métricas: espaços colapsados, literais e listas IN (?, ?, ...) viram '?'."""
+    return _RE_LITERAIS.sub("?", _RE_LISTA_PARAMETROS.sub("(?, ...)", " ".join(sql.split())))[:500]
+
+class MetricasConsultas:
+    """Agrega os tempos medidos por ConexaoInstrumentada e mantém o log das consultas lentas (com EXPLAIN QUERY PLAN).
+
+    O caminho quente não usa lock: cada thread soma na sua própria tabela string SQL -> série, e o snapshot junta as tabelas
+    e agrupa por forma (forma_consulta). Parâmetros não são guardados (podem conter senhas/CPFs). O plano é capturado uma vez por forma."""
+    def __init__(self, *, limiar_lenta_ms: float | None = 100.0, max_lentas: int = 100, max_consultas: int = 4096, explicar: bool = True):
+        self.limiar_lenta_ms = limiar_lenta_ms; self.max_consultas = max_consultas; self.explicar = explicar; self._lock = threading.Lock()
+        self._limiar = float('inf') if limiar_lenta_ms is None else limiar_lenta_ms
+        self._local = threading.local(); self._tabelas: list[dict[str, EstatisticaTempo]] = []; self._planos: dict[str, list[str] | None] = {}
+        self.commits = EstatisticaTempo(); self.conexoes = EstatisticaTempo(); self.lentas: deque = deque(maxlen=max_lentas); self.desde = time.time()
+
+    def _tabela_da_thread(self) -> dict:
+        tabela = self._local.tabela = {}
+        with self._lock: self._tabelas.append(tabela)
+        return tabela
+
+    def _serie(self, tabela: dict, sql: str) -> EstatisticaTempo:
+        if len(tabela) >= self.max_consultas: sql = "<outras>" # SQL montado com valores embutidos não cresce sem limite
+        return tabela.setdefault(sql, EstatisticaTempo())
+
+    def registrar(self, sql: str, segundos: float, linhas: int = 0, erro: bool = False, conn: sqlite3.Connection | None = None, params=None):
+        """Conta uma execução; se passar do limiar, registra no log de lentas (conn/params permitem capturar o plano)."""
+        try: tabela = self._local.tabela
+        except AttributeError: tabela = self._tabela_da_thread()
+        ms = segundos * 1000.0; (tabela.get(sql) or self._serie(tabela, sql)).registrar(ms, linhas, erro)
+        if ms >= self._limiar: self._registrar_lenta(sql, ms, conn, params)
+
+    def _registrar_lenta(self, sql: str, ms: float, conn, params):
+        forma = forma_consulta(sql)
+        if self.explicar and forma not in self._planos and conn is not None and params is not None:
+            try: self._planos[forma] = [row[-1] for row in sqlite3.Cursor(conn).execute("EXPLAIN QUERY PLAN " + sql, params)] # Cursor simples: não é medido
+            except sqlite3.Error: self._planos[forma] = None # Script, instrução sem plano ou conexão já fechada
+        entrada = {'quando': time.time(), 'ms': ms, 'forma': forma, 'thread': threading.current_thread().name, 'plano': self._planos.get(forma)}
+        with self._lock: self.lentas.append(entrada)
+        print(f"Consulta lenta ({ms:.1f} ms): {forma[:200]}")
+
+    def registrar_commit(self, segundos: float):
+        with self._lock: self.commits.registrar(segundos * 1000.0)
+
+    def registrar_conexao(self, segundos: float):
+        with self._lock: self.conexoes.registrar(segundos * 1000.0)
+
+    def snapshot(self) -> dict:
+        """Cópia das métricas (as threads continuam somando durante a leitura): formas por tempo total, commits, conexões e lentas recentes."""
+        por_forma: dict[str, EstatisticaTempo] = {}
+        with self._lock:
+            for tabela in self._tabelas:
+                for sql, estatistica in list(tabela.items()): por_forma.setdefault(forma_consulta(sql), EstatisticaTempo()).somar(estatistica)
+            commits = self.commits.como_dict(); conexoes = self.conexoes.como_dict(); lentas = list(self.lentas)
+        formas = sorted(({'forma': forma, **e.como_dict()} for forma, e in por_forma.items()), key=lambda f: f['total_ms'], reverse=True)
+        return {'desde': self.desde, 'limiar_lenta_ms': self.limiar_lenta_ms, 'consultas': formas, 'commits': commits, 'conexoes': conexoes, 'lentas': lentas}
+
+    def limpar(self):
+        """Zera contadores e o log de lentas (os planos capturados continuam válidos)."""
+        with self._lock:
+            for tabela in self._tabelas: tabela.clear()
+            self.commits = EstatisticaTempo(); self.conexoes = EstatisticaTempo(); self.lentas.clear(); self.desde = time.time()
+
+class CursorInstrumentado(sqlite3.Cursor):
+    """Cursor que mede execute/executemany/executescript; para SELECTs, o tempo inclui a leitura por fetchone/fetchmany/fetchall.
+
+    A medição de um SELECT termina no fetchone, no fetchall ou no fetchmany que esgota o resultado (ou no próximo execute/close);
+    linhas lidas iterando o cursor diretamente não entram no tempo."""
+    _pendente = None # [sql, params, segundos acumulados, linhas] do SELECT ainda sendo lido
+
+    def _concluir(self):
+        pendente = self._pendente; self._pendente = None
+        self.connection.metricas.registrar(pendente[0], pendente[2], pendente[3], False, self.connection, pendente[1])
+
+    def execute(self, sql, params=()):
+        if self._pendente is not None: self._concluir()
+        inicio = time.perf_counter()
+        try: sqlite3.Cursor.execute(self, sql, params)
+        except sqlite3.Error: self.connection.metricas.registrar(sql, time.perf_counter() - inicio, 0, True); raise
+        segundos = time.perf_counter() - inicio
+        if self.description is not None: self._pendente = [sql, params, segundos, 0]
+        else: self.connection.metricas.registrar(sql, segundos, max(self.rowcount, 0), False, self.connection, params)
+        return self
+
+    def executemany(self, sql, seq_params):
+        if self._pendente is not None: self._concluir()
+        inicio = time.perf_counter()
+        try: sqlite3.Cursor.executemany(self, sql, seq_params)
+        except sqlite3.Error: self.connection.metricas.registrar(sql, time.perf_counter() - inicio, 0, True); raise
+        self.connection.metricas.registrar(sql, time.perf_counter() - inicio, max(self.rowcount, 0)); return self
+
+    def executescript(self, script):
+        if self._pendente is not None: self._concluir()
+        inicio = time.perf_counter()
+        try: sqlite3.Cursor.executescript(self, script)
+        except sqlite3.Error: self.connection.metricas.registrar(script, time.perf_counter() - inicio, 0, True); raise
+        self.connection.metricas.registrar(script, time.perf_counter() - inicio); return self
+
+    def fetchone(self):
+        pendente = self._pendente
+        if pendente is None: return sqlite3.Cursor.fetchone(self)
+        inicio = time.perf_counter(); linha = sqlite3.Cursor.fetchone(self); pendente[2] += time.perf_counter() - inicio
+        if linha is not None: pendente[3] += 1
+        self._concluir(); return linha
+
+    def fetchall(self):
+        pendente = self._pendente
+        if pendente is None: return sqlite3.Cursor.fetchall(self)
+        inicio = time.perf_counter(); linhas = sqlite3.Cursor.fetchall(self); pendente[2] += time.perf_counter() - inicio; pendente[3] += len(linhas)
+        self._concluir(); return linhas
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size; pendente = self._pendente
+        if pendente is None: return sqlite3.Cursor.fetchmany(self, size)
+        inicio = time.perf_counter(); linhas = sqlite3.Cursor.fetchmany(self, size); pendente[2] += time.perf_counter() - inicio; pendente[3] += len(linhas)
+        if len(linhas) < size: self._concluir() # Resultado esgotado
+        return linhas
+
+    def close(self):
+        if self._pendente is not None: self._concluir()
+        sqlite3.Cursor.close(self)
+
+    def __del__(self):
+        if self._pendente is not None:
+            try: self._concluir()
+            except Exception: pass
+
+class ConexaoInstrumentada(sqlite3.Connection):
+    """Conexão cujos cursores são CursorInstrumentado e cujos commits são medidos (métricas em self.metricas)."""
+    metricas: MetricasConsultas
+    def cursor(self, factory=CursorInstrumentado): return sqlite3.Connection.cursor(self, factory)
+    def execute(self, sql, params=()): return sqlite3.Connection.cursor(self, CursorInstrumentado).execute(sql, params) # Via cursor(): herda o row_factory
+    def executemany(self, sql, seq_params): return sqlite3.Connection.cursor(self, CursorInstrumentado).executemany(sql, seq_params)
+    def executescript(self, script): return sqlite3.Connection.cursor(self, CursorInstrumentado).executescript(script)
+
+    def commit(self):
+        inicio = time.perf_counter()
+        try: sqlite3.Connection.commit(self)
+        finally: self.metricas.registrar_commit(time.perf_counter() - inicio)
+
 class DatabaseManager:
     """Gerencia a conexão e as operações com o banco de dados SQLite."""
-    def __init__(self, db_name="banco_moderno_v6_ptbr.db"): # Novo nome
-        self.db_name = db_name
+    def __init__(self, db_name="banco_moderno_v6_ptbr.db", *, pool=False, synchronous="NORMAL", cache_size=-16000, cached_statements=256, busy_timeout=5000, capacidade_cache=1024, capacidade_extratos=16, metricas=True, limiar_lenta_ms=100.0, arquivo=None, centavos=True, fragmento=None): # Novo nome
+        self.db_name = db_name; self.busy_timeout = busy_timeout # ms que o SQLite espera por uma trava antes de devolver "database is locked"
+        # Modo pool: uma conexão persistente por thread (WAL + PRAGMAs aplicados uma única vez)
+        self.pool = pool; self.synchronous = synchronous; self.cache_size = cache_size; self.cached_statements = cached_statements
+        self._local = threading.local(); self._conexoes_pool: list[sqlite3.Connection] = []; self._lock_pool = threading.Lock(); self._fechado = False
+        self.arquivo = arquivo or os.path.splitext(db_name)[0] + "_arquivo.db" # Histórico de períodos arquivados (arquivar_periodos)
+        # Unidade dos valores monetários no BD, lida do esquema: centavos (INTEGER) ou reais (REAL, BDs antigos até converter_para_centavos)
+        self.em_centavos = False; self._versao_esquema = None; self._centavos_novo = centavos # centavos=True: BD criado agora já nasce em centavos
+        self.fila_postagem: 'FilaPostagem | None' = None # Opcional: group commit dos movimentos (ver iniciar_fila_postagem)
+        # Fragmento k de um BancoParticionado (particionamento.py): IDs a partir de k * BLOCO_IDS_FRAGMENTO; None = banco de arquivo único
+        self.fragmento = fragmento; self.particionado = None # O BancoParticionado dono (transferências para contas de outro fragmento)
+        # Mapas de identidade (um objeto por ID); capacidade_cache=0 desativa
+        self.cache_clientes = MapaIdentidade(capacidade_cache); self.cache_contas = MapaIdentidade(capacidade_cache)
+        self.cache_extratos = MapaIdentidade(capacidade_extratos) # Extratos já formatados por (conta, completo); cada um guarda o texto inteiro já carregado
+        self.numeros_conta = AlocadorNumerosConta(self) # Números de conta via sequência no BD (seguro entre instâncias)
+        self.metricas = MetricasConsultas(limiar_lenta_ms=limiar_lenta_ms) if metricas else None # Tempo por instrução/commit/conexão (metricas=False: conexões comuns)
+        self.avisos: list[tuple[str, str]] = [] # (título, texto) para a interface mostrar depois de abrir o BD (ex.: ADMIN criado)
         self.initialize_db() # Cria tabelas se não existirem
 
     def _connect(self):
-        """Estabelece a conexão com o banco de dados."""
+        """Estabelece a conexão com o banco de dados (ou reutiliza a da thread no modo pool)."""
+        if self.pool:
+            conn = getattr(self._local, 'conn', None)
+            if conn is not None: return conn
+            if self._fechado: raise sqlite3.ProgrammingError("DatabaseManager já foi fechado.")
         try:
-            conn = sqlite3.connect(self.db_name)
+            inicio = time.perf_counter(); fabrica = ConexaoInstrumentada if self.metricas is not None else sqlite3.Connection
+            conn = sqlite3.connect(self.db_name, check_same_thread=not self.pool, cached_statements=self.cached_statements, factory=fabrica)
+            if self.metricas is not None: conn.metricas = self.metricas
             conn.execute("PRAGMA foreign_keys = ON;") # Habilita chaves estrangeiras
+            conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout)};") # Espera a trava de escrita em vez de falhar na hora
             conn.row_factory = sqlite3.Row # Retorna resultados como dicionários
+            if self.pool: # Conexão de longa duração: configura WAL, sincronismo e cache de páginas
+                conn.execute("PRAGMA journal_mode = WAL;"); conn.execute(f"PRAGMA synchronous = {self.synchronous};"); conn.execute(f"PRAGMA cache_size = {int(self.cache_size)};")
+                self._local.conn = conn
+                with self._lock_pool: self._conexoes_pool.append(conn)
+            if self.metricas is not None: self.metricas.registrar_conexao(time.perf_counter() - inicio) # Abertura + PRAGMAs
             return conn
         except sqlite3.Error as e:
             print(f"Erro ao conectar ao BD: {e}")
-            messagebox.showerror("Erro Crítico de BD", f"Não foi possível conectar ao banco de dados:\n{e}")
-            raise # Re-levanta a exceção para interromper
+            raise # Re-levanta a exceção para interromper (sem diálogo: roda também no serviço, no servidor e nas CLIs; a interface avisa)
+
+    def _connect_arquivo(self):
+        """Conexão de leitura com o banco de arquivo (uma por thread no modo pool) ou None se ainda não há arquivo.
+
+        É separada da conexão principal: anexar o arquivo nela faria todo BEGIN IMMEDIATE travar também o arquivo."""
+        conn = getattr(self._local, 'conn_arquivo', None) if self.pool else None
+        if conn is not None: return conn
+        if self.pool and self._fechado: raise sqlite3.ProgrammingError("DatabaseManager já foi fechado.")
+        if not os.path.exists(self.arquivo): return None
+        fabrica = ConexaoInstrumentada if self.metricas is not None else sqlite3.Connection
+        conn = sqlite3.connect(self.arquivo, check_same_thread=not self.pool, cached_statements=self.cached_statements, factory=fabrica)
+        if self.metricas is not None: conn.metricas = self.metricas
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout)};"); conn.row_factory = sqlite3.Row
+        if self.pool:
+            self._local.conn_arquivo = conn
+            with self._lock_pool: self._conexoes_pool.append(conn)
+        return conn
+
+    def _release(self, conn):
+        """Devolve a conexão: fecha no modo simples, mantém aberta no modo pool."""
+        if conn is None: return
+        if not self.pool: conn.close()
+        elif conn.in_transaction: conn.rollback() # Nunca deixa transação pendurada na conexão da thread
+
+    def reconstruir_contadores_saques(self) -> int:
+        """Recalcula saques_diarios a partir de transacoes (numa única transação) e retorna o número de linhas."""
+        def reconstruir(cursor):
+            cursor.execute("DELETE FROM saques_diarios"); cursor.execute(SQL_RECONSTRUIR_SAQUES_DIARIOS)
+            return cursor.execute("SELECT COUNT(*) FROM saques_diarios").fetchone()[0]
+        return self.executar_transacao(reconstruir)
+
+    def verificar_contadores_saques(self) -> list[tuple[int, str, int, int]]:
+        """Compara saques_diarios com o ledger; retorna (conta_id, dia, contador, real) para cada divergência."""
+        q = f"""WITH r AS ({SQL_CONTAGEM_SAQUES_LEDGER})
+                SELECT r.conta_id, r.dia, COALESCE(s.total, 0), r.total FROM r LEFT JOIN saques_diarios s ON s.conta_id = r.conta_id AND s.dia = r.dia WHERE COALESCE(s.total, 0) != r.total
+                UNION ALL
+                SELECT s.conta_id, s.dia, s.total, 0 FROM saques_diarios s WHERE s.total != 0 AND NOT EXISTS (SELECT 1 FROM r WHERE r.conta_id = s.conta_id AND r.dia = s.dia)"""
+        return [tuple(row) for row in self.fetch_all(q)]
+
+    def reservar_numeros_conta(self, quantidade: int = 1) -> range:
+        """Reserva atomicamente `quantidade` números de conta consecutivos e retorna o intervalo reservado."""
+        if quantidade < 1: raise ValueError("quantidade deve ser >= 1")
+        return self.executar_transacao(lambda cursor: reservar_sequencia(cursor, quantidade))
+
+    def sincronizar_sequencia_contas(self) -> int:
+        """Avança a sequência para depois do maior número existente (contas inseridas com número explícito); retorna o próximo."""
+        self.numeros_conta.descartar() # Bloco em memória pode ter ficado para trás
+        return self.executar_transacao(sincronizar_sequencia_contas)
+
+    def estatisticas_cache(self) -> dict:
+        """Acertos/falhas dos mapas de identidade de clientes e contas e do cache de extratos."""
+        return {'clientes': self.cache_clientes.estatisticas(), 'contas': self.cache_contas.estatisticas(), 'extratos': self.cache_extratos.estatisticas()}
+
+    def _detectar_modo(self, conn=None):
+        """Relê no esquema se os valores estão em centavos (transacoes.valor INTEGER), junto com o schema_version em que isso vale."""
+        q = "SELECT upper(type) = 'INTEGER', (SELECT schema_version FROM pragma_schema_version) FROM pragma_table_info('transacoes') WHERE name = 'valor'"
+        row = conn.execute(q).fetchone() if conn is not None else self.fetch_one(q)
+        if row is not None: self.em_centavos, self._versao_esquema = bool(row[0]), row[1]
+
+    def para_bd(self, valor):
+        """Valor monetário (Dinheiro, texto ou número em reais) na unidade gravada no BD: int de centavos ou float de reais."""
+        valor = Dinheiro.de(valor); return valor.centavos if self.em_centavos else float(valor)
+
+    def de_bd(self, valor) -> Dinheiro | None:
+        """Valor monetário lido do BD (na unidade do modo atual) como Dinheiro; None continua None."""
+        if valor is None: return None
+        return Dinheiro(int(valor)) if self.em_centavos else Dinheiro.de(float(valor))
+
+    def sql_centavos(self, expr: str) -> str:
+        """Expressão SQL de um valor monetário do BD em centavos inteiros (para somar/comparar sem float)."""
+        return expr if self.em_centavos else sql_em_centavos(expr)
+
+    def sql_reais(self, expr: str) -> str:
+        """Expressão SQL de um valor monetário do BD em reais (para exportar/exibir)."""
+        return f"({expr}) / 100.0" if self.em_centavos else expr
+
+    def converter_para_centavos(self, *, online: bool = True, lote: int = 5_000, pausa: float = 0.02, ao_progresso=None) -> dict:
+        """Passa contas.saldo/limite, transacoes.valor e fechamentos.saldo (e o banco de arquivo) de REAL em reais para INTEGER em centavos.
+
+        online=True não para as escritas: o ledger é copiado para transacoes_centavos em janelas de `lote` IDs, cada uma
+        numa transação curta seguida de `pausa` segundos sem a trava (sem ela, quem espera no busy_timeout nunca acha a
+        brecha entre uma janela e outra), enquanto gatilhos espelham o que outras conexões gravam; só a troca final (ledger renomeado,
+        contas/fechamentos/arquivo reconstruídos) segura a trava de escrita. Interrompida, basta rodar de novo (a cópia
+        recomeça ignorando o que já foi copiado). O índice do ledger passa a se chamar idx_transacoes_centavos_conta_ts_id
+        (o SQLite não renomeia índices). online=False reconstrói tudo de uma vez (BD vazio ou parado). ao_progresso(copiadas, ultimo_id)."""
+        inicio = time.perf_counter(); r = {'transacoes': 0, 'contas': 0, 'fechamentos': 0, 'arquivo': 0}
+        conn = sqlite3.connect(self.db_name, timeout=self.busy_timeout / 1000, isolation_level=None) # Transações explícitas abaixo
+        try:
+            conn.execute("PRAGMA foreign_keys = OFF;") # A troca recria tabelas referenciadas: DROP/RENAME não podem disparar cascatas
+            conn.execute("PRAGMA legacy_alter_table = ON;") # O RENAME não revalida gatilhos de outras tabelas (resumos_conta_excluida lê transacoes, ausente no meio da troca)
+            if os.path.exists(self.arquivo): conn.execute("ATTACH DATABASE ? AS arquivo", (self.arquivo,)) # ATTACH não pode acontecer dentro da transação
+            arquivo_em_reais = os.path.exists(self.arquivo) and _tipo_valor(conn, 'arquivo') == 'REAL'
+            if _tipo_valor(conn) == 'REAL' and online:
+                conn.execute("BEGIN IMMEDIATE")
+                for sql in COPIA_CENTAVOS: conn.execute(sql)
+                ultimo = conn.execute("SELECT COALESCE(MAX(id), 0) FROM transacoes").fetchone()[0]; conn.execute("COMMIT") # Daqui em diante os gatilhos copiam
+                for de in range(0, ultimo, lote):
+                    conn.execute("BEGIN IMMEDIATE")
+                    r['transacoes'] += conn.execute(f"INSERT OR IGNORE INTO transacoes_centavos SELECT id, conta_id, tipo, {sql_em_centavos('valor')}, timestamp, conta_destino_id FROM transacoes WHERE id > ? AND id <= ?", (de, de + lote)).rowcount
+                    conn.execute("COMMIT")
+                    if ao_progresso is not None: ao_progresso(min(de + lote, ultimo), ultimo)
+                    time.sleep(pausa)
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if _tipo_valor(conn) == 'REAL':
+                    if online:
+                        seq = _sequencia(conn, 'transacoes'); conn.execute("DROP TABLE transacoes") # Leva junto o índice e os gatilhos
+                        conn.execute("ALTER TABLE transacoes_centavos RENAME TO transacoes"); _restaurar_sequencia(conn, 'transacoes', seq)
+                    else: conn.execute("DROP TABLE IF EXISTS transacoes_centavos"); r['transacoes'] = reconstruir_em_centavos(conn, 'transacoes') # Sobra de conversão online interrompida
+                    r['contas'] = reconstruir_em_centavos(conn, 'contas'); r['fechamentos'] = reconstruir_em_centavos(conn, 'fechamentos')
+                    if conn.execute("PRAGMA main.foreign_key_check").fetchone() is not None: raise sqlite3.IntegrityError("chave estrangeira inválida depois da conversão para centavos")
+                if arquivo_em_reais: r['arquivo'] = _converter_arquivo_centavos(conn)
+                conn.execute("COMMIT")
+            except BaseException: conn.execute("ROLLBACK"); raise
+        finally:
+            conn.close()
+        self._detectar_modo(); r['segundos'] = time.perf_counter() - inicio; return r
+
+    def fetch_all_arquivo(self, query, params=()):
+        """fetch_all no banco de arquivo (lista vazia se não houver arquivo)."""
+        conn = None
+        try:
+            conn = self._connect_arquivo()
+            if conn is None: return []
+            cursor = conn.cursor(); cursor.execute(query, params); return cursor.fetchall()
+        except sqlite3.Error as e:
+            print(f"Erro BD [Fetch All Arquivo]: {e}\nQuery: {query}\nParams: {params}"); return []
+        finally:
+            self._release(conn)
+
+    def limite_fechamento(self) -> str | None:
+        """Início do mês seguinte ao último período fechado (lançamentos antes disso estão nos fechamentos) ou None."""
+        row = self.fetch_one("SELECT MAX(periodo) FROM periodos_fechados")
+        return inicio_mes_seguinte(row[0]) if row and row[0] else None
+
+    def limite_arquivo(self) -> str | None:
+        """Início do mês seguinte ao último período arquivado: lançamentos anteriores estão só no banco de arquivo."""
+        row = self.fetch_one("SELECT MAX(periodo) FROM periodos_fechados WHERE arquivado_em IS NOT NULL")
+        return inicio_mes_seguinte(row[0]) if row and row[0] else None
+
+    def fechar_periodos(self, ate: str | None = None) -> dict:
+        """Grava os fechamentos mensais de todas as contas até o período 'AAAA-MM' (padrão: o mês passado), numa transação.
+
+        Parte do último fechamento de cada conta e soma os lançamentos dos meses novos (o saldo de abertura das contas sem
+        fechamento é o saldo atual menos todo o ledger). Só meses já encerrados podem ser fechados."""
+        ate = ate or periodo_de(datetime.date.today().replace(day=1) - datetime.timedelta(days=1)); _validar_periodo(ate)
+        if ate >= periodo_de(datetime.date.today()): raise ValueError(f"O período {ate} ainda não terminou.")
+        return self.executar_transacao(lambda cursor: fechar_periodos(cursor, ate))
+
+    def arquivar_periodos(self, ate: str | None = None, *, compactar: bool = False) -> dict:
+        """Move os lançamentos dos períodos fechados até 'ate' (padrão: todos os fechados) para o banco de arquivo.
+
+        Copia (INSERT OR IGNORE) e só então apaga do banco principal, marcando os períodos como arquivados na mesma transação
+        do DELETE: quem lê usa limite_arquivo() para saber onde cada lançamento está, então nunca vê linha duplicada ou faltando.
+        Repetir após uma falha completa o trabalho. compactar=True roda VACUUM no banco principal no fim."""
+        fechado = self.fetch_one("SELECT MAX(periodo) FROM periodos_fechados")[0]
+        if fechado is None: raise ValueError("Nenhum período fechado: rode fechar_periodos antes.")
+        ate = ate or fechado; _validar_periodo(ate)
+        if ate > fechado: raise ValueError(f"O período {ate} ainda não foi fechado (último fechado: {fechado}).")
+        limite = inicio_mes_seguinte(ate); inicio = time.perf_counter()
+        conn = sqlite3.connect(self.db_name, timeout=self.busy_timeout / 1000) # Conexão própria: só ela anexa o arquivo
+        try:
+            conn.execute("PRAGMA foreign_keys = ON;"); conn.execute("ATTACH DATABASE ? AS arquivo", (self.arquivo,)); conn.execute("PRAGMA arquivo.journal_mode = WAL;")
+            for sql in ESQUEMA_ARQUIVO: conn.execute(sql.format(esquema="arquivo.", tipo_valor="INTEGER" if self.em_centavos else "REAL"))
+            with conn: copiadas = conn.execute("INSERT OR IGNORE INTO arquivo.transacoes SELECT id, conta_id, tipo, valor, timestamp, conta_destino_id FROM main.transacoes WHERE timestamp < ?", (limite,)).rowcount
+            self.atualizar_resumos() # Fora da trava: o que sobrar até o DELETE entra abaixo, na mesma transação
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                atualizar_resumos(conn, self.sql_centavos('t.valor')) # Lançamentos só saem do ledger principal depois de somados aos resumos
+                removidas = conn.execute("DELETE FROM main.transacoes WHERE timestamp < ? AND EXISTS (SELECT 1 FROM arquivo.transacoes a WHERE a.id = transacoes.id)", (limite,)).rowcount
+                conn.execute("DELETE FROM main.saques_diarios WHERE dia < ?", (limite[:10],)) # Contadores só servem para o dia corrente
+                conn.execute("UPDATE main.periodos_fechados SET arquivado_em = ? WHERE periodo <= ? AND arquivado_em IS NULL", (_texto_data(datetime.datetime.now()), ate))
+                conn.commit()
+            except BaseException: conn.rollback(); raise
+            if compactar: conn.execute("VACUUM main")
+        finally:
+            conn.close()
+        return {'ate': ate, 'copiadas': copiadas, 'removidas': removidas, 'arquivo': self.arquivo, 'segundos': time.perf_counter() - inicio}
+
+    def verificar_saldos(self) -> list[tuple[int, str, Dinheiro, Dinheiro]]:
+        """Confere contas.saldo contra último fechamento + lançamentos posteriores; retorna (conta_id, numero, saldo, esperado) das divergências.
+
+        Lê só o ledger depois do último fechamento (contas sem fechamento: o ledger inteiro a partir de zero)."""
+        q = f"SELECT id, numero, saldo, esperado FROM (SELECT id, numero, saldo, {SQL_SALDO_ESPERADO} AS esperado FROM contas) WHERE ABS(saldo - esperado) > 0.005"
+        return [(row[0], row[1], self.de_bd(row[2]), self.de_bd(row[3])) for row in self.fetch_all(q, (self.limite_fechamento() or '',))]
+
+    def atualizar_resumos(self, *, lote: int = 100_000) -> dict:
+        """Soma aos resumos de relatório os lançamentos gravados depois da marca, numa transação curta por lote de ids.
+
+        Custo proporcional ao que entrou desde a última chamada, não ao tamanho do ledger. Na primeira vez (resumos nunca
+        construídos, ex.: logo depois da migração) faz a reconstrução completa, que também lê o banco de arquivo."""
+        if self.fetch_one("SELECT 1 FROM marcas_resumo WHERE nome = 'transacoes'") is None: return self.reconstruir_resumos(lote=lote)
+        inicio = time.perf_counter(); lidos = 0
+        while True:
+            n, marca = self.executar_transacao(lambda cursor: atualizar_resumos(cursor, self.sql_centavos('t.valor'), lote=lote, max_lotes=1)) # Modo relido a cada transação
+            lidos += n
+            if n == 0: return {'ids': lidos, 'ultimo_id': marca, 'segundos': time.perf_counter() - inicio}
+
+    def _conectar_com_arquivo(self) -> tuple[sqlite3.Connection, str]:
+        """Conexão própria com o banco de arquivo anexado (se existir) e a expressão do ledger completo para SQL_LEDGER_RESUMO."""
+        conn = sqlite3.connect(self.db_name, timeout=self.busy_timeout / 1000); conn.execute("PRAGMA foreign_keys = ON;")
+        if not os.path.exists(self.arquivo): return conn, 'transacoes'
+        conn.execute("ATTACH DATABASE ? AS arquivo", (self.arquivo,)); return conn, SQL_LEDGER_COM_ARQUIVO
+
+    def reconstruir_resumos(self, *, lote: int = 100_000) -> dict:
+        """Refaz todos os resumos a partir do ledger (principal + arquivo), numa única transação: quem lê vê os antigos até o commit."""
+        inicio = time.perf_counter(); conn, ledger = self._conectar_com_arquivo()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._detectar_modo(conn); ultimo = conn.execute("SELECT COALESCE(MAX(id), 0) FROM transacoes").fetchone()[0]
+                if ledger != 'transacoes': ultimo = max(ultimo, conn.execute("SELECT COALESCE(MAX(id), 0) FROM arquivo.transacoes").fetchone()[0])
+                for tabela in (*RESUMOS, 'marcas_resumo'): conn.execute(f"DELETE FROM {tabela}")
+                lidos, marca = atualizar_resumos(conn, self.sql_centavos('t.valor'), lote=lote, ledger=ledger, ultimo=ultimo)
+                if lidos == 0: conn.execute("INSERT INTO marcas_resumo (nome, ultimo_id) VALUES ('transacoes', 0)") # Ledger vazio: resumos construídos
+                conn.commit()
+            except BaseException: conn.rollback(); raise
+        finally:
+            conn.close()
+        return {'ids': lidos, 'ultimo_id': marca, 'segundos': time.perf_counter() - inicio}
+
+    def verificar_resumos(self, *, max_exemplos: int = 20) -> dict:
+        """Recalcula cada resumo direto do ledger (principal + arquivo, ids até a marca) e compara com o gravado.
+
+        Retorna {'ultimo_id', 'divergencias': {tabela: linhas diferentes}, 'exemplos': [(tabela, 'ledger'|'resumo', linha)], 'segundos'};
+        'ledger' = linha que o recálculo produz e o resumo não tem (ou tem com outros valores), 'resumo' = o inverso."""
+        inicio = time.perf_counter(); conn, ledger = self._conectar_com_arquivo(); divergencias = {}; exemplos = []
+        try:
+            conn.execute("BEGIN") # Marca e resumos do mesmo instante (WAL: escritores continuam)
+            self._detectar_modo(conn); marca = marca_resumos(conn) or 0
+            fonte = f"({SQL_LEDGER_RESUMO.format(valor=self.sql_centavos('t.valor'), ledger=ledger)})"
+            for tabela, (chave, colunas, agregacao) in RESUMOS.items():
+                conn.execute("DROP TABLE IF EXISTS temp.resumo_esperado")
+                conn.execute(f"CREATE TEMP TABLE resumo_esperado AS {agregacao.format(fonte=fonte)}", (0, marca)); campos = ', '.join(chave + colunas)
+                diferentes = [(tabela, 'ledger', tuple(row)) for row in conn.execute(f"SELECT * FROM temp.resumo_esperado EXCEPT SELECT {campos} FROM main.{tabela}")]
+                diferentes += [(tabela, 'resumo', tuple(row)) for row in conn.execute(f"SELECT {campos} FROM main.{tabela} EXCEPT SELECT * FROM temp.resumo_esperado")]
+                divergencias[tabela] = len(diferentes); exemplos += diferentes[:max(0, max_exemplos - len(exemplos))]
+            conn.rollback()
+        finally:
+            conn.close()
+        return {'ultimo_id': marca, 'divergencias': divergencias, 'exemplos': exemplos, 'segundos': time.perf_counter() - inicio}
+
+    def estatisticas_consultas(self) -> dict:
+        """Snapshot das métricas de consultas (vazio se metricas=False)."""
+        return self.metricas.snapshot() if self.metricas is not None else {}
+
+    def iniciar_fila_postagem(self, **kwargs) -> 'FilaPostagem':
+        """Passa a enviar os movimentos de Conta por uma fila de escritor único (um commit por lote)."""
+        if self.fila_postagem is None: self.fila_postagem = FilaPostagem(self, **kwargs)
+        return self.fila_postagem
+
+    def close(self):
+        """Fecha todas as conexões do pool (encerramento limpo da aplicação)."""
+        if self.fila_postagem is not None: self.fila_postagem.fechar(); self.fila_postagem = None # Esvazia a fila antes de fechar conexões
+        with self._lock_pool: conexoes, self._conexoes_pool = self._conexoes_pool, []; self._fechado = True
+        for conn in conexoes:
+            try:
+                if conn.in_transaction: conn.rollback()
+                conn.execute("PRAGMA optimize;") # Atualiza estatísticas antes de sair
+                conn.close()
+            except sqlite3.Error as e: print(f"Erro ao fechar conexão: {e}")
+        self._local = threading.local()
+
+    def executar_transacao(self, funcao, *, tentativas=8, espera_base=0.005, espera_max=0.25):
+        """Executa funcao(cursor) dentro de BEGIN IMMEDIATE, com novas tentativas (backoff exponencial com jitter) se o BD estiver travado."""
+        for tentativa in range(tentativas):
+            conn = None
+            try:
+                conn = self._connect(); cursor = conn.cursor()
+                cursor.execute("BEGIN IMMEDIATE") # Trava de escrita já no início: nada de upgrade leitura->escrita no meio da transação
+                if cursor.execute("PRAGMA schema_version").fetchone()[0] != self._versao_esquema: self._detectar_modo(cursor) # Ex.: conversão para centavos por outro processo
+                resultado = funcao(cursor); conn.commit(); return resultado
+            except sqlite3.OperationalError as e:
+                if conn and conn.in_transaction: conn.rollback()
+                travado = "locked" in str(e) or "busy" in str(e)
+                if not travado or tentativa == tentativas - 1: raise
+                time.sleep(random.uniform(0, min(espera_max, espera_base * 2 ** tentativa))) # "Full jitter": evita tempestade de retentativas
+            except BaseException:
+                if conn and conn.in_transaction: conn.rollback() # Recusa de negócio ou erro: desfaz tudo
+                raise
+            finally:
+                self._release(conn)
+
+    def __enter__(self): return self
+    def __exit__(self, *exc): self.close(); return False
 
     def execute_query(self, query, params=(), *, is_script=False):
         """Executa uma query que não retorna dados (INSERT, UPDATE, DELETE) ou um script."""
@@ -41,7 +847,7 @@ class DatabaseManager:
             # Não mostra messagebox para todos os erros para não poluir
             return None # Indica falha
         finally:
-            if conn: conn.close() # Garante que a conexão seja fechada
+            self._release(conn) # Garante que a conexão seja fechada (ou devolvida ao pool)
 
     def fetch_one(self, query, params=()):
         """Executa uma query e retorna um único resultado (ou None)."""
@@ -52,7 +858,7 @@ class DatabaseManager:
         except sqlite3.Error as e:
             print(f"Erro BD [Fetch One]: {e}\nQuery: {query}\nParams: {params}"); return None
         finally:
-            if conn: conn.close()
+            self._release(conn)
 
     def fetch_all(self, query, params=()):
         """Executa uma query e retorna todos os resultados (ou lista vazia)."""
@@ -63,54 +869,379 @@ class DatabaseManager:
         except sqlite3.Error as e:
             print(f"Erro BD [Fetch All]: {e}\nQuery: {query}\nParams: {params}"); return []
         finally:
-            if conn: conn.close()
+            self._release(conn)
 
-    def initialize_db(self):
-        """Cria/Atualiza as tabelas do banco de dados se não existirem."""
-        needs_setup = not os.path.exists(self.db_name) # Verifica se o arquivo BD já existe
-        # Cria/Atualiza Tabela Clientes (com senha e role)
+    def iterar_lotes(self, query, params=(), *, tamanho_lote: int = 5000, tuplas: bool = False, arquivo: bool = False):
+        """Gera o resultado de uma consulta em listas de até tamanho_lote linhas (fetchmany), sem materializá-lo; erros de BD propagam.
+
+        tuplas=True devolve tuplas simples em vez de sqlite3.Row (mais barato para quem só escreve as colunas em ordem).
+        arquivo=True roda numa conexão própria com o banco de arquivo anexado como 'arquivo' (ver _conectar_com_arquivo)."""
+        conn = self._conectar_com_arquivo()[0] if arquivo else self._connect()
         try:
-            conn = self._connect(); cursor = conn.cursor()
-            # Cria tabela base se não existir
-            cursor.execute("CREATE TABLE IF NOT EXISTS clientes (id INTEGER PRIMARY KEY AUTOINCREMENT, nome TEXT NOT NULL, cpf TEXT NOT NULL UNIQUE, endereco TEXT);")
-            # Tenta adicionar colunas (ignora erro se já existirem)
-            try: cursor.execute("ALTER TABLE clientes ADD COLUMN senha TEXT NOT NULL DEFAULT 'senha_padrao';"); print("Coluna 'senha' adicionada/verificada.")
-            except sqlite3.OperationalError as e:
-                if "duplicate column name" not in str(e): raise
-            try: cursor.execute("ALTER TABLE clientes ADD COLUMN role TEXT NOT NULL DEFAULT 'user';"); print("Coluna 'role' adicionada/verificada.")
-            except sqlite3.OperationalError as e:
-                if "duplicate column name" not in str(e): raise
-            conn.commit()
-        except sqlite3.Error as e: print(f"Erro ao inicializar tabela clientes: {e}")
+            cursor = conn.cursor()
+            if tuplas: cursor.row_factory = None
+            cursor.execute(query, params)
+            while lote := cursor.fetchmany(tamanho_lote): yield lote
         finally:
-             if conn: conn.close()
-        # Cria Outras Tabelas (contas, transacoes)
-        create_other_tables_script = """
-        CREATE TABLE IF NOT EXISTS contas (id INTEGER PRIMARY KEY AUTOINCREMENT, numero TEXT NOT NULL UNIQUE, agencia TEXT NOT NULL DEFAULT '0001', saldo REAL NOT NULL DEFAULT 0.0, limite REAL DEFAULT 500.0, limite_saques INTEGER DEFAULT 3, tipo_conta TEXT NOT NULL DEFAULT 'corrente', cliente_id INTEGER NOT NULL, FOREIGN KEY (cliente_id) REFERENCES clientes (id) ON DELETE CASCADE);
-        CREATE TABLE IF NOT EXISTS transacoes (id INTEGER PRIMARY KEY AUTOINCREMENT, conta_id INTEGER NOT NULL, tipo TEXT NOT NULL CHECK(tipo IN ('deposito', 'saque', 'transferencia_enviada', 'transferencia_recebida')), valor REAL NOT NULL, timestamp DATETIME DEFAULT CURRENT_TIMESTAMP, conta_destino_id INTEGER DEFAULT NULL, FOREIGN KEY (conta_id) REFERENCES contas (id) ON DELETE CASCADE, FOREIGN KEY (conta_destino_id) REFERENCES contas(id));
-        """
-        print("Inicializando BD (contas, transacoes)...")
-        self.execute_query(create_other_tables_script, is_script=True)
-        print("Tabelas verificadas/criadas.")
-        # Adiciona Admin se for a primeira execução
-        if needs_setup:
+            conn.close() if arquivo else self._release(conn)
+
+    def aplicar_migracoes(self) -> int:
+        """Aplica as migrações pendentes (comparando com PRAGMA user_version) e retorna a versão final."""
+        conn = None
+        try:
+            conn = self._connect(); versao = conn.execute("PRAGMA user_version").fetchone()[0]
+            for numero, descricao, passo in MIGRACOES:
+                if numero <= versao: continue
+                conn.execute("BEGIN IMMEDIATE") # Trava de escrita: outra instância pode estar migrando ao mesmo tempo
+                versao = conn.execute("PRAGMA user_version").fetchone()[0]
+                if numero <= versao: conn.rollback(); continue # Já aplicada pela outra instância
+                cursor = conn.cursor()
+                if callable(passo): passo(cursor)
+                else:
+                    for sql in passo: cursor.execute(sql)
+                cursor.execute(f"PRAGMA user_version = {numero}"); conn.commit(); versao = numero
+                print(f"Migração {numero} aplicada: {descricao}")
+            return versao
+        except sqlite3.Error as e:
+            print(f"Erro ao aplicar migrações: {e}")
+            if conn and conn.in_transaction: conn.rollback()
+            raise # Esquema inconsistente: interrompe
+        finally:
+            self._release(conn)
+
+    def initialize_db(self):
+        """Cria/Atualiza as tabelas do banco de dados (via migrações versionadas).
+
+        Caminho rápido: uma única consulta (SQL_SONDA_ESQUEMA) confirma que o esquema já está na versão atual, e nenhuma DDL roda."""
+        needs_setup = not os.path.exists(self.db_name) # Verifica se o arquivo BD já existe
+        sonda = None if needs_setup else self.fetch_one(SQL_SONDA_ESQUEMA)
+        if sonda is not None and sonda[0] >= ESQUEMA_VERSAO and sonda[1]: self.em_centavos, self._versao_esquema = bool(sonda[2]), sonda[3]; return
+        print("Inicializando BD (migrações)...")
+        vazio = needs_setup or sonda is None or sonda[1] == 0 # Arquivo novo ou ainda sem tabelas
+        versao = self.aplicar_migracoes()
+        self._detectar_modo()
+        if vazio and self._centavos_novo and not self.em_centavos: self.converter_para_centavos(online=False) # Sem dados: instantâneo
+        if vazio and self.fragmento: # Faixa de IDs própria: IDs únicos entre fragmentos e roteáveis sem consultar o diretório
+            self.executar_transacao(lambda cursor: [_restaurar_sequencia(cursor, tabela, self.fragmento * BLOCO_IDS_FRAGMENTO) for tabela in ('clientes', 'contas', 'transacoes')])
+        print(f"Esquema na versão {versao} (valores em {'centavos' if self.em_centavos else 'reais'}).")
+        # Adiciona Admin se for a primeira execução (num banco fragmentado, só no fragmento 0)
+        if needs_setup and not self.fragmento:
             print("Primeira execução: Adicionando usuário ADMIN de exemplo...")
             try:
                 admin_cpf = "000.000.000-00"; admin_senha_plana = "admin123" # SENHA INSEGURA!
                 if not self.fetch_one("SELECT id FROM clientes WHERE cpf = ?", (admin_cpf,)):
                     admin_id = self.execute_query("INSERT INTO clientes (nome, cpf, endereco, senha, role) VALUES (?, ?, ?, ?, ?)", ("Admin Master", admin_cpf, "Sistema", admin_senha_plana, "admin"))
                     if admin_id:
-                        self.execute_query("INSERT INTO contas (numero, cliente_id, saldo) VALUES (?, ?, ?)", ("9999", admin_id, 9999.0))
+                        self.execute_query("INSERT INTO contas (numero, cliente_id, saldo) VALUES (?, ?, ?)", ("9999", admin_id, self.para_bd(9999)))
+                        self.sincronizar_sequencia_contas() # Número fixo: a sequência continua a partir de 10000
                         print(f"Usuário ADMIN (CPF: {admin_cpf}, Senha: {admin_senha_plana}) criado.")
-                        messagebox.showinfo("Admin Criado", f"Admin criado:\nCPF: {admin_cpf}\nSenha: {admin_senha_plana}\nUse para o primeiro login.")
+                        self.avisos.append(("Admin Criado", f"Admin criado:\nCPF: {admin_cpf}\nSenha: {admin_senha_plana}\nUse para o primeiro login.")) # A tela de login mostra
                     else: print("Erro ao inserir ADMIN.")
                 else: print("ADMIN já existe.")
             except Exception as e: print(f"Erro dados de exemplo: {e}")
 
+def _texto_data(valor) -> str:
+    """Converte date/datetime/str no formato de texto gravado em transacoes.timestamp (comparável por ordem)."""
+    if isinstance(valor, datetime.datetime): return valor.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(valor, datetime.date): return valor.strftime('%Y-%m-%d')
+    return str(valor)
+
+def reservar_sequencia(cursor, quantidade: int, nome: str = 'numero_conta') -> range:
+    """Reserva `quantidade` valores consecutivos da sequência dentro da transação do cursor (que já deve ter a trava de escrita)."""
+    inicio = cursor.execute("SELECT proximo FROM sequencias WHERE nome = ?", (nome,)).fetchone()[0]
+    cursor.execute("UPDATE sequencias SET proximo = proximo + ? WHERE nome = ?", (quantidade, nome))
+    return range(inicio, inicio + quantidade)
+
+def sincronizar_sequencia_contas(cursor) -> int:
+    """Avança a sequência de números de conta para depois do maior número existente; retorna o próximo."""
+    cursor.execute("UPDATE sequencias SET proximo = MAX(proximo, (SELECT COALESCE(MAX(CAST(numero AS INTEGER)), 0) + 1 FROM contas)) WHERE nome = 'numero_conta'")
+    return cursor.execute("SELECT proximo FROM sequencias WHERE nome = 'numero_conta'").fetchone()[0]
+
+def periodo_de(valor) -> str:
+    """Período mensal 'AAAA-MM' de uma data/datetime/texto."""
+    return _texto_data(valor)[:7]
+
+def inicio_mes_seguinte(periodo: str) -> str:
+    """Primeiro instante do mês seguinte a 'AAAA-MM', no formato de transacoes.timestamp."""
+    ano, mes = int(periodo[:4]), int(periodo[5:7]); ano, mes = (ano + 1, 1) if mes == 12 else (ano, mes + 1)
+    return f"{ano:04d}-{mes:02d}-01 00:00:00"
+
+def _validar_periodo(periodo: str):
+    if not re.fullmatch(r"\d{4}-(0[1-9]|1[0-2])", periodo or ""): raise ValueError(f"Período inválido (use AAAA-MM): {periodo!r}")
+
+def fechar_periodos(cursor, ate: str) -> dict:
+    """Numa transação aberta: fecha os meses depois do último período fechado até 'ate' (ver DatabaseManager.fechar_periodos)."""
+    anterior = cursor.execute("SELECT MAX(periodo) FROM periodos_fechados").fetchone()[0]
+    if anterior is not None and ate <= anterior: return {'periodos': [], 'fechamentos': 0}
+    inicio = inicio_mes_seguinte(anterior) if anterior else ''; fim = inicio_mes_seguinte(ate)
+    # Saldo de partida de cada conta: último fechamento ou, sem fechamento, saldo atual menos o ledger inteiro (saldo de abertura)
+    cursor.execute("DROP TABLE IF EXISTS temp.fechamento_base")
+    cursor.execute("CREATE TEMP TABLE fechamento_base (conta_id INTEGER PRIMARY KEY, saldo NOT NULL)") # Chave primária: o JOIN abaixo busca por conta_id; saldo sem tipo: reais ou centavos, conforme o BD
+    cursor.execute(f"""INSERT INTO temp.fechamento_base SELECT c.id, COALESCE((SELECT f.saldo FROM fechamentos f WHERE f.conta_id = c.id ORDER BY f.periodo DESC LIMIT 1),
+                           c.saldo - COALESCE((SELECT SUM({SQL_DELTA_SALDO}) FROM transacoes t WHERE t.conta_id = c.id), 0)) AS saldo FROM contas c""")
+    # Um fechamento por mês com movimento (saldo acumulado em ordem de período) ...
+    cursor.execute(f"""INSERT INTO fechamentos (conta_id, periodo, saldo, transacoes)
+                       SELECT m.conta_id, m.periodo, b.saldo + SUM(m.delta) OVER (PARTITION BY m.conta_id ORDER BY m.periodo), m.n
+                       FROM (SELECT conta_id, substr(timestamp, 1, 7) AS periodo, SUM({SQL_DELTA_SALDO}) AS delta, COUNT(*) AS n FROM transacoes
+                             WHERE timestamp >= ? AND timestamp < ? GROUP BY conta_id, periodo) m JOIN temp.fechamento_base b ON b.conta_id = m.conta_id""", (inicio, fim))
+    # ... e um no último mês para toda conta, para que o fechamento mais próximo de qualquer conta seja sempre o último
+    cursor.execute(f"""INSERT OR IGNORE INTO fechamentos (conta_id, periodo, saldo, transacoes)
+                       SELECT b.conta_id, ?, b.saldo + COALESCE((SELECT SUM({SQL_DELTA_SALDO}) FROM transacoes t WHERE t.conta_id = b.conta_id AND t.timestamp >= ? AND t.timestamp < ?), 0), 0
+                       FROM temp.fechamento_base b""", (ate, inicio, fim))
+    fechamentos = cursor.execute("SELECT COUNT(*) FROM fechamentos WHERE periodo > ? AND periodo <= ?", (anterior or '', ate)).fetchone()[0]
+    cursor.execute("DROP TABLE temp.fechamento_base")
+    periodo = periodo_de(cursor.execute("SELECT MIN(timestamp) FROM transacoes").fetchone()[0] or fim) if anterior is None else periodo_de(inicio)
+    periodos = []
+    while periodo <= ate: periodos.append(periodo); periodo = periodo_de(inicio_mes_seguinte(periodo))
+    agora = _texto_data(datetime.datetime.now())
+    cursor.executemany("INSERT INTO periodos_fechados (periodo, fechado_em) VALUES (?, ?)", [(p, agora) for p in periodos])
+    return {'periodos': periodos, 'fechamentos': fechamentos}
+
+# Resumos para relatórios (migração 9): lançamentos de uma faixa de ids com dia, cliente da conta, cliente destino da transferência e valor em centavos
+SQL_LEDGER_RESUMO = """SELECT t.conta_id, c.cliente_id, substr(t.timestamp, 1, 10) AS dia, t.tipo, {valor} AS centavos, cd.cliente_id AS cliente_destino_id
+                       FROM {ledger} t JOIN contas c ON c.id = t.conta_id LEFT JOIN contas cd ON cd.id = t.conta_destino_id AND t.tipo = 'transferencia_enviada'
+                       WHERE t.id > ? AND t.id <= ?"""
+# Ledger principal + arquivado (banco de arquivo anexado como 'arquivo'; linhas ainda nos dois bancos contam uma vez só)
+SQL_LEDGER_COM_ARQUIVO = """(SELECT id, conta_id, tipo, valor, timestamp, conta_destino_id FROM main.transacoes UNION ALL
+                            SELECT id, conta_id, tipo, valor, timestamp, conta_destino_id FROM arquivo.transacoes a WHERE NOT EXISTS (SELECT 1 FROM main.transacoes m WHERE m.id = a.id))"""
+_SOMA_TIPO = "SUM(CASE WHEN tipo = '{0}' THEN centavos ELSE 0 END), SUM(tipo = '{0}')" # Valor e quantidade de um tipo de lançamento
+RESUMOS = { # tabela: (chave, colunas somadas, agregação sobre {fonte} na ordem chave + colunas)
+    'resumo_diario': (('dia',), ('depositos', 'n_depositos', 'saques', 'n_saques', 'transferencias', 'n_transferencias'),
+                      f"SELECT dia, {_SOMA_TIPO.format('deposito')}, {_SOMA_TIPO.format('saque')}, {_SOMA_TIPO.format('transferencia_enviada')} FROM {{fonte}} GROUP BY dia"),
+    'resumo_diario_conta': (('conta_id', 'dia'), ('depositos', 'n_depositos', 'saques', 'n_saques', 'enviadas', 'n_enviadas', 'recebidas', 'n_recebidas'),
+                            f"SELECT conta_id, dia, {', '.join(_SOMA_TIPO.format(tipo) for tipo in ('deposito', 'saque', 'transferencia_enviada', 'transferencia_recebida'))} FROM {{fonte}} GROUP BY conta_id, dia"),
+    'resumo_diario_cliente': (('cliente_id', 'dia'), ('entradas', 'saidas', 'movimentos'),
+                              """SELECT cliente_id, dia, SUM(CASE WHEN tipo IN ('deposito', 'transferencia_recebida') THEN centavos ELSE 0 END),
+                                        SUM(CASE WHEN tipo IN ('saque', 'transferencia_enviada') THEN centavos ELSE 0 END), COUNT(*) FROM {fonte} GROUP BY cliente_id, dia"""),
+    'resumo_mensal_cliente': (('mes', 'cliente_id'), ('entradas', 'saidas', 'movimentos'),
+                              """SELECT substr(dia, 1, 7), cliente_id, SUM(CASE WHEN tipo IN ('deposito', 'transferencia_recebida') THEN centavos ELSE 0 END),
+                                        SUM(CASE WHEN tipo IN ('saque', 'transferencia_enviada') THEN centavos ELSE 0 END), COUNT(*) FROM {fonte} GROUP BY 1, 2"""),
+    'resumo_mensal_transferencias': (('mes', 'cliente_origem_id', 'cliente_destino_id'), ('quantidade', 'centavos'),
+                                     """SELECT substr(dia, 1, 7), cliente_id, cliente_destino_id, COUNT(*), SUM(centavos) FROM {fonte}
+                                        WHERE tipo = 'transferencia_enviada' AND cliente_destino_id IS NOT NULL GROUP BY 1, 2, 3"""), # Entre fragmentos: sem destino local
+}
+# Upsert de cada resumo a partir do lote em temp.lote_resumo (WHERE true: exigido antes de ON CONFLICT num INSERT ... SELECT)
+SQL_SOMAR_RESUMOS = {tabela: f"INSERT INTO {tabela} ({', '.join(chave + colunas)}) SELECT * FROM ({agregacao.format(fonte='temp.lote_resumo')}) WHERE true "
+                             f"ON CONFLICT ({', '.join(chave)}) DO UPDATE SET " + ", ".join(f"{c} = {c} + excluded.{c}" for c in colunas)
+                     for tabela, (chave, colunas, agregacao) in RESUMOS.items()}
+
+def marca_resumos(cursor) -> int | None:
+    """Maior id do ledger já somado aos resumos (None: resumos nunca construídos)."""
+    row = cursor.execute("SELECT ultimo_id FROM marcas_resumo WHERE nome = 'transacoes'").fetchone(); return row[0] if row else None
+
+def somar_aos_resumos(cursor, de: int, ate: int, valor: str, ledger: str = 'transacoes'):
+    """Numa transação aberta: soma aos resumos os lançamentos com id em (de, ate] e move a marca para `ate`.
+
+    O lote é materializado uma vez (com os JOINs em contas) e cada resumo é um upsert agregado sobre ele. Os ids do ledger
+    são atribuídos em ordem de commit (um escritor por vez), então nenhum lançamento aparece depois atrás da marca."""
+    cursor.execute("DROP TABLE IF EXISTS temp.lote_resumo")
+    cursor.execute(f"CREATE TEMP TABLE lote_resumo AS {SQL_LEDGER_RESUMO.format(valor=valor, ledger=ledger)}", (de, ate))
+    for sql in SQL_SOMAR_RESUMOS.values(): cursor.execute(sql)
+    cursor.execute("INSERT INTO marcas_resumo (nome, ultimo_id) VALUES ('transacoes', ?) ON CONFLICT (nome) DO UPDATE SET ultimo_id = excluded.ultimo_id", (ate,))
+    cursor.execute("DROP TABLE temp.lote_resumo")
+
+def atualizar_resumos(cursor, valor: str, *, lote: int = 100_000, max_lotes: int | None = None, ledger: str = 'transacoes', ultimo: int | None = None) -> tuple[int, int]:
+    """Numa transação aberta: soma aos resumos o que veio depois da marca, `lote` ids por vez (até max_lotes lotes); retorna (ids lidos, nova marca).
+
+    valor: expressão de t.valor em centavos (DatabaseManager.sql_centavos); ultimo: maior id a considerar (padrão: MAX(id) de transacoes)."""
+    inicio = marca = marca_resumos(cursor) or 0; lotes = 0
+    if ultimo is None: ultimo = cursor.execute("SELECT COALESCE(MAX(id), 0) FROM transacoes").fetchone()[0]
+    while marca < ultimo and (max_lotes is None or lotes < max_lotes):
+        ate = min(marca + lote, ultimo); somar_aos_resumos(cursor, marca, ate, valor, ledger); marca = ate; lotes += 1
+    return marca - inicio, marca
+
+def sql_em_centavos(expr: str) -> str:
+    """Expressão SQL que converte um valor em reais (REAL) para centavos inteiros."""
+    return f"CAST(ROUND({expr} * 100) AS INTEGER)"
+
+def _tipo_valor(conn, esquema: str = 'main') -> str | None:
+    """Tipo declarado de transacoes.valor no esquema ('REAL', 'INTEGER' ou None se a tabela não existe)."""
+    row = conn.execute("SELECT upper(type) FROM pragma_table_info('transacoes', ?) WHERE name = 'valor'", (esquema,)).fetchone()
+    return row[0] if row else None
+
+def _sequencia(cursor, tabela: str) -> int | None:
+    row = cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (tabela,)).fetchone(); return row[0] if row else None
+
+def _restaurar_sequencia(cursor, tabela: str, seq: int | None):
+    """Mantém o AUTOINCREMENT depois de recriar a tabela: IDs já usados (e apagados) nunca voltam."""
+    if seq is None: return
+    if cursor.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = ?", (seq, tabela)).rowcount == 0:
+        cursor.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)", (tabela, seq))
+
+def reconstruir_em_centavos(cursor, tabela: str) -> int:
+    """Numa transação aberta (com foreign_keys=OFF): recria a tabela com os valores em centavos, mantendo índices, gatilhos e sequência; retorna as linhas."""
+    colunas = [row[1] for row in cursor.execute(f"PRAGMA table_info({tabela})")]
+    indices = [row[0] for row in cursor.execute("SELECT sql FROM sqlite_master WHERE type IN ('index', 'trigger') AND tbl_name = ? AND sql IS NOT NULL", (tabela,))] # Gatilhos também caem com o DROP
+    seq = _sequencia(cursor, tabela); nova = f"{tabela}_centavos"
+    cursor.execute(TABELAS_CENTAVOS[tabela].format(nome=nova))
+    selecao = ", ".join(sql_em_centavos(c) if c in COLUNAS_MONETARIAS[tabela] else c for c in colunas)
+    linhas = cursor.execute(f"INSERT INTO {nova} ({', '.join(colunas)}) SELECT {selecao} FROM {tabela}").rowcount
+    cursor.execute(f"DROP TABLE {tabela}"); cursor.execute(f"ALTER TABLE {nova} RENAME TO {tabela}")
+    for sql in indices: cursor.execute(sql) # Mesmos nomes: o DROP levou os antigos
+    _restaurar_sequencia(cursor, tabela, seq); return linhas
+
+def _converter_arquivo_centavos(cursor) -> int:
+    """Numa transação aberta com o banco de arquivo anexado como 'arquivo': recria o ledger arquivado em centavos."""
+    cursor.execute("ALTER TABLE arquivo.transacoes RENAME TO transacoes_reais")
+    cursor.execute(ESQUEMA_ARQUIVO[0].format(esquema="arquivo.", tipo_valor="INTEGER"))
+    linhas = cursor.execute(f"INSERT INTO arquivo.transacoes SELECT id, conta_id, tipo, {sql_em_centavos('valor')}, timestamp, conta_destino_id FROM arquivo.transacoes_reais").rowcount
+    cursor.execute("DROP TABLE arquivo.transacoes_reais") # Leva o índice antigo; o novo é criado depois da carga
+    for sql in ESQUEMA_ARQUIVO[1:]: cursor.execute(sql.format(esquema="arquivo.", tipo_valor="INTEGER"))
+    return linhas
+
+def cpf_formatado_valido(cpf: str) -> bool:
+    """Confere o formato xxx.xxx.xxx-xx (só a máscara; não calcula os dígitos verificadores)."""
+    return len(cpf) == 14 and cpf[3] == '.' and cpf[7] == '.' and cpf[11] == '-' and (cpf[:3] + cpf[4:7] + cpf[8:11] + cpf[12:]).isdigit()
+
+# --- Lançamento atômico de movimentos (usado por Conta e pelos processamentos em lote) ---
+
+class MovimentoRecusado(Exception):
+    """Movimento rejeitado por regra de negócio; nada é gravado (a transação é desfeita)."""
+    def __init__(self, motivo: str, mensagem: str):
+        super().__init__(mensagem); self.motivo = motivo # 'saldo_insuficiente', 'conta_inexistente', 'conta_destino_inexistente', 'tipo_invalido', 'limite_saques', 'valor_invalido', 'contas_iguais', 'transferencia_abortada'
+
+def _creditar(cursor, conta_id: int, valor: int | float, motivo_inexistente: str = 'conta_inexistente'):
+    """Soma valor ao saldo numa única instrução (sem ler-calcular-gravar em Python)."""
+    cursor.execute("UPDATE contas SET saldo = saldo + ? WHERE id = ?", (valor, conta_id))
+    if cursor.rowcount == 0: raise MovimentoRecusado(motivo_inexistente, f"Conta ID {conta_id} não existe.")
+
+def _debitar(cursor, conta_id: int, valor: int | float, usa_limite: bool):
+    """Debita valor apenas se saldo (+ limite, para CC) cobrir: a verificação e a escrita são a mesma instrução."""
+    cursor.execute("UPDATE contas SET saldo = saldo - ? WHERE id = ? AND saldo + (CASE WHEN ? THEN COALESCE(limite, 0) ELSE 0 END) >= ?", (valor, conta_id, usa_limite, valor))
+    if cursor.rowcount == 0:
+        if cursor.execute("SELECT 1 FROM contas WHERE id = ?", (conta_id,)).fetchone() is None: raise MovimentoRecusado('conta_inexistente', f"Conta ID {conta_id} não existe.")
+        raise MovimentoRecusado('saldo_insuficiente', "Saldo insuficiente.")
+
+def _contar_saque_do_dia(cursor, conta_id: int, limite_saques: int):
+    """Incrementa o contador materializado de saques/transferências do dia, recusando se o limite já foi atingido."""
+    cursor.execute("INSERT INTO saques_diarios (conta_id, dia, total) VALUES (?, ?, 1) ON CONFLICT (conta_id, dia) DO UPDATE SET total = total + 1 WHERE total < ?",
+                   (conta_id, datetime.date.today().isoformat(), limite_saques))
+    if cursor.rowcount == 0: raise MovimentoRecusado('limite_saques', f"Limite de {limite_saques} saques/transferências diários atingido.")
+
+def postar_movimento(cursor, conta_id: int, tipo: str, valor: int | float, conta_destino_id: int | None = None, *, usa_limite: bool = False, limite_saques: int | None = None) -> int | float:
+    """Aplica um movimento numa transação já aberta e retorna o novo saldo da conta (levanta MovimentoRecusado).
+
+    valor e saldo na unidade do BD (DatabaseManager.para_bd/de_bd: centavos ou reais).
+    Com limite_saques, saques e transferências enviadas também contam no limite diário, verificado na mesma transação."""
+    if limite_saques is not None and tipo in ('saque', 'transferencia_enviada'): _contar_saque_do_dia(cursor, conta_id, limite_saques)
+    if tipo == 'deposito': _creditar(cursor, conta_id, valor)
+    elif tipo == 'saque': _debitar(cursor, conta_id, valor, usa_limite)
+    elif tipo == 'transferencia_enviada':
+        if conta_destino_id is None: raise MovimentoRecusado('conta_destino_inexistente', "Conta destino não informada.")
+        # Ordem fixa (menor ID primeiro) para as duas contas: transferências cruzadas nunca esperam uma pela outra
+        for cid in sorted((conta_id, conta_destino_id)):
+            if cid == conta_id: _debitar(cursor, conta_id, valor, usa_limite)
+            else: _creditar(cursor, conta_destino_id, valor, 'conta_destino_inexistente')
+        cursor.execute("INSERT INTO transacoes (conta_id, tipo, valor, conta_destino_id) VALUES (?, ?, ?, ?)", (conta_destino_id, 'transferencia_recebida', valor, conta_id)) # Registra Recebimento
+    else: raise MovimentoRecusado('tipo_invalido', f"Tipo de movimento inválido: {tipo}.")
+    cursor.execute("INSERT INTO transacoes (conta_id, tipo, valor, conta_destino_id) VALUES (?, ?, ?, ?)", (conta_id, tipo, valor, conta_destino_id if tipo == 'transferencia_enviada' else None)) # Registra Origem
+    return cursor.execute("SELECT saldo FROM contas WHERE id = ?", (conta_id,)).fetchone()[0]
+
+class FilaPostagem:
+    """Fila de escritor único: aplica vários movimentos numa só transação SQLite (group commit), com um Future por movimento."""
+    _FIM = object() # Sentinela de encerramento
+
+    def __init__(self, db_manager: DatabaseManager, *, tamanho_lote: int = 256, latencia_max: float = 0.002):
+        self.db = db_manager; self.tamanho_lote = tamanho_lote; self.latencia_max = latencia_max # Commit quando o lote enche OU o prazo vence
+        self._fila: queue.Queue = queue.Queue(); self._fechada = False
+        self._thread = threading.Thread(target=self._executar, name="FilaPostagem", daemon=True); self._thread.start()
+
+    def enviar(self, conta_id: int, tipo: str, valor, conta_destino_id: int | None = None, **opcoes) -> Future:
+        """Enfileira um movimento (valor: Dinheiro ou reais; opcoes: as de postar_movimento); o Future resolve com o novo saldo (unidade do BD) ou com MovimentoRecusado/sqlite3.Error."""
+        if self._fechada: raise RuntimeError("FilaPostagem encerrada.")
+        futuro = Future(); self._fila.put(((conta_id, tipo, valor, conta_destino_id, opcoes), futuro)); return futuro
+
+    def fechar(self):
+        """Processa o que já foi enfileirado e encerra a thread escritora."""
+        if self._fechada: return
+        self._fechada = True; self._fila.put(self._FIM); self._thread.join()
+
+    def _executar(self):
+        """Laço da thread escritora: junta itens até tamanho_lote ou latencia_max e grava o lote."""
+        fim = False
+        while not fim:
+            item = self._fila.get()
+            if item is self._FIM: break
+            lote = [item]; prazo = time.monotonic() + self.latencia_max
+            while len(lote) < self.tamanho_lote:
+                restante = prazo - time.monotonic()
+                try: item = self._fila.get(timeout=restante) if restante > 0 else self._fila.get_nowait()
+                except queue.Empty: break
+                if item is self._FIM: fim = True; break
+                lote.append(item)
+            self._gravar_lote(lote)
+
+    def _gravar_lote(self, lote):
+        """Uma transação por lote; cada movimento num SAVEPOINT para que uma recusa não desfaça os demais."""
+        def aplicar(cursor):
+            resultados = []
+            for (conta_id, tipo, valor, conta_destino_id, opcoes), futuro in lote:
+                cursor.execute("SAVEPOINT movimento")
+                try: saldo = postar_movimento(cursor, conta_id, tipo, self.db.para_bd(valor), conta_destino_id, **opcoes); resultados.append((futuro, saldo, None)) # Unidade do BD lida já com a trava
+                except (MovimentoRecusado, sqlite3.IntegrityError) as e: cursor.execute("ROLLBACK TO movimento"); resultados.append((futuro, None, e))
+                cursor.execute("RELEASE movimento")
+            return resultados
+        try: resultados = self.db.executar_transacao(aplicar)
+        except Exception as e: # Falha do lote inteiro (ex.: BD travado após todas as tentativas)
+            for _, futuro in lote: futuro.set_exception(e)
+            return
+        for futuro, saldo, erro in resultados: # Só resolve depois do COMMIT
+            if erro is not None: futuro.set_exception(erro)
+            else: futuro.set_result(saldo)
+
+class FeedAlteracoes:
+    """Leitor do feed de alterações (tabela alteracoes, migração 11): diz a quem exibe contas o que mudou desde a última leitura.
+
+    novas() usa uma conexão só sua, porque PRAGMA data_version só muda com commits de OUTRAS conexões (inclusive as do pool
+    deste processo): sem gravação nova, a verificação é esse PRAGMA e nenhuma página de tabela é lida. Havendo, lê só seq > último
+    visto. Os commits são serializados pela trava de escrita, então um seq nunca aparece depois de um maior; um buraco no
+    início só acontece se a poda passou do leitor (ou se há mais de `limite` alterações pendentes): aí o resultado pede recarregar tudo."""
+    SQL_NOVAS = "SELECT seq, tipo, conta_id, cliente_id FROM alteracoes WHERE seq > ? ORDER BY seq LIMIT ?"
+
+    def __init__(self, db_manager: DatabaseManager, *, limite: int = 10_000):
+        self.db = db_manager; self.limite = limite; self._lock = threading.Lock()
+        fabrica = ConexaoInstrumentada if db_manager.metricas is not None else sqlite3.Connection
+        self._conn = sqlite3.connect(db_manager.db_name, check_same_thread=False, factory=fabrica) # Usada por uma thread de cada vez (self._lock)
+        if db_manager.metricas is not None: self._conn.metricas = db_manager.metricas
+        self._conn.execute(f"PRAGMA busy_timeout = {int(db_manager.busy_timeout)};")
+        with db_manager._lock_pool: db_manager._conexoes_pool.append(self._conn) # Fechada com as do pool em close()
+        self._versao = self._conn.execute("PRAGMA data_version").fetchone()[0] # Antes do MAX: um commit no meio só gera uma leitura a mais
+        self.ultimo_seq = self._conn.execute("SELECT COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'alteracoes'), 0)").fetchone()[0] # Maior seq já usado
+
+    def novas(self) -> dict | None:
+        """None se nada foi gravado desde a última chamada; senão {'saldos': contas com saldo alterado, 'criadas'/'excluidas': {conta_id: cliente_id},
+        'recarregar': True se houve perda (leitor atrasado demais), 'seq': último visto}. Tira do cache de contas as alteradas e excluídas."""
+        with self._lock:
+            versao = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if versao == self._versao: return None
+            self._versao = versao # Lido antes das alterações: um commit entre os dois só é relido na próxima chamada
+            linhas = self._conn.execute(self.SQL_NOVAS, (self.ultimo_seq, self.limite + 1)).fetchall()
+            if not linhas: return None # Gravação que não passou por contas (ex.: só clientes ou resumos)
+            recarregar = linhas[0][0] != self.ultimo_seq + 1 or len(linhas) > self.limite
+            if len(linhas) > self.limite: self.ultimo_seq = self._conn.execute("SELECT MAX(seq) FROM alteracoes").fetchone()[0]
+            else: self.ultimo_seq = linhas[-1][0]
+        saldos = set(); criadas = {}; excluidas = {}
+        for _, tipo, conta_id, cliente_id in linhas:
+            if tipo == 'saldo': saldos.add(conta_id)
+            elif tipo == 'conta_criada': criadas[conta_id] = cliente_id
+            else: excluidas[conta_id] = cliente_id; criadas.pop(conta_id, None)
+        saldos -= excluidas.keys()
+        if recarregar: self.db.cache_contas.limpar()
+        for conta_id in saldos: self.db.cache_contas.invalidar(conta_id) # Saldo em memória ficou velho; a próxima obter() relê
+        for conta_id in excluidas: self.db.cache_contas.invalidar(conta_id); self.db.cache_extratos.invalidar((conta_id, False)); self.db.cache_extratos.invalidar((conta_id, True))
+        return {'saldos': saldos, 'criadas': criadas, 'excluidas': excluidas, 'recarregar': recarregar, 'seq': self.ultimo_seq}
+
+    def fechar(self):
+        with self.db._lock_pool:
+            if self._conn in self.db._conexoes_pool: self.db._conexoes_pool.remove(self._conn)
+        with self._lock: self._conn.close()
+
 # --- PARTE 1: Classes do Modelo (comentários traduzidos) ---
 
 class Cliente:
     """Representa um cliente do banco, interagindo com o BD (com senha e papel)."""
+    __slots__ = ('db', 'id', 'nome', 'cpf', 'endereco', '_senha_plana', 'role')
+
     def __init__(self, db_manager: DatabaseManager, cliente_id=None, nome=None, cpf=None, endereco=None, senha=None, role=None):
         self.db=db_manager; self.id=cliente_id; self.nome=nome; self.cpf=cpf; self.endereco=endereco;
         # **AVISO:** Armazenando senha em texto plano!
@@ -129,10 +1260,12 @@ class Cliente:
         if not self.nome or not self.cpf or not self._senha_plana: print("Erro: Nome, CPF, Senha obrigatórios."); return False
         # **AVISO:** Salvando senha em texto plano!
         if self.id is not None: # UPDATE
-            q="UPDATE clientes SET nome=?, cpf=?, endereco=?, senha=?, role=? WHERE id=?"; p=(self.nome, self.cpf, self.endereco, self._senha_plana, self.role, self.id); r=self.db.execute_query(q,p); return r is not None
+            q="UPDATE clientes SET nome=?, cpf=?, endereco=?, senha=?, role=? WHERE id=?"; p=(self.nome, self.cpf, self.endereco, self._senha_plana, self.role, self.id); r=self.db.execute_query(q,p)
+            if r is None: self.db.cache_clientes.invalidar(self.id); return False
+            self.db.cache_clientes.guardar(self.id, self, self.cpf); return True # Este objeto passa a ser o do mapa (CPF pode ter mudado)
         else: # INSERT
             q="INSERT INTO clientes (nome, cpf, endereco, senha, role) VALUES (?, ?, ?, ?, ?)"; p=(self.nome, self.cpf, self.endereco, self._senha_plana, self.role); new_id=self.db.execute_query(q,p);
-            if new_id: self.id=new_id; return True
+            if new_id: self.id=new_id; self.db.cache_clientes.guardar(self.id, self, self.cpf); return True
             print(f"Falha ao inserir cliente CPF {self.cpf}."); return False # Pode ser CPF duplicado
 
     def check_password(self, password_attempt: str) -> bool:
@@ -144,15 +1277,31 @@ class Cliente:
 
     def delete(self) -> bool:
         """Exclui o cliente do banco de dados (CASCADE deve excluir contas/transações)."""
-        if self.id is None: return False; q="DELETE FROM clientes WHERE id = ?"; r=self.db.execute_query(q, (self.id,));
-        if r is not None: self.id=None; return True; return False
+        if self.id is None: return False
+        q="DELETE FROM clientes WHERE id = ?"; r=self.db.execute_query(q, (self.id,))
+        if r is None: return False
+        cliente_id = self.id; self.db.cache_clientes.invalidar(cliente_id); self.db.cache_contas.invalidar_onde(lambda c: c.cliente_id == cliente_id) # Contas apagadas em cascata
+        self.db.cache_extratos.invalidar_onde(lambda e: e.conta.cliente_id == cliente_id)
+        self.id=None; return True
+
+    @classmethod
+    def obter(cls, db_manager: DatabaseManager, cliente_id: int) -> 'Cliente | None':
+        """Retorna o cliente pelo ID via mapa de identidade (carrega do BD na primeira vez)."""
+        cliente = db_manager.cache_clientes.obter(cliente_id)
+        if cliente is not None: return cliente
+        cliente = cls(db_manager, cliente_id=cliente_id)
+        if not cliente.id: return None
+        db_manager.cache_clientes.guardar(cliente.id, cliente, cliente.cpf); return cliente
 
     @staticmethod
     def find_by_cpf(db_manager: DatabaseManager, cpf: str) -> 'Cliente | None':
-        """Busca um cliente pelo CPF no BD (incluindo senha e papel)."""
+        """Busca um cliente pelo CPF (mapa de identidade, senão BD, incluindo senha e papel)."""
+        cliente = db_manager.cache_clientes.obter_por_chave(cpf)
+        if cliente is not None: return cliente
         data = db_manager.fetch_one("SELECT id, nome, cpf, endereco, senha, role FROM clientes WHERE cpf = ?", (cpf,))
         if data: # Mapeia manualmente 'id' do BD para 'cliente_id' do construtor
-            return Cliente(db_manager, cliente_id=data['id'], nome=data['nome'], cpf=data['cpf'], endereco=data['endereco'], senha=data['senha'], role=data['role'])
+            cliente = Cliente(db_manager, cliente_id=data['id'], nome=data['nome'], cpf=data['cpf'], endereco=data['endereco'], senha=data['senha'], role=data['role'])
+            db_manager.cache_clientes.guardar(cliente.id, cliente, cliente.cpf); return cliente
         return None
 
     def __str__(self):
@@ -162,13 +1311,20 @@ class Cliente:
 
 class Conta:
     """Classe base para contas bancárias, interagindo com o BD."""
-    # Definição de atributos para clareza
-    id: int | None = None; numero: str | None = None; agencia: str | None = None
-    _saldo: float = 0.0; cliente_id: int | None = None; tipo_conta: str | None = None
-    limite: float = 0.0; limite_saques: int = 3; _cliente_cache: Cliente | None = None
+    # Definição de atributos para clareza (__slots__: sem __dict__ por objeto)
+    __slots__ = ('db', 'id', 'numero', 'agencia', '_saldo', 'cliente_id', 'tipo_conta', 'limite', 'limite_saques', '_cliente_cache')
+    id: int | None; numero: str | None; agencia: str | None
+    _saldo: Dinheiro; cliente_id: int | None; tipo_conta: str | None
+    limite: Dinheiro; limite_saques: int; _cliente_cache: Cliente | None
+    # Consultas quentes (verificadas contra o plano de execução em benchmark.py planos)
+    SQL_HISTORICO = "SELECT id, tipo, valor, timestamp, conta_destino_id FROM transacoes WHERE conta_id = ? ORDER BY timestamp ASC, id ASC"
+    SQL_HISTORICO_PAGINA_BASE = "SELECT id, tipo, valor, timestamp, conta_destino_id FROM transacoes WHERE conta_id = ?" # + filtros/chave/LIMIT em pagina_historico
+    SQL_SAQUES_HOJE = "SELECT total FROM saques_diarios WHERE conta_id = ? AND dia = ?" # Contador materializado (O(1))
+    TITULOS_ERRO_MOVIMENTO = {'deposito': "Erro Depósito", 'saque': "Erro Saque", 'transferencia_enviada': "Erro Transferência"} # Títulos das recusas (avisar_recusa)
 
     def __init__(self, db_manager: DatabaseManager, conta_id: int | None = None):
-        self.db = db_manager
+        self.db = db_manager; self.id = self.numero = self.agencia = self.cliente_id = self.tipo_conta = self._cliente_cache = None
+        self._saldo = Dinheiro(0); self.limite = Dinheiro(0); self.limite_saques = 3
         if conta_id is not None: self.id = conta_id; self._load_from_db()
         else: print("Alerta: Conta inicializada sem ID.")
 
@@ -177,14 +1333,67 @@ class Conta:
         if self.id is None: return
         data = self.db.fetch_one("SELECT * FROM contas WHERE id = ?", (self.id,))
         if data:
-            self.numero, self.agencia, self._saldo = data['numero'], data['agencia'], data['saldo']
-            self.limite, self.limite_saques = data['limite'], data['limite_saques']
+            self.numero, self.agencia, self._saldo = data['numero'], data['agencia'], self.db.de_bd(data['saldo'])
+            self.limite, self.limite_saques = self.db.de_bd(data['limite'] or 0), data['limite_saques'] # Limite nulo vale 0 (como no COALESCE de _debitar)
             self.tipo_conta, self.cliente_id = data['tipo_conta'], data['cliente_id']
             self._cliente_cache = None # Limpa cache do cliente ao recarregar
         else: print(f"Erro: Conta ID {self.id} não encontrada."); self.id = None # Invalida
 
+    @classmethod
+    def obter(cls, db_manager: DatabaseManager, conta_id: int) -> 'Conta | None':
+        """Retorna a conta pelo ID via mapa de identidade (carrega do BD na primeira vez)."""
+        conta = db_manager.cache_contas.obter(conta_id)
+        if isinstance(conta, cls): return conta
+        conta = cls(db_manager, conta_id=conta_id)
+        if not conta.id: return None
+        db_manager.cache_contas.guardar(conta.id, conta, conta.numero); return conta
+
+    @classmethod
+    def obter_por_numero(cls, db_manager: DatabaseManager, numero: str) -> 'Conta | None':
+        """Busca a conta pelo número (mapa de identidade, senão BD)."""
+        conta = db_manager.cache_contas.obter_por_chave(numero)
+        if isinstance(conta, cls): return conta
+        data = db_manager.fetch_one("SELECT id FROM contas WHERE numero = ?", (numero,))
+        return cls.obter(db_manager, data['id']) if data else None
+
+    # Modos da busca de contas: (filtro de prefixo, colunas da ordenação/chave, nomes dessas colunas no resultado)
+    _BUSCA_NOME = ("cl.nome >= ? COLLATE NOCASE AND cl.nome < ? COLLATE NOCASE", "cl.nome COLLATE NOCASE, cl.id, co.numero", ('nome', 'cliente_id', 'numero'))
+    _BUSCA_CPF = ("cl.cpf >= ? AND cl.cpf < ?", "cl.cpf, co.numero", ('cpf', 'numero'))
+    _BUSCA_NUMERO = ("co.numero >= ? AND co.numero < ?", "co.numero", ('numero',))
+
+    @staticmethod
+    def buscar(db_manager: DatabaseManager, termo: str = "", *, limite: int = 20, apos: tuple | None = None) -> tuple[list[dict], tuple | None]:
+        """Busca contas por prefixo, uma página por vez: só dígitos = número da conta; dígitos com '.'/'-' = CPF; senão nome (sem diferenciar maiúsculas).
+
+        Cada modo filtra por faixa [prefixo, prefixo + U+10FFFF) e ordena pelas colunas do próprio índice, então a página
+        sai do índice sem ordenar o resultado todo. Retorna as linhas e a chave para a página seguinte (None no fim)."""
+        q, params, chave = Conta.sql_busca(termo, limite=limite, apos=apos)
+        linhas = [dict(row) for row in db_manager.fetch_all(q, params)]
+        proxima = tuple(linhas[-1][c] for c in chave) if len(linhas) == limite else None
+        return linhas, proxima
+
+    @staticmethod
+    def sql_busca(termo: str, *, limite: int, apos: tuple | None = None) -> tuple[str, list, tuple[str, ...]]:
+        """Monta a consulta de buscar(): (SQL, parâmetros, colunas da chave de paginação)."""
+        termo = termo.strip()
+        if termo.isdigit(): filtro, ordem, chave = Conta._BUSCA_NUMERO
+        elif termo and all(ch.isdigit() or ch in '.-' for ch in termo): filtro, ordem, chave = Conta._BUSCA_CPF
+        else: filtro, ordem, chave = Conta._BUSCA_NOME
+        q = "SELECT co.id, co.numero, cl.id AS cliente_id, cl.nome, cl.cpf FROM clientes cl JOIN contas co ON co.cliente_id = cl.id WHERE 1"; params: list = []
+        if termo: q += f" AND {filtro}"; params += [termo, termo + chr(0x10FFFF)]
+        if apos is not None: q += f" AND ({ordem}) > ({', '.join('?' * len(apos))})"; params += list(apos)
+        q += f" ORDER BY {ordem} LIMIT ?"; params.append(limite)
+        return q, params, chave
+
+    def delete(self) -> bool:
+        """Encerra (exclui) a conta no BD; as transações saem em cascata."""
+        if self.id is None: return False
+        r = self.db.execute_query("DELETE FROM contas WHERE id = ?", (self.id,))
+        if r is None: return False
+        self.db.cache_contas.invalidar(self.id); self.db.cache_extratos.invalidar((self.id, False)); self.db.cache_extratos.invalidar((self.id, True)); self.id = None; return True
+
     @property
-    def saldo(self) -> float:
+    def saldo(self) -> Dinheiro:
         """Retorna o saldo atual (mantido em memória após carregamento/operações)."""
         return self._saldo
 
@@ -192,464 +1401,315 @@ class Conta:
     def cliente(self) -> Cliente | None:
         """Retorna o objeto Cliente associado (busca no BD com cache)."""
         if self._cliente_cache is None and self.cliente_id is not None:
-            self._cliente_cache = Cliente(self.db, cliente_id=self.cliente_id) # Carrega cliente
-            if not self._cliente_cache or not self._cliente_cache.id: self._cliente_cache = None # Verifica se carregou
+            self._cliente_cache = Cliente.obter(self.db, self.cliente_id) # Carrega cliente (compartilhado pelo mapa de identidade)
         return self._cliente_cache
 
     @property
     def historico(self) -> list[dict]:
-        """Busca as transações da conta no BD."""
-        if self.id is None: return []
-        q = "SELECT id, tipo, valor, timestamp, conta_destino_id FROM transacoes WHERE conta_id = ? ORDER BY timestamp ASC"
-        res = self.db.fetch_all(q, (self.id,)); return [dict(row) for row in res] # Retorna lista de dicionários
+        """Busca todas as transações da conta no BD (prefira iterar_historico/pagina_historico para contas grandes)."""
+        return list(self.iterar_historico())
+
+    def pagina_historico(self, *, apos: tuple[str, int] | None = None, limite: int = 200, inicio=None, fim=None) -> tuple[list[dict], tuple[str, int] | None]:
+        """Retorna uma página do histórico em ordem (timestamp, id) e a chave para pedir a próxima (None no fim).
+
+        Paginação por chave (keyset): a página seguinte começa depois de 'apos', sem OFFSET, então o custo
+        não cresce com a posição no ledger. 'inicio' (inclusive) e 'fim' (exclusive) filtram por data/hora.
+        Lançamentos de períodos arquivados vêm do banco de arquivo (todos anteriores a limite_arquivo), com a mesma chave."""
+        if self.id is None: return [], None
+        q = self.SQL_HISTORICO_PAGINA_BASE; params: list = [self.id]
+        if inicio is not None: q += " AND timestamp >= ?"; params.append(_texto_data(inicio))
+        if fim is not None: q += " AND timestamp < ?"; params.append(_texto_data(fim))
+        if apos is not None: q += " AND (timestamp, id) > (?, ?)"; params.extend(apos)
+        q += " ORDER BY timestamp ASC, id ASC LIMIT ?"; params.append(limite)
+        arquivado = self.db.limite_arquivo(); linhas = []
+        if arquivado is not None and (apos is None or apos[0] < arquivado) and (inicio is None or params[1] < arquivado):
+            linhas = [dict(row) for row in self.db.fetch_all_arquivo(q, params)]
+        if len(linhas) < limite: params[-1] = limite - len(linhas); linhas += [dict(row) for row in self.db.fetch_all(q, params)]
+        for linha in linhas: linha['valor'] = self.db.de_bd(linha['valor'])
+        proxima = (linhas[-1]['timestamp'], linhas[-1]['id']) if len(linhas) == limite else None
+        return linhas, proxima
+
+    def iterar_historico(self, *, inicio=None, fim=None, tamanho_lote: int = 500):
+        """Gera as transações da conta lote a lote (memória limitada ao tamanho do lote)."""
+        apos = None
+        while True:
+            linhas, apos = self.pagina_historico(apos=apos, limite=tamanho_lote, inicio=inicio, fim=fim)
+            yield from linhas
+            if apos is None: return
+
+    def fechamento_anterior(self) -> dict | None:
+        """Último fechamento mensal da conta: {'periodo', 'saldo', 'inicio'} ('inicio': onde começam os lançamentos seguintes) ou None."""
+        if self.id is None: return None
+        row = self.db.fetch_one("SELECT periodo, saldo FROM fechamentos WHERE conta_id = ? ORDER BY periodo DESC LIMIT 1", (self.id,))
+        return {'periodo': row['periodo'], 'saldo': self.db.de_bd(row['saldo']), 'inicio': inicio_mes_seguinte(row['periodo'])} if row else None
 
     def _get_numero_saques_hoje(self) -> int:
-        """Consulta o BD para saber quantos saques/transferências foram feitos hoje."""
+        """Consulta o contador do dia de saques/transferências (a checagem definitiva acontece dentro da transação)."""
         if self.id is None: return 0
-        hoje = datetime.date.today().strftime('%Y-%m-%d')
-        q = "SELECT COUNT(*) as total FROM transacoes WHERE conta_id = ? AND tipo IN ('saque', 'transferencia_enviada') AND DATE(timestamp) = ?"
-        res = self.db.fetch_one(q, (self.id, hoje)); return res['total'] if res else 0
+        res = self.db.fetch_one(self.SQL_SAQUES_HOJE, (self.id, datetime.date.today().isoformat())); return res['total'] if res else 0
 
-    def _atualizar_saldo_e_registrar_transacao(self, tipo: str, valor: float, conta_destino_id: int | None = None) -> bool:
-        """Método interno ATUALIZADO para transações atômicas (deposito, saque, transferencia)."""
+    def _atualizar_saldo_e_registrar_transacao(self, tipo: str, valor: Dinheiro, conta_destino_id: int | None = None, conta_destino: 'Conta | None' = None) -> bool:
+        """Método interno para transações atômicas (deposito, saque, transferencia): UPDATE condicional + BEGIN IMMEDIATE com retentativas."""
         if self.id is None: return False
-        conn = None
-        try:
-            conn = self.db._connect(); cursor = conn.cursor()
-            # --- Início da Transação Atômica ---
-            cursor.execute("SELECT saldo FROM contas WHERE id = ?", (self.id,)) # Saldo Origem
-            saldo_origem_db = cursor.fetchone()['saldo']; novo_saldo_origem = saldo_origem_db
-
-            if tipo == 'deposito': novo_saldo_origem = saldo_origem_db + valor
-            elif tipo in ('saque', 'transferencia_enviada'):
-                saldo_disponivel = saldo_origem_db
-                if isinstance(self, ContaCorrente): saldo_disponivel += self.limite
-                if valor > saldo_disponivel: conn.rollback(); print(f"BD Check: Saldo insuficiente para {tipo}."); return False
-                novo_saldo_origem = saldo_origem_db - valor
-                if tipo == 'transferencia_enviada': # Lógica da transferência
-                    if conta_destino_id is None: conn.rollback(); return False
-                    cursor.execute("SELECT saldo FROM contas WHERE id = ?", (conta_destino_id,)) # Saldo Destino
-                    saldo_destino_row = cursor.fetchone()
-                    if saldo_destino_row is None: conn.rollback(); print("Conta destino não existe."); return False
-                    novo_saldo_destino = saldo_destino_row['saldo'] + valor
-                    cursor.execute("UPDATE contas SET saldo = ? WHERE id = ?", (novo_saldo_destino, conta_destino_id)) # Atualiza Destino
-                    cursor.execute("INSERT INTO transacoes (conta_id, tipo, valor, conta_destino_id) VALUES (?, ?, ?, ?)", (conta_destino_id, 'transferencia_recebida', valor, self.id)) # Registra Recebimento
-            else: conn.rollback(); return False # Tipo inválido
-
-            cursor.execute("UPDATE contas SET saldo = ? WHERE id = ?", (novo_saldo_origem, self.id)) # Atualiza Origem
-            cursor.execute("INSERT INTO transacoes (conta_id, tipo, valor, conta_destino_id) VALUES (?, ?, ?, ?)", (self.id, tipo, valor, conta_destino_id if tipo == 'transferencia_enviada' else None)) # Registra Origem
-            conn.commit() # Confirma TUDO
-            # --- Fim da Transação Atômica ---
-            self._saldo = novo_saldo_origem; print(f"{tipo.replace('_', ' ').capitalize()} R$ {valor:.2f} OK no BD."); return True
+        try: self._postar(tipo, valor, conta_destino_id, conta_destino)
+        except MovimentoRecusado as e:
+            print(f"BD Check: {e} ({tipo})")
+            if e.motivo == 'limite_saques': _messagebox().showwarning("Limite", str(e)) # Limite atingido por outra instância entre a checagem e a transação
+            return False
         except sqlite3.Error as e:
-            print(f"Erro BD durante {tipo}: {e}");
-            if conn: conn.rollback(); messagebox.showerror("Erro BD", f"Falha ao processar {tipo}.")
+            print(f"Erro BD durante {tipo}: {e}"); _messagebox().showerror("Erro BD", f"Falha ao processar {tipo}.")
             return False
-        finally:
-            if conn: conn.close()
+        return True
+
+    def _postar(self, tipo: str, valor: Dinheiro, conta_destino_id: int | None = None, conta_destino: 'Conta | None' = None) -> Dinheiro:
+        """Grava o movimento (fila de group commit ou transação própria) e retorna o novo saldo; levanta MovimentoRecusado/sqlite3.Error.
+
+        Transferência para uma conta de outro fragmento (conta_destino de outro DatabaseManager do mesmo BancoParticionado): duas fases."""
+        usa_limite = isinstance(self, ContaCorrente); opcoes = {'usa_limite': usa_limite, 'limite_saques': self.limite_saques if usa_limite else None}
+        if self.db.particionado is not None and conta_destino is not None and conta_destino.db is not self.db: novo_saldo = self.db.particionado.transferir(self, conta_destino, valor, **opcoes)
+        elif self.db.fila_postagem is not None: novo_saldo = self.db.fila_postagem.enviar(self.id, tipo, valor, conta_destino_id, **opcoes).result() # Group commit
+        else: novo_saldo = self.db.executar_transacao(lambda cursor: postar_movimento(cursor, self.id, tipo, self.db.para_bd(valor), conta_destino_id, **opcoes)) # Unidade do BD lida já com a trava
+        self._saldo = novo_saldo = self.db.de_bd(novo_saldo); self._apos_postagem(conta_destino_id)
+        print(f"{tipo.replace('_', ' ').capitalize()} R$ {valor:.2f} OK no BD."); return novo_saldo
+
+    def _apos_postagem(self, conta_destino_id: int | None):
+        """Mantém o mapa de identidade coerente: o saldo da conta destino em cache ficou desatualizado."""
+        if conta_destino_id is not None: self.db.cache_contas.invalidar(conta_destino_id)
+        if not self.db.cache_contas.contem(self.id, self): self.db.cache_contas.invalidar(self.id) # Outra cópia da origem em cache (espiada sem contar acerto/falha)
+
+    def validar_movimento(self, tipo: str, valor: Dinheiro, conta_destino: 'Conta | None' = None):
+        """Checagens prévias de depósito/saque/transferência (a definitiva acontece na transação); levanta MovimentoRecusado."""
+        if tipo == 'transferencia_enviada':
+            if not (self.id and conta_destino and conta_destino.id): raise MovimentoRecusado('conta_destino_inexistente', "Conta de origem ou destino inválida.")
+            if self.id == conta_destino.id: raise MovimentoRecusado('contas_iguais', "Contas de origem e destino iguais.")
+        elif self.id is None: raise MovimentoRecusado('conta_inexistente', "Conta inválida.")
+        if valor <= 0: raise MovimentoRecusado('valor_invalido', "Valor deve ser positivo.")
+        if tipo == 'deposito': return
+        saldo_disp = self.saldo; corrente = isinstance(self, ContaCorrente)
+        # Saque: saldo (conta base) -> limite diário -> saldo+limite (CC); transferência: saldo/limite -> limite diário
+        if tipo == 'saque' and not corrente and valor > saldo_disp: raise MovimentoRecusado('saldo_insuficiente', f"Saldo insuficiente: R$ {saldo_disp:.2f}")
+        if corrente: saldo_disp += self.limite
+        if tipo == 'transferencia_enviada' and valor > saldo_disp: raise MovimentoRecusado('saldo_insuficiente', f"Saldo/Limite insuficiente: R$ {saldo_disp:.2f}")
+        if corrente and self._get_numero_saques_hoje() >= self.limite_saques:
+            raise MovimentoRecusado('limite_saques', f"Limite de {self.limite_saques} saques/transferências diários atingido.")
+        if tipo == 'saque' and corrente and valor > saldo_disp: raise MovimentoRecusado('saldo_insuficiente', f"Saldo+Limite insuficiente: R$ {saldo_disp:.2f}")
+
+    def efetuar_movimento(self, tipo: str, valor, conta_destino: 'Conta | None' = None) -> Dinheiro:
+        """Valida e grava o movimento sem tocar na interface (seguro em threads de trabalho); retorna o novo saldo.
+
+        valor: Dinheiro, texto ou número em reais (levanta MovimentoRecusado('valor_invalido') se não for um valor em centavos)."""
+        valor = self._valor_movimento(valor); self.validar_movimento(tipo, valor, conta_destino)
+        return self._postar(tipo, valor, conta_destino.id if conta_destino else None, conta_destino)
+
+    @staticmethod
+    def avisar_recusa(tipo: str, erro: MovimentoRecusado, **kwargs):
+        """Mostra a recusa ao usuário (aviso para o limite diário, erro nos demais casos)."""
+        if erro.motivo == 'limite_saques': _messagebox().showwarning("Limite", str(erro), **kwargs)
+        elif erro.motivo in ('valor_invalido', 'saldo_insuficiente'): _messagebox().showerror(Conta.TITULOS_ERRO_MOVIMENTO.get(tipo, "Erro"), str(erro), **kwargs)
+        else: _messagebox().showerror("Erro", str(erro), **kwargs)
+
+    @staticmethod
+    def _valor_movimento(valor) -> Dinheiro:
+        try: return Dinheiro.de(valor)
+        except (TypeError, ValueError) as e: raise MovimentoRecusado('valor_invalido', f"Valor inválido: {e}")
+
+    def _movimentar(self, tipo: str, valor, conta_destino: 'Conta | None' = None) -> bool:
+        """Checagens prévias com aviso ao usuário + transação BD (com validação final)."""
+        try: valor = self._valor_movimento(valor); self.validar_movimento(tipo, valor, conta_destino)
+        except MovimentoRecusado as e: self.avisar_recusa(tipo, e); return False
+        return self._atualizar_saldo_e_registrar_transacao(tipo, valor, conta_destino.id if conta_destino else None, conta_destino)
 
-    def depositar(self, valor: float) -> bool:
+    def depositar(self, valor) -> bool:
         """Realiza um depósito."""
-        if self.id is None: messagebox.showerror("Erro", "Conta inválida."); return False
-        if valor <= 0: messagebox.showerror("Erro Depósito", "Valor deve ser positivo."); return False
-        return self._atualizar_saldo_e_registrar_transacao('deposito', valor)
+        return self._movimentar('deposito', valor)
 
-    def sacar(self, valor: float) -> bool:
+    def sacar(self, valor) -> bool:
         """Realiza um saque (validação inicial + transação BD)."""
-        if self.id is None: messagebox.showerror("Erro", "Conta inválida."); return False
-        if valor <= 0: messagebox.showerror("Erro Saque", "Valor deve ser positivo."); return False
-        saldo_disp = self.saldo
-        # Validação inicial rápida (sem limite para conta base)
-        if not isinstance(self, ContaCorrente) and valor > saldo_disp:
-             messagebox.showerror("Erro Saque", f"Saldo insuficiente: R$ {saldo_disp:.2f}"); return False
-        # Validação de limite diário para CC (inclui transferências)
-        if isinstance(self, ContaCorrente):
-            num_saques_hoje = self._get_numero_saques_hoje()
-            if num_saques_hoje >= self.limite_saques:
-                messagebox.showwarning("Limite", f"Limite de {self.limite_saques} saques/transferências diários atingido."); return False
-            # Validação inicial rápida com limite para CC
-            saldo_disp += self.limite
-            if valor > saldo_disp: messagebox.showerror("Erro Saque", f"Saldo+Limite insuficiente: R$ {saldo_disp:.2f}"); return False
-        # Transação BD (com validação final de saldo/limite)
-        return self._atualizar_saldo_e_registrar_transacao('saque', valor)
-
-    def transferir(self, valor: float, conta_destino: 'Conta') -> bool:
+        return self._movimentar('saque', valor)
+
+    def transferir(self, valor, conta_destino: 'Conta') -> bool:
         """Realiza uma transferência para outra conta de forma atômica."""
-        if not (self.id and conta_destino and conta_destino.id): messagebox.showerror("Erro", "Conta de origem ou destino inválida."); return False
-        if self.id == conta_destino.id: messagebox.showerror("Erro", "Contas de origem e destino iguais."); return False
-        if valor <= 0: messagebox.showerror("Erro Transferência", "Valor deve ser positivo."); return False
-        # Validação inicial saldo/limite
-        saldo_disp = self.saldo
-        if isinstance(self, ContaCorrente): saldo_disp += self.limite
-        if valor > saldo_disp: messagebox.showerror("Erro Transferência", f"Saldo/Limite insuficiente: R$ {saldo_disp:.2f}"); return False
-        # Validação limite diário
-        if isinstance(self, ContaCorrente):
-            num_saques_hoje = self._get_numero_saques_hoje()
-            if num_saques_hoje >= self.limite_saques:
-                messagebox.showwarning("Limite", f"Limite de {self.limite_saques} saques/transferências diários atingido."); return False
-        # Transação BD (com validação final)
-        return self._atualizar_saldo_e_registrar_transacao('transferencia_enviada', valor, conta_destino.id)
+        return self._movimentar('transferencia_enviada', valor, conta_destino)
 
-    def exibir_extrato(self) -> str:
-        """Gera string formatada do extrato (com detalhes de transferência)."""
-        cliente = self.cliente
-        if not self.id or not cliente: return "Erro: Conta/Cliente não carregados."
-        transacoes_lista = self.historico
-        extrato_str = f"""
+    # Tipo -> (rótulo já alinhado, sinal, prefixo da conta relacionada: destino na enviada, origem na recebida)
+    ROTULOS_EXTRATO = {'deposito': ("Depósito".ljust(18), "+", None), 'saque': ("Saque".ljust(18), "-", None),
+                       'transferencia_enviada': ("Transf. Enviada".ljust(18), "-", " -> ID:"), 'transferencia_recebida': ("Transf. Recebida".ljust(18), "+", " <- ID:")}
+
+    @staticmethod
+    def formatar_transacao(t: dict) -> str:
+        """Formata uma linha do extrato (data, tipo, sinal, valor e conta relacionada)."""
+        ts = t['timestamp'] # 'AAAA-MM-DD HH:MM:SS[.ffffff]' vira 'DD/MM/AAAA HH:MM:SS' por fatiamento (strptime/strftime por linha dominavam o extrato)
+        ts_fmt = f"{ts[8:10]}/{ts[5:7]}/{ts[:4]} {ts[11:19]}" if isinstance(ts, str) and ts[4:5] == ts[7:8] == '-' and ts[10:11] == ' ' and ts[19:20] in ('', '.') else ts
+        tipo_fmt, op, prefixo = Conta.ROTULOS_EXTRATO.get(t['tipo']) or (t['tipo'].capitalize().ljust(18), "?", None)
+        detalhe = f"{prefixo}{t['conta_destino_id']}" if prefixo and t['conta_destino_id'] else ""
+        return f"{ts_fmt} - {tipo_fmt}: {op} R$ {t['valor']:.2f}{detalhe}"
+
+    def cabecalho_extrato(self) -> str:
+        """Cabeçalho do extrato (cliente, agência e conta)."""
+        return f"""
         ================ EXTRATO ================
-        {str(cliente)}
+        {str(self.cliente)}
         Agência: {self.agencia}  Conta: {self.numero} ({self.tipo_conta.capitalize()})
         -----------------------------------------
         Transações:
         """
-        if not transacoes_lista: transacoes_str = "Nenhuma movimentação realizada."
-        else:
-            linhas_transacoes = []
-            for t in transacoes_lista:
-                try: ts_str=t['timestamp'].split('.')[0]; ts=datetime.datetime.strptime(ts_str,'%Y-%m-%d %H:%M:%S'); ts_fmt=ts.strftime('%d/%m/%Y %H:%M:%S')
-                except: ts_fmt = t['timestamp']
-                valor_fmt = f"R$ {t['valor']:.2f}"; tipo = t['tipo']; detalhe = ""
-                if tipo == 'deposito': tipo_fmt = "Depósito".ljust(18); op = "+" # Aumentado ljust
-                elif tipo == 'saque': tipo_fmt = "Saque".ljust(18); op = "-"
-                elif tipo == 'transferencia_enviada':
-                    tipo_fmt = "Transf. Enviada".ljust(18); op = "-"
-                    if t['conta_destino_id']: detalhe = f" -> ID:{t['conta_destino_id']}" # Mostra ID destino
-                elif tipo == 'transferencia_recebida':
-                    tipo_fmt = "Transf. Recebida".ljust(18); op = "+"
-                    if t['conta_destino_id']: detalhe = f" <- ID:{t['conta_destino_id']}" # ID aqui é a origem
-                else: tipo_fmt = tipo.capitalize().ljust(18); op = "?"
-                linhas_transacoes.append(f"{ts_fmt} - {tipo_fmt}: {op} {valor_fmt}{detalhe}")
-            transacoes_str = "\n".join(linhas_transacoes)
-        extrato_str += f"\n{textwrap.indent(transacoes_str, '  ')}\n"
-        extrato_str += f"-----------------------------------------\n"
+
+    def rodape_extrato(self) -> str:
+        """Rodapé do extrato: relê o saldo no BD e mostra o limite (CC)."""
+        rodape = f"-----------------------------------------\n"
         saldo_atual_db = self.db.fetch_one("SELECT saldo FROM contas WHERE id = ?", (self.id,));
-        if saldo_atual_db: self._saldo = saldo_atual_db['saldo']; extrato_str += f"Saldo Atual: R$ {self.saldo:.2f}\n"
-        else: extrato_str += f"Saldo Atual: Erro\n"
-        if isinstance(self, ContaCorrente): extrato_str += f"Limite Ch. Especial: R$ {self.limite:.2f}\n"
-        extrato_str += "=========================================\n"
-        return extrato_str
+        if saldo_atual_db: self._saldo = self.db.de_bd(saldo_atual_db['saldo']); rodape += f"Saldo Atual: R$ {self.saldo:.2f}\n"
+        else: rodape += f"Saldo Atual: Erro\n"
+        if isinstance(self, ContaCorrente): rodape += f"Limite Ch. Especial: R$ {self.limite:.2f}\n"
+        return rodape + "=========================================\n"
+
+    def extrato_renderizado(self, completo: bool = False) -> 'ExtratoRenderizado':
+        """Extrato formatado da conta (desde o último fechamento ou completo), compartilhado pelo cache LRU db.cache_extratos."""
+        chave = (self.id, completo); extrato = self.db.cache_extratos.obter(chave)
+        if extrato is None: extrato = ExtratoRenderizado(self, completo); self.db.cache_extratos.guardar(chave, extrato)
+        else: extrato.conta = self # Objeto atual do mapa de identidade (saldo/limite do rodapé)
+        return extrato
+
+    def exibir_extrato(self) -> str:
+        """Gera string formatada do extrato completo (com detalhes de transferência); só os lançamentos novos desde a última chamada são formatados."""
+        cliente = self.cliente
+        if not self.id or not cliente: return "Erro: Conta/Cliente não carregados."
+        extrato = self.extrato_renderizado(completo=True); extrato.sincronizar()
+        while not extrato.fim: extrato.carregar_pagina(500) # Lê o ledger em lotes
+        return extrato.texto()
 
 class ContaCorrente(Conta):
     """Conta Corrente, herda de Conta."""
+    __slots__ = ()
     pass # Lógica específica já tratada na classe base ou herdada
 
-# --- PARTE 2: Tela de Login ---
-
-class LoginWindow(customtkinter.CTk):
-    """Janela de login inicial da aplicação."""
-    def __init__(self, db_manager: DatabaseManager):
-        super().__init__(); self.db = db_manager; self.title("Login - Banco Moderno"); self.geometry("400x350"); self.resizable(False, False); self.grid_columnconfigure(0, weight=1)
-        self.lbl_title = customtkinter.CTkLabel(self, text="Acesso ao Sistema", font=customtkinter.CTkFont(size=20, weight="bold")); self.lbl_title.grid(row=0, column=0, padx=20, pady=(30, 15))
-        self.lbl_cpf = customtkinter.CTkLabel(self, text="CPF (xxx.xxx.xxx-xx):"); self.lbl_cpf.grid(row=1, column=0, padx=50, pady=(10, 0), sticky="w")
-        self.entry_cpf = customtkinter.CTkEntry(self, width=300); self.entry_cpf.grid(row=2, column=0, padx=50, pady=(0, 10), sticky="ew")
-        self.lbl_senha = customtkinter.CTkLabel(self, text="Senha:"); self.lbl_senha.grid(row=3, column=0, padx=50, pady=(10, 0), sticky="w")
-        self.entry_senha = customtkinter.CTkEntry(self, width=300, show="*"); self.entry_senha.grid(row=4, column=0, padx=50, pady=(0, 15), sticky="ew")
-        self.btn_login = customtkinter.CTkButton(self, text="Login", command=self.attempt_login, width=300); self.btn_login.grid(row=5, column=0, padx=50, pady=10)
-        self.lbl_error = customtkinter.CTkLabel(self, text="", text_color="red"); self.lbl_error.grid(row=6, column=0, padx=50, pady=(5, 10))
-        self.entry_cpf.focus(); self.entry_senha.bind("<Return>", self.attempt_login); self.btn_login.bind("<Return>", self.attempt_login)
-
-    def attempt_login(self, event=None):
-        """Tenta autenticar o usuário."""
-        cpf = self.entry_cpf.get().strip(); senha = self.entry_senha.get()
-        if not cpf or not senha: self.show_error("CPF e Senha obrigatórios."); return
-        cliente_logando = Cliente.find_by_cpf(self.db, cpf) # Usa método corrigido
-        if cliente_logando and cliente_logando.check_password(senha):
-            print(f"Login OK: {cliente_logando}"); self.destroy(); main_app = BancoGUI(self.db, cliente_logando, cliente_logando.role); main_app.mainloop()
-        else: self.show_error("CPF ou Senha inválidos."); self.entry_senha.delete(0, tk.END)
-
-    def show_error(self, message):
-        """Exibe mensagem de erro no login."""
-        self.lbl_error.configure(text=message)
-
-# --- PARTE 3: Interface Gráfica Principal (Traduzida e com Transferência) ---
-
-class BancoGUI(customtkinter.CTk):
-    """Interface gráfica principal, adaptada para login, papel e transferência."""
-    def __init__(self, db_manager: DatabaseManager, logged_in_cliente: Cliente, user_role: str):
-        super().__init__(); self.db = db_manager; self.logged_in_cliente = logged_in_cliente; self.user_role = user_role
-        self.conta_selecionada: Conta | None = None; self.map_display_to_conta_id: dict[str, int] = {}
-        self.proximo_numero_conta = self._get_next_account_number()
-
-        # Config Janela e Aparência
-        customtkinter.set_appearance_mode("System"); customtkinter.set_default_color_theme("blue")
-        self.title(f"Banco App - [{user_role.upper()}] {logged_in_cliente.nome}") # Título com nome e papel
-        self.geometry("800x850")
-
-        # Layout Principal
-        self.grid_columnconfigure(0, weight=1); self.grid_rowconfigure(3, weight=1); self.grid_rowconfigure(4, weight=0)
-
-        # --- Frame Superior ---
-        top_frame = customtkinter.CTkFrame(self, fg_color="transparent"); top_frame.grid(row=0, column=0, padx=20, pady=(10, 5), sticky="ew"); top_frame.grid_columnconfigure(1, weight=1)
-        self.title_label = customtkinter.CTkLabel(top_frame, text="Bem-vindo(a)!", font=customtkinter.CTkFont(size=20, weight="bold")); self.title_label.grid(row=0, column=0, padx=10, pady=5, sticky="w")
-        self.account_options = ["Carregando..."]; self.selected_account_var = customtkinter.StringVar(value=self.account_options[0])
-        self.account_dropdown = customtkinter.CTkOptionMenu(top_frame, variable=self.selected_account_var, command=self.selecionar_conta_pelo_dropdown, width=250, state="disabled"); self.account_dropdown.grid(row=0, column=1, padx=10, pady=5, sticky="ew")
-        self.theme_switch = customtkinter.CTkSwitch(top_frame, text="Modo Escuro", command=self.toggle_theme); self.theme_switch.grid(row=0, column=2, padx=10, pady=5, sticky="e")
-        if customtkinter.get_appearance_mode() == "Dark": self.theme_switch.select()
-
-        # --- Frame Botões Gerenciamento ---
-        self.mgmt_button_frame = customtkinter.CTkFrame(self, fg_color="transparent"); self.mgmt_button_frame.grid(row=1, column=0, padx=20, pady=5, sticky="ew"); self.mgmt_button_frame.grid_columnconfigure((0, 1, 2, 3), weight=1)
-        self.btn_encerrar_conta = customtkinter.CTkButton(self.mgmt_button_frame, text="Encerrar Conta Sel.", command=self.encerrar_conta_selecionada, fg_color="#E57373", hover_color="#EF5350"); self.btn_encerrar_conta.grid(row=0, column=0, padx=5, pady=5, sticky="ew")
-        if self.user_role == 'admin': # Botões exclusivos do Admin
-            self.btn_add_conta = customtkinter.CTkButton(self.mgmt_button_frame, text="Add Conta p/ Cliente", command=self.adicionar_nova_conta_para_cliente); self.btn_add_conta.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
-            self.btn_cadastrar_cliente = customtkinter.CTkButton(self.mgmt_button_frame, text="Cadastrar Cliente", command=self.abrir_janela_cadastro); self.btn_cadastrar_cliente.grid(row=0, column=2, padx=5, pady=5, sticky="ew")
-            self.btn_excluir_cliente = customtkinter.CTkButton(self.mgmt_button_frame, text="Excluir Cliente Sel.", command=self.excluir_cliente_selecionado, fg_color="#D32F2F", hover_color="#B71C1C"); self.btn_excluir_cliente.grid(row=0, column=3, padx=5, pady=5, sticky="ew")
-        else: self.mgmt_button_frame.grid_columnconfigure(0, weight=4) # Botão de encerrar ocupa mais espaço
-
-        # --- Frame Principal Conteúdo ---
-        main_content_frame = customtkinter.CTkFrame(self, corner_radius=10); main_content_frame.grid(row=2, column=0, padx=20, pady=(0, 10), sticky="nsew"); main_content_frame.grid_columnconfigure(0, weight=1); main_content_frame.grid_rowconfigure(3, weight=1)
-        # Seção Informações
-        info_frame = customtkinter.CTkFrame(main_content_frame); info_frame.grid(row=0, column=0, padx=15, pady=15, sticky="ew"); info_frame.grid_columnconfigure(1, weight=1)
-        self.lbl_cliente = customtkinter.CTkLabel(info_frame, text="Cliente: -", anchor="w"); self.lbl_cliente.grid(row=0, column=0, columnspan=2, padx=10, pady=(10, 5), sticky="ew")
-        self.lbl_conta = customtkinter.CTkLabel(info_frame, text="Conta: -", anchor="w"); self.lbl_conta.grid(row=1, column=0, columnspan=2, padx=10, pady=5, sticky="ew")
-        self.lbl_saldo_texto = customtkinter.CTkLabel(info_frame, text="Saldo Atual:", font=customtkinter.CTkFont(size=14, weight="bold"), anchor="w"); self.lbl_saldo_texto.grid(row=2, column=0, padx=10, pady=(10, 10), sticky="w")
-        self.lbl_saldo_valor = customtkinter.CTkLabel(info_frame, text="R$ -", font=customtkinter.CTkFont(size=16, weight="bold"), anchor="e"); self.lbl_saldo_valor.grid(row=2, column=1, padx=10, pady=(10, 10), sticky="e")
-        # Seção Operações (Depósito/Saque)
-        self.actions_frame = customtkinter.CTkFrame(main_content_frame); self.actions_frame.grid(row=1, column=0, padx=15, pady=5, sticky="ew"); self.actions_frame.grid_columnconfigure((1, 2, 3), weight=1)
-        valor_label = customtkinter.CTkLabel(self.actions_frame, text="Valor Op:"); valor_label.grid(row=0, column=0, padx=(10, 0), pady=5, sticky="w")
-        self.entry_valor = customtkinter.CTkEntry(self.actions_frame, placeholder_text="0.00", width=140); self.entry_valor.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
-        self.btn_depositar = customtkinter.CTkButton(self.actions_frame, text="Depositar", command=self.realizar_deposito); self.btn_depositar.grid(row=0, column=2, padx=5, pady=5, sticky="ew")
-        self.btn_sacar = customtkinter.CTkButton(self.actions_frame, text="Sacar", command=self.realizar_saque, fg_color="#E53935", hover_color="#C62828"); self.btn_sacar.grid(row=0, column=3, padx=5, pady=5, sticky="ew")
-        # Seção Transferência
-        self.transfer_frame = customtkinter.CTkFrame(main_content_frame); self.transfer_frame.grid(row=2, column=0, padx=15, pady=5, sticky="ew"); self.transfer_frame.grid_columnconfigure(1, weight=1); self.transfer_frame.grid_columnconfigure(3, weight=1); self.transfer_frame.grid_columnconfigure(4, weight=1)
-        lbl_conta_dest = customtkinter.CTkLabel(self.transfer_frame, text="Conta Destino:"); lbl_conta_dest.grid(row=0, column=0, padx=(10,0), pady=5, sticky="w")
-        self.entry_conta_destino = customtkinter.CTkEntry(self.transfer_frame, placeholder_text="Número", width=100); self.entry_conta_destino.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
-        lbl_valor_transf = customtkinter.CTkLabel(self.transfer_frame, text="Valor Transf:"); lbl_valor_transf.grid(row=0, column=2, padx=(10,0), pady=5, sticky="w")
-        self.entry_valor_transferencia = customtkinter.CTkEntry(self.transfer_frame, placeholder_text="0.00", width=100); self.entry_valor_transferencia.grid(row=0, column=3, padx=5, pady=5, sticky="ew")
-        self.btn_transferir = customtkinter.CTkButton(self.transfer_frame, text="Transferir", command=self.realizar_transferencia, fg_color="#0B5ED7", hover_color="#0A58CA"); self.btn_transferir.grid(row=0, column=4, padx=(5,10), pady=5, sticky="ew")
-        # Seção Extrato
-        self.extrato_frame = customtkinter.CTkFrame(main_content_frame); self.extrato_frame.grid(row=3, column=0, padx=15, pady=10, sticky="nsew"); self.extrato_frame.grid_rowconfigure(0, weight=1); self.extrato_frame.grid_columnconfigure(0, weight=1)
-        self.txt_extrato = customtkinter.CTkTextbox(self.extrato_frame, wrap=tk.WORD, font=("Courier New", 11), corner_radius=8, border_width=1); self.txt_extrato.grid(row=0, column=0, padx=10, pady=(10, 5), sticky="nsew"); self.txt_extrato.configure(state="disabled")
-        self.btn_atualizar_extrato = customtkinter.CTkButton(main_content_frame, text="Atualizar Extrato", command=self.mostrar_extrato, fg_color="grey", hover_color="#555555"); self.btn_atualizar_extrato.grid(row=4, column=0, padx=15, pady=(5, 10), sticky="ew")
-
-        # --- Rodapé ---
-        footer_label = customtkinter.CTkLabel(self, text="Artur Kuzma Marques fez isso :)", font=customtkinter.CTkFont(size=10), text_color="gray"); footer_label.grid(row=4, column=0, padx=20, pady=(5, 10), sticky="s")
-
-        # --- Inicialização da Interface ---
-        self.after(100, self.carregar_e_atualizar_contas_iniciais) # Carrega dados após janela aparecer
-
-    def _get_next_account_number(self) -> int:
-        """Busca o maior número de conta no BD e retorna o próximo."""
-        max_num_row = self.db.fetch_one("SELECT MAX(CAST(numero AS INTEGER)) as max_num FROM contas")
-        max_num = 1000;
-        if max_num_row and max_num_row['max_num'] is not None:
-            try: max_num = int(max_num_row['max_num'])
-            except ValueError: pass
-        return max_num + 1
-
-    # --- Funções de Gerenciamento e Callbacks (comentários traduzidos) ---
-
-    def carregar_e_atualizar_contas_iniciais(self):
-        """Carrega contas do BD (filtradas por papel) e atualiza dropdown."""
-        print("Carregando contas iniciais do BD..."); self.atualizar_dropdown_contas()
-        if self.account_options and "Nenhuma conta" not in self.account_options[0] and "Você não possui contas" not in self.account_options[0]:
-            self.selected_account_var.set(self.account_options[0]); self.selecionar_conta_pelo_dropdown(self.account_options[0])
-        else: self.atualizar_info_display()
-
-    def atualizar_dropdown_contas(self):
-        """Busca contas no BD (filtrando por user se não for admin) e atualiza."""
-        print(f"Atualizando dropdown (Papel: {self.user_role})..."); contas_db=[]; query=""; params=()
-        if self.user_role=='admin': q="SELECT co.id, co.numero, cl.nome FROM contas co JOIN clientes cl ON co.cliente_id = cl.id ORDER BY cl.nome, co.numero ASC"
-        elif self.user_role=='user' and self.logged_in_cliente and self.logged_in_cliente.id: q="SELECT co.id, co.numero, cl.nome FROM contas co JOIN clientes cl ON co.cliente_id = cl.id WHERE co.cliente_id = ? ORDER BY co.numero ASC"; params=(self.logged_in_cliente.id,)
-        else: print("Erro: Papel/Login inválido.")
-        if q: contas_db = self.db.fetch_all(q, params)
-        self.map_display_to_conta_id.clear(); self.account_options = []
-        if not contas_db:
-            if self.user_role=='user': self.account_options=["Você não possui contas"]
-            else: self.account_options=["Nenhuma conta cadastrada"]
-            self.conta_selecionada=None; self.selected_account_var.set(self.account_options[0]); self.account_dropdown.configure(values=self.account_options, state="disabled")
-        else:
-            for r in contas_db: self.account_options.append(f"{r['nome']} (Conta {r['numero']})"); self.map_display_to_conta_id[self.account_options[-1]]=r['id']
-            self.account_dropdown.configure(values=self.account_options, state="normal")
-            c_id_ant=self.conta_selecionada.id if self.conta_selecionada else None; sel_enc=False
-            if c_id_ant is not None:
-                for disp, c_id in self.map_display_to_conta_id.items():
-                    if c_id == c_id_ant: self.selected_account_var.set(disp); sel_enc=True; break
-            if not sel_enc:
-                prim_op=self.account_options[0]; self.selected_account_var.set(prim_op)
-                c_id_prim=self.map_display_to_conta_id.get(prim_op)
-                if c_id_prim: self.conta_selecionada = ContaCorrente(self.db, conta_id=c_id_prim)
-                else: self.conta_selecionada = None
-        self.atualizar_info_display() # Atualiza UI com base na nova lista/seleção
-
-    def selecionar_conta_pelo_dropdown(self, selection_string: str):
-        """Callback quando uma conta é selecionada no dropdown."""
-        print(f"Dropdown selecionado: {selection_string}");
-        if "Nenhuma conta" in selection_string or "Você não possui contas" in selection_string: self.conta_selecionada = None
-        else:
-            conta_id = self.map_display_to_conta_id.get(selection_string)
-            if conta_id:
-                temp_conta = ContaCorrente(self.db, conta_id=conta_id)
-                if not temp_conta.id: messagebox.showerror("Erro", f"Falha ao carregar conta ID {conta_id}."); self.conta_selecionada = None
-                elif self.user_role=='admin' or (temp_conta.cliente and temp_conta.cliente.id == self.logged_in_cliente.id): self.conta_selecionada = temp_conta # Seleção válida
-                else: messagebox.showerror("Acesso Negado", "Permissão negada."); self.conta_selecionada = None # Impede seleção de conta de outro user
-            else: messagebox.showerror("Erro Interno", f"ID não encontrado: {selection_string}"); self.conta_selecionada = None
-        self.atualizar_info_display() # Atualiza UI com a nova seleção
-
-    def atualizar_info_display(self):
-        """Atualiza labels, extrato e estados de botões com base na conta_selecionada."""
-        has_selection = self.conta_selecionada and self.conta_selecionada.id; is_admin = self.user_role == 'admin'
-        op_state = "normal" if has_selection else "disabled"
-        # Botões/Entries de Operação e Transferência
-        self.entry_valor.configure(state=op_state); self.btn_depositar.configure(state=op_state); self.btn_sacar.configure(state=op_state); self.btn_atualizar_extrato.configure(state=op_state)
-        self.entry_conta_destino.configure(state=op_state); self.entry_valor_transferencia.configure(state=op_state); self.btn_transferir.configure(state=op_state)
-        # Botão Encerrar Conta
-        self.btn_encerrar_conta.configure(state=op_state)
-        # Botões Admin (só existem se for admin)
-        if is_admin: self.btn_add_conta.configure(state=op_state); self.btn_excluir_cliente.configure(state=op_state); self.btn_cadastrar_cliente.configure(state="normal")
-        # Labels e Extrato
-        if has_selection:
-            conta = self.conta_selecionada; cliente = conta.cliente
-            if cliente: self.lbl_cliente.configure(text=f"Cliente: {cliente.nome} (CPF: {cliente.cpf})")
-            else: self.lbl_cliente.configure(text="Cliente: Erro")
-            self.lbl_conta.configure(text=f"Conta: {conta.agencia}-{conta.numero} ({conta.tipo_conta.capitalize()})")
-            self.atualizar_display_saldo(); self.mostrar_extrato()
-        else: # Sem seleção
-            self.lbl_cliente.configure(text="Cliente: -"); self.lbl_conta.configure(text="Conta: -")
-            self.lbl_saldo_valor.configure(text="R$ -"); self.atualizar_cor_saldo()
-            self.txt_extrato.configure(state="normal"); self.txt_extrato.delete("1.0", tk.END); self.txt_extrato.insert("1.0", "Selecione uma conta."); self.txt_extrato.configure(state="disabled")
-
-    def abrir_janela_cadastro(self):
-        """Abre janela para cadastrar novo cliente (Admin)."""
-        if hasattr(self, 'cadastro_window') and self.cadastro_window.winfo_exists(): self.cadastro_window.focus(); return
-        self.cadastro_window = customtkinter.CTkToplevel(self); self.cadastro_window.title("Cadastrar Novo Cliente"); self.cadastro_window.geometry("400x350"); self.cadastro_window.transient(self); self.cadastro_window.grab_set(); self.cadastro_window.grid_columnconfigure(1, weight=1)
-        customtkinter.CTkLabel(self.cadastro_window, text="Nome:").grid(row=0, column=0, padx=10, pady=10, sticky="w"); entry_nome = customtkinter.CTkEntry(self.cadastro_window, width=250); entry_nome.grid(row=0, column=1, padx=10, pady=10, sticky="ew")
-        customtkinter.CTkLabel(self.cadastro_window, text="CPF:").grid(row=1, column=0, padx=10, pady=10, sticky="w"); entry_cpf = customtkinter.CTkEntry(self.cadastro_window, width=250); entry_cpf.grid(row=1, column=1, padx=10, pady=10, sticky="ew")
-        customtkinter.CTkLabel(self.cadastro_window, text="Endereço:").grid(row=2, column=0, padx=10, pady=10, sticky="w"); entry_endereco = customtkinter.CTkEntry(self.cadastro_window, width=250); entry_endereco.grid(row=2, column=1, padx=10, pady=10, sticky="ew")
-        customtkinter.CTkLabel(self.cadastro_window, text="Senha:").grid(row=3, column=0, padx=10, pady=10, sticky="w"); entry_senha = customtkinter.CTkEntry(self.cadastro_window, width=250, show="*"); entry_senha.grid(row=3, column=1, padx=10, pady=10, sticky="ew")
-        btn_confirmar = customtkinter.CTkButton(self.cadastro_window, text="Confirmar Cadastro", command=lambda: self.cadastrar_cliente(entry_nome.get(), entry_cpf.get(), entry_endereco.get(), entry_senha.get(), self.cadastro_window)); btn_confirmar.grid(row=4, column=0, columnspan=2, padx=20, pady=20, sticky="ew"); entry_nome.focus()
-
-    def cadastrar_cliente(self, nome, cpf, endereco, senha, window_ref):
-        """Valida e salva novo cliente e conta inicial no BD (Admin)."""
-        # (Ordem corrigida: messagebox e destroy ANTES de atualizar UI)
-        nome, cpf, endereco, senha = nome.strip(), cpf.strip(), endereco.strip(), senha
-        if not nome or not cpf or not endereco or not senha: messagebox.showerror("Erro", "Todos campos obrigatórios!", parent=window_ref); return
-        if len(cpf) != 14 or cpf[3]!='.' or cpf[7]!='.' or cpf[11]!='-': messagebox.showerror("Erro", "Formato CPF inválido.", parent=window_ref); return
-        if Cliente.find_by_cpf(self.db, cpf): messagebox.showerror("Erro", f"CPF {cpf} já cadastrado!", parent=window_ref); return
-        novo_cliente = Cliente(self.db, nome=nome, cpf=cpf, endereco=endereco, senha=senha, role='user')
-        if novo_cliente.save():
-            cliente_id_criado = novo_cliente.id; print(f"Cliente {nome} (ID: {cliente_id_criado}) salvo.")
-            while True: 
-                numero_nova_conta = str(self.proximo_numero_conta); self.proximo_numero_conta += 1
-                if not self.db.fetch_one("SELECT id FROM contas WHERE numero = ?", (numero_nova_conta,)): break
-            conta_id_criado = self.db.execute_query("INSERT INTO contas (numero, cliente_id) VALUES (?, ?)", (numero_nova_conta, cliente_id_criado))
-            if conta_id_criado:
-                print(f"Conta {numero_nova_conta} criada.");
-                messagebox.showinfo("Sucesso", f"Cliente {nome} cadastrado!\nConta {numero_nova_conta} criada.", parent=self) # Parent=self
-                window_ref.destroy() # Destroi pop-up
-                self.atualizar_dropdown_contas() # Atualiza lista principal
-                if self.user_role == 'admin': # Seleciona nova conta se for admin
-                     sel_str = f"{nome} (Conta {numero_nova_conta})";
-                     if sel_str in self.map_display_to_conta_id: self.selected_account_var.set(sel_str); self.selecionar_conta_pelo_dropdown(sel_str)
-            else: messagebox.showerror("Erro BD", "Cliente salvo, falha ao criar conta.", parent=window_ref); novo_cliente.delete(); self.atualizar_dropdown_contas()
-        else: messagebox.showerror("Erro BD", "Falha ao salvar cliente.", parent=window_ref)
-
-    def adicionar_nova_conta_para_cliente(self):
-        """(Admin) Adiciona uma nova conta corrente para o cliente selecionado."""
-        if not self.conta_selecionada or not self.conta_selecionada.cliente: messagebox.showerror("Erro", "Selecione conta do cliente."); return
-        cliente_alvo = self.conta_selecionada.cliente
-        if not cliente_alvo or not cliente_alvo.id: messagebox.showerror("Erro", "Cliente selecionado inválido."); return
-        confirm = messagebox.askyesno("Adicionar Conta", f"Criar nova conta para {cliente_alvo.nome}?", parent=self)
-        if confirm:
-            while True: 
-                numero_nova_conta = str(self.proximo_numero_conta); self.proximo_numero_conta += 1
-                if not self.db.fetch_one("SELECT id FROM contas WHERE numero = ?", (numero_nova_conta,)): break
-            conta_id_criado = self.db.execute_query("INSERT INTO contas (numero, cliente_id) VALUES (?, ?)", (numero_nova_conta, cliente_alvo.id))
-            if conta_id_criado:
-                messagebox.showinfo("Sucesso", f"Nova conta {numero_nova_conta} criada para {cliente_alvo.nome}."); self.atualizar_dropdown_contas()
-                sel_str = f"{cliente_alvo.nome} (Conta {numero_nova_conta})"
-                if sel_str in self.map_display_to_conta_id: self.selected_account_var.set(sel_str); self.selecionar_conta_pelo_dropdown(sel_str)
-            else: messagebox.showerror("Erro BD", "Falha ao criar nova conta.")
-
-    def encerrar_conta_selecionada(self):
-        """Encerra (exclui) a conta selecionada (com verificação de permissão)."""
-        if not self.conta_selecionada or not self.conta_selecionada.id: messagebox.showerror("Erro", "Nenhuma conta selecionada."); return
-        conta_a_encerrar = self.conta_selecionada; cliente_dono = conta_a_encerrar.cliente
-        permitido = (self.user_role == 'admin') or (self.user_role == 'user' and cliente_dono and cliente_dono.id == self.logged_in_cliente.id)
-        if not permitido: messagebox.showerror("Acesso Negado", "Permissão negada."); return
-        confirm = messagebox.askyesno("Confirmar", f"Encerrar conta {conta_a_encerrar.numero} de {cliente_dono.nome if cliente_dono else 'N/A'}?", icon='warning', parent=self)
-        if confirm:
-            q = "DELETE FROM contas WHERE id = ?"; r = self.db.execute_query(q, (conta_a_encerrar.id,))
-            if r is not None: messagebox.showinfo("Sucesso", f"Conta {conta_a_encerrar.numero} encerrada."); self.conta_selecionada = None; self.atualizar_dropdown_contas()
-            else: messagebox.showerror("Erro BD", f"Falha ao encerrar conta {conta_a_encerrar.numero}.")
-
-    def excluir_cliente_selecionado(self):
-        """(Admin) Exclui o cliente selecionado e seus dados."""
-        if not self.conta_selecionada or not self.conta_selecionada.cliente: messagebox.showerror("Erro", "Selecione conta do cliente."); return
-        cliente_para_excluir = self.conta_selecionada.cliente
-        if not cliente_para_excluir.id: messagebox.showerror("Erro", "Cliente inválido."); return
-        if cliente_para_excluir.cpf == "000.000.000-00": messagebox.showerror("Inválido", "ADMIN padrão não pode ser excluído."); return
-        confirm = messagebox.askyesno("Confirmar", f"Excluir cliente {cliente_para_excluir.nome}?\n\nCONTAS E TRANSAÇÕES SERÃO PERDIDAS!", icon='warning', parent=self)
-        if confirm:
-            if cliente_para_excluir.delete(): messagebox.showinfo("Sucesso", f"Cliente {cliente_para_excluir.nome} excluído."); self.conta_selecionada = None; self.atualizar_dropdown_contas()
-            else: messagebox.showerror("Erro BD", f"Falha ao excluir cliente {cliente_para_excluir.nome}.")
-
-    def _obter_valor_transferencia(self) -> float | None:
-        """Obtém e valida o valor do campo de transferência."""
-        try:
-            valor_str = self.entry_valor_transferencia.get().replace(",", ".")
-            if not valor_str: messagebox.showwarning("Inválido", "Insira valor para transferir."); return None
-            valor = float(valor_str)
-            if valor <= 0: messagebox.showerror("Erro", "Valor da transferência positivo."); return None
-            return valor
-        except ValueError: messagebox.showerror("Erro", "Valor da transferência inválido."); return None
-
-    def realizar_transferencia(self):
-        """Executa a operação de transferência entre contas."""
-        if not self.conta_selecionada or not self.conta_selecionada.id: messagebox.showerror("Erro", "Selecione conta origem."); return
-        conta_origem = self.conta_selecionada
-        num_conta_destino = self.entry_conta_destino.get().strip()
-        valor = self._obter_valor_transferencia()
-        if not num_conta_destino or valor is None: return # Erros já mostrados
-
-        conta_destino_data = self.db.fetch_one("SELECT id FROM contas WHERE numero = ?", (num_conta_destino,))
-        if not conta_destino_data: messagebox.showerror("Erro", f"Conta destino '{num_conta_destino}' não encontrada."); return
-        conta_destino_id = conta_destino_data['id']
-        conta_destino_obj = ContaCorrente(self.db, conta_id=conta_destino_id) # Cria obj temporário
-        if not conta_destino_obj.id: messagebox.showerror("Erro", f"Falha ao carregar conta destino {num_conta_destino}."); return
-
-        # Chama método transferir (lida com BD e validações finais)
-        sucesso = conta_origem.transferir(valor, conta_destino_obj)
-        if sucesso:
-            messagebox.showinfo("Sucesso", f"Transferência R$ {valor:.2f} para conta {num_conta_destino} OK!")
-            self.entry_conta_destino.delete(0, tk.END); self.entry_valor_transferencia.delete(0, tk.END) # Limpa campos
-            self.atualizar_display_saldo(); self.mostrar_extrato() # Atualiza UI da origem
-
-    # --- Funções de Callback Restantes (sem mudanças) ---
-    def toggle_theme(self): customtkinter.set_appearance_mode("Dark" if self.theme_switch.get()==1 else "Light"); self.atualizar_cor_saldo()
-    def atualizar_cor_saldo(self):
-        if self.conta_selecionada and self.conta_selecionada.id: saldo=self.conta_selecionada.saldo; cVerde="#34A853"; cVermelho="#E53935"; cor=cVerde if saldo>=0 else cVermelho; self.lbl_saldo_valor.configure(text_color=cor)
-        else: cPadrao=customtkinter.ThemeManager.theme["CTkLabel"]["text_color"]; self.lbl_saldo_valor.configure(text_color=cPadrao)
-    def atualizar_display_saldo(self):
-        if self.conta_selecionada and self.conta_selecionada.id: saldo=self.conta_selecionada.saldo; self.lbl_saldo_valor.configure(text=f"R$ {saldo:.2f}"); self.atualizar_cor_saldo()
-        else: self.lbl_saldo_valor.configure(text="R$ -"); self.atualizar_cor_saldo()
-    def mostrar_extrato(self):
-        if not self.conta_selecionada or not self.conta_selecionada.id: return
-        self.atualizar_display_saldo(); txt=self.conta_selecionada.exibir_extrato()
-        self.txt_extrato.configure(state="normal"); self.txt_extrato.delete("1.0", tk.END); self.txt_extrato.insert("1.0", txt); self.txt_extrato.configure(state="disabled")
-    def _obter_valor_entry(self) -> float | None:
-        try:
-            vStr=self.entry_valor.get().replace(",",".")
-            if not vStr: messagebox.showwarning("Inválido", "Insira valor."); return None
-            v=float(vStr)
-            if v<=0: messagebox.showerror("Erro", "Valor positivo."); return None
-            self.entry_valor.delete(0, tk.END); return v
-        except ValueError: messagebox.showerror("Erro", "Valor numérico inválido."); return None
-    def realizar_deposito(self):
-        if not self.conta_selecionada or not self.conta_selecionada.id: messagebox.showerror("Erro", "Selecione conta."); return
-        v = self._obter_valor_entry()
-        if v is not None:
-            if self.conta_selecionada.depositar(v): messagebox.showinfo("Sucesso", f"Depósito R$ {v:.2f} OK!"); self.atualizar_display_saldo(); self.mostrar_extrato()
-    def realizar_saque(self):
-        if not self.conta_selecionada or not self.conta_selecionada.id: messagebox.showerror("Erro", "Selecione conta."); return
-        v = self._obter_valor_entry()
-        if v is not None:
-            if self.conta_selecionada.sacar(v): messagebox.showinfo("Sucesso", f"Saque R$ {v:.2f} OK!"); self.atualizar_display_saldo(); self.mostrar_extrato()
+class ExtratoRenderizado:
+    """Texto do extrato de uma conta, formatado uma única vez e estendido só com o que é novo.
+
+    As páginas do histórico são formatadas conforme pedidas (carregar_pagina); depois do fim, sincronizar() busca só os
+    lançamentos com id acima do último visto, anexa as linhas e refaz o rodapé. Se aparecer um lançamento com data
+    anterior à da última linha (importação) ou um novo fechamento mensal, o texto é descartado (geracao muda) e recomeça."""
+    __slots__ = ('conta', 'completo', 'cabecalho', 'linhas', 'chave', 'fim', 'id_visto', 'periodo', 'rodape', 'geracao', '_lock')
+    SQL_TOPO = "SELECT MAX(id) AS topo FROM transacoes" # Fim da árvore do rowid: O(1)
+    SQL_NOVOS_RECENTES = "SELECT id, tipo, valor, timestamp, conta_destino_id FROM transacoes WHERE id > ? AND +conta_id = ? ORDER BY timestamp, id" # Faixa do rowid: custa os lançamentos do banco todo desde a última sincronização
+    SQL_NOVOS_CONTA = "SELECT id, tipo, valor, timestamp, conta_destino_id FROM transacoes WHERE conta_id = ? AND id > ? ORDER BY timestamp, id" # Índice da conta: quando a faixa acima for longa
+    JANELA_RECENTES = 20_000 # Acima disso (lançamentos no banco desde a última sincronização), SQL_NOVOS_CONTA
+
+    def __init__(self, conta: Conta, completo: bool = False):
+        self.conta = conta; self.completo = completo; self.geracao = 0; self._lock = threading.Lock(); self._limpar()
+
+    def _limpar(self):
+        self.cabecalho = None; self.linhas: list[str] = []; self.chave = None; self.fim = False; self.id_visto = 0; self.periodo = None; self.rodape = ""
+        self.geracao += 1
+
+    def limpar(self):
+        """Descarta o texto formatado (a próxima página recomeça do cabeçalho)."""
+        with self._lock: self._limpar()
+
+    def _topo(self) -> int:
+        row = self.conta.db.fetch_one(self.SQL_TOPO); return (row['topo'] if row else None) or 0
+
+    def _anexar(self, linhas: list[dict]) -> str:
+        novas = [f"\n  {self.conta.formatar_transacao(t)}" for t in linhas]; self.linhas += novas
+        if linhas: self.chave = (linhas[-1]['timestamp'], linhas[-1]['id'])
+        return "".join(novas)
+
+    def _montar_rodape(self):
+        vazio = ("\n  Nenhuma movimentação desde o fechamento." if self.periodo else "\n  Nenhuma movimentação realizada.") if not self.linhas else ""
+        self.rodape = vazio + "\n" + self.conta.rodape_extrato()
+
+    def carregar_pagina(self, limite: int = 200) -> str:
+        """Formata a próxima página (a primeira com o cabeçalho) e retorna o texto acrescentado; no fim do histórico monta o rodapé."""
+        with self._lock:
+            if self.fim: return ""
+            texto = ""; apos = self.chave
+            if self.cabecalho is None:
+                texto = self.conta.cabecalho_extrato(); fechamento = None if self.completo else self.conta.fechamento_anterior()
+                if fechamento is not None:
+                    self.periodo = fechamento['periodo']; mes = f"{self.periodo[5:]}/{self.periodo[:4]}"
+                    texto += f"\n  Saldo no fechamento de {mes}: R$ {fechamento['saldo']:.2f} (use Histórico Completo para os lançamentos anteriores)"
+                self.cabecalho = texto
+            if apos is None and self.periodo is not None: apos = (inicio_mes_seguinte(self.periodo), 0)
+            topo = self._topo() # Lido antes da página: tudo até aqui já estava gravado quando ela foi lida
+            linhas, proxima = self.conta.pagina_historico(apos=apos, limite=limite); texto += self._anexar(linhas)
+            if proxima is None: self.fim = True; self.id_visto = max([topo] + [t['id'] for t in linhas]); self._montar_rodape()
+            return texto
+
+    def sincronizar(self) -> bool:
+        """Anexa os lançamentos gravados depois do fim do histórico já carregado e refaz o rodapé; False se o texto foi descartado."""
+        with self._lock:
+            if not self.fim: return True # As próximas páginas já trarão os lançamentos novos
+            if not self.completo and (self.conta.fechamento_anterior() or {}).get('periodo') != self.periodo: self._limpar(); return False
+            topo = self._topo()
+            if topo <= self.id_visto: return True
+            sql, params = (self.SQL_NOVOS_RECENTES, (self.id_visto, self.conta.id)) if topo - self.id_visto <= self.JANELA_RECENTES else (self.SQL_NOVOS_CONTA, (self.conta.id, self.id_visto))
+            linhas = [dict(row) for row in self.conta.db.fetch_all(sql, params)]
+            if linhas and self.chave is not None and (linhas[0]['timestamp'], linhas[0]['id']) <= self.chave: self._limpar(); return False # Fora de ordem
+            for t in linhas: t['valor'] = self.conta.db.de_bd(t['valor'])
+            self._anexar(linhas); self.id_visto = max([topo] + [t['id'] for t in linhas]); self._montar_rodape(); return True
+
+    def trecho(self, geracao: int | None = None, desde: int = 0) -> tuple[int, bool, str, int, str | None]:
+        """O que falta mostrar a quem já exibe `desde` linhas da geração `geracao`: (geração, redesenhar, texto, total de linhas, rodapé ou None).
+
+        Com outra geração (ou None) o texto é o extrato inteiro carregado até aqui e redesenhar=True; senão só as linhas novas."""
+        with self._lock:
+            rodape = self.rodape if self.fim else None
+            if geracao != self.geracao: return self.geracao, True, (self.cabecalho or "") + "".join(self.linhas), len(self.linhas), rodape
+            return self.geracao, False, "".join(self.linhas[desde:]), len(self.linhas), rodape
+
+    def texto(self) -> str:
+        """Extrato inteiro carregado até aqui (com o rodapé, se já chegou ao fim do histórico)."""
+        _, _, texto, _, rodape = self.trecho(); return texto + (rodape or "")
 
 # --- PARTE 4: Execução Principal ---
 
 if __name__ == "__main__":
+    import argparse # Só a linha de comando usa (fora do caminho de quem importa main)
+    parser = argparse.ArgumentParser(description="Banco Moderno (sem opções: abre a tela de login).")
+    parser.add_argument("--db", default="banco_moderno_v6_ptbr.db", help="arquivo do banco de dados")
+    parser.add_argument("--verificar-contadores", action="store_true", help="compara os contadores de saques diários com o ledger e sai")
+    parser.add_argument("--reconstruir-contadores", action="store_true", help="recalcula os contadores de saques diários a partir do ledger e sai")
+    parser.add_argument("--fechar-periodos", nargs="?", const="", metavar="AAAA-MM", help="grava os fechamentos mensais de saldo até o período (padrão: mês passado) e sai")
+    parser.add_argument("--arquivar", nargs="?", const="", metavar="AAAA-MM", help="move os lançamentos dos períodos fechados até o período (padrão: todos) para o banco de arquivo e sai")
+    parser.add_argument("--compactar", action="store_true", help="com --arquivar: roda VACUUM no banco principal depois")
+    parser.add_argument("--verificar-saldos", action="store_true", help="confere os saldos contra o último fechamento + lançamentos posteriores e sai")
+    parser.add_argument("--migrar-centavos", action="store_true", help="converte os valores de REAL (reais) para INTEGER (centavos) sem parar as escritas e sai")
+    args = parser.parse_args()
     print("AVISO: Senhas em texto plano (INSEGURO!)")
-    db_manager = DatabaseManager("banco_moderno_v6_ptbr.db") # Novo nome
-    login_app = LoginWindow(db_manager)
+    sys.modules.setdefault("main", sys.modules[__name__]) # interface.py faz "from main import ...": o mesmo módulo, não uma segunda cópia
+    if args.reconstruir_contadores or args.verificar_contadores or args.fechar_periodos is not None or args.arquivar is not None or args.migrar_centavos or args.verificar_saldos:
+        db_manager = DatabaseManager(args.db, pool=True) # Novo nome (conexões persistentes)
+    if args.reconstruir_contadores: print(f"Contadores reconstruídos: {db_manager.reconstruir_contadores_saques()} linha(s)."); db_manager.close(); raise SystemExit(0)
+    if args.verificar_contadores:
+        divergencias = db_manager.verificar_contadores_saques(); db_manager.close()
+        for conta_id, dia, contador, real in divergencias: print(f"Conta {conta_id} em {dia}: contador {contador}, ledger {real}")
+        print(f"{len(divergencias)} divergência(s)."); raise SystemExit(1 if divergencias else 0)
+    if args.fechar_periodos is not None or args.arquivar is not None:
+        try:
+            if args.fechar_periodos is not None:
+                r = db_manager.fechar_periodos(args.fechar_periodos or None)
+                print(f"Períodos fechados: {', '.join(r['periodos']) or 'nenhum novo'} ({r['fechamentos']} fechamento(s)).")
+            if args.arquivar is not None:
+                r = db_manager.arquivar_periodos(args.arquivar or None, compactar=args.compactar)
+                print(f"Arquivado até {r['ate']} em {r['arquivo']}: {r['removidas']} lançamento(s) movido(s) em {r['segundos']:.1f}s.")
+        except ValueError as e: print(f"Erro: {e}"); raise SystemExit(2)
+        finally: db_manager.close()
+        raise SystemExit(0)
+    if args.migrar_centavos:
+        try:
+            r = db_manager.converter_para_centavos(ao_progresso=lambda feitas, total: print(f"\rCopiando ledger: {feitas:,}/{total:,}", end="", flush=True))
+            print(f"\nValores em centavos: {r['transacoes']:,} lançamento(s) copiado(s), {r['contas']:,} conta(s), {r['fechamentos']:,} fechamento(s), {r['arquivo']:,} arquivado(s) em {r['segundos']:.1f}s.")
+        finally: db_manager.close()
+        raise SystemExit(0)
+    if args.verificar_saldos:
+        divergencias = db_manager.verificar_saldos(); db_manager.close()
+        for conta_id, numero, saldo, esperado in divergencias: print(f"Conta {numero} (id {conta_id}): saldo {saldo:.2f}, esperado {esperado:.2f}")
+        print(f"{len(divergencias)} divergência(s)."); raise SystemExit(1 if divergencias else 0)
+    abrir_db = ThreadPoolExecutor(max_workers=1, thread_name_prefix="banco-init"); futuro_db = abrir_db.submit(DatabaseManager, args.db, pool=True) # A tela de login não espera o BD
+    import logging; logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s") # Mensagens e falhas da interface
+    from interface import LoginWindow # customtkinter só é carregado aqui (enquanto o BD abre na thread)
+    login_app = LoginWindow(futuro_db)
     login_app.mainloop() # Inicia pela tela de login
+    abrir_db.shutdown(wait=True)
+    if futuro_db.exception() is None: futuro_db.result().close() # Fecha conexões do pool
     print("Aplicação finalizada.")
\ No newline at end of file
@@ -0,0 +1,234 @@
+"""Banco fragmentado: clientes, contas e lançamentos em N arquivos SQLite por cliente, com diretório de roteamento e transferências
+entre fragmentos em duas fases (uso: python particionamento.py --db ... --fragmentos 4 [--recuperar] [--verificar])."""
+import argparse
+import os
+import sqlite3
+import uuid
+
+from main import BLOCO_IDS_FRAGMENTO, Cliente, ContaCorrente, DatabaseManager, Dinheiro, MovimentoRecusado, _contar_saque_do_dia, _creditar, _debitar, reservar_sequencia
+
+# Uma perna de transferência entre fragmentos (INSERT ou INSERT OR IGNORE + este trecho)
+SQL_PERNA = "INTO transferencias_fragmentos (id, papel, estado, conta_id, fragmento_remoto, conta_remota_id, centavos, transacao_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+SQL_ABERTAS = "SELECT id, conta_id, fragmento_remoto, conta_remota_id, centavos FROM transferencias_fragmentos WHERE papel = ? AND estado = ?"
+
+# --- Passos do protocolo (cada um numa transação do fragmento: DatabaseManager.executar_transacao) ---
+
+def _preparar_destino(cursor, transferencia_id: str, conta_id: int, fragmento_origem: int, conta_origem_id: int, centavos: int):
+    """Fase 1 no destino: a conta existe (voto sim) e o recebimento fica registrado como 'preparada', ainda sem crédito."""
+    if cursor.execute("SELECT 1 FROM contas WHERE id = ?", (conta_id,)).fetchone() is None: raise MovimentoRecusado('conta_destino_inexistente', f"Conta ID {conta_id} não existe.")
+    cursor.execute(f"INSERT {SQL_PERNA}", (transferencia_id, 'destino', 'preparada', conta_id, fragmento_origem, conta_origem_id, centavos, None))
+
+def _debitar_origem(cursor, transferencia_id: str, conta_id: int, fragmento_destino: int, conta_destino_id: int, valor, centavos: int, *, usa_limite: bool, limite_saques: int | None):
+    """Fase 1 na origem + decisão: limite diário, débito condicional, lançamento e a perna 'confirmada' numa transação só.
+
+    O commit desta transação é o ponto de decisão. Se a recuperação já abortou a transferência, a perna da origem existe
+    e o INSERT falha pela chave primária (IntegrityError): nada é debitado."""
+    if limite_saques is not None: _contar_saque_do_dia(cursor, conta_id, limite_saques)
+    _debitar(cursor, conta_id, valor, usa_limite)
+    transacao_id = cursor.execute("INSERT INTO transacoes (conta_id, tipo, valor) VALUES (?, 'transferencia_enviada', ?)", (conta_id, valor)).lastrowid # Sem conta_destino_id: a FK é do fragmento
+    cursor.execute(f"INSERT {SQL_PERNA}", (transferencia_id, 'origem', 'confirmada', conta_id, fragmento_destino, conta_destino_id, centavos, transacao_id))
+    return cursor.execute("SELECT saldo FROM contas WHERE id = ?", (conta_id,)).fetchone()[0]
+
+def _decidir(cursor, transferencia_id: str, conta_id: int, fragmento_destino: int, conta_destino_id: int, centavos: int) -> str:
+    """Na origem: a decisão gravada ou, se ainda não há, 'abortada' (gravada agora: a origem não consegue mais confirmar)."""
+    cursor.execute(f"INSERT OR IGNORE {SQL_PERNA}", (transferencia_id, 'origem', 'abortada', conta_id, fragmento_destino, conta_destino_id, centavos, None))
+    return cursor.execute("SELECT estado FROM transferencias_fragmentos WHERE id = ?", (transferencia_id,)).fetchone()[0]
+
+def _concluir_destino(cursor, transferencia_id: str, para_bd) -> bool:
+    """Fase 2 no destino: credita e lança o recebimento uma única vez (a perna vira 'concluida' na mesma transação); False se já estava concluída."""
+    row = cursor.execute("SELECT estado, conta_id, centavos FROM transferencias_fragmentos WHERE id = ?", (transferencia_id,)).fetchone()
+    if row is not None and row[0] == 'concluida': return False
+    if row is None or row[0] != 'preparada': raise MovimentoRecusado('transferencia_abortada', f"Transferência {transferencia_id} confirmada sem perna preparada no destino.")
+    valor = para_bd(Dinheiro(row[2])); _creditar(cursor, row[1], valor, 'conta_destino_inexistente')
+    transacao_id = cursor.execute("INSERT INTO transacoes (conta_id, tipo, valor) VALUES (?, 'transferencia_recebida', ?)", (row[1], valor)).lastrowid
+    cursor.execute("UPDATE transferencias_fragmentos SET estado = 'concluida', transacao_id = ? WHERE id = ?", (transacao_id, transferencia_id)); return True
+
+def _concluir_origem(cursor, transferencia_id: str):
+    cursor.execute("UPDATE transferencias_fragmentos SET estado = 'concluida' WHERE id = ? AND estado = 'confirmada'", (transferencia_id,))
+
+def _abortar_destino(cursor, transferencia_id: str):
+    cursor.execute("UPDATE transferencias_fragmentos SET estado = 'abortada' WHERE id = ? AND estado = 'preparada'", (transferencia_id,))
+
+def _proximo_fragmento(cursor) -> int:
+    """Rodízio persistente dos fragmentos de novos clientes (sequência no fragmento 0)."""
+    cursor.execute("INSERT OR IGNORE INTO sequencias (nome, proximo) VALUES ('fragmento_cliente', 0)")
+    return reservar_sequencia(cursor, 1, 'fragmento_cliente')[0]
+
+class BancoParticionado:
+    """N fragmentos (um DatabaseManager por arquivo), com clientes, contas e lançamentos particionados por cliente.
+
+    Cada fragmento tem a sua trava de escrita: movimentos em fragmentos diferentes não esperam um pelo outro. O fragmento de um
+    cliente, conta ou lançamento sai do próprio ID (faixas de BLOCO_IDS_FRAGMENTO); o diretório no fragmento 0 resolve CPF e número
+    da conta. Movimentos dentro de um fragmento seguem o caminho atômico de sempre (postar_movimento); a transferência para outro
+    fragmento (Conta.transferir entre contas de fragmentos diferentes) usa duas fases registradas em transferencias_fragmentos."""
+    def __init__(self, db_name="banco_moderno_v6_ptbr.db", fragmentos: int = 4, *, recuperar: bool = True, **opcoes_db):
+        if fragmentos < 1: raise ValueError("fragmentos deve ser >= 1")
+        opcoes_db.setdefault('pool', True); opcoes_db.setdefault('synchronous', "FULL") # FULL: pernas gravadas sobrevivem também a queda de energia (NORMAL/WAL, só à do processo)
+        self.db_name = db_name; self.fragmentos: list[DatabaseManager] = []
+        try:
+            for k in range(fragmentos): self.fragmentos.append(DatabaseManager(self.caminho_fragmento(db_name, k), fragmento=k, **opcoes_db)); self.fragmentos[k].particionado = self
+            self.diretorio = self.fragmentos[0] # Tabelas diretorio_* e a sequência global de números de conta
+            maximo = self.diretorio.fetch_one("SELECT MAX(fragmento) FROM diretorio_clientes")[0]
+            if maximo is None: self.reconstruir_diretorio() # Diretório novo: registra o que já existe (ex.: um banco de arquivo único que virou o fragmento 0)
+            elif maximo >= fragmentos: raise ValueError(f"O diretório já tem clientes no fragmento {maximo}: abra com pelo menos {maximo + 1} fragmentos.")
+            if recuperar: self.recuperar_transferencias()
+        except BaseException:
+            self.close(); raise
+
+    @staticmethod
+    def caminho_fragmento(db_name: str, k: int) -> str:
+        """Arquivo do fragmento k: o próprio db_name no 0 (um banco existente vira o fragmento 0), <base>_fragmento<k>.db nos demais."""
+        if k == 0: return db_name
+        base, ext = os.path.splitext(db_name); return f"{base}_fragmento{k}{ext or '.db'}"
+
+    def fragmento(self, obj_id: int) -> DatabaseManager:
+        """Fragmento de um cliente, conta ou lançamento pelo ID."""
+        k = obj_id // BLOCO_IDS_FRAGMENTO
+        if not 0 <= k < len(self.fragmentos): raise ValueError(f"ID {obj_id} fora dos {len(self.fragmentos)} fragmentos.")
+        return self.fragmentos[k]
+
+    # --- Roteamento ---
+
+    def cliente_por_cpf(self, cpf: str) -> Cliente | None:
+        row = self.diretorio.fetch_one("SELECT fragmento FROM diretorio_clientes WHERE cpf = ?", (cpf,))
+        return Cliente.find_by_cpf(self.fragmentos[row['fragmento']], cpf) if row else None
+
+    def conta_por_numero(self, numero: str) -> ContaCorrente | None:
+        row = self.diretorio.fetch_one("SELECT fragmento FROM diretorio_contas WHERE numero = ?", (str(numero),))
+        return ContaCorrente.obter_por_numero(self.fragmentos[row['fragmento']], str(numero)) if row else None
+
+    def cliente(self, cliente_id: int) -> Cliente | None:
+        return Cliente.obter(self.fragmento(cliente_id), cliente_id)
+
+    def conta(self, conta_id: int) -> ContaCorrente | None:
+        return ContaCorrente.obter(self.fragmento(conta_id), conta_id)
+
+    # --- Cadastro ---
+
+    def cadastrar_cliente(self, nome: str, cpf: str, endereco: str, senha: str, role: str = 'user') -> Cliente:
+        """Cria o cliente no próximo fragmento (rodízio) e o registra no diretório; levanta ValueError se o CPF já existe em algum fragmento.
+
+        O diretório é gravado depois do fragmento: dois cadastros do mesmo CPF em fragmentos diferentes disputam a chave primária
+        do diretório e o perdedor apaga o cliente que criou."""
+        if self.diretorio.fetch_one("SELECT 1 FROM diretorio_clientes WHERE cpf = ?", (cpf,)): raise ValueError(f"CPF {cpf} já cadastrado.")
+        k = self.diretorio.executar_transacao(_proximo_fragmento) % len(self.fragmentos); db = self.fragmentos[k]
+        cliente_id = db.executar_transacao(lambda cursor: cursor.execute("INSERT INTO clientes (nome, cpf, endereco, senha, role) VALUES (?, ?, ?, ?, ?)", (nome, cpf, endereco, senha, role)).lastrowid)
+        try: self.diretorio.executar_transacao(lambda cursor: cursor.execute("INSERT INTO diretorio_clientes (cpf, fragmento, cliente_id) VALUES (?, ?, ?)", (cpf, k, cliente_id)))
+        except sqlite3.IntegrityError:
+            db.executar_transacao(lambda cursor: cursor.execute("DELETE FROM clientes WHERE id = ?", (cliente_id,))); raise ValueError(f"CPF {cpf} já cadastrado.")
+        return Cliente.obter(db, cliente_id)
+
+    def abrir_conta(self, cliente: Cliente) -> ContaCorrente:
+        """Abre uma conta corrente no fragmento do cliente, com número da sequência global (fragmento 0), e a registra no diretório."""
+        db = self.fragmento(cliente.id); numero = self.diretorio.numeros_conta.proximo()
+        conta_id = db.executar_transacao(lambda cursor: cursor.execute("INSERT INTO contas (numero, cliente_id) VALUES (?, ?)", (numero, cliente.id)).lastrowid)
+        self.diretorio.executar_transacao(lambda cursor: cursor.execute("INSERT INTO diretorio_contas (numero, fragmento, conta_id) VALUES (?, ?, ?)", (numero, db.fragmento, conta_id)))
+        return ContaCorrente.obter(db, conta_id)
+
+    def excluir_cliente(self, cliente: Cliente) -> bool:
+        """Exclui o cliente (contas e lançamentos em cascata no fragmento) e as entradas dele no diretório."""
+        cpf = cliente.cpf; numeros = [row['numero'] for row in cliente.db.fetch_all("SELECT numero FROM contas WHERE cliente_id = ?", (cliente.id,))]
+        if not cliente.delete(): return False
+        def remover(cursor):
+            cursor.execute("DELETE FROM diretorio_clientes WHERE cpf = ?", (cpf,)); cursor.executemany("DELETE FROM diretorio_contas WHERE numero = ?", ((n,) for n in numeros))
+        self.diretorio.executar_transacao(remover); return True
+
+    def reconstruir_diretorio(self) -> dict:
+        """Refaz o diretório a partir dos fragmentos (numa transação do fragmento 0) e avança a sequência de números de conta."""
+        def reconstruir(cursor):
+            cursor.execute("DELETE FROM diretorio_clientes"); cursor.execute("DELETE FROM diretorio_contas")
+            for k, db in enumerate(self.fragmentos):
+                if k == 0: cursor.execute("INSERT INTO diretorio_clientes SELECT cpf, 0, id FROM clientes"); cursor.execute("INSERT INTO diretorio_contas SELECT numero, 0, id FROM contas"); continue
+                for lote in db.iterar_lotes("SELECT cpf, ?, id FROM clientes", (k,), tuplas=True): cursor.executemany("INSERT INTO diretorio_clientes VALUES (?, ?, ?)", lote)
+                for lote in db.iterar_lotes("SELECT numero, ?, id FROM contas", (k,), tuplas=True): cursor.executemany("INSERT INTO diretorio_contas VALUES (?, ?, ?)", lote)
+            cursor.execute("UPDATE sequencias SET proximo = MAX(proximo, (SELECT COALESCE(MAX(CAST(numero AS INTEGER)), 0) + 1 FROM diretorio_contas)) WHERE nome = 'numero_conta'")
+            return {'clientes': cursor.execute("SELECT COUNT(*) FROM diretorio_clientes").fetchone()[0], 'contas': cursor.execute("SELECT COUNT(*) FROM diretorio_contas").fetchone()[0]}
+        self.diretorio.numeros_conta.descartar(); return self.diretorio.executar_transacao(reconstruir)
+
+    # --- Transferências entre fragmentos ---
+
+    def transferir(self, origem, destino, valor, *, usa_limite: bool = False, limite_saques: int | None = None):
+        """Transfere entre contas de fragmentos diferentes e retorna o novo saldo da origem (na unidade do BD da origem).
+
+        1. destino: confere a conta e grava a perna 'preparada' (sem crédito);
+        2. origem: limite diário, débito, lançamento e a perna 'confirmada' numa só transação (o commit é a decisão);
+        3. destino: crédito, lançamento e perna 'concluida'; 4. origem: perna 'concluida'.
+        Recusa no passo 2 aborta a perna do destino. Queda depois do 2 deixa a decisão gravada e recuperar_transferencias
+        termina o crédito (uma vez só); queda antes dele deixa só a perna preparada, que a recuperação aborta."""
+        db_o, db_d = origem.db, destino.db; valor = Dinheiro.de(valor); transferencia_id = uuid.uuid4().hex
+        db_d.executar_transacao(lambda cursor: _preparar_destino(cursor, transferencia_id, destino.id, db_o.fragmento, origem.id, valor.centavos))
+        try:
+            novo_saldo = db_o.executar_transacao(lambda cursor: _debitar_origem(cursor, transferencia_id, origem.id, db_d.fragmento, destino.id, db_o.para_bd(valor), valor.centavos,
+                                                                                usa_limite=usa_limite, limite_saques=limite_saques))
+        except MovimentoRecusado: db_d.executar_transacao(lambda cursor: _abortar_destino(cursor, transferencia_id)); raise # Transação da origem desfeita: nada a decidir
+        except BaseException as e: # Resultado incerto (erro de BD no commit, IntegrityError da perna já abortada): a origem decide
+            if self._resolver(transferencia_id, db_o, db_d, origem.id, destino.id, valor.centavos) != 'abortada': return db_o.fetch_one("SELECT saldo FROM contas WHERE id = ?", (origem.id,))[0]
+            if isinstance(e, sqlite3.IntegrityError): raise MovimentoRecusado('transferencia_abortada', "Transferência abortada pela recuperação (ficou preparada tempo demais).") from e
+            raise
+        try: self._concluir(transferencia_id, db_o, db_d)
+        except (sqlite3.Error, MovimentoRecusado) as e: print(f"Transferência {transferencia_id} confirmada; o crédito fica para recuperar_transferencias: {e}")
+        db_d.cache_contas.invalidar(destino.id); return novo_saldo # Saldo do destino em cache ficou desatualizado
+
+    def _concluir(self, transferencia_id: str, db_o: DatabaseManager, db_d: DatabaseManager):
+        """Fase 2 de uma transferência confirmada (idempotente)."""
+        db_d.executar_transacao(lambda cursor: _concluir_destino(cursor, transferencia_id, db_d.para_bd))
+        db_o.executar_transacao(lambda cursor: _concluir_origem(cursor, transferencia_id))
+
+    def _resolver(self, transferencia_id: str, db_o: DatabaseManager, db_d: DatabaseManager, conta_origem_id: int, conta_destino_id: int, centavos: int) -> str:
+        """Lê (ou grava como 'abortada') a decisão na origem e aplica a fase 2 correspondente; retorna o estado decidido."""
+        estado = db_o.executar_transacao(lambda cursor: _decidir(cursor, transferencia_id, conta_origem_id, db_d.fragmento, conta_destino_id, centavos))
+        if estado == 'abortada': db_d.executar_transacao(lambda cursor: _abortar_destino(cursor, transferencia_id))
+        else: self._concluir(transferencia_id, db_o, db_d)
+        return estado
+
+    def recuperar_transferencias(self, *, idade_minima: float = 60.0) -> dict:
+        """Termina as transferências interrompidas: conclui as confirmadas na origem e decide as preparadas no destino há mais de
+        `idade_minima` segundos (as mais novas podem estar em andamento noutra instância). Retorna {'concluidas', 'abortadas', 'pendentes'}."""
+        resumo = {'concluidas': 0, 'abortadas': 0, 'pendentes': 0}
+        for db_o in self.fragmentos:
+            for transferencia_id, conta_id, remoto, conta_remota_id, centavos in db_o.fetch_all(SQL_ABERTAS, ('origem', 'confirmada')):
+                try: self._resolver(transferencia_id, db_o, self.fragmentos[remoto], conta_id, conta_remota_id, centavos); resumo['concluidas'] += 1
+                except (sqlite3.Error, MovimentoRecusado) as e: print(f"Transferência {transferencia_id} continua pendente: {e}"); resumo['pendentes'] += 1
+        for db_d in self.fragmentos:
+            for transferencia_id, conta_id, remoto, conta_remota_id, centavos in db_d.fetch_all(SQL_ABERTAS + " AND criada_em <= datetime('now', ?)", ('destino', 'preparada', f"-{idade_minima} seconds")):
+                try: estado = self._resolver(transferencia_id, self.fragmentos[remoto], db_d, conta_remota_id, conta_id, centavos); resumo['abortadas' if estado == 'abortada' else 'concluidas'] += 1
+                except (sqlite3.Error, MovimentoRecusado) as e: print(f"Transferência {transferencia_id} continua pendente: {e}"); resumo['pendentes'] += 1
+        return resumo
+
+    def verificar(self) -> dict:
+        """Conservação do dinheiro com o banco parado: soma dos saldos, valor em trânsito (debitado e ainda não creditado) e saldos x ledger por fragmento."""
+        saldos = transito = 0; divergencias = []
+        for db in self.fragmentos:
+            saldos += db.fetch_one(f"SELECT COALESCE(SUM({db.sql_centavos('saldo')}), 0) FROM contas")[0]
+            for transferencia_id, _, remoto, _, centavos in db.fetch_all(SQL_ABERTAS, ('origem', 'confirmada')):
+                row = self.fragmentos[remoto].fetch_one("SELECT estado FROM transferencias_fragmentos WHERE id = ?", (transferencia_id,))
+                if row is not None and row['estado'] == 'preparada': transito += centavos
+            divergencias += db.verificar_saldos()
+        return {'saldos': Dinheiro(saldos), 'em_transito': Dinheiro(transito), 'divergencias_saldo': divergencias}
+
+    def close(self):
+        for db in self.fragmentos: db.close()
+
+    def __enter__(self): return self
+    def __exit__(self, *exc): self.close(); return False
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--db", default="banco_moderno_v6_ptbr.db", help="arquivo do fragmento 0 (os demais: <base>_fragmento<k>.db)")
+    parser.add_argument("--fragmentos", type=int, default=4)
+    parser.add_argument("--recuperar", action="store_true", help="termina as transferências entre fragmentos interrompidas")
+    parser.add_argument("--idade-minima", type=float, default=60.0, help="com --recuperar: segundos antes de abortar uma perna só preparada")
+    parser.add_argument("--verificar", action="store_true", help="soma dos saldos, valor em trânsito e saldos x ledger em cada fragmento")
+    args = parser.parse_args()
+    with BancoParticionado(args.db, args.fragmentos, recuperar=False) as banco:
+        if args.recuperar:
+            r = banco.recuperar_transferencias(idade_minima=args.idade_minima)
+            print(f"Transferências: {r['concluidas']} concluída(s), {r['abortadas']} abortada(s), {r['pendentes']} pendente(s).")
+        if args.verificar:
+            r = banco.verificar()
+            for conta_id, numero, saldo, esperado in r['divergencias_saldo']: print(f"Conta {numero} (id {conta_id}): saldo {saldo:.2f}, esperado {esperado:.2f}")
+            print(f"Saldos R$ {r['saldos']:.2f} + em trânsito R$ {r['em_transito']:.2f} em {len(banco.fragmentos)} fragmento(s); {len(r['divergencias_saldo'])} divergência(s).")
+            raise SystemExit(1 if r['divergencias_saldo'] else 0)
+
+if __name__ == "__main__":
+    main_cli()
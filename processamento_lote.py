@@ -0,0 +1,174 @@
+"""Processamento em lote de arquivos de movimentos (depósitos, saques e transferências por número de conta), sem Tk
+(uso: python processamento_lote.py --db ... --arquivo movimentos.csv --resultado recusados.csv [--processos 4])."""
+import argparse
+import csv
+import datetime
+import itertools
+import os
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+from main import DatabaseManager, Dinheiro
+
+TIPOS_MOVIMENTO = ('deposito', 'saque', 'transferencia_enviada')
+MAX_PARAMETROS_IN = 900 # Abaixo do limite antigo de 999 variáveis do SQLite
+COLUNAS_RESULTADO = ('linha', 'numero_conta', 'tipo', 'valor', 'numero_conta_destino', 'motivo', 'mensagem')
+# Estado das contas do bloco, lido já com a trava de escrita: saldo e limite em centavos, limite de saques (só corrente) e o contador de hoje
+SQL_ESTADO_CONTAS = """SELECT c.numero, c.id, {saldo}, CASE WHEN c.tipo_conta = 'corrente' THEN {limite} ELSE 0 END, CASE WHEN c.tipo_conta = 'corrente' THEN c.limite_saques END, s.total
+                       FROM contas c LEFT JOIN saques_diarios s ON s.conta_id = c.id AND s.dia = ? WHERE c.numero IN"""
+
+def _particao(numero: str, particoes: int) -> int:
+    return zlib.crc32(numero.encode()) % particoes # Estável entre processos (hash() de str não é)
+
+def _validar_particao(linhas: list, ids: dict) -> tuple[list, list]:
+    """Confere formato e regras sem estado das linhas de uma partição; retorna (movimentos [(seq, conta_id, tipo, centavos, destino_id)], recusas [(seq, motivo, mensagem)])."""
+    movimentos = []; recusas = []
+    for seq, numero, tipo, valor, destino in linhas:
+        conta_id = ids.get(numero)
+        if conta_id is None: recusas.append((seq, 'conta_inexistente', f"Conta {numero!r} não existe.")); continue
+        if tipo not in TIPOS_MOVIMENTO: recusas.append((seq, 'tipo_invalido', f"Tipo de movimento inválido: {tipo!r}.")); continue
+        try: centavos = Dinheiro.parse(valor).centavos
+        except ValueError as e: recusas.append((seq, 'valor_invalido', f"Valor inválido: {e}")); continue
+        if centavos <= 0: recusas.append((seq, 'valor_invalido', "Valor deve ser positivo.")); continue
+        destino_id = None
+        if tipo == 'transferencia_enviada':
+            destino_id = ids.get(destino)
+            if destino_id is None: recusas.append((seq, 'conta_destino_inexistente', f"Conta destino {destino!r} não encontrada.")); continue
+            if destino_id == conta_id: recusas.append((seq, 'contas_iguais', "Contas de origem e destino iguais.")); continue
+        elif destino: recusas.append((seq, 'tipo_invalido', "Só transferências têm conta destino.")); continue
+        movimentos.append((seq, conta_id, tipo, centavos, destino_id))
+    return movimentos, recusas
+
+def _simular_particao(movimentos: list, contas: dict, creditos: list) -> tuple[dict, dict]:
+    """Aplica os movimentos da partição na ordem do arquivo com as regras de postar_movimento e retorna ({seq: motivo da recusa ou None}, estado final).
+
+    contas: {conta_id: (saldo, limite, limite_saques, saques_hoje)} das contas da partição; creditos: transferências aceitas
+    vindas de outras partições [(seq, conta_id, centavos)]. Transferência para conta da própria partição é creditada aqui mesmo."""
+    estado = {cid: list(e) for cid, e in contas.items()}; decisoes = {}
+    for item in sorted(itertools.chain(movimentos, creditos)): # seq é único no bloco: ordem do arquivo
+        if len(item) == 3: estado[item[1]][0] += item[2]; continue
+        seq, conta_id, tipo, centavos, destino_id = item; e = estado[conta_id]
+        if tipo == 'deposito': e[0] += centavos; decisoes[seq] = None; continue
+        sem_saldo = e[0] + e[1] < centavos # _debitar: saldo + limite (só corrente)
+        if sem_saldo and tipo == 'transferencia_enviada': decisoes[seq] = 'saldo_insuficiente'; continue # Mesma ordem de Conta.validar_movimento
+        if e[2] is not None and e[3] is not None and e[3] >= e[2]: decisoes[seq] = 'limite_saques'; continue # _contar_saque_do_dia: a primeira do dia sempre entra
+        if sem_saldo: decisoes[seq] = 'saldo_insuficiente'; continue
+        e[0] -= centavos; decisoes[seq] = None
+        if e[2] is not None: e[3] = (e[3] or 0) + 1
+        if destino_id in estado: estado[destino_id][0] += centavos
+    return decisoes, {cid: e for cid, e in estado.items() if e != list(contas[cid])}
+
+def _processar_particao(linhas: list, ids: dict, contas: dict) -> tuple[list, list, dict, dict]:
+    """Primeira rodada de uma partição (no pool): validação + simulação ainda sem créditos de outras partições."""
+    movimentos, recusas = _validar_particao(linhas, ids)
+    return (movimentos, recusas) + _simular_particao(movimentos, contas, [])
+
+class ProcessadorLote:
+    """Aplica um arquivo de movimentos em blocos, com o mesmo resultado de postá-los um a um na ordem do arquivo.
+
+    Cada bloco (`tamanho_bloco` linhas) roda numa transação (BEGIN IMMEDIATE): o estado das contas envolvidas é lido com a trava,
+    as linhas são divididas em partições pela conta de origem (cada conta numa só partição, então a ordem de cada conta é mantida)
+    e validadas/simuladas em paralelo (processos > 1). Uma transferência entre partições vira crédito na partição do destino, e as
+    partições cujos créditos mudaram são simuladas de novo até nada mudar (a decisão de um movimento só depende dos anteriores,
+    então cada rodada acerta pelo menos até a primeira transferência que estava errada). A gravação é única por bloco:
+    lançamentos com executemany, um UPDATE de saldo por conta e o contador de saques do dia. As recusas (limite diário,
+    saldo + limite, conta inexistente, formato) vão para o arquivo de resultado depois do COMMIT do bloco."""
+    def __init__(self, db_manager: DatabaseManager, *, processos: int = 1, tamanho_bloco: int = 50_000):
+        self.db = db_manager; self.processos = max(1, processos); self.tamanho_bloco = tamanho_bloco
+
+    def processar(self, caminho: str, caminho_resultado: str | None = None) -> dict:
+        """Processa o CSV (numero_conta, tipo, valor[, numero_conta_destino]) e grava as recusas em caminho_resultado; retorna os totais."""
+        rel = {'arquivo': caminho, 'lidas': 0, 'aplicadas': 0, 'recusadas': 0, 'blocos': 0, 'rodadas': 0, 'motivos': {}}; inicio = time.perf_counter()
+        pool = ProcessPoolExecutor(max_workers=self.processos) if self.processos > 1 else None
+        try:
+            with open(caminho, newline='', encoding='utf-8-sig') as arquivo, open(caminho_resultado or os.devnull, 'w', newline='', encoding='utf-8') as saida:
+                leitor = csv.DictReader(arquivo); resultado = csv.writer(saida); resultado.writerow(COLUNAS_RESULTADO)
+                linhas = ((leitor.line_num, (r.get('numero_conta') or '').strip(), (r.get('tipo') or '').strip(), r.get('valor') or '', (r.get('numero_conta_destino') or '').strip()) for r in leitor)
+                while bloco := list(itertools.islice(linhas, self.tamanho_bloco)):
+                    recusas, rodadas, alteradas = self.db.executar_transacao(lambda cursor: self._aplicar_bloco(cursor, bloco, pool))
+                    for cid in alteradas: self.db.cache_contas.invalidar(cid) # Saldos em cache ficaram velhos
+                    originais = {linha[0]: linha for linha in bloco}
+                    for seq, motivo, mensagem in sorted(recusas):
+                        resultado.writerow((*originais[seq], motivo, mensagem)); rel['motivos'][motivo] = rel['motivos'].get(motivo, 0) + 1
+                    rel['lidas'] += len(bloco); rel['recusadas'] += len(recusas); rel['aplicadas'] += len(bloco) - len(recusas); rel['blocos'] += 1; rel['rodadas'] += rodadas
+        finally:
+            if pool is not None: pool.shutdown()
+        rel['segundos'] = time.perf_counter() - inicio; rel['linhas_por_segundo'] = rel['lidas'] / rel['segundos'] if rel['segundos'] > 0 else 0.0
+        return rel
+
+    def _mapear(self, pool, funcao, argumentos: list) -> list:
+        return list(pool.map(funcao, *zip(*argumentos))) if pool is not None and len(argumentos) > 1 else [funcao(*a) for a in argumentos]
+
+    def _aplicar_bloco(self, cursor, bloco: list, pool) -> tuple[list, int, set]:
+        """Numa transação aberta: lê o estado, valida e simula as partições e grava o bloco. Retorna (recusas, rodadas, contas alteradas)."""
+        n = self.processos; estados = self._ler_estados(cursor, {linha[1] for linha in bloco} | {linha[4] for linha in bloco} - {''})
+        ids = {numero: e[0] for numero, e in estados.items()}; particao = {e[0]: _particao(numero, n) for numero, e in estados.items()}
+        contas = [{} for _ in range(n)]; linhas = [[] for _ in range(n)]; ids_particao = [{} for _ in range(n)]
+        for e in estados.values(): contas[particao[e[0]]][e[0]] = e[1:]
+        for linha in bloco:
+            p = _particao(linha[1], n); linhas[p].append(linha)
+            for numero in (linha[1], linha[4]):
+                if numero in ids: ids_particao[p][numero] = ids[numero]
+        primeira = self._mapear(pool, _processar_particao, list(zip(linhas, ids_particao, contas)))
+        movimentos = [r[0] for r in primeira]; recusas = [x for r in primeira for x in r[1]]; decisoes = [r[2] for r in primeira]; finais = [r[3] for r in primeira]
+        usados = [[] for _ in range(n)]; rodadas = 1
+        while True: # Créditos entre partições segundo as decisões atuais; refaz só quem passou a receber créditos diferentes
+            creditos = [[] for _ in range(n)]
+            for p, movs in enumerate(movimentos):
+                for seq, _, tipo, centavos, destino_id in movs:
+                    if tipo == 'transferencia_enviada' and particao[destino_id] != p and decisoes[p][seq] is None: creditos[particao[destino_id]].append((seq, destino_id, centavos))
+            refazer = [p for p in range(n) if creditos[p] != usados[p]]
+            if not refazer: break
+            for p, (d, f) in zip(refazer, self._mapear(pool, _simular_particao, [(movimentos[p], contas[p], creditos[p]) for p in refazer])): decisoes[p] = d; finais[p] = f; usados[p] = creditos[p]
+            rodadas += 1
+        por_id = {e[0]: e for e in estados.values()}
+        for p, movs in enumerate(movimentos):
+            for seq, conta_id, *_ in movs:
+                motivo = decisoes[p][seq]
+                if motivo == 'limite_saques': recusas.append((seq, motivo, f"Limite de {por_id[conta_id][3]} saques/transferências diários atingido."))
+                elif motivo is not None: recusas.append((seq, motivo, "Saldo + limite insuficiente."))
+        self._gravar(cursor, sorted(m for p, movs in enumerate(movimentos) for m in movs if decisoes[p][m[0]] is None), por_id, finais)
+        return recusas, rodadas, {cid for final in finais for cid in final}
+
+    def _ler_estados(self, cursor, numeros: set) -> dict:
+        """{numero: (conta_id, saldo, limite, limite_saques, saques_hoje)} das contas que existem (valores em centavos; limites só da corrente)."""
+        q = SQL_ESTADO_CONTAS.format(saldo=self.db.sql_centavos('c.saldo'), limite=self.db.sql_centavos('COALESCE(c.limite, 0)'))
+        hoje = datetime.date.today().isoformat(); numeros = list(numeros); estados = {}
+        for i in range(0, len(numeros), MAX_PARAMETROS_IN):
+            fatia = numeros[i:i + MAX_PARAMETROS_IN]
+            for numero, *estado in cursor.execute(f"{q} ({', '.join('?' * len(fatia))})", (hoje, *fatia)): estados[numero] = tuple(estado)
+        return estados
+
+    def _gravar(self, cursor, aceitos: list, por_id: dict, finais: list):
+        """Grava os movimentos aceitos na ordem do arquivo (como postar_movimento: a recebida antes da enviada), os saldos e os contadores."""
+        para_bd = self.db.para_bd; hoje = datetime.date.today().isoformat(); linhas = []
+        for seq, conta_id, tipo, centavos, destino_id in aceitos:
+            valor = para_bd(Dinheiro(centavos))
+            if tipo == 'transferencia_enviada': linhas.append((destino_id, 'transferencia_recebida', valor, conta_id))
+            linhas.append((conta_id, tipo, valor, destino_id))
+        cursor.executemany("INSERT INTO transacoes (conta_id, tipo, valor, conta_destino_id) VALUES (?, ?, ?, ?)", linhas)
+        alteradas = [(cid, e) for final in finais for cid, e in final.items()] # Cada conta está numa só partição
+        deltas = dict.fromkeys((cid for _, conta_id, _, _, destino_id in aceitos for cid in (conta_id, destino_id) if cid is not None), 0)
+        deltas.update((cid, e[0] - por_id[cid][1]) for cid, e in alteradas)
+        # Toda conta com lançamento novo recebe o UPDATE, mesmo com saldo igual no fim do bloco: o gatilho do feed de alterações avisa quem a exibe (uma linha por conta)
+        cursor.executemany("UPDATE contas SET saldo = saldo + ? WHERE id = ?", ((para_bd(Dinheiro(delta)), cid) for cid, delta in deltas.items()))
+        cursor.executemany("INSERT INTO saques_diarios (conta_id, dia, total) VALUES (?, ?, ?) ON CONFLICT (conta_id, dia) DO UPDATE SET total = total + excluded.total",
+                           ((cid, hoje, e[3] - (por_id[cid][4] or 0)) for cid, e in alteradas if e[3] != por_id[cid][4]))
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--db", default="banco_moderno_v6_ptbr.db", help="arquivo do banco de dados")
+    parser.add_argument("--arquivo", required=True, help="CSV com numero_conta, tipo (deposito/saque/transferencia_enviada), valor e numero_conta_destino")
+    parser.add_argument("--resultado", help="CSV onde gravar as linhas recusadas com o motivo")
+    parser.add_argument("--processos", type=int, default=1, help="partições validadas em paralelo")
+    parser.add_argument("--bloco", type=int, default=50_000, help="linhas por transação (limita a memória e o tempo com a trava de escrita)")
+    args = parser.parse_args()
+    with DatabaseManager(args.db, pool=True) as db:
+        rel = ProcessadorLote(db, processos=args.processos, tamanho_bloco=args.bloco).processar(args.arquivo, args.resultado)
+    print(f"{rel['aplicadas']:,} aplicadas, {rel['recusadas']:,} recusadas de {rel['lidas']:,} em {rel['segundos']:.2f}s ({rel['linhas_por_segundo']:,.0f} linhas/s, {rel['blocos']} bloco(s), {rel['rodadas']} rodada(s))")
+    for motivo, n in sorted(rel['motivos'].items()): print(f"    {motivo}: {n:,}")
+    raise SystemExit(1 if rel['recusadas'] else 0)
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,103 @@
+"""Relatórios do admin a partir dos resumos (migração 9), mantidos incrementalmente pela marca em transacoes.id (uso: python relatorios.py --db ...)."""
+import argparse
+import datetime
+
+from main import DatabaseManager, Dinheiro
+
+SQL_DEPOSITOS_POR_DIA = "SELECT dia, depositos, n_depositos FROM resumo_diario WHERE dia >= ? AND n_depositos > 0 ORDER BY dia DESC"
+# Entradas (depósitos + transferências recebidas) menos saídas (saques + enviadas) no mês: lido em ordem do índice (mes, entradas - saidas)
+SQL_FLUXO_CLIENTES = """SELECT r.cliente_id, cl.nome, r.entradas, r.saidas, r.entradas - r.saidas FROM resumo_mensal_cliente r JOIN clientes cl ON cl.id = r.cliente_id
+                        WHERE r.mes = ? ORDER BY r.entradas - r.saidas {ordem} LIMIT ?"""
+SQL_FLUXO_DIARIO_CLIENTE = "SELECT dia, entradas, saidas, movimentos FROM resumo_diario_cliente WHERE cliente_id = ? AND dia >= ? ORDER BY dia DESC"
+SQL_MAIORES_SALDOS = "SELECT co.numero, cl.nome, co.saldo FROM contas co JOIN clientes cl ON cl.id = co.cliente_id ORDER BY co.saldo DESC LIMIT ?" # idx_contas_saldo
+SQL_TRANSFERENCIAS_CLIENTES = """SELECT o.nome AS origem, d.nome AS destino, r.quantidade, r.centavos FROM resumo_mensal_transferencias r
+                                 JOIN clientes o ON o.id = r.cliente_origem_id JOIN clientes d ON d.id = r.cliente_destino_id
+                                 WHERE r.mes = ? ORDER BY r.centavos DESC LIMIT ?""" # idx_resumo_mensal_transferencias_valor: sem ordenar
+
+class RelatoriosAdmin:
+    """Consultas do painel de relatórios: leem só os resumos (e contas), nunca o ledger, então o custo não cresce com ele.
+
+    Os resumos refletem os lançamentos até a marca: chame atualizar() (barato, só o que entrou desde a última vez) antes de consultar."""
+    def __init__(self, db_manager: DatabaseManager):
+        self.db = db_manager
+
+    def atualizar(self) -> dict:
+        return self.db.atualizar_resumos()
+
+    @staticmethod
+    def _desde(dias: int) -> str:
+        return (datetime.date.today() - datetime.timedelta(days=dias - 1)).isoformat() # dias=1: só hoje
+
+    @staticmethod
+    def _mes_atual() -> str:
+        return datetime.date.today().isoformat()[:7]
+
+    def depositos_por_dia(self, dias: int = 30) -> list[dict]:
+        """Total depositado por dia nos últimos `dias` dias (mais recente primeiro; dias sem depósito não aparecem)."""
+        return [{'dia': row[0], 'total': Dinheiro(row[1]), 'quantidade': row[2]} for row in self.db.fetch_all(SQL_DEPOSITOS_POR_DIA, (self._desde(dias),))]
+
+    def fluxo_clientes(self, mes: str | None = None, limite: int = 10, *, saidas: bool = False) -> list[dict]:
+        """Clientes com maior fluxo líquido (entradas - saídas) no mês 'AAAA-MM' (padrão: o atual); saidas=True: os de maior saída líquida."""
+        q = SQL_FLUXO_CLIENTES.format(ordem="ASC" if saidas else "DESC")
+        return [{'cliente_id': row[0], 'nome': row[1], 'entradas': Dinheiro(row[2]), 'saidas': Dinheiro(row[3]), 'liquido': Dinheiro(row[4])} for row in self.db.fetch_all(q, (mes or self._mes_atual(), limite))]
+
+    def fluxo_diario_cliente(self, cliente_id: int, dias: int = 30) -> list[dict]:
+        """Entradas, saídas e movimentos de um cliente por dia nos últimos `dias` dias (mais recente primeiro)."""
+        return [{'dia': row[0], 'entradas': Dinheiro(row[1]), 'saidas': Dinheiro(row[2]), 'movimentos': row[3]} for row in self.db.fetch_all(SQL_FLUXO_DIARIO_CLIENTE, (cliente_id, self._desde(dias)))]
+
+    def maiores_saldos(self, limite: int = 10) -> list[dict]:
+        return [{'numero': row[0], 'nome': row[1], 'saldo': self.db.de_bd(row[2])} for row in self.db.fetch_all(SQL_MAIORES_SALDOS, (limite,))]
+
+    def transferencias_entre_clientes(self, mes: str | None = None, limite: int = 10) -> list[dict]:
+        """Pares de clientes (origem -> destino) com maior volume transferido no mês 'AAAA-MM' (padrão: o atual)."""
+        return [{'origem': row[0], 'destino': row[1], 'quantidade': row[2], 'total': Dinheiro(row[3])} for row in self.db.fetch_all(SQL_TRANSFERENCIAS_CLIENTES, (mes or self._mes_atual(), limite))]
+
+    def painel(self, dias: int = 30, limite: int = 10, *, cliente_id: int | None = None) -> dict:
+        """Todos os relatórios do painel de uma vez (atualiza os resumos antes); cliente_id: inclui o fluxo diário desse cliente."""
+        atualizacao = self.atualizar(); mes = self._mes_atual()
+        return {'dias': dias, 'mes': mes, 'atualizacao': atualizacao, 'depositos': self.depositos_por_dia(dias),
+                'entradas': self.fluxo_clientes(mes, limite), 'saidas': self.fluxo_clientes(mes, limite, saidas=True),
+                'saldos': self.maiores_saldos(limite), 'transferencias': self.transferencias_entre_clientes(mes, limite),
+                'cliente': self.fluxo_diario_cliente(cliente_id, dias) if cliente_id is not None else None}
+
+    @staticmethod
+    def formatar(painel: dict) -> str:
+        """Texto do painel (caixa de texto da interface e CLI)."""
+        a = painel['atualizacao']
+        linhas = [f"Resumos até o lançamento {a['ultimo_id']:,} ({a['ids']:,} id(s) somados agora em {a['segundos'] * 1000:.0f} ms)", "",
+                  f"Depósitos por dia (últimos {painel['dias']} dias):"]
+        linhas += [f"  {d['dia']}  R$ {d['total']:>16,.2f}  {d['quantidade']:>8,} depósito(s)" for d in painel['depositos']] or ["  (nenhum)"]
+        for chave, titulo in (('entradas', "Maior entrada líquida"), ('saidas', "Maior saída líquida")):
+            linhas += ["", f"{titulo} por cliente ({painel['mes']}):"]
+            linhas += [f"  {f['nome'][:30]:<30} entradas R$ {f['entradas']:>14,.2f}  saídas R$ {f['saidas']:>14,.2f}  líquido R$ {f['liquido']:>+15,.2f}" for f in painel[chave]] or ["  (nenhum)"]
+        linhas += ["", "Maiores saldos:"] + [f"  Conta {s['numero']:<10} {s['nome'][:30]:<30} R$ {s['saldo']:>16,.2f}" for s in painel['saldos']]
+        linhas += ["", f"Transferências entre clientes ({painel['mes']}):"]
+        linhas += [f"  {t['origem'][:25]:<25} -> {t['destino'][:25]:<25} {t['quantidade']:>6,}x  R$ {t['total']:>14,.2f}" for t in painel['transferencias']] or ["  (nenhuma)"]
+        if painel['cliente'] is not None:
+            linhas += ["", f"Fluxo diário do cliente selecionado (últimos {painel['dias']} dias):"]
+            linhas += [f"  {d['dia']}  entradas R$ {d['entradas']:>14,.2f}  saídas R$ {d['saidas']:>14,.2f}  {d['movimentos']:>6,} movimento(s)" for d in painel['cliente']] or ["  (nenhum)"]
+        return "\n".join(linhas)
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--db", default="banco_moderno_v6_ptbr.db", help="arquivo do banco de dados")
+    parser.add_argument("--dias", type=int, default=30, help="janela dos relatórios diários")
+    parser.add_argument("--cpf", help="inclui o fluxo diário deste cliente")
+    acao = parser.add_mutually_exclusive_group()
+    acao.add_argument("--reconstruir", action="store_true", help="refaz todos os resumos a partir do ledger (principal + arquivo)")
+    acao.add_argument("--verificar", action="store_true", help="recalcula os resumos do ledger e compara com os gravados")
+    args = parser.parse_args()
+    with DatabaseManager(args.db, pool=True) as db:
+        if args.reconstruir:
+            r = db.reconstruir_resumos(); print(f"Resumos reconstruídos: {r['ids']:,} ids até {r['ultimo_id']:,} em {r['segundos']:.1f}s"); return
+        if args.verificar:
+            r = db.verificar_resumos()
+            for tabela, n in r['divergencias'].items(): print(f"{tabela}: {n} linha(s) divergente(s)")
+            for tabela, lado, linha in r['exemplos']: print(f"  {tabela} [{'só no ledger' if lado == 'ledger' else 'só no resumo'}]: {linha}")
+            print(f"Conferidos os lançamentos até {r['ultimo_id']:,} em {r['segundos']:.1f}s"); raise SystemExit(1 if any(r['divergencias'].values()) else 0)
+        cliente = db.fetch_one("SELECT id FROM clientes WHERE cpf = ?", (args.cpf,)) if args.cpf else None
+        if args.cpf and cliente is None: raise SystemExit(f"cliente com CPF {args.cpf} não existe")
+        print(RelatoriosAdmin.formatar(RelatoriosAdmin(db).painel(args.dias, cliente_id=cliente[0] if cliente else None)))
+
+if __name__ == "__main__":
+    main_cli()
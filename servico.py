@@ -0,0 +1,116 @@
+"""Camada de serviço sem interface gráfica: operações bancárias com resultados e erros estruturados (usada pelo servidor HTTP)."""
+import secrets
+import sqlite3
+import threading
+import time
+
+from main import DatabaseManager, Cliente, Conta, ContaCorrente, Dinheiro, MovimentoRecusado
+
+class ErroServico(Exception):
+    """Falha de uma operação do serviço: código estável, mensagem para o usuário e status HTTP correspondente."""
+    def __init__(self, codigo: str, mensagem: str, status: int = 400):
+        super().__init__(mensagem); self.codigo = codigo; self.mensagem = mensagem; self.status = status
+
+    def como_dict(self) -> dict:
+        return {'codigo': self.codigo, 'mensagem': self.mensagem}
+
+# Status HTTP das recusas de movimento (MovimentoRecusado.motivo); as demais viram 422
+STATUS_RECUSA = {'conta_inexistente': 404, 'conta_destino_inexistente': 404, 'limite_saques': 429}
+
+class ServicoBancario:
+    """Login, saldo, extrato e movimentos sem messagebox: cada método retorna um dict (JSON) ou levanta ErroServico."""
+    def __init__(self, db_manager: DatabaseManager, *, validade_sessao: float = 3600.0):
+        self.db = db_manager; self.validade_sessao = validade_sessao
+        self._sessoes: dict[str, tuple[int, float]] = {}; self._lock = threading.Lock() # token -> (cliente_id, expira_em)
+
+    # --- Sessões ---
+
+    def login(self, cpf: str, senha: str) -> dict:
+        """Autentica por CPF e senha e abre uma sessão (token opaco)."""
+        if not cpf or not senha: raise ErroServico('dados_invalidos', "CPF e Senha obrigatórios.")
+        cliente = Cliente.find_by_cpf(self.db, cpf.strip())
+        if not cliente or not cliente.check_password(senha): raise ErroServico('credenciais_invalidas', "CPF ou Senha inválidos.", 401)
+        token = secrets.token_urlsafe(24)
+        with self._lock: self._sessoes[token] = (cliente.id, time.monotonic() + self.validade_sessao)
+        return {'token': token, 'cliente_id': cliente.id, 'nome': cliente.nome, 'role': cliente.role}
+
+    def logout(self, token: str) -> dict:
+        with self._lock: self._sessoes.pop(token, None)
+        return {}
+
+    def _cliente(self, token: str | None) -> Cliente:
+        """Cliente da sessão (renova a validade a cada uso)."""
+        agora = time.monotonic()
+        with self._lock:
+            sessao = self._sessoes.get(token) if token else None
+            if sessao is None or sessao[1] < agora:
+                if sessao is not None: del self._sessoes[token]
+                raise ErroServico('nao_autenticado', "Sessão inválida ou expirada.", 401)
+            self._sessoes[token] = (sessao[0], agora + self.validade_sessao)
+        cliente = Cliente.obter(self.db, sessao[0])
+        if cliente is None: raise ErroServico('nao_autenticado', "Cliente da sessão não existe mais.", 401)
+        return cliente
+
+    def _conta(self, cliente: Cliente, numero: str) -> ContaCorrente:
+        """Conta pelo número, verificando a permissão (admin acessa qualquer conta)."""
+        conta = ContaCorrente.obter_por_numero(self.db, str(numero))
+        if conta is None: raise ErroServico('conta_inexistente', f"Conta '{numero}' não encontrada.", 404)
+        if cliente.role != 'admin' and conta.cliente_id != cliente.id: raise ErroServico('acesso_negado', "Permissão negada.", 403)
+        return conta
+
+    def _reler(self, conta: ContaCorrente, numero: str) -> ContaCorrente:
+        """Relê saldo e limites do BD no objeto do mapa de identidade: outra instância (ou processo) pode ter movimentado a conta."""
+        row = self.db.fetch_one("SELECT saldo, limite, limite_saques FROM contas WHERE id = ?", (conta.id,))
+        if row is None: raise ErroServico('conta_inexistente', f"Conta '{numero}' não encontrada.", 404)
+        conta._saldo = self.db.de_bd(row['saldo']); conta.limite = self.db.de_bd(row['limite'] or 0); conta.limite_saques = row['limite_saques']
+        return conta
+
+    # --- Consultas ---
+
+    def contas(self, token: str) -> dict:
+        """Contas do cliente da sessão."""
+        cliente = self._cliente(token)
+        linhas = self.db.fetch_all("SELECT numero, agencia, saldo, tipo_conta FROM contas WHERE cliente_id = ? ORDER BY numero", (cliente.id,))
+        return {'contas': [{**row, 'saldo': float(self.db.de_bd(row['saldo']))} for row in map(dict, linhas)]}
+
+    def saldo(self, token: str, numero: str) -> dict:
+        """Saldo relido do BD (outra instância pode ter movimentado a conta) e limites."""
+        conta = self._reler(self._conta(self._cliente(token), numero), numero)
+        return {'numero': conta.numero, 'agencia': conta.agencia, 'saldo': float(conta.saldo), 'limite': float(conta.limite),
+                'limite_saques': conta.limite_saques, 'saques_hoje': conta._get_numero_saques_hoje()}
+
+    def extrato(self, token: str, numero: str, *, apos: tuple | list | None = None, limite: int = 200) -> dict:
+        """Uma página do histórico (paginação por chave: passe 'proxima' como 'apos' para continuar)."""
+        conta = self._conta(self._cliente(token), numero)
+        if not 1 <= limite <= 1000: raise ErroServico('dados_invalidos', "limite deve estar entre 1 e 1000.")
+        if apos is not None and len(apos) != 2: raise ErroServico('dados_invalidos', "apos deve ser [timestamp, id].")
+        linhas, proxima = conta.pagina_historico(apos=tuple(apos) if apos is not None else None, limite=limite)
+        for linha in linhas: linha['valor'] = float(linha['valor']) # JSON: reais
+        return {'numero': conta.numero, 'transacoes': linhas, 'proxima': list(proxima) if proxima else None}
+
+    # --- Movimentos ---
+
+    def depositar(self, token: str, numero: str, valor) -> dict:
+        return self._movimentar(token, numero, 'deposito', valor)
+
+    def sacar(self, token: str, numero: str, valor) -> dict:
+        return self._movimentar(token, numero, 'saque', valor)
+
+    def transferir(self, token: str, numero: str, destino: str, valor) -> dict:
+        return self._movimentar(token, numero, 'transferencia_enviada', valor, destino)
+
+    def _movimentar(self, token: str, numero: str, tipo: str, valor, destino: str | None = None) -> dict:
+        """Valida e grava o movimento (Conta.efetuar_movimento) e traduz recusas/erros de BD em ErroServico."""
+        conta = self._reler(self._conta(self._cliente(token), numero), numero) # A checagem prévia usa o saldo do objeto
+        if isinstance(valor, bool) or not isinstance(valor, (int, float)): raise ErroServico('valor_invalido', "Valor numérico inválido.")
+        try: centavos = Dinheiro.de(valor)
+        except ValueError: raise ErroServico('valor_invalido', "Valor numérico inválido.")
+        if float(centavos) != valor: raise ErroServico('valor_invalido', "Valor com mais de 2 casas decimais.") # Nada de arredondar em silêncio
+        conta_destino = None
+        if tipo == 'transferencia_enviada':
+            conta_destino = ContaCorrente.obter_por_numero(self.db, str(destino)) if destino else None
+            if conta_destino is None: raise ErroServico('conta_destino_inexistente', f"Conta destino '{destino}' não encontrada.", 404)
+        try: novo_saldo = conta.efetuar_movimento(tipo, centavos, conta_destino)
+        except MovimentoRecusado as e: raise ErroServico(e.motivo, str(e), STATUS_RECUSA.get(e.motivo, 422)) from e
+        except sqlite3.Error as e: raise ErroServico('erro_bd', f"Falha ao processar {tipo}.", 503) from e
+        return {'numero': conta.numero, 'tipo': tipo, 'valor': float(centavos), 'saldo': float(novo_saldo)}
@@ -0,0 +1,161 @@
+"""Servidor HTTP/JSON (asyncio, sem dependências externas) sobre ServicoBancario (uso: python servidor.py [--porta 8080])."""
+import argparse
+import asyncio
+import contextlib
+import functools
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+from main import DatabaseManager
+from servico import ErroServico, ServicoBancario
+
+# Rotas: (método, padrão do caminho, nome do método de ServidorBancario)
+ROTAS = [
+    ("POST", re.compile(r"^/login$"), "_rota_login"),
+    ("POST", re.compile(r"^/logout$"), "_rota_logout"),
+    ("GET", re.compile(r"^/contas$"), "_rota_contas"),
+    ("GET", re.compile(r"^/contas/(?P<numero>[^/]+)/saldo$"), "_rota_saldo"),
+    ("GET", re.compile(r"^/contas/(?P<numero>[^/]+)/extrato$"), "_rota_extrato"),
+    ("POST", re.compile(r"^/contas/(?P<numero>[^/]+)/depositos$"), "_rota_deposito"),
+    ("POST", re.compile(r"^/contas/(?P<numero>[^/]+)/saques$"), "_rota_saque"),
+    ("POST", re.compile(r"^/contas/(?P<numero>[^/]+)/transferencias$"), "_rota_transferencia"),
+]
+TAMANHO_MAX_CORPO = 64 * 1024
+
+class ServidorBancario:
+    """HTTP/1.1 com keep-alive; o trabalho de BD roda num pool de threads limitado (o loop asyncio só faz E/S de rede)."""
+    def __init__(self, servico: ServicoBancario, *, host: str = "127.0.0.1", porta: int = 8080, max_workers: int = 8, max_pendentes: int = 256):
+        self.servico = servico; self.host = host; self.porta = porta; self.max_workers = max_workers; self.max_pendentes = max_pendentes
+        self._pool: ThreadPoolExecutor | None = None; self._vagas: asyncio.Semaphore | None = None; self._servidor: asyncio.AbstractServer | None = None
+
+    async def iniciar(self) -> int:
+        """Abre o socket e retorna a porta efetiva (porta=0 escolhe uma livre)."""
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="banco-api")
+        self._vagas = asyncio.Semaphore(self.max_pendentes) # Contrapressão: requisições além disso esperam antes de ocupar a fila do pool
+        self._servidor = await asyncio.start_server(self._atender, self.host, self.porta)
+        self.porta = self._servidor.sockets[0].getsockname()[1]; return self.porta
+
+    async def servir(self):
+        """Inicia (se preciso) e atende até ser cancelado."""
+        if self._servidor is None: await self.iniciar()
+        print(f"Servidor em http://{self.host}:{self.porta} ({self.max_workers} threads de BD)")
+        async with self._servidor: await self._servidor.serve_forever()
+
+    def fechar(self):
+        if self._servidor is not None: self._servidor.close()
+        if self._pool is not None: self._pool.shutdown(wait=True, cancel_futures=True)
+
+    async def _executar(self, funcao, *args, **kwargs):
+        """Roda uma chamada do serviço no pool de threads de BD."""
+        async with self._vagas:
+            return await asyncio.get_running_loop().run_in_executor(self._pool, functools.partial(funcao, *args, **kwargs))
+
+    # --- HTTP ---
+
+    async def _atender(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Uma conexão: lê requisições em sequência (keep-alive) até o cliente fechar."""
+        try:
+            while True:
+                linha = await reader.readline()
+                if not linha: break
+                try: metodo, alvo, versao = linha.decode('latin-1').split()
+                except ValueError: await self._responder(writer, 400, {'ok': False, 'erro': {'codigo': 'requisicao_invalida', 'mensagem': "Linha de requisição inválida."}}, False); break
+                cabecalhos = {}
+                while True:
+                    h = await reader.readline()
+                    if h in (b"\r\n", b"\n", b""): break
+                    nome, _, valor = h.decode('latin-1').partition(":"); cabecalhos[nome.strip().lower()] = valor.strip()
+                texto = cabecalhos.get('content-length') or "0"
+                tamanho = int(texto) if texto.isascii() and texto.isdigit() else None # Só dígitos: int() também aceitaria "-1", "+1" e "1_0"
+                if tamanho is None: await self._responder(writer, 400, {'ok': False, 'erro': {'codigo': 'requisicao_invalida', 'mensagem': "Content-Length inválido."}}, False); break
+                if tamanho > TAMANHO_MAX_CORPO: await self._responder(writer, 413, {'ok': False, 'erro': {'codigo': 'corpo_grande', 'mensagem': "Corpo grande demais."}}, False); break
+                corpo = await reader.readexactly(tamanho) if tamanho else b""
+                manter = cabecalhos.get('connection', '').lower() != 'close' and versao == "HTTP/1.1"
+                status, resposta = await self._despachar(metodo.upper(), alvo, cabecalhos, corpo)
+                await self._responder(writer, status, resposta, manter)
+                if not manter: break
+        except (asyncio.IncompleteReadError, ConnectionError): pass
+        finally:
+            writer.close()
+            with contextlib.suppress(ConnectionError): await writer.wait_closed()
+
+    async def _responder(self, writer: asyncio.StreamWriter, status: int, corpo: dict, manter: bool):
+        dados = json.dumps(corpo, ensure_ascii=False).encode('utf-8')
+        cabecalho = (f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\nContent-Type: application/json; charset=utf-8\r\n"
+                     f"Content-Length: {len(dados)}\r\nConnection: {'keep-alive' if manter else 'close'}\r\n\r\n")
+        writer.write(cabecalho.encode('latin-1') + dados); await writer.drain()
+
+    async def _despachar(self, metodo: str, alvo: str, cabecalhos: dict, corpo: bytes) -> tuple[int, dict]:
+        """Encontra a rota, decodifica o JSON e converte ErroServico/exceções em respostas de erro."""
+        partes = urlsplit(alvo); consulta = {k: v[-1] for k, v in parse_qs(partes.query).items()}
+        rota = None; metodo_errado = False
+        for metodo_rota, padrao, nome in ROTAS:
+            achou = padrao.match(partes.path)
+            if achou and metodo_rota == metodo: rota = (getattr(self, nome), achou.groupdict()); break
+            metodo_errado = metodo_errado or bool(achou)
+        if rota is None:
+            if metodo_errado: return 405, {'ok': False, 'erro': {'codigo': 'metodo_nao_permitido', 'mensagem': f"{metodo} não permitido em {partes.path}."}}
+            return 404, {'ok': False, 'erro': {'codigo': 'rota_inexistente', 'mensagem': f"Rota {partes.path} não existe."}}
+        try:
+            dados = json.loads(corpo) if corpo else {}
+            if not isinstance(dados, dict): raise ValueError("o corpo deve ser um objeto JSON")
+        except ValueError as e: return 400, {'ok': False, 'erro': {'codigo': 'json_invalido', 'mensagem': f"JSON inválido: {e}"}}
+        autorizacao = cabecalhos.get('authorization', '')
+        token = autorizacao[7:].strip() if autorizacao.lower().startswith('bearer ') else None
+        funcao, parametros = rota
+        try: return 200, {'ok': True, **await funcao(token, dados, consulta, **parametros)}
+        except ErroServico as e: return e.status, {'ok': False, 'erro': e.como_dict()}
+        except Exception as e:
+            print(f"Erro interno em {metodo} {partes.path}: {e!r}")
+            return 500, {'ok': False, 'erro': {'codigo': 'erro_interno', 'mensagem': "Erro interno do servidor."}}
+
+    # --- Rotas (token, corpo JSON, query string, parâmetros do caminho) ---
+
+    async def _rota_login(self, token, dados, consulta):
+        return await self._executar(self.servico.login, str(dados.get('cpf', '')), str(dados.get('senha', '')))
+
+    async def _rota_logout(self, token, dados, consulta):
+        return await self._executar(self.servico.logout, token)
+
+    async def _rota_contas(self, token, dados, consulta):
+        return await self._executar(self.servico.contas, token)
+
+    async def _rota_saldo(self, token, dados, consulta, numero):
+        return await self._executar(self.servico.saldo, token, numero)
+
+    async def _rota_extrato(self, token, dados, consulta, numero):
+        try:
+            limite = int(consulta.get('limite', 200))
+            apos = (consulta['apos_ts'], int(consulta['apos_id'])) if 'apos_ts' in consulta else None
+        except (KeyError, ValueError): raise ErroServico('dados_invalidos', "Use limite=<n> e apos_ts=<timestamp>&apos_id=<id>.")
+        return await self._executar(self.servico.extrato, token, numero, apos=apos, limite=limite)
+
+    async def _rota_deposito(self, token, dados, consulta, numero):
+        return await self._executar(self.servico.depositar, token, numero, dados.get('valor'))
+
+    async def _rota_saque(self, token, dados, consulta, numero):
+        return await self._executar(self.servico.sacar, token, numero, dados.get('valor'))
+
+    async def _rota_transferencia(self, token, dados, consulta, numero):
+        return await self._executar(self.servico.transferir, token, numero, dados.get('destino'), dados.get('valor'))
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--db", default="banco_moderno_v6_ptbr.db", help="arquivo do banco de dados")
+    parser.add_argument("--host", default="127.0.0.1"); parser.add_argument("--porta", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=8, help="threads de BD")
+    parser.add_argument("--silencioso", action="store_true", help="descarta os prints das operações (útil sob carga)")
+    args = parser.parse_args()
+    with contextlib.ExitStack() as pilha:
+        if args.silencioso: pilha.enter_context(contextlib.redirect_stdout(pilha.enter_context(open(os.devnull, 'w'))))
+        db = DatabaseManager(args.db, pool=True); servidor = ServidorBancario(ServicoBancario(db), host=args.host, porta=args.porta, max_workers=args.workers)
+        try: asyncio.run(servidor.servir())
+        except KeyboardInterrupt: pass
+        finally: servidor.fechar(); db.close()
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,21 @@
+"""Fixtures compartilhadas dos testes (uso: python -m pytest tests). Os testes não importam a interface: rodam sem Tk."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # Módulos do projeto ficam na raiz
+
+from main import DatabaseManager # noqa: E402
+
+def criar_conta(db: DatabaseManager, numero: str, saldo: float = 0.0, cpf: str | None = None) -> int: # saldo em reais
+    """Insere um cliente e uma conta de teste e retorna o ID da conta."""
+    cpf = cpf or f"{int(numero):011d}"; cpf = f"{cpf[:3]}.{cpf[3:6]}.{cpf[6:9]}-{cpf[9:11]}"
+    cliente_id = db.execute_query("INSERT INTO clientes (nome, cpf, endereco, senha) VALUES (?, ?, ?, ?)", (f"Cliente {numero}", cpf, "Rua Teste", "123"))
+    return db.execute_query("INSERT INTO contas (numero, cliente_id, saldo) VALUES (?, ?, ?)", (numero, cliente_id, db.para_bd(saldo)))
+
+@pytest.fixture
+def banco(tmp_path):
+    """BD novo em modo pool (sem o ADMIN de exemplo: o arquivo já existe quando o DatabaseManager abre)."""
+    caminho = tmp_path / "banco.db"; caminho.touch()
+    with DatabaseManager(str(caminho), pool=True) as db: yield db
@@ -0,0 +1,48 @@
+"""Conciliação do ledger com IDs da faixa de fragmentos (>= 10**12): os dois motores dão o mesmo resultado."""
+import pytest
+
+import conciliacao
+from conciliacao import ConciliadorLedger
+from main import BLOCO_IDS_FRAGMENTO, DatabaseManager, postar_movimento
+
+from conftest import criar_conta
+
+MOTORES = ['python'] + (['numpy'] if conciliacao.np is not None else [])
+
+@pytest.fixture
+def fragmento(tmp_path):
+    """Fragmento 1 de um banco particionado: clientes, contas e lançamentos começam em 10**12."""
+    with DatabaseManager(str(tmp_path / "banco_fragmento1.db"), pool=True, fragmento=1) as db: yield db
+
+def _movimentar(db, origem: int, destino: int):
+    for tipo, valor, conta_destino in (('deposito', 500, None), ('transferencia_enviada', 120, destino), ('saque', 30, None), ('transferencia_enviada', 45, destino)):
+        db.executar_transacao(lambda cursor: postar_movimento(cursor, origem, tipo, db.para_bd(valor), conta_destino))
+
+@pytest.mark.skipif(conciliacao.np is None, reason="requer numpy")
+def test_agregacao_numpy_igual_python_com_ids_grandes():
+    np = conciliacao.np; base = BLOCO_IDS_FRAGMENTO
+    ids = [base + 1, base + 2, 2 ** 32 + 7, 2 ** 40 + 3] # Inclui IDs que não cabem em 32 bits
+    lote = [(ids[0], 0, 1000, 0, 1), (ids[0], 2, 300, ids[1], 1), (ids[1], 3, 300, ids[0], 1), (ids[2], 2, 50, ids[3], 0), (ids[3], 1, 20, 0, 1)]
+    colunas = [np.array(c, dtype=np.int64) for c in zip(*lote)]
+    conta, tipo, centavos, destino, apos = colunas
+    assert conciliacao._agregar_numpy([(conta, tipo, apos, centavos, destino)]) == conciliacao._agregar_python([lote])
+
+@pytest.mark.parametrize("motor", MOTORES)
+def test_concilia_fragmento(fragmento, motor):
+    origem, destino = criar_conta(fragmento, "20001", 100.0), criar_conta(fragmento, "20002", 0.0)
+    assert origem > BLOCO_IDS_FRAGMENTO and destino > BLOCO_IDS_FRAGMENTO
+    _movimentar(fragmento, origem, destino)
+    fragmento.execute_query("UPDATE contas SET saldo = 0 WHERE id IN (?, ?)", (origem, destino)) # Saldo inicial fora do ledger: zera para conferir
+    fragmento.execute_query("UPDATE contas SET saldo = ? WHERE id = ?", (fragmento.para_bd(500 - 120 - 30 - 45), origem))
+    fragmento.execute_query("UPDATE contas SET saldo = ? WHERE id = ?", (fragmento.para_bd(165), destino))
+    r = ConciliadorLedger(fragmento, motor=motor).conciliar()
+    assert r['transacoes'] == 6 and r['divergencias_saldo'] == [] and r['transferencias_sem_par'] == []
+
+@pytest.mark.parametrize("motor", MOTORES)
+def test_aponta_divergencias_com_ids_do_fragmento(fragmento, motor):
+    origem, destino = criar_conta(fragmento, "20001", 0.0), criar_conta(fragmento, "20002", 0.0)
+    _movimentar(fragmento, origem, destino)
+    fragmento.execute_query("DELETE FROM transacoes WHERE id = (SELECT MAX(id) FROM transacoes WHERE tipo = 'transferencia_recebida')") # Recebida de 45 sumiu
+    r = ConciliadorLedger(fragmento, motor=motor).conciliar()
+    assert [(p['origem'], p['destino'], p['enviadas'], p['recebidas']) for p in r['transferencias_sem_par']] == [(origem, destino, 2, 1)]
+    assert [d[0] for d in r['divergencias_saldo']] == [destino] # Saldo tem os 45, o ledger não
@@ -0,0 +1,53 @@
+"""Estresse com processos escritores concorrentes: nenhuma atualização perdida, saldo = ledger e limite respeitado."""
+import contextlib
+import multiprocessing
+import os
+import random
+
+import pytest
+
+from conftest import criar_conta
+from main import DatabaseManager, ContaCorrente
+
+N_CONTAS = 20; SALDO_INICIAL = 1000.0; OPERACOES = 600
+
+def _escritor(caminho: str, conta_ids: list[int], n_ops: int, seed: int) -> tuple[float, int]:
+    """Processo escritor: depósitos e transferências aleatórias pelo caminho de postagem real de Conta."""
+    rnd = random.Random(seed); depositado = 0.0; recusados = 0
+    with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo): # Conta imprime cada operação
+        db = DatabaseManager(caminho, pool=True); contas = [ContaCorrente(db, conta_id=cid) for cid in conta_ids]
+        for _ in range(n_ops):
+            origem = rnd.choice(contas)
+            if rnd.random() < 0.5:
+                if origem._atualizar_saldo_e_registrar_transacao('deposito', 1.0): depositado += 1.0
+            else:
+                destino = rnd.choice(contas)
+                if destino is origem: continue
+                if not origem._atualizar_saldo_e_registrar_transacao('transferencia_enviada', float(rnd.randint(1, 300)), destino.id): recusados += 1
+        db.close()
+    return depositado, recusados
+
+def verificar_consistencia(db: DatabaseManager, saldo_inicial: float, n_contas: int, depositado: float) -> list[str]:
+    """Confere conservação do dinheiro, saldo x ledger por conta e respeito ao limite (saldo_inicial e depositado em reais)."""
+    saldo_inicial = db.para_bd(saldo_inicial); depositado = db.para_bd(depositado) # Comparações na unidade do BD
+    saldo_inicial_total = saldo_inicial * n_contas
+    erros = []
+    total = db.fetch_one("SELECT SUM(saldo) AS t FROM contas")['t']
+    if abs(total - (saldo_inicial_total + depositado)) > 1e-6: erros.append(f"Total {total} != inicial {saldo_inicial_total} + depósitos {depositado}")
+    q = """SELECT co.id, co.saldo, co.limite, COALESCE(SUM(CASE WHEN t.tipo IN ('deposito', 'transferencia_recebida') THEN t.valor ELSE -t.valor END), 0) AS liquido
+           FROM contas co LEFT JOIN transacoes t ON t.conta_id = co.id GROUP BY co.id"""
+    for row in db.fetch_all(q):
+        if abs(row['saldo'] - saldo_inicial - row['liquido']) > 1e-6: erros.append(f"Conta {row['id']}: saldo {row['saldo']} != inicial + ledger {saldo_inicial + row['liquido']}")
+        if row['saldo'] < -row['limite'] - 1e-6: erros.append(f"Conta {row['id']} abaixo do limite: {row['saldo']}")
+    erros.extend(f"Contador de saques divergente: {d}" for d in db.verificar_contadores_saques())
+    return erros
+
+@pytest.mark.parametrize("escritores", [1, 4])
+def test_escritores_concorrentes_sem_atualizacao_perdida(banco, escritores):
+    conta_ids = [criar_conta(banco, str(1000 + i), SALDO_INICIAL) for i in range(N_CONTAS)]
+    banco.execute_query("UPDATE contas SET limite_saques = ?", (10 ** 9,)) # O estresse é de concorrência, não do limite diário
+    with multiprocessing.get_context("spawn").Pool(escritores) as pool:
+        resultados = pool.starmap(_escritor, [(banco.db_name, conta_ids, OPERACOES // escritores, seed) for seed in range(escritores)])
+    depositado = sum(r[0] for r in resultados)
+    assert depositado > 0 and banco.fetch_one("SELECT COUNT(*) FROM transacoes WHERE tipo = 'transferencia_enviada'")[0] > 0
+    assert verificar_consistencia(banco, SALDO_INICIAL, N_CONTAS, depositado) == []
@@ -0,0 +1,24 @@
+"""Comparação e hash de Dinheiro contra outros números: valor exato (centavos / 100), como Decimal."""
+from decimal import Decimal
+
+from main import Dinheiro
+
+def test_compara_pelo_valor_exato():
+    trinta = Dinheiro(30)
+    assert trinta == Decimal("0.3") and trinta == Decimal("0.30") and trinta < Decimal("0.31")
+    assert trinta != 0.304 and trinta < 0.304 and trinta > 0.299
+    assert trinta != 0.3 and Decimal("0.3") != 0.3 # 0.3 em float não é 30 centavos; nem Decimal o considera igual
+    assert Dinheiro(50) == 0.5 and Dinheiro(100) == 1 and Dinheiro(100) != 1.001 and Dinheiro(-250) < -2
+
+def test_igual_a_entrada_do_construtor():
+    for valor in (Decimal("0.3"), Decimal("1234.56"), 7, Decimal("-0.01")):
+        assert Dinheiro.de(valor) == valor and {Dinheiro.de(valor): 'x'}.get(valor) == 'x'
+
+def test_valores_grandes_sem_erro_de_float():
+    assert Dinheiro(10**17 + 1) != 10**15 + 0.01 and Dinheiro(10**17 + 1) == Decimal(10**15) + Decimal("0.01")
+    assert Dinheiro(10**17 + 1) > 10**15 and Dinheiro(10**17) < Decimal("1000000000000000.01")
+
+def test_hash_coerente_com_igualdade():
+    assert hash(Dinheiro(30)) == hash(Decimal("0.3")) and hash(Dinheiro(50)) == hash(0.5) and hash(Dinheiro(100)) == hash(1)
+    assert Dinheiro(30) in {Decimal("0.30")} and Dinheiro(30) not in {0.304}
+    assert len({Dinheiro(30), Dinheiro.de(0.3), Decimal("0.3")}) == 1
@@ -0,0 +1,29 @@
+"""Exportação de extratos com períodos arquivados (ExportadorExtrato)."""
+import csv
+
+from conftest import criar_conta
+from exportacao import ExportadorExtrato
+from main import postar_movimento
+
+def _ler(caminho) -> list[dict]:
+    with open(caminho, encoding='utf-8', newline='') as arquivo: return list(csv.DictReader(arquivo))
+
+def test_exporta_lancamentos_arquivados(banco, tmp_path):
+    origem = criar_conta(banco, "1001", cpf="00000000001"); destino = criar_conta(banco, "1002", cpf="00000000002")
+    movimentar = lambda *args: banco.executar_transacao(lambda cursor: postar_movimento(cursor, *args))
+    movimentar(origem, 'deposito', banco.para_bd(500)); movimentar(origem, 'transferencia_enviada', banco.para_bd(120), destino) # Também lança a recebida
+    banco.execute_query("UPDATE transacoes SET timestamp = '2020-01-15 10:00:00.000000'") # Movimento de um mês já encerrado
+    banco.fechar_periodos('2020-01'); assert banco.arquivar_periodos()['removidas'] == 3
+    movimentar(origem, 'saque', banco.para_bd(30)) # Fica no banco principal
+    assert banco.fetch_one("SELECT COUNT(*) FROM transacoes")[0] == 1
+
+    exportador = ExportadorExtrato(banco)
+    conta = _ler(exportador.exportar(str(tmp_path / "conta.csv"), numero_conta="1001")['arquivo'])
+    assert [(linha['tipo'], float(linha['valor'])) for linha in conta] == [('deposito', 500.0), ('transferencia_enviada', 120.0), ('saque', 30.0)]
+    assert conta[1]['numero_conta_destino'] == "1002"
+    cliente = _ler(exportador.exportar(str(tmp_path / "cliente.csv"), cpf="000.000.000-02")['arquivo'])
+    assert [linha['tipo'] for linha in cliente] == ['transferencia_recebida']
+    banco_todo = _ler(exportador.exportar(str(tmp_path / "banco.csv"))['arquivo'])
+    assert [(linha['numero_conta'], int(linha['id'])) for linha in banco_todo] == sorted((linha['numero_conta'], int(linha['id'])) for linha in banco_todo)
+    assert len(banco_todo) == 4
+    assert len(_ler(exportador.exportar(str(tmp_path / "recente.csv"), inicio="2021-01-01")['arquivo'])) == 1 # Só o principal
@@ -0,0 +1,11 @@
+"""Contadores do mapa de identidade de contas: só consultas contam acerto/falha, não as postagens."""
+from conftest import criar_conta
+from main import ContaCorrente
+
+def test_postagem_nao_conta_acerto_nem_falha(banco):
+    conta = ContaCorrente.obter(banco, criar_conta(banco, "1001", 100.0)); destino = ContaCorrente.obter(banco, criar_conta(banco, "1002", cpf="00000000002"))
+    cache = banco.cache_contas; antes = (cache.acertos, cache.falhas)
+    conta.efetuar_movimento('deposito', 10.0); conta.efetuar_movimento('saque', 5.0); conta.efetuar_movimento('transferencia_enviada', 1.0, destino)
+    assert (cache.acertos, cache.falhas) == antes
+    assert cache.contem(conta.id, conta) and not cache.contem(destino.id, destino) # Destino invalidado: o saldo em cache ficou velho
+    assert ContaCorrente.obter(banco, conta.id) is conta and cache.acertos == antes[0] + 1
@@ -0,0 +1,55 @@
+"""Regressão de planos: cada acesso a tabela das consultas quentes usa índice (sem SCAN completo)."""
+import datetime
+import random
+
+import pytest
+
+from exportacao import ExportadorExtrato
+from main import Conta, DatabaseManager
+
+N_CONTAS = 1000; N_TRANSACOES = 50_000
+
+@pytest.fixture(scope="module")
+def ledger(tmp_path_factory):
+    """BD com N_CONTAS contas (um cliente cada) e N_TRANSACOES lançamentos no último ano, com estatísticas (ANALYZE)."""
+    caminho = tmp_path_factory.mktemp("planos") / "banco.db"; caminho.touch(); rnd = random.Random(42)
+    with DatabaseManager(str(caminho), pool=True) as db:
+        conn = db._connect()
+        try:
+            conn.executemany("INSERT INTO clientes (nome, cpf, endereco, senha) VALUES (?, ?, ?, ?)", ((f"Cliente {i:06d}", f"{i:03d}.{i:03d}.{i:03d}-{i % 100:02d}"[-14:], "Rua", "123") for i in range(N_CONTAS)))
+            conn.executemany("INSERT INTO contas (numero, cliente_id, saldo) VALUES (?, ?, 0)", ((str(10000 + i), i + 1) for i in range(N_CONTAS)))
+            base = datetime.datetime.now() - datetime.timedelta(days=365); tipos = ('deposito', 'saque', 'transferencia_enviada', 'transferencia_recebida')
+            conn.executemany("INSERT INTO transacoes (conta_id, tipo, valor, timestamp) VALUES (?, ?, ?, ?)",
+                             ((rnd.randint(1, N_CONTAS), rnd.choice(tipos), db.para_bd(rnd.randint(100, 50_000) / 100), (base + datetime.timedelta(seconds=rnd.randrange(365 * 86400))).strftime('%Y-%m-%d %H:%M:%S')) for _ in range(N_TRANSACOES)))
+            conn.commit(); conn.execute("ANALYZE;")
+        finally:
+            db._release(conn)
+        yield db
+
+def _consultas() -> dict:
+    hoje = datetime.date.today(); conta = N_CONTAS // 2
+    return {
+        "historico": (Conta.SQL_HISTORICO, (conta,)),
+        "historico_pagina": (Conta.SQL_HISTORICO_PAGINA_BASE + " AND (timestamp, id) > (?, ?) ORDER BY timestamp ASC, id ASC LIMIT ?", (conta, hoje.isoformat(), 0, 200)),
+        "saques_hoje": (Conta.SQL_SAQUES_HOJE, (conta, hoje.isoformat())),
+        "busca_todas": Conta.sql_busca("", limite=6)[:2],
+        "busca_nome": Conta.sql_busca("cliente 0004", limite=6, apos=("Cliente 000400", 401, "10400"))[:2],
+        "busca_cpf": Conta.sql_busca("004.", limite=6)[:2],
+        "busca_numero": Conta.sql_busca("105", limite=6, apos=("10500",))[:2],
+        "contas_cliente": ("SELECT co.id, co.numero, cl.nome FROM contas co JOIN clientes cl ON co.cliente_id = cl.id WHERE co.cliente_id = ? ORDER BY co.numero ASC", (500,)), # BancoGUI.SQL_CONTAS_CLIENTE (a interface exige Tk)
+        "conta_por_numero": ("SELECT id FROM contas WHERE numero = ?", ("10500",)),
+        "cliente_por_cpf": ("SELECT id, nome, cpf, endereco, senha, role FROM clientes WHERE cpf = ?", ("000.000.000-00",)),
+        "exportacao_conta": ExportadorExtrato.consulta(conta_id=conta, inicio=hoje - datetime.timedelta(days=30)),
+        "exportacao_cliente": ExportadorExtrato.consulta(cliente_id=500),
+        "exportacao_banco": ExportadorExtrato.consulta(inicio=hoje - datetime.timedelta(days=1)),
+    }
+
+@pytest.mark.parametrize("nome", list(_consultas()))
+def test_consulta_usa_indice(ledger, nome):
+    sql, params = _consultas()[nome]
+    plano = [row['detail'] for row in ledger.fetch_all("EXPLAIN QUERY PLAN " + sql, params)]
+    assert [d for d in plano if d.startswith("SCAN") and "USING" not in d] == [], plano # TEMP B-TREE sobre poucas linhas é aceitável
+
+def test_exportacao_banco_sem_ordenacao_temporaria(ledger):
+    sql, params = _consultas()["exportacao_banco"]; plano = [row['detail'] for row in ledger.fetch_all("EXPLAIN QUERY PLAN " + sql, params)]
+    assert not any("TEMP B-TREE" in d for d in plano), plano # Índice inteiro em ordem (conta, timestamp, id)
@@ -0,0 +1,40 @@
+"""Números de conta da sequência no BD: sem duplicatas entre processos e lacunas só dentro de blocos reservados."""
+import multiprocessing
+import threading
+
+from main import AlocadorNumerosConta, DatabaseManager
+
+PROCESSOS = 4; CONTAS_POR_PROCESSO = 1500; TAMANHO_BLOCO = 100
+
+def _cadastrar(caminho: str, indice: int, n_contas: int, tamanho_bloco: int) -> int:
+    """Processo de cadastro em massa: números do alocador em blocos, contas inseridas com executemany."""
+    db = DatabaseManager(caminho, pool=True); alocador = AlocadorNumerosConta(db, tamanho_bloco)
+    cliente_id = db.execute_query("INSERT INTO clientes (nome, cpf, endereco, senha) VALUES (?, ?, ?, ?)", (f"Lote {indice}", f"999.999.{indice:03d}-99", "Rua", "123"))
+    conn = db._connect(); criadas = 0
+    while criadas < n_contas:
+        lote = [(alocador.proximo(), cliente_id) for _ in range(min(250, n_contas - criadas))]
+        with conn: conn.executemany("INSERT INTO contas (numero, cliente_id) VALUES (?, ?)", lote)
+        criadas += len(lote)
+    db.close(); return criadas
+
+def _proximo(db: DatabaseManager) -> int: return db.fetch_one("SELECT proximo FROM sequencias WHERE nome = 'numero_conta'")['proximo']
+
+def test_processos_concorrentes_sem_numeros_duplicados(banco):
+    inicio = _proximo(banco)
+    with multiprocessing.get_context("spawn").Pool(PROCESSOS) as pool:
+        criadas = sum(pool.starmap(_cadastrar, [(banco.db_name, i, CONTAS_POR_PROCESSO, TAMANHO_BLOCO) for i in range(PROCESSOS)]))
+    numeros = [int(row['numero']) for row in banco.fetch_all("SELECT numero FROM contas")]; proximo = _proximo(banco)
+    assert criadas == len(numeros) == PROCESSOS * CONTAS_POR_PROCESSO
+    assert len(set(numeros)) == len(numeros)
+    assert inicio <= min(numeros) and max(numeros) < proximo # Só números reservados na sequência
+    assert (proximo - inicio) - len(numeros) <= PROCESSOS * (TAMANHO_BLOCO - 1) # Lacunas: no máximo a sobra do último bloco de cada processo
+
+def test_threads_compartilhando_o_alocador(banco):
+    alocador = AlocadorNumerosConta(banco, tamanho_bloco=7); numeros: list[str] = []; lock = threading.Lock()
+    def pegar():
+        meus = [alocador.proximo() for _ in range(200)]
+        with lock: numeros.extend(meus)
+    threads = [threading.Thread(target=pegar) for _ in range(8)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert len(set(numeros)) == len(numeros) == 1600
@@ -0,0 +1,36 @@
+"""ServicoBancario com mais de uma instância no mesmo arquivo (a checagem prévia não pode usar saldo velho) e uso sem interface."""
+import sqlite3
+import sys
+
+import pytest
+
+from conftest import criar_conta
+from main import DatabaseManager
+from servico import ServicoBancario
+
+@pytest.fixture
+def segundo_banco(banco):
+    """Outra instância (outro DatabaseManager, outro mapa de identidade) sobre o mesmo arquivo."""
+    with DatabaseManager(banco.db_name, pool=True) as db: yield db
+
+def test_transferencia_ve_deposito_de_outra_instancia(banco, segundo_banco):
+    criar_conta(banco, "1001", 500.0, cpf="00000000001"); criar_conta(banco, "1002", cpf="00000000002")
+    a, b = ServicoBancario(banco), ServicoBancario(segundo_banco)
+    token_a = a.login("000.000.000-01", "123")['token']; token_b = b.login("000.000.000-01", "123")['token']
+    assert a.depositar(token_a, "1001", 10)['saldo'] == 510.0 # A carrega a conta no seu mapa de identidade
+    assert b.depositar(token_b, "1001", 5000)['saldo'] == 5510.0
+    r = a.transferir(token_a, "1001", "1002", 3000) # Recusada com saldo_insuficiente se A validasse com o saldo de antes
+    assert r['saldo'] == 2510.0 and a.saldo(token_a, "1001")['saldo'] == b.saldo(token_b, "1001")['saldo'] == 2510.0
+
+def test_saque_ve_limite_de_saques_de_outra_instancia(banco, segundo_banco):
+    criar_conta(banco, "1001", 500.0, cpf="00000000001")
+    a, b = ServicoBancario(banco), ServicoBancario(segundo_banco)
+    token_a = a.login("000.000.000-01", "123")['token']; token_b = b.login("000.000.000-01", "123")['token']
+    assert a.saldo(token_a, "1001")['limite_saques'] == 3
+    banco.execute_query("UPDATE contas SET limite_saques = 10 WHERE numero = '1001'")
+    for _ in range(5): b.sacar(token_b, "1001", 1)
+    assert a.sacar(token_a, "1001", 1)['saldo'] == 494.0
+
+def test_falha_de_conexao_sem_interface(tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, 'tkinter', None) # Qualquer tentativa de abrir um diálogo falharia com ImportError
+    with pytest.raises(sqlite3.OperationalError): DatabaseManager(str(tmp_path / "nao_existe" / "banco.db"), pool=True)
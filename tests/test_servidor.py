@@ -0,0 +1,36 @@
+"""Validação do Content-Length no servidor HTTP: respostas de erro em vez de conexão derrubada."""
+import asyncio
+import json
+
+import pytest
+
+from servico import ServicoBancario
+from servidor import TAMANHO_MAX_CORPO, ServidorBancario
+
+async def _requisitar(banco, content_length: str, corpo: bytes = b"") -> tuple[int, dict]:
+    servidor = ServidorBancario(ServicoBancario(banco), porta=0, max_workers=1); porta = await servidor.iniciar()
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", porta)
+        writer.write(f"POST /login HTTP/1.1\r\nHost: teste\r\nContent-Length: {content_length}\r\n\r\n".encode('latin-1') + corpo); await writer.drain()
+        status = int((await reader.readline()).split()[1])
+        cabecalhos = {}
+        while (linha := await reader.readline()) not in (b"\r\n", b""):
+            nome, _, valor = linha.decode('latin-1').partition(":"); cabecalhos[nome.strip().lower()] = valor.strip()
+        resposta = json.loads(await reader.readexactly(int(cabecalhos['content-length'])))
+        writer.close(); return status, resposta
+    finally:
+        servidor.fechar()
+
+@pytest.mark.parametrize("valor", ["abc", "-1", "+5", "1_0", "1.5"])
+def test_content_length_invalido(banco, valor):
+    status, resposta = asyncio.run(_requisitar(banco, valor))
+    assert status == 400 and resposta['erro']['codigo'] == 'requisicao_invalida'
+
+def test_corpo_grande_demais(banco):
+    status, resposta = asyncio.run(_requisitar(banco, str(TAMANHO_MAX_CORPO + 1)))
+    assert status == 413 and resposta['erro']['codigo'] == 'corpo_grande'
+
+def test_content_length_valido(banco):
+    corpo = b'{"cpf": "000.000.000-00", "senha": "x"}'
+    status, resposta = asyncio.run(_requisitar(banco, str(len(corpo)), corpo))
+    assert status != 400 and resposta['ok'] is False # Chegou ao serviço: credenciais recusadas